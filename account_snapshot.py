@@ -0,0 +1,123 @@
+"""
+账户/持仓快照
+同一轮循环内的账户余额和持仓查询共享一份数据（TTL内读内存），
+任何下单/撤单/平仓请求成功后自动失效，下一次查询重新请求
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+
+class AccountSnapshot:
+    """合约账户余额和持仓的共享快照"""
+
+    def __init__(self, client, ttl: float = 10.0):
+        """
+        初始化账户快照
+
+        Args:
+            client: BinanceClient实例（注册下单监听，下单后自动失效）
+            ttl: 快照有效期（秒）
+        """
+        self.client = client
+        self.ttl = ttl
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._account: Optional[Dict] = None
+        self._positions: Optional[List[Dict]] = None
+        self._account_at = 0.0
+        self._positions_at = 0.0
+
+        # 统计信息
+        self.stats = {
+            'account_fetches': 0,
+            'position_fetches': 0,
+            'hits': 0,
+            'invalidations': 0
+        }
+
+        if hasattr(client, 'add_order_listener'):
+            client.add_order_listener(self._on_order)
+
+    def _on_order(self, method: str, endpoint: str):
+        """下单监听回调"""
+        self.invalidate()
+
+    def invalidate(self):
+        """使快照失效（下单后或新一轮循环开始时调用）"""
+        with self._lock:
+            self._account = None
+            self._positions = None
+            self.stats['invalidations'] += 1
+
+    # ========== 数据加载 ==========
+
+    def _get_account(self) -> Dict:
+        """/fapi/v2/account（TTL内复用）"""
+        with self._lock:
+            if self._account is not None and time.time() - self._account_at < self.ttl:
+                self.stats['hits'] += 1
+                return self._account
+
+            # 在锁内请求：并发的查询只发出一次请求，下单监听的失效也会等本次请求结束
+            self._account = self.client.get_futures_account_info()
+            self._account_at = time.time()
+            self.stats['account_fetches'] += 1
+            return self._account
+
+    def _get_positions(self) -> List[Dict]:
+        """非零持仓（TTL内复用；用户数据流同步时 get_active_positions 读本地镜像）"""
+        with self._lock:
+            if self._positions is not None and time.time() - self._positions_at < self.ttl:
+                self.stats['hits'] += 1
+                return self._positions
+
+            self._positions = self.client.get_active_positions()
+            self._positions_at = time.time()
+            self.stats['position_fetches'] += 1
+            return self._positions
+
+    # ========== 查询接口 ==========
+
+    def get_account_info(self) -> Dict:
+        """合约账户信息（与 BinanceClient.get_futures_account_info 相同，返回副本）"""
+        return dict(self._get_account())
+
+    def get_balance(self) -> float:
+        """合约账户总钱包余额（与 BinanceClient.get_futures_usdt_balance 相同）"""
+        return float(self._get_account().get('totalWalletBalance', 0))
+
+    def get_available_balance(self) -> float:
+        """合约账户可用余额"""
+        return float(self._get_account().get('availableBalance', 0))
+
+    def get_positions(self) -> List[Dict]:
+        """活跃持仓（与 BinanceClient.get_active_positions 相同，返回副本）"""
+        return [dict(p) for p in self._get_positions()]
+
+    def get_position(self, symbol: str) -> Optional[Dict]:
+        """单个交易对的持仓，无持仓返回None"""
+        for position in self._get_positions():
+            if position.get('symbol') == symbol:
+                return dict(position)
+        return None
+
+    def get_summary(self) -> Dict:
+        """
+        账户摘要
+
+        Returns:
+            {'balance', 'positions', 'unrealized_pnl', 'total_value'}
+        """
+        balance = self.get_balance()
+        positions = self.get_positions()
+        unrealized_pnl = sum(float(p.get('unRealizedProfit', 0)) for p in positions)
+        return {
+            'balance': balance,
+            'positions': positions,
+            'unrealized_pnl': unrealized_pnl,
+            'total_value': balance + unrealized_pnl
+        }
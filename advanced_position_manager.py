@@ -158,7 +158,7 @@ class AdvancedPositionManager:
 
             # 计算滚仓数量：usable_pnl * leverage / price
             quantity = (usable_pnl * leverage) / current_price
-            quantity = round(quantity, 3)  # 精度控制
+            quantity = self.client.exchange_filters.get(symbol).quantize_qty(quantity)  # 按交易所步长取整
 
             # 设置杠杆
             self.client.set_leverage(symbol, leverage)
@@ -232,7 +232,7 @@ class AdvancedPositionManager:
 
             # 计算数量
             quantity = current_size / price
-            quantity = round(quantity, 3)
+            quantity = self.client.exchange_filters.get(symbol).quantize_qty(quantity)
 
             # 执行加仓
             result = self.client.create_futures_order(
@@ -301,33 +301,36 @@ class AdvancedPositionManager:
                     tp_price = entry_price * (1 + profit_pct / 100)
                 else:
                     tp_price = entry_price * (1 - profit_pct / 100)
+                tp_price = self.client.exchange_filters.get(symbol).quantize_price(tp_price)
 
                 # 计算本级止盈数量
                 qty = remaining_qty * (close_pct / 100)
                 qty = round(qty, 3)
 
-                # 创建止盈订单
-                order = self.client.create_take_profit_order(
-                    symbol=symbol,
-                    side=tp_side,
-                    quantity=qty,
-                    stop_price=tp_price,
-                    reduce_only=True
-                )
-
                 results.append({
                     'profit_pct': profit_pct,
                     'price': tp_price,
                     'quantity': qty,
-                    'order': order
+                    'order': None
                 })
 
                 remaining_qty -= qty
 
-                self.logger.info(
-                    f"📈 设置止盈 Level {len(results)}: "
-                    f"盈利{profit_pct}%时平{close_pct}%仓位 @ ${tp_price:.2f}"
-                )
+            # 所有级别的止盈单一次批量提交
+            order_results = self._place_take_profit_orders(
+                symbol, tp_side, [(r['price'], r['quantity']) for r in results]
+            )
+
+            for i, (level, result, order_result) in enumerate(zip(tp_levels, results, order_results), 1):
+                if order_result['success']:
+                    result['order'] = order_result['order']
+                    self.logger.info(
+                        f"📈 设置止盈 Level {i}: "
+                        f"盈利{level['profit_pct']}%时平{level['close_pct']}%仓位 @ ${result['price']:.2f}"
+                    )
+                else:
+                    result['error'] = order_result['error']
+                    self.logger.error(f"设置止盈 Level {i} 失败: {order_result['error']}")
 
             return results
 
@@ -335,6 +338,48 @@ class AdvancedPositionManager:
             self.logger.error(f"设置多级止盈失败: {e}")
             return []
 
+    def _place_take_profit_orders(self, symbol: str, close_side: str,
+                                  levels: List[Tuple[float, float]]) -> List[Dict]:
+        """
+        批量提交止盈单（TAKE_PROFIT_MARKET），每批最多 BATCH_ORDER_LIMIT 个，一个请求往返
+
+        Args:
+            symbol: 交易对
+            close_side: 平仓方向 (SELL 平多 / BUY 平空)
+            levels: [(触发价格, 数量), ...]
+
+        Returns:
+            与 levels 一一对应的结果列表（格式同 BinanceClient.create_batch_futures_orders）
+        """
+        if not levels:
+            return []
+
+        # 双向持仓模式不接受 reduceOnly，由 positionSide 决定平仓方向
+        try:
+            position_side = self.client.get_close_position_side(close_side)
+        except Exception as e:
+            return [{'success': False, 'error': f'获取持仓模式失败: {e}', 'code': None} for _ in levels]
+
+        orders = [{
+            'symbol': symbol,
+            'side': close_side,
+            'order_type': 'TAKE_PROFIT_MARKET',
+            'quantity': quantity,
+            'position_side': position_side,
+            'reduce_only': position_side == 'BOTH',
+            'stopPrice': stop_price
+        } for stop_price, quantity in levels]
+
+        results = []
+        batch_size = self.client.BATCH_ORDER_LIMIT
+        for i in range(0, len(orders), batch_size):
+            chunk = orders[i:i + batch_size]
+            try:
+                results.extend(self.client.create_batch_futures_orders(chunk))
+            except Exception as e:
+                results.extend({'success': False, 'error': str(e), 'code': None} for _ in chunk)
+        return results
+
     # ==================== 4. 移动止损到盈亏平衡 ====================
 
     def move_stop_to_breakeven(self, symbol: str, entry_price: float,
@@ -379,6 +424,7 @@ class AdvancedPositionManager:
                 profit_pct = ((entry_price - mark_price) / entry_price) * 100
                 new_stop_price = entry_price * (1 - breakeven_offset_pct / 100)
                 stop_side = 'BUY'
+            new_stop_price = self.client.exchange_filters.get(symbol).quantize_price(new_stop_price)
 
             if profit_pct < profit_trigger_pct:
                 return {
@@ -457,6 +503,7 @@ class AdvancedPositionManager:
             else:
                 stop_price = entry_price + stop_distance
                 stop_side = 'BUY'
+            stop_price = self.client.exchange_filters.get(symbol).quantize_price(stop_price)
 
             # 创建止损订单
             order = self.client.create_stop_loss_order(
@@ -589,7 +636,7 @@ class AdvancedPositionManager:
 
             # 计算对冲数量和方向
             hedge_quantity = abs(position_amt) * hedge_ratio
-            hedge_quantity = round(hedge_quantity, 3)
+            hedge_quantity = self.client.exchange_filters.get(symbol).quantize_qty(hedge_quantity)
 
             hedge_side = 'SELL' if position_amt > 0 else 'BUY'
 
@@ -668,7 +715,7 @@ class AdvancedPositionManager:
                 side = 'SELL' if position_amt > 0 else 'BUY'
                 quantity = abs(diff_usdt / mark_price)
 
-            quantity = round(quantity, 3)
+            quantity = self.client.exchange_filters.get(symbol).quantize_qty(quantity)
 
             # 执行调整
             order = self.client.create_futures_order(
@@ -772,8 +819,8 @@ class AdvancedPositionManager:
             # 计算订单方向（止盈是反向平仓）
             close_side = 'SELL' if side == 'LONG' else 'BUY'
 
-            orders_created = []
-            target_prices = []
+            filters = self.client.exchange_filters.get(symbol)
+            planned = []
             remaining_pct = 100.0  # 剩余仓位百分比
 
             self.logger.info(f"\n💰 [分批止盈] 开始设置 {symbol} 止盈计划:")
@@ -791,6 +838,7 @@ class AdvancedPositionManager:
                     target_price = entry_price * (1 + profit_pct / 100)
                 else:  # SHORT
                     target_price = entry_price * (1 - profit_pct / 100)
+                target_price = filters.quantize_price(target_price)
 
                 # 计算平仓数量（基于剩余仓位百分比）
                 if i == len(targets):
@@ -800,38 +848,43 @@ class AdvancedPositionManager:
                     # 中间目标：平指定百分比
                     close_quantity = total_quantity * (close_pct / 100)
 
-                # 确保数量精度（Binance要求至少3位小数）
-                close_quantity = round(close_quantity, 3)
+                # 按交易所数量步长取整
+                close_quantity = filters.quantize_qty(close_quantity)
 
-                if close_quantity < 0.001:
-                    self.logger.warning(f"  ⚠️  跳过数量过小的订单: {close_quantity}")
+                # 低于交易所最小数量/最小名义价值的订单会被拒绝，不提交
+                if not filters.is_valid_order(close_quantity, target_price):
+                    self.logger.warning(
+                        f"  ⚠️  跳过数量过小的订单: {close_quantity} "
+                        f"(最小 {filters.min_order_qty(target_price)} @ ${target_price})"
+                    )
                     continue
 
-                # 创建止盈限价单（TAKE_PROFIT_MARKET类型）
-                try:
-                    order = self.client.create_take_profit_order(
-                        symbol=symbol,
-                        side=close_side,
-                        quantity=close_quantity,
-                        stop_price=target_price,
-                        reduce_only=True
-                    )
+                planned.append((i, profit_pct, close_pct, target_price, close_quantity))
 
-                    orders_created.append(order)
-                    target_prices.append(target_price)
+                # 更新剩余仓位
+                remaining_pct -= close_pct
 
-                    self.logger.info(
-                        f"  ✅ 目标{i}: 盈利{profit_pct}%时 @ ${target_price:.2f} "
-                        f"平仓{close_pct}% ({close_quantity:.3f}个)"
-                    )
+            # 创建止盈单（TAKE_PROFIT_MARKET类型），所有目标一次批量提交
+            order_results = self._place_take_profit_orders(
+                symbol, close_side, [(price, qty) for _, _, _, price, qty in planned]
+            )
 
-                    # 更新剩余仓位
-                    remaining_pct -= close_pct
+            orders_created = []
+            target_prices = []
 
-                except Exception as e:
-                    self.logger.error(f"  ❌ 创建止盈订单{i}失败: {e}")
+            for (i, profit_pct, close_pct, target_price, close_quantity), order_result in zip(planned, order_results):
+                if not order_result['success']:
+                    self.logger.error(f"  ❌ 创建止盈订单{i}失败: {order_result['error']}")
                     continue
 
+                orders_created.append(order_result['order'])
+                target_prices.append(target_price)
+
+                self.logger.info(
+                    f"  ✅ 目标{i}: 盈利{profit_pct}%时 @ ${target_price:.2f} "
+                    f"平仓{close_pct}% ({close_quantity:.3f}个)"
+                )
+
             if len(orders_created) == 0:
                 return {
                     'success': False,
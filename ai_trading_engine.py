@@ -7,13 +7,13 @@ from typing import Dict, List, Optional
 from datetime import datetime
 import logging
 import time
-import pandas as pd
+import numpy as np
 import os
-import math
 
 from deepseek_client import DeepSeekClient
 from binance_client import BinanceClient
 from market_analyzer import MarketAnalyzer
+import indicators
 from risk_manager import RiskManager
 from advanced_position_manager import AdvancedPositionManager
 from trailing_stop_manager import TrailingStopManager
@@ -30,10 +30,13 @@ except ImportError:
 class AITradingEngine:
     """AI 交易引擎"""
 
+    # 单交易对提示词（DeepSeekClient._build_trading_prompt）和模型选择读取的市场上下文字段
+    CONTEXT_FIELDS = ('current_price', 'price_change_24h', 'rsi', 'macd', 'trend')
+
     def __init__(self, deepseek_api_key: str, binance_client: BinanceClient,
                  market_analyzer: MarketAnalyzer, risk_manager: RiskManager,
                  performance_tracker=None, roll_tracker=None,
-                 enable_enhanced_features: bool = True):
+                 enable_enhanced_features: bool = True, account_snapshot=None):
         """
         初始化 AI 交易引擎
 
@@ -45,6 +48,7 @@ class AITradingEngine:
             performance_tracker: 性能追踪器（用于保存交易到文件）
             roll_tracker: ROLL状态追踪器
             enable_enhanced_features: 是否启用增强功能（运行状态追踪、丰富市场数据）
+            account_snapshot: 账户/持仓快照（同一轮循环内共享，不传时直接请求API）
         """
         self.deepseek = DeepSeekClient(deepseek_api_key)
         self.binance = binance_client
@@ -52,6 +56,7 @@ class AITradingEngine:
         self.risk_manager = risk_manager
         self.performance = performance_tracker  # 性能追踪器
         self.roll_tracker = roll_tracker  # ROLL追踪器
+        self.account_snapshot = account_snapshot
 
         self.logger = logging.getLogger(__name__)
         self.trade_history = []
@@ -82,7 +87,8 @@ class AITradingEngine:
                 self.enhanced_engine = EnhancedDecisionEngine(
                     binance_client,
                     market_analyzer,
-                    self.runtime_manager
+                    self.runtime_manager,
+                    account_snapshot=account_snapshot
                 )
                 self.logger.info("[OK] 增强功能已启用（运行状态追踪、丰富市场数据）")
             except Exception as e:
@@ -94,7 +100,8 @@ class AITradingEngine:
             self.runtime_manager = None
             self.enhanced_engine = None
 
-    def analyze_and_trade(self, symbol: str, max_position_pct: float = 10.0, runtime_stats: Dict = None) -> Dict:
+    def analyze_and_trade(self, symbol: str, max_position_pct: float = 10.0, runtime_stats: Dict = None,
+                          deadline: Optional[float] = None, preset_decision: Optional[Dict] = None) -> Dict:
         """
         分析市场并执行交易
 
@@ -102,6 +109,8 @@ class AITradingEngine:
             symbol: 交易对（如 BTCUSDT）
             max_position_pct: 最大仓位百分比
             runtime_stats: 可选的系统运行统计信息（由bot实例提供）
+            deadline: 截止时间（time.time()），AI决策返回时已超过则不再下单（行情已过期）
+            preset_decision: 批量决策中该交易对的决策（可选，传入时不再单独调用AI）
 
         Returns:
             交易结果
@@ -143,41 +152,12 @@ class AITradingEngine:
                     # 全新系统，无真实交易历史，不显示警告
                     self.logger.debug(f"[{symbol}] [DEBUG] 无有效交易历史，跳过胜率检查")
 
-            # 2. 收集市场数据
-            self.logger.info(f"[{symbol}] 开始分析...")
-
-            # [NEW] 如果启用了增强功能，使用MarketAnalyzer获取完整市场上下文
-            if self.enhanced_features_enabled and self.market_analyzer:
-                market_data = self.market_analyzer.get_comprehensive_market_context(symbol)
-                self.logger.debug(f"[{symbol}] [OK] 使用增强市场数据（包含历史序列、4h上下文、资金费率、持仓量）")
-            else:
-                market_data = self._gather_market_data(symbol)
-
-            # 2. 获取账户信息（传递runtime_stats）
-            account_info = self._get_account_info(runtime_stats=runtime_stats)
-
-            # 3. 双模型决策系统：推理模型 + 日常模型
-            # 判断是否使用推理模型（Reasoner）
-            use_reasoner = self._should_use_reasoner(symbol, market_data, account_info)
-
-            if use_reasoner:
-                self.logger.info(f"[{symbol}] [深度分析] 调用 DeepSeek Chat V3.1...")
-                ai_result = self.deepseek.analyze_with_reasoning(
-                    market_data=market_data,
-                    account_info=account_info,
-                    trade_history=self.trade_history[-10:]
-                )
+            if preset_decision is not None:
+                # 本轮批量决策已给出该交易对的决策，不再单独调用AI
+                self.logger.info(f"[{symbol}] 使用本轮批量决策")
+                ai_result = {'success': True, 'decision': preset_decision, 'model_used': 'deepseek-chat (batch)'}
             else:
-                self.logger.info(f"[{symbol}] [快速分析] 调用 DeepSeek Chat V3.1...")
-                ai_result = self.deepseek.analyze_market_and_decide(
-                    market_data,
-                    account_info,
-                    self.trade_history
-                )
-
-            # [NEW] AI调用后更新计数
-            if self.enhanced_features_enabled and self.runtime_manager:
-                self.runtime_manager.increment_ai_calls()
+                ai_result = self._decide_single(symbol, runtime_stats)
 
             if not ai_result['success']:
                 error_msg = ai_result.get('error', '未知错误')
@@ -203,6 +183,15 @@ class AITradingEngine:
             # 4. [OK] 完全信任AI决策，不设置信心阈值
             # DeepSeek会根据自己的判断决定信心度，我们完全尊重AI的自主权
 
+            # 决策耗时超过截止时间：决策依据的行情已过期，放弃执行
+            if deadline is not None and time.time() > deadline and decision['action'] != 'HOLD':
+                self.logger.warning(f"[{symbol}] 决策返回时已超过截止时间，放弃执行 {decision['action']}")
+                return {
+                    'success': False,
+                    'error': '决策超时，行情已过期，放弃执行',
+                    'details': {'decision': decision}
+                }
+
             # 执行交易
             trade_result = self._execute_trade(symbol, decision, max_position_pct)
 
@@ -228,7 +217,81 @@ class AITradingEngine:
                 'error': str(e)
             }
 
-    def analyze_position_for_closing(self, symbol: str, position: Dict, runtime_stats: Dict = None) -> Dict:
+    def _decide_single(self, symbol: str, runtime_stats: Dict = None) -> Dict:
+        """单独为一个交易对收集市场数据并调用AI决策"""
+        # 收集市场数据
+        self.logger.info(f"[{symbol}] 开始分析...")
+
+        # [NEW] 如果启用了增强功能，使用MarketAnalyzer获取完整市场上下文
+        if self.enhanced_features_enabled and self.market_analyzer:
+            # 只并发预取提示词用到的字段
+            market_data = self.market_analyzer.get_comprehensive_market_context(symbol).prefetch(
+                self.CONTEXT_FIELDS
+            )
+            self.logger.debug(f"[{symbol}] [OK] 使用增强市场数据（包含历史序列、4h上下文、资金费率、持仓量）")
+        else:
+            market_data = self._gather_market_data(symbol)
+
+        # 获取账户信息（传递runtime_stats）
+        account_info = self._get_account_info(runtime_stats=runtime_stats)
+
+        # 双模型决策系统：推理模型 + 日常模型
+        # 判断是否使用推理模型（Reasoner）
+        use_reasoner = self._should_use_reasoner(symbol, market_data, account_info)
+
+        if use_reasoner:
+            self.logger.info(f"[{symbol}] [深度分析] 调用 DeepSeek Chat V3.1...")
+            ai_result = self.deepseek.analyze_with_reasoning(
+                market_data=market_data,
+                account_info=account_info,
+                trade_history=self.trade_history[-10:]
+            )
+        else:
+            self.logger.info(f"[{symbol}] [快速分析] 调用 DeepSeek Chat V3.1...")
+            ai_result = self.deepseek.analyze_market_and_decide(
+                market_data,
+                account_info,
+                self.trade_history
+            )
+
+        # [NEW] AI调用后更新计数
+        if self.enhanced_features_enabled and self.runtime_manager:
+            self.runtime_manager.increment_ai_calls()
+
+        return ai_result
+
+    def decide_batch(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        一次AI调用为多个交易对做出决策（提示词由 EnhancedDecisionEngine 生成，覆盖全部交易对和持仓）
+
+        Args:
+            symbols: 本轮需要决策的交易对
+
+        Returns:
+            {symbol: decision}；增强功能未启用、调用或解析失败时为空字典，
+            缺少决策的交易对由调用方单独决策
+        """
+        if not symbols or not self.enhanced_features_enabled or self.enhanced_engine is None:
+            return {}
+        try:
+            prompt = self.enhanced_engine.generate_comprehensive_prompt(symbols)
+            self.logger.info(f"[BATCH] 一次调用为 {len(symbols)} 个交易对决策...")
+            result = self.deepseek.analyze_batch_and_decide(prompt, symbols)
+        except Exception as e:
+            self.logger.error(f"[BATCH] 批量决策失败，逐个交易对决策: {e}")
+            return {}
+
+        if self.runtime_manager:
+            self.runtime_manager.increment_ai_calls()
+        if not result['success']:
+            self.logger.warning(f"[BATCH] 批量决策失败，逐个交易对决策: {result.get('error')}")
+            return {}
+        if result['missing']:
+            self.logger.warning(f"[BATCH] 缺少 {', '.join(result['missing'])} 的决策，这些交易对单独决策")
+        return result['decisions']
+
+    def analyze_position_for_closing(self, symbol: str, position: Dict, runtime_stats: Dict = None,
+                                     preset_decision: Optional[Dict] = None) -> Dict:
         """
         评估现有持仓是否应该平仓
 
@@ -236,10 +299,18 @@ class AITradingEngine:
             symbol: 交易对
             position: 当前持仓信息
             runtime_stats: 可选的系统运行统计信息（由bot实例提供）
+            preset_decision: 批量决策中该交易对的决策（可选，传入时不再单独调用AI）
 
         Returns:
             评估结果，包含AI决策
         """
+        if preset_decision is not None:
+            self.logger.info(f"[{symbol}] 持仓使用本轮批量决策: {preset_decision.get('action', 'HOLD')}")
+            return {
+                'success': True,
+                'decision': preset_decision
+            }
+
         try:
             from datetime import datetime, timezone
 
@@ -333,20 +404,16 @@ class AITradingEngine:
             # 获取当前价格
             current_price = self.market_analyzer.get_current_price(symbol)
 
-            # 获取 K 线数据计算技术指标（使用 MarketAnalyzer）
-            df = self.market_analyzer.get_kline_data(symbol, '1h', limit=100)
+            # 获取 K 线数据计算技术指标（float64 数组，一次计算全部指标）
+            bars = self.market_analyzer.get_kline_arrays(symbol, '1h', limit=100)
+            ind = indicators.compute_all(bars['close'], spec={
+                'sma': (20, 50), 'ema': (12, 26), 'rsi': (14,), 'macd': (12, 26, 9), 'bollinger': (20, 2)
+            })
+            sma_20 = indicators.last(ind['sma20'], current_price)
+            sma_50 = indicators.last(ind['sma50'], current_price)
 
-            # 计算技术指标
-            rsi = self.market_analyzer.calculate_rsi(df, period=14)
-            macd_line, signal_line, histogram = self.market_analyzer.calculate_macd(df)
-            upper_band, middle_band, lower_band = self.market_analyzer.calculate_bollinger_bands(df, period=20)
-
-            # 计算移动平均线
-            sma_20 = self.market_analyzer.calculate_sma(df, 20)
-            sma_50 = self.market_analyzer.calculate_sma(df, 50)
-
-            # 提取收盘价列表（用于其他计算）
-            closes = df['close'].tolist()
+            # 支撑/阻力位（枢轴点聚类，与市场上下文共用同一检测组件和缓存）
+            levels = self.market_analyzer.find_support_resistance(symbol, '1h', current_price=current_price)
 
             # 提取价格信息
             price_info = overview.get('price_info', {})
@@ -356,25 +423,25 @@ class AITradingEngine:
                 'current_price': current_price,
                 'price_change_24h': price_info.get('change_percent', 0),
                 'volume_24h': price_info.get('quote_volume_24h', 0),
-                'rsi': round(rsi.iloc[-1], 2) if len(rsi) > 0 and not pd.isna(rsi.iloc[-1]) else 50,
+                'rsi': round(indicators.last(ind['rsi14'], 50), 2),
                 'macd': {
-                    'macd': round(macd_line.iloc[-1], 4) if len(macd_line) > 0 else 0,
-                    'signal': round(signal_line.iloc[-1], 4) if len(signal_line) > 0 else 0,
-                    'histogram': round(histogram.iloc[-1], 4) if len(histogram) > 0 else 0
+                    'macd': round(indicators.last(ind['macd'], 0), 4),
+                    'signal': round(indicators.last(ind['macd_signal'], 0), 4),
+                    'histogram': round(indicators.last(ind['macd_hist'], 0), 4)
                 },
                 'bollinger_bands': {
-                    'upper': round(upper_band.iloc[-1], 2) if len(upper_band) > 0 else 0,
-                    'middle': round(middle_band.iloc[-1], 2) if len(middle_band) > 0 else 0,
-                    'lower': round(lower_band.iloc[-1], 2) if len(lower_band) > 0 else 0
+                    'upper': round(indicators.last(ind['bb_upper'], 0), 2),
+                    'middle': round(indicators.last(ind['bb_middle'], 0), 2),
+                    'lower': round(indicators.last(ind['bb_lower'], 0), 2)
                 },
                 'moving_averages': {
-                    'sma_20': round(sma_20.iloc[-1], 2) if len(sma_20) > 0 else 0,
-                    'sma_50': round(sma_50.iloc[-1], 2) if len(sma_50) > 0 else 0
+                    'sma_20': round(sma_20, 2),
+                    'sma_50': round(sma_50, 2)
                 },
-                'trend': self._determine_trend(current_price, sma_20.iloc[-1] if len(sma_20) > 0 else current_price, sma_50.iloc[-1] if len(sma_50) > 0 else current_price),
-                'support_levels': self._find_support_levels(closes),
-                'resistance_levels': self._find_resistance_levels(closes),
-                'atr': self._calculate_atr(df)
+                'trend': self._determine_trend(current_price, sma_20, sma_50),
+                'support_levels': levels['support_levels'],
+                'resistance_levels': levels['resistance_levels'],
+                'atr': self._calculate_atr(bars)
             }
 
         except Exception as e:
@@ -383,6 +450,18 @@ class AITradingEngine:
             self.logger.error(f"详细错误: {traceback.format_exc()}")
             raise
 
+    def _get_balance(self) -> float:
+        """合约账户余额（有快照时读快照）"""
+        if self.account_snapshot is not None:
+            return self.account_snapshot.get_balance()
+        return self.binance.get_futures_usdt_balance()
+
+    def _get_positions(self) -> List[Dict]:
+        """活跃持仓（有快照时读快照）"""
+        if self.account_snapshot is not None:
+            return self.account_snapshot.get_positions()
+        return self.binance.get_active_positions()
+
     def _get_account_info(self, runtime_stats: Dict = None) -> Dict:
         """
         获取账户信息
@@ -391,11 +470,9 @@ class AITradingEngine:
             runtime_stats: 可选的系统运行统计信息（由bot实例提供）
         """
         try:
-            # 获取合约余额
-            futures_balance = self.binance.get_futures_usdt_balance()
-
-            # 获取持仓
-            positions = self.binance.get_active_positions()
+            # 获取合约余额和持仓（优先读本轮共享快照）
+            futures_balance = self._get_balance()
+            positions = self._get_positions()
 
             # 计算未实现盈亏
             total_unrealized_pnl = sum(float(pos.get('unRealizedProfit', 0)) for pos in positions)
@@ -463,7 +540,7 @@ class AITradingEngine:
         take_profit_pct = (take_profit_pct_raw if take_profit_pct_raw is not None else 2) / 100  # AI未返回时最保守2%止盈
 
         # 获取账户余额
-        balance = self.binance.get_futures_usdt_balance()
+        balance = self._get_balance()
         # 使用DeepSeek决定的仓位大小
         trade_amount = balance * (position_size_pct / 100)
 
@@ -552,35 +629,12 @@ class AITradingEngine:
             current_price = self.market_analyzer.get_current_price(symbol)
 
             # [CONFIG] 智能杠杆调整：同时满足币安名义价值和精度要求
-            # 先确定精度规则和最小名义价值（币安不同交易对要求不同）
-            if 'BTC' in symbol:
-                precision = 3  # BTC: 0.001
-                min_qty = 0.001
-                base_min_notional = 100  # BTC 最小名义价值 $100
-            elif 'ETH' in symbol:
-                precision = 3  # ETH: 0.001
-                min_qty = 0.001
-                base_min_notional = 20  # ETH 最小名义价值 $20
-            elif 'BNB' in symbol:
-                precision = 2  # BNB: 0.01
-                min_qty = 0.01
-                base_min_notional = 20  # BNB 最小名义价值 $20
-            elif 'SOL' in symbol:
-                precision = 1  # SOL: 0.1
-                min_qty = 0.1
-                base_min_notional = 20  # SOL 最小名义价值 $20
-            elif 'DOGE' in symbol:
-                precision = 0  # DOGE: 整数
-                min_qty = 1.0
-                base_min_notional = 20  # DOGE 最小名义价值 $20
-            else:
-                precision = 1  # 默认: 0.1
-                min_qty = 0.1
-                base_min_notional = 20  # 默认最小名义价值 $20
+            # 精度规则和最小名义价值来自交易所规则缓存（LOT_SIZE / MIN_NOTIONAL）
+            filters = self.binance.exchange_filters.get(symbol)
+            min_qty = float(filters.market_min_qty)
 
-            # 计算满足精度要求所需的最小名义价值
-            min_notional_for_precision = min_qty * current_price
-            min_notional = max(base_min_notional, min_notional_for_precision)  # 取交易所要求和精度要求的最大值
+            # 同时满足最小数量和最小名义价值所需的名义价值
+            min_notional = filters.min_order_notional(current_price)
 
             # 计算所需杠杆
             required_leverage = int(min_notional / amount) + 1
@@ -598,41 +652,21 @@ class AITradingEngine:
             # 计算数量并按交易对调整精度
             raw_quantity = (amount * leverage) / current_price
 
-            # 根据交易对设置精度（币安合约规则）
-            if 'BTC' in symbol:
-                quantity = round(raw_quantity, 3)  # BTC: 0.001
-            elif 'ETH' in symbol:
-                quantity = round(raw_quantity, 3)  # ETH: 0.001
-            elif 'BNB' in symbol:
-                quantity = round(raw_quantity, 1)  # BNB: 0.1
-            elif 'SOL' in symbol:
-                quantity = round(raw_quantity, 1)  # SOL: 0.1
-            elif 'DOGE' in symbol:
-                quantity = round(raw_quantity, 0)  # DOGE: 整数
-            else:
-                quantity = round(raw_quantity, 1)  # 默认: 0.1 (大多数山寨币)
+            # 按交易所数量步长向下取整
+            quantity = filters.quantize_qty(raw_quantity)
 
             # 🔧 如果计算数量为0或名义价值不足，尝试使用最小交易量
             actual_notional = quantity * current_price
             if quantity == 0 or actual_notional < min_notional:
-                # 计算满足最小名义价值所需的数量（向上取整到精度要求）
-                required_quantity = min_notional / current_price
-                # 向上取整到精度要求
-                if 'BTC' in symbol or 'ETH' in symbol:
-                    required_quantity = math.ceil(required_quantity * 1000) / 1000  # 向上取整到0.001
-                elif 'BNB' in symbol or 'SOL' in symbol:
-                    required_quantity = math.ceil(required_quantity * 10) / 10  # 向上取整到0.1
-                elif 'DOGE' in symbol:
-                    required_quantity = math.ceil(required_quantity)  # 向上取整到整数
-                else:
-                    required_quantity = math.ceil(required_quantity * 10) / 10  # 默认向上取整到0.1
+                # 满足最小数量和最小名义价值的最小数量（已向上取整到步长）
+                required_quantity = filters.min_order_qty(current_price)
                 
                 # 计算所需保证金
                 adjusted_notional = required_quantity * current_price
                 required_margin = adjusted_notional / leverage
                 
                 # 获取可用余额
-                available_balance = self.binance.get_futures_usdt_balance()
+                available_balance = self._get_balance()
                 
                 if required_margin > available_balance:
                     self.logger.warning(f"[{symbol}] 最小交易需要保证金 ${required_margin:.2f}，可用余额 ${available_balance:.2f}，无法开仓")
@@ -643,37 +677,13 @@ class AITradingEngine:
                                f"所需保证金: ${required_margin:.2f}")
                 quantity = required_quantity
 
-            # 计算止损止盈价格（四舍五入到2位小数，USDT精度要求）
-            stop_loss = round(current_price * (1 - stop_loss_pct), 2)
-            take_profit = round(current_price * (1 + take_profit_pct), 2)
-
-            # 开多单
-            order = self.binance.create_futures_order(
-                symbol=symbol,
-                side='BUY',
-                order_type='MARKET',
-                quantity=quantity,
-                position_side='LONG'
-            )
+            # 计算止损止盈价格（按交易所 tickSize 取整）
+            stop_loss = filters.quantize_price(current_price * (1 - stop_loss_pct))
+            take_profit = filters.quantize_price(current_price * (1 + take_profit_pct))
 
-            # 设置止损（positionSide已足够，无需reduce_only）
-            self.binance.create_futures_order(
-                symbol=symbol,
-                side='SELL',
-                order_type='STOP_MARKET',
-                quantity=quantity,
-                position_side='LONG',
-                stopPrice=stop_loss
-            )
-
-            # 设置止盈（positionSide已足够，无需reduce_only）
-            self.binance.create_futures_order(
-                symbol=symbol,
-                side='SELL',
-                order_type='TAKE_PROFIT_MARKET',
-                quantity=quantity,
-                position_side='LONG',
-                stopPrice=take_profit
+            # 开多单，止损止盈与开仓单同一批提交
+            order = self._place_entry_with_protection(
+                symbol, 'BUY', 'LONG', quantity, stop_loss, take_profit
             )
 
             self.logger.info(f"[OK] 开多单成功: {symbol}, 数量: {quantity}, 杠杆: {leverage}x, 止损: {stop_loss}, 止盈: {take_profit}")
@@ -702,35 +712,12 @@ class AITradingEngine:
             current_price = self.market_analyzer.get_current_price(symbol)
 
             # [CONFIG] 智能杠杆调整：同时满足币安名义价值和精度要求
-            # 先确定精度规则和最小名义价值（币安不同交易对要求不同）
-            if 'BTC' in symbol:
-                precision = 3  # BTC: 0.001
-                min_qty = 0.001
-                base_min_notional = 100  # BTC 最小名义价值 $100
-            elif 'ETH' in symbol:
-                precision = 3  # ETH: 0.001
-                min_qty = 0.001
-                base_min_notional = 20  # ETH 最小名义价值 $20
-            elif 'BNB' in symbol:
-                precision = 2  # BNB: 0.01
-                min_qty = 0.01
-                base_min_notional = 20  # BNB 最小名义价值 $20
-            elif 'SOL' in symbol:
-                precision = 1  # SOL: 0.1
-                min_qty = 0.1
-                base_min_notional = 20  # SOL 最小名义价值 $20
-            elif 'DOGE' in symbol:
-                precision = 0  # DOGE: 整数
-                min_qty = 1.0
-                base_min_notional = 20  # DOGE 最小名义价值 $20
-            else:
-                precision = 1  # 默认: 0.1
-                min_qty = 0.1
-                base_min_notional = 20  # 默认最小名义价值 $20
+            # 精度规则和最小名义价值来自交易所规则缓存（LOT_SIZE / MIN_NOTIONAL）
+            filters = self.binance.exchange_filters.get(symbol)
+            min_qty = float(filters.market_min_qty)
 
-            # 计算满足精度要求所需的最小名义价值
-            min_notional_for_precision = min_qty * current_price
-            min_notional = max(base_min_notional, min_notional_for_precision)  # 取交易所要求和精度要求的最大值
+            # 同时满足最小数量和最小名义价值所需的名义价值
+            min_notional = filters.min_order_notional(current_price)
 
             # 计算所需杠杆
             required_leverage = int(min_notional / amount) + 1
@@ -748,41 +735,21 @@ class AITradingEngine:
             # 计算数量并按交易对调整精度
             raw_quantity = (amount * leverage) / current_price
 
-            # 根据交易对设置精度（币安合约规则）
-            if 'BTC' in symbol:
-                quantity = round(raw_quantity, 3)  # BTC: 0.001
-            elif 'ETH' in symbol:
-                quantity = round(raw_quantity, 3)  # ETH: 0.001
-            elif 'BNB' in symbol:
-                quantity = round(raw_quantity, 1)  # BNB: 0.1
-            elif 'SOL' in symbol:
-                quantity = round(raw_quantity, 1)  # SOL: 0.1
-            elif 'DOGE' in symbol:
-                quantity = round(raw_quantity, 0)  # DOGE: 整数
-            else:
-                quantity = round(raw_quantity, 1)  # 默认: 0.1 (大多数山寨币)
+            # 按交易所数量步长向下取整
+            quantity = filters.quantize_qty(raw_quantity)
 
             # 🔧 如果计算数量为0或名义价值不足，尝试使用最小交易量
             actual_notional = quantity * current_price
             if quantity == 0 or actual_notional < min_notional:
-                # 计算满足最小名义价值所需的数量（向上取整到精度要求）
-                required_quantity = min_notional / current_price
-                # 向上取整到精度要求
-                if 'BTC' in symbol or 'ETH' in symbol:
-                    required_quantity = math.ceil(required_quantity * 1000) / 1000  # 向上取整到0.001
-                elif 'BNB' in symbol or 'SOL' in symbol:
-                    required_quantity = math.ceil(required_quantity * 10) / 10  # 向上取整到0.1
-                elif 'DOGE' in symbol:
-                    required_quantity = math.ceil(required_quantity)  # 向上取整到整数
-                else:
-                    required_quantity = math.ceil(required_quantity * 10) / 10  # 默认向上取整到0.1
+                # 满足最小数量和最小名义价值的最小数量（已向上取整到步长）
+                required_quantity = filters.min_order_qty(current_price)
                 
                 # 计算所需保证金
                 adjusted_notional = required_quantity * current_price
                 required_margin = adjusted_notional / leverage
                 
                 # 获取可用余额
-                available_balance = self.binance.get_futures_usdt_balance()
+                available_balance = self._get_balance()
                 
                 if required_margin > available_balance:
                     self.logger.warning(f"[{symbol}] 最小交易需要保证金 ${required_margin:.2f}，可用余额 ${available_balance:.2f}，无法开仓")
@@ -793,37 +760,13 @@ class AITradingEngine:
                                f"所需保证金: ${required_margin:.2f}")
                 quantity = required_quantity
 
-            # 计算止损止盈价格（四舍五入到2位小数，USDT精度要求）
-            stop_loss = round(current_price * (1 + stop_loss_pct), 2)
-            take_profit = round(current_price * (1 - take_profit_pct), 2)
-
-            # 开空单
-            order = self.binance.create_futures_order(
-                symbol=symbol,
-                side='SELL',
-                order_type='MARKET',
-                quantity=quantity,
-                position_side='SHORT'
-            )
-
-            # 设置止损（positionSide已足够，无需reduce_only）
-            self.binance.create_futures_order(
-                symbol=symbol,
-                side='BUY',
-                order_type='STOP_MARKET',
-                quantity=quantity,
-                position_side='SHORT',
-                stopPrice=stop_loss
-            )
+            # 计算止损止盈价格（按交易所 tickSize 取整）
+            stop_loss = filters.quantize_price(current_price * (1 + stop_loss_pct))
+            take_profit = filters.quantize_price(current_price * (1 - take_profit_pct))
 
-            # 设置止盈（positionSide已足够，无需reduce_only）
-            self.binance.create_futures_order(
-                symbol=symbol,
-                side='BUY',
-                order_type='TAKE_PROFIT_MARKET',
-                quantity=quantity,
-                position_side='SHORT',
-                stopPrice=take_profit
+            # 开空单，止损止盈与开仓单同一批提交
+            order = self._place_entry_with_protection(
+                symbol, 'SELL', 'SHORT', quantity, stop_loss, take_profit
             )
 
             self.logger.info(f"[OK] 开空单成功: {symbol}, 数量: {quantity}, 杠杆: {leverage}x, 止损: {stop_loss}, 止盈: {take_profit}")
@@ -844,6 +787,63 @@ class AITradingEngine:
             self.logger.error(f"[ERROR] 开空单失败: {e}")
             return {'success': False, 'error': str(e)}
 
+    def _place_entry_with_protection(self, symbol: str, side: str, position_side: str,
+                                     quantity: float, stop_loss: float, take_profit: float) -> Dict:
+        """
+        开仓市价单 + 止损 + 止盈通过 /fapi/v1/batchOrders 一次提交，开仓后不留无保护的窗口
+
+        保护单只设置 positionSide（不设置 reduce_only），批内处理顺序不影响挂单。
+        开仓单失败时撤掉已挂上的保护单；保护单失败时单独重试一次。
+
+        Args:
+            symbol: 交易对
+            side: 开仓方向 (BUY/SELL)
+            position_side: 持仓方向 (LONG/SHORT)
+            quantity: 数量
+            stop_loss: 止损触发价
+            take_profit: 止盈触发价
+
+        Returns:
+            开仓订单信息
+
+        Raises:
+            Exception: 开仓单失败
+        """
+        close_side = 'SELL' if side == 'BUY' else 'BUY'
+        entry = {'symbol': symbol, 'side': side, 'order_type': 'MARKET',
+                 'quantity': quantity, 'position_side': position_side}
+        protections = [
+            ('止损', {'symbol': symbol, 'side': close_side, 'order_type': 'STOP_MARKET',
+                     'quantity': quantity, 'position_side': position_side, 'stopPrice': stop_loss}),
+            ('止盈', {'symbol': symbol, 'side': close_side, 'order_type': 'TAKE_PROFIT_MARKET',
+                     'quantity': quantity, 'position_side': position_side, 'stopPrice': take_profit}),
+        ]
+
+        results = self.binance.create_batch_futures_orders([entry] + [p for _, p in protections])
+        entry_result, protection_results = results[0], results[1:]
+
+        if not entry_result['success']:
+            # 开仓失败：撤掉已挂上的保护单，避免遗留孤立挂单
+            for (name, _), result in zip(protections, protection_results):
+                if not result['success']:
+                    continue
+                try:
+                    self.binance.cancel_futures_order(symbol, order_id=result['order']['orderId'])
+                except Exception as e:
+                    self.logger.error(f"[ERROR] [{symbol}] 撤销{name}单失败: {e}")
+            raise Exception(f"开仓单失败: {entry_result['error']}")
+
+        for (name, params), result in zip(protections, protection_results):
+            if result['success']:
+                continue
+            self.logger.warning(f"[WARNING] [{symbol}] 批量{name}单失败，单独重试: {result['error']}")
+            try:
+                self.binance.create_futures_order(**params)
+            except Exception as e:
+                self.logger.error(f"[ERROR] [{symbol}] {name}单设置失败，持仓无{name}保护: {e}")
+
+        return entry_result['order']
+
     def _record_trade(self, symbol: str, decision: Dict, trade_result: Dict):
         """记录交易历史"""
         trade_record = {
@@ -893,22 +893,6 @@ class AITradingEngine:
         else:
             return "震荡"
 
-    def _find_support_levels(self, closes: List[float]) -> List[float]:
-        """寻找支撑位"""
-        recent_lows = []
-        for i in range(10, len(closes) - 10):
-            if closes[i] == min(closes[i-10:i+10]):
-                recent_lows.append(closes[i])
-        return sorted(recent_lows)[-3:] if recent_lows else []
-
-    def _find_resistance_levels(self, closes: List[float]) -> List[float]:
-        """寻找阻力位"""
-        recent_highs = []
-        for i in range(10, len(closes) - 10):
-            if closes[i] == max(closes[i-10:i+10]):
-                recent_highs.append(closes[i])
-        return sorted(recent_highs)[-3:] if recent_highs else []
-
     def _calculate_recent_win_rate(self, n: int = 5) -> float:
         """
         计算最近N笔交易的胜率
@@ -930,18 +914,14 @@ class AITradingEngine:
 
         return wins / len(recent_trades)
 
-    def _calculate_atr(self, df) -> float:
-        """计算 ATR（接受 DataFrame）"""
+    def _calculate_atr(self, bars) -> float:
+        """计算 ATR（接受 K线数组字典或 DataFrame）"""
         try:
-            import pandas as pd
-            tr_list = []
-            for i in range(1, min(15, len(df))):
-                high = df['high'].iloc[i]
-                low = df['low'].iloc[i]
-                prev_close = df['close'].iloc[i-1]
-                tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
-                tr_list.append(tr)
-            return round(sum(tr_list) / len(tr_list), 2) if tr_list else 0
+            high = np.asarray(bars['high'], dtype=np.float64)
+            low = np.asarray(bars['low'], dtype=np.float64)
+            close = np.asarray(bars['close'], dtype=np.float64)
+            tr = indicators.true_range(high, low, close)[1:min(15, len(close))]
+            return round(float(tr.mean()), 2) if len(tr) else 0
         except Exception:
             return 0
 
@@ -976,15 +956,17 @@ class AITradingEngine:
             return True
 
         # 条件1：开仓决策使用推理模型（最重要）
-        # 检查是否已有持仓
+        # 检查是否已有持仓（account_info 中已有本轮持仓）
         has_position = False
         try:
-            positions = self.binance.get_positions()
+            positions = account_info.get('positions')
+            if positions is None:
+                positions = self._get_positions()
             for pos in positions:
                 if pos['symbol'] == symbol and float(pos.get('positionAmt', 0)) != 0:
                     has_position = True
                     break
-        except:
+        except Exception:
             pass
 
         if not has_position:
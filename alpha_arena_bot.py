@@ -8,12 +8,21 @@ import os
 import sys
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import signal
 
 # 导入模块
 from binance_client import BinanceClient
+from binance_stream_client import BinanceStreamClient
+from async_binance_client import AsyncBinanceClient
+from market_snapshot import MarketSnapshot
+from local_order_book import OrderBookStore
+from kline_resampler import ResampledKlineStore
+from account_snapshot import AccountSnapshot
+from user_data_stream import UserDataStream
 from market_analyzer import MarketAnalyzer
 from risk_manager import RiskManager
 from ai_trading_engine import AITradingEngine
@@ -27,35 +36,6 @@ from rolling_position_manager import RollingPositionManager  # [NEW V3.0] 浮盈
 class AlphaArenaBot:
     """DeepSeek Ai Trade Bot"""
 
-    @staticmethod
-    def _get_quantity_precision(symbol: str) -> int:
-        """
-        获取交易对的数量精度（小数位数）
-        
-        Args:
-            symbol: 交易对名称
-            
-        Returns:
-            精度（小数位数）
-        """
-        # 根据币安合约规则设置精度
-        if 'BTC' in symbol:
-            return 3  # BTC: 0.001
-        elif 'ETH' in symbol:
-            return 3  # ETH: 0.001
-        elif 'BNB' in symbol:
-            return 1  # BNB: 0.1
-        elif 'SOL' in symbol:
-            return 1  # SOL: 0.1
-        elif 'DOGE' in symbol:
-            return 0  # DOGE: 整数
-        elif symbol in ['AAVEUSDT', 'UNIUSDT', 'LINKUSDT', 'CRVUSDT', 'SNXUSDT', 'DYDXUSDT']:
-            # 这些DeFi币通常要求整数或0位小数
-            return 0  # 整数
-        else:
-            # 默认：大多数山寨币支持1位小数
-            return 1  # 0.1
-
     def __init__(self):
         """初始化机器人"""
         # 设置日志
@@ -119,6 +99,28 @@ class AlphaArenaBot:
         self.binance_api_key = os.getenv('BINANCE_API_KEY')
         self.binance_api_secret = os.getenv('BINANCE_API_SECRET')
         self.testnet = os.getenv('BINANCE_TESTNET', 'false').lower() == 'true'
+        # 相同GET请求结果复用时间（秒），并发中的相同请求总是合并
+        self.binance_get_cache_ttl = float(os.getenv('BINANCE_GET_CACHE_TTL', 0.25))
+        # 请求遥测导出文件（每轮追加一行各接口延迟统计，留空则不导出）
+        self.request_telemetry_path = os.getenv('REQUEST_TELEMETRY_PATH', 'logs/request_telemetry.jsonl')
+        # GET 按观测延迟自适应超时；公开行情GET超过 p95 未返回时发送对冲请求
+        self.binance_adaptive_timeout = os.getenv('BINANCE_ADAPTIVE_TIMEOUT', 'true').lower() == 'true'
+        self.binance_hedge_requests = os.getenv('BINANCE_HEDGE_REQUESTS', 'false').lower() == 'true'
+        # 流式指标状态文件（关闭时保存，启动时恢复，避免重启后重新预热；留空则不保存）
+        self.indicator_state_path = os.getenv('INDICATOR_STATE_PATH', 'data/indicator_state.json')
+
+        # 行情 WebSocket 配置（STREAM_URL 可指向本地回放服务器）
+        self.enable_market_stream = os.getenv('ENABLE_MARKET_STREAM', 'true').lower() == 'true'
+        self.stream_url = os.getenv('STREAM_URL') or None
+        self.enable_user_stream = os.getenv('ENABLE_USER_STREAM', 'true').lower() == 'true'
+        self.user_stream_url = os.getenv('USER_STREAM_URL') or None
+        # 本地订单簿：行情流额外订阅增量深度，订单簿分析不再每次请求REST深度
+        self.enable_local_order_book = os.getenv('ENABLE_LOCAL_ORDER_BOOK', 'true').lower() == 'true'
+        # 3m/15m/1h/4h K线由1分钟基础K线聚合（行情流只需订阅1分钟K线）
+        self.enable_kline_resample = os.getenv('ENABLE_KLINE_RESAMPLE', 'true').lower() == 'true'
+
+        # 账户/持仓快照有效期（秒），下单后立即失效
+        self.account_snapshot_ttl = float(os.getenv('ACCOUNT_SNAPSHOT_TTL', 10))
 
         # DeepSeek 配置
         self.deepseek_api_key = os.getenv('DEEPSEEK_API_KEY')
@@ -128,6 +130,11 @@ class AlphaArenaBot:
         self.max_position_pct = float(os.getenv('MAX_POSITION_PCT', 10))
         self.default_leverage = int(os.getenv('DEFAULT_LEVERAGE', 3))
         self.trading_interval = int(os.getenv('TRADING_INTERVAL_SECONDS', 300))
+        # 多交易对并发处理：同时处理的交易对数量（1 为逐个处理），每轮单个交易对的截止时间（秒）
+        self.symbol_concurrency = max(1, int(os.getenv('SYMBOL_CONCURRENCY', 4)))
+        self.symbol_deadline = float(os.getenv('SYMBOL_DEADLINE_SECONDS', 240))
+        # 批量决策：每轮一次AI调用得到所有交易对的决策（解析失败或缺少的交易对仍单独调用）
+        self.batch_decisions = os.getenv('BATCH_DECISIONS', 'false').lower() == 'true'
 
         # 交易对（配置的交易对）
         symbols_str = os.getenv('TRADING_SYMBOLS', 'BTCUSDT,ETHUSDT')
@@ -144,7 +151,10 @@ class AlphaArenaBot:
         self.binance = BinanceClient(
             api_key=self.binance_api_key,
             api_secret=self.binance_api_secret,
-            testnet=self.testnet
+            testnet=self.testnet,
+            get_cache_ttl=self.binance_get_cache_ttl,
+            adaptive_timeout=self.binance_adaptive_timeout,
+            hedge_requests=self.binance_hedge_requests
         )
 
         # [NEW] 从Binance API获取实际账户余额，替代配置文件中的初始资金
@@ -187,8 +197,69 @@ class AlphaArenaBot:
         except Exception as e:
             self.logger.warning(f"[WARNING] 检查合约账户持仓失败: {e}，继续使用配置的交易对")
 
+        # 行情流（kline / markPrice / bookTicker），断线时各读取方自动回退REST
+        self.stream_client = None
+        if self.enable_market_stream:
+            stream_client = BinanceStreamClient(
+                self.trading_symbols + self.temp_trading_symbols,
+                kline_intervals=('1m',) if self.enable_kline_resample else ('1m', '3m'),
+                testnet=self.testnet,
+                stream_url=self.stream_url,
+                depth_updates=self.enable_local_order_book
+            )
+            if stream_client.start():
+                self.stream_client = stream_client
+
+        # 本地订单簿（快照 + 增量深度流按更新ID同步），行情流不可用时不启用
+        self.order_books = None
+        if self.stream_client is not None and self.enable_local_order_book:
+            self.order_books = OrderBookStore(self.binance, stream_client=self.stream_client)
+
+        # 交易所下单规则缓存：启动时加载，后台按TTL刷新
+        self.binance.exchange_filters.start_background_refresh()
+
+        # 异步客户端：每个交易对的独立行情请求并发发出
+        self.async_binance = AsyncBinanceClient(self.binance)
+
+        # 全市场行情快照：每轮两次请求覆盖所有交易对的 ticker 和资金费率
+        self.market_snapshot = MarketSnapshot(self.binance)
+
+        # 账户/持仓快照：本轮循环内各组件共享，下单后自动失效
+        self.account_snapshot = AccountSnapshot(self.binance, ttl=self.account_snapshot_ttl)
+
+        # 止损/止盈成交后等待持仓归零的交易对；撤剩余保护单的REST请求在单个后台线程中执行
+        self._pending_exit_symbols = set()
+        self._exit_lock = threading.Lock()
+        self._exit_order_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='exit-orders')
+
+        # 用户数据流：推送维护余额/持仓/挂单镜像，get_active_positions 在同步时直接读镜像
+        self.user_data_stream = None
+        if self.enable_user_stream:
+            user_stream = UserDataStream(
+                self.binance,
+                testnet=self.testnet,
+                stream_url=self.user_stream_url,
+                mark_price_source=self.stream_client
+            )
+            user_stream.add_listener(self._on_user_data_event)
+            if user_stream.start():
+                self.user_data_stream = user_stream
+                self.binance.attach_user_data_stream(user_stream)
+
         # 市场分析器
-        self.market_analyzer = MarketAnalyzer(self.binance)
+        kline_store = ResampledKlineStore(self.binance) if self.enable_kline_resample else None
+        self.market_analyzer = MarketAnalyzer(
+            self.binance,
+            kline_store=kline_store,
+            stream_client=self.stream_client,
+            async_client=self.async_binance,
+            market_snapshot=self.market_snapshot,
+            order_books=self.order_books
+        )
+        if self.indicator_state_path:
+            restored = self.market_analyzer.indicator_streams.load(self.indicator_state_path)
+            if restored:
+                self.logger.info(f"[INDICATOR] 恢复 {restored} 组流式指标状态")
 
         # 风险管理器
         risk_config = {
@@ -202,7 +273,7 @@ class AlphaArenaBot:
             'max_open_positions': 10,
             'max_daily_trades': 100
         }
-        self.risk_manager = RiskManager(risk_config)
+        self.risk_manager = RiskManager(risk_config, account_snapshot=self.account_snapshot)
 
         # 性能追踪器（使用实际余额） - 必须在AI引擎之前初始化
         self.performance = PerformanceTracker(
@@ -229,7 +300,8 @@ class AlphaArenaBot:
             market_analyzer=self.market_analyzer,
             risk_manager=self.risk_manager,
             performance_tracker=self.performance,  # [FIX] 传入性能追踪器
-            roll_tracker=self.roll_tracker  # [V3.3] 传入ROLL追踪器
+            roll_tracker=self.roll_tracker,  # [V3.3] 传入ROLL追踪器
+            account_snapshot=self.account_snapshot
         )
 
         # [NEW V2.0] 高级仓位管理器
@@ -238,6 +310,14 @@ class AlphaArenaBot:
             market_analyzer=self.market_analyzer
         )
 
+        # 多交易对并发处理：行情获取和AI决策在各交易对之间重叠，同一交易对同时只有一个任务
+        self._symbol_executor = ThreadPoolExecutor(max_workers=self.symbol_concurrency,
+                                                   thread_name_prefix='symbol')
+        self._symbol_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._decisions_lock = threading.Lock()
+
     def _signal_handler(self, signum, frame):
         """信号处理器（优雅关闭）"""
         self.logger.info(f"[SIGNAL] 收到信号 {signum}, 正在优雅关闭...")
@@ -296,7 +376,7 @@ class AlphaArenaBot:
 
         # 显示当前持仓详情（已在_init_components中纳入管理，这里只显示详情）
         try:
-            positions = self.binance.get_active_positions()
+            positions = self.account_snapshot.get_positions()
             if positions:
                 self.logger.info(f"[POSITIONS] 当前持仓 ({len(positions)} 个):")
                 for pos in positions:
@@ -326,16 +406,22 @@ class AlphaArenaBot:
                 self.logger.info(f"[LOOP] 开始第 {cycle_count} 轮交易循环 | [TIME] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
                 self.logger.info(f"{'='*60}")
 
-                # 1. 更新账户状态
+                # 1. 更新账户状态和全市场行情快照（账户快照每轮重新获取）
+                self.account_snapshot.invalidate()
                 self._update_account_status()
+                self.market_snapshot.refresh()
 
                 # 2. 对每个交易对进行分析和交易（包括配置的和临时的）
                 all_symbols = self.trading_symbols + self.temp_trading_symbols
-                for symbol in all_symbols:
-                    self._process_symbol(symbol)
+                # API 限流由 BinanceClient 内的权重限流器处理，接近上限时才会等待
+                self._process_symbols(all_symbols)
 
-                    # 短暂延迟避免 API 限流
-                    time.sleep(2)
+                rate_status = self.binance.get_rate_limit_status()
+                self.logger.info(
+                    f"[RATE_LIMIT] 已用权重 {rate_status['used_weight']}/{rate_status['weight_limit']} | "
+                    f"余量 {rate_status['headroom']} | 累计限流等待 {rate_status['throttled_seconds']:.1f}s"
+                )
+                self._report_request_telemetry()
 
                 # 3. 显示性能摘要 (已禁用 - 用户要求去掉)
                 # self._display_performance()
@@ -355,6 +441,22 @@ class AlphaArenaBot:
 
         self._shutdown()
 
+    def _report_request_telemetry(self):
+        """输出最慢的接口，并把各接口累计统计追加到遥测文件（不清零：自适应超时依赖累计样本）"""
+        try:
+            endpoints = self.binance.telemetry.snapshot()
+            if endpoints:
+                slowest = sorted(endpoints.items(), key=lambda item: -item[1]['latency']['p99_ms'])[:3]
+                self.logger.info("[LATENCY] " + " | ".join(
+                    f"{key} p50={stats['latency']['p50_ms']:.0f}ms p99={stats['latency']['p99_ms']:.0f}ms "
+                    f"重试{stats['retries']}次"
+                    for key, stats in slowest
+                ))
+            if self.request_telemetry_path:
+                self.binance.telemetry.dump_jsonl(self.request_telemetry_path)
+        except Exception as e:
+            self.logger.warning(f"[WARNING] 导出请求遥测失败: {e}")
+
     def _update_account_status(self):
         """更新账户状态"""
         try:
@@ -362,11 +464,9 @@ class AlphaArenaBot:
             import time as time_module
             start_time = time_module.time()
 
-            # 获取余额
-            balance = self.binance.get_futures_usdt_balance()
-
-            # 获取持仓
-            positions = self.binance.get_active_positions()
+            # 获取余额和持仓（写入本轮账户快照，后续组件复用）
+            balance = self.account_snapshot.get_balance()
+            positions = self.account_snapshot.get_positions()
 
             # 计算API延迟
             api_latency_ms = int((time_module.time() - start_time) * 1000)
@@ -447,12 +547,98 @@ class AlphaArenaBot:
         except Exception as e:
             self.logger.error(f"更新账户状态失败: {e}")
 
-    def _process_symbol(self, symbol: str):
+    # ========== 多交易对并发处理 ==========
+
+    def _get_symbol_lock(self, symbol: str) -> threading.Lock:
+        """获取某个交易对的锁（同一交易对的分析和下单串行）"""
+        with self._locks_guard:
+            lock = self._symbol_locks.get(symbol)
+            if lock is None:
+                lock = threading.Lock()
+                self._symbol_locks[symbol] = lock
+            return lock
+
+    def _process_symbols(self, symbols: List[str]):
+        """
+        处理本轮所有交易对（最多 symbol_concurrency 个同时进行）
+
+        本轮耗时接近最慢的单个交易对而不是所有交易对之和；每个交易对的截止时间从它开始处理时计算，
+        超过截止时间的交易对不再等待，其任务在后台结束且不会再下单，下一轮该交易对仍在处理时跳过
+        """
+        started = time.time()
+        # 批量模式：决策在本轮开始时一次得到，截止时间从批量决策返回后计算
+        decisions = self._decide_batch(symbols) if self.batch_decisions else {}
+        decided_at = time.time()
+        if self.symbol_concurrency <= 1 or len(symbols) <= 1:
+            for symbol in symbols:
+                self._run_symbol(symbol, self.symbol_deadline, decisions.get(symbol), decided_at)
+            return
+
+        futures = {self._symbol_executor.submit(self._run_symbol, symbol, self.symbol_deadline,
+                                                decisions.get(symbol), decided_at): symbol
+                   for symbol in symbols}
+        # 超过并发数的交易对排队执行，每一批都有完整的截止时间
+        batches = -(-len(symbols) // self.symbol_concurrency)
+        _, pending = wait(futures, timeout=self.symbol_deadline * batches)
+        for future in pending:
+            # 尚未开始的直接取消，避免结果注定被丢弃却仍然请求行情和调用AI
+            if future.cancel():
+                self.logger.warning(f"[TIMEOUT] {futures[future]} 本轮未能开始处理，已取消")
+            else:
+                self.logger.warning(f"[TIMEOUT] {futures[future]} 超过 {self.symbol_deadline:.0f}s 仍未完成，本轮不再等待")
+        self.logger.info(f"[PIPELINE] {len(symbols)} 个交易对处理完成，耗时 {time.time() - started:.1f}s "
+                         f"(并发 {self.symbol_concurrency})")
+
+    def _decide_batch(self, symbols: List[str]) -> Dict[str, Dict]:
+        """一次AI调用得到本轮所有交易对的决策（失败时返回空字典，各交易对单独决策）"""
+        try:
+            decisions = self.ai_engine.decide_batch(symbols)
+        except Exception as e:
+            self.logger.error(f"[BATCH] 批量决策失败: {e}")
+            return {}
+        if decisions:
+            with self._stats_lock:
+                self.total_invocations += 1
+            self.logger.info(f"[BATCH] 一次调用得到 {len(decisions)}/{len(symbols)} 个交易对的决策")
+        return decisions
+
+    def _run_symbol(self, symbol: str, budget: Optional[float] = None, decision: Optional[Dict] = None,
+                    decided_at: Optional[float] = None):
+        """
+        在交易对锁内处理单个交易对（上一轮的任务仍未结束时跳过）
+
+        Args:
+            symbol: 交易对
+            budget: 处理时限（秒），截止时间从实际开始处理时计算
+            decision: 本轮批量决策中该交易对的决策（可选）
+            decided_at: 批量决策返回的时间，有批量决策时截止时间从这里计算（决策依据的行情从此开始变旧）
+        """
+        lock = self._get_symbol_lock(symbol)
+        if not lock.acquire(blocking=False):
+            self.logger.warning(f"[SKIP] {symbol} 上一轮仍在处理，本轮跳过")
+            return
+        started = decided_at if decision is not None and decided_at is not None else time.time()
+        deadline = started + budget if budget is not None else None
+        try:
+            self._process_symbol(symbol, deadline, decision)
+        finally:
+            lock.release()
+
+    def _deadline_passed(self, symbol: str, deadline: Optional[float]) -> bool:
+        """AI决策返回时是否已超过截止时间（超过则不再执行，决策依据的行情已过期）"""
+        if deadline is not None and time.time() > deadline:
+            self.logger.warning(f"  [TIMEOUT] {symbol} 决策返回时已超过截止时间，放弃执行")
+            return True
+        return False
+
+    def _process_symbol(self, symbol: str, deadline: Optional[float] = None, decision: Optional[Dict] = None):
         """
         处理单个交易对
 
         Args:
             symbol: 交易对
+            deadline: 截止时间（time.time()），超过后不再执行AI决策
+            decision: 本轮批量决策中该交易对的决策（可选，不传则单独调用AI）
         """
         try:
             # 获取实时市场数据
@@ -461,7 +647,7 @@ class AlphaArenaBot:
 
             # 获取当前价格和24h数据
             try:
-                ticker = self.binance.get_futures_24h_ticker(symbol=symbol)
+                ticker = self.market_snapshot.get_ticker(symbol) or self.binance.get_futures_24h_ticker(symbol=symbol)
                 current_price = float(ticker.get('lastPrice', 0))
                 price_change_24h = float(ticker.get('priceChangePercent', 0))
                 volume_24h = float(ticker.get('volume', 0))
@@ -477,7 +663,7 @@ class AlphaArenaBot:
                 # 继续执行，使用基本分析
 
             # 检查是否已有持仓
-            positions = self.binance.get_active_positions()
+            positions = self.account_snapshot.get_positions()
             existing_position = None
             for pos in positions:
                 if pos['symbol'] == symbol and float(pos.get('positionAmt', 0)) != 0:
@@ -501,15 +687,20 @@ class AlphaArenaBot:
                 result = self.ai_engine.analyze_position_for_closing(
                     symbol=symbol,
                     position=existing_position,
-                    runtime_stats=runtime_stats
+                    runtime_stats=runtime_stats,
+                    preset_decision=decision
                 )
 
-                # [NEW] 递增AI调用计数
-                self.total_invocations += 1
+                # [NEW] 递增AI调用计数（批量决策已在本轮开始时计数）
+                if decision is None:
+                    with self._stats_lock:
+                        self.total_invocations += 1
 
                 if result['success']:
                     ai_decision = result.get('decision', {})
                     action = ai_decision.get('action', 'HOLD')
+                    if action != 'HOLD' and self._deadline_passed(symbol, deadline):
+                        return
 
                     # 保存AI的持仓评估决策
                     self._save_ai_decision(symbol, ai_decision, result)
@@ -592,11 +783,15 @@ class AlphaArenaBot:
             result = self.ai_engine.analyze_and_trade(
                 symbol=symbol,
                 max_position_pct=self.max_position_pct,
-                runtime_stats=runtime_stats
+                runtime_stats=runtime_stats,
+                deadline=deadline,
+                preset_decision=decision
             )
 
-            # [NEW] 递增AI调用计数
-            self.total_invocations += 1
+            # [NEW] 递增AI调用计数（批量决策已在本轮开始时计数）
+            if decision is None:
+                with self._stats_lock:
+                    self.total_invocations += 1
 
             if result['success']:
                 ai_decision = result.get('ai_decision', {})
@@ -645,103 +840,105 @@ class AlphaArenaBot:
     def _save_ai_decision(self, symbol: str, decision: dict, trade_result: dict):
         """保存增强的AI决策卡片到文件"""
         import json
-        try:
-            # 读取现有决策
+        # 读取-追加-写回决策文件，多个交易对并发处理时需串行
+        with self._decisions_lock:
             try:
-                with open('ai_decisions.json', 'r') as f:
-                    decisions = json.load(f)
-            except FileNotFoundError:
-                decisions = []
+                # 读取现有决策
+                try:
+                    with open('ai_decisions.json', 'r') as f:
+                        decisions = json.load(f)
+                except FileNotFoundError:
+                    decisions = []
 
-            # 获取当前账户状态
-            try:
-                balance = self.binance.get_futures_usdt_balance()
-                positions = self.binance.get_active_positions()
-                unrealized_pnl = sum(float(pos.get('unRealizedProfit', 0)) for pos in positions)
-                total_value = balance + unrealized_pnl
-                metrics = self.performance.calculate_metrics(balance, positions)
-            except Exception:
-                balance = 0
-                total_value = 0
-                metrics = {'total_return_pct': 0}
-                positions = []
-
-            # 获取交易时段信息
-            from deepseek_client import DeepSeekClient
-            temp_client = DeepSeekClient(self.deepseek_api_key)
-            session_info = temp_client.get_trading_session()
-
-            # 构建增强的决策记录
-            decision_record = {
-                'timestamp': datetime.now().isoformat(),
-                'cycle': len(decisions) + 1,
-
-                # [ANALYZE] 账户快照
-                'account_snapshot': {
-                    'total_value': round(total_value, 2),
-                    'cash_balance': round(balance, 2),
-                    'total_return_pct': round(metrics.get('total_return_pct', 0), 2),
-                    'positions_count': len(positions),
-                    'unrealized_pnl': round(unrealized_pnl, 2)
-                },
-
-                # [TARGET] 本次决策详情
-                'decision': {
-                    'symbol': symbol,
-                    'action': decision.get('action', 'HOLD'),
-                    'confidence': decision.get('confidence', 0),
-                    'reasoning': decision.get('reasoning', ''),
-                    'leverage': decision.get('leverage', 3),
-                    'position_size': decision.get('position_size', 5),
-                    'stop_loss_pct': decision.get('stop_loss_pct', 1.5),
-                    'take_profit_pct': decision.get('take_profit_pct', 5),
-                    'executed': trade_result.get('success', False),
-                    'error': trade_result.get('error', None)
-                },
-
-                # [TIMER] 交易时段
-                'session_info': {
-                    'session': session_info['session'],
-                    'volatility': session_info['volatility'],
-                    'recommendation': session_info['recommendation'],
-                    'aggressive_mode': session_info['aggressive_mode']
-                },
-
-                # [ACCOUNT] 持仓快照（如果是持仓决策）
-                'position_snapshot': None
-            }
+                # 获取当前账户状态
+                try:
+                    balance = self.account_snapshot.get_balance()
+                    positions = self.account_snapshot.get_positions()
+                    unrealized_pnl = sum(float(pos.get('unRealizedProfit', 0)) for pos in positions)
+                    total_value = balance + unrealized_pnl
+                    metrics = self.performance.calculate_metrics(balance, positions)
+                except Exception:
+                    balance = 0
+                    total_value = 0
+                    metrics = {'total_return_pct': 0}
+                    positions = []
+
+                # 获取交易时段信息
+                from deepseek_client import DeepSeekClient
+                temp_client = DeepSeekClient(self.deepseek_api_key)
+                session_info = temp_client.get_trading_session()
+
+                # 构建增强的决策记录
+                decision_record = {
+                    'timestamp': datetime.now().isoformat(),
+                    'cycle': len(decisions) + 1,
+
+                    # [ANALYZE] 账户快照
+                    'account_snapshot': {
+                        'total_value': round(total_value, 2),
+                        'cash_balance': round(balance, 2),
+                        'total_return_pct': round(metrics.get('total_return_pct', 0), 2),
+                        'positions_count': len(positions),
+                        'unrealized_pnl': round(unrealized_pnl, 2)
+                    },
+
+                    # [TARGET] 本次决策详情
+                    'decision': {
+                        'symbol': symbol,
+                        'action': decision.get('action', 'HOLD'),
+                        'confidence': decision.get('confidence', 0),
+                        'reasoning': decision.get('reasoning', ''),
+                        'leverage': decision.get('leverage', 3),
+                        'position_size': decision.get('position_size', 5),
+                        'stop_loss_pct': decision.get('stop_loss_pct', 1.5),
+                        'take_profit_pct': decision.get('take_profit_pct', 5),
+                        'executed': trade_result.get('success', False),
+                        'error': trade_result.get('error', None)
+                    },
+
+                    # [TIMER] 交易时段
+                    'session_info': {
+                        'session': session_info['session'],
+                        'volatility': session_info['volatility'],
+                        'recommendation': session_info['recommendation'],
+                        'aggressive_mode': session_info['aggressive_mode']
+                    },
+
+                    # [ACCOUNT] 持仓快照（如果是持仓决策）
+                    'position_snapshot': None
+                }
 
-            # 如果是持仓评估，添加持仓详情
-            if decision.get('action') in ['HOLD', 'CLOSE']:
-                for pos in positions:
-                    if pos['symbol'] == symbol:
-                        entry_price = float(pos.get('entryPrice', 0))
-                        current_price = float(pos.get('markPrice', 0))
-                        pnl_pct = ((current_price - entry_price) / entry_price * 100 *
-                                  (-1 if float(pos.get('positionAmt', 0)) < 0 else 1))
-
-                        decision_record['position_snapshot'] = {
-                            'direction': 'SHORT' if float(pos.get('positionAmt', 0)) < 0 else 'LONG',
-                            'quantity': abs(float(pos.get('positionAmt', 0))),
-                            'leverage': int(pos.get('leverage', 1)),
-                            'entry_price': entry_price,
-                            'current_price': current_price,
-                            'unrealized_pnl': float(pos.get('unRealizedProfit', 0)),
-                            'unrealized_pnl_pct': round(pnl_pct, 2)
-                        }
-                        break
-
-            decisions.append(decision_record)
-
-            # 只保留最近200条决策
-            decisions = decisions[-200:]
-
-            # 保存
-            with open('ai_decisions.json', 'w') as f:
-                json.dump(decisions, f, indent=2, ensure_ascii=False)
+                # 如果是持仓评估，添加持仓详情
+                if decision.get('action') in ['HOLD', 'CLOSE']:
+                    for pos in positions:
+                        if pos['symbol'] == symbol:
+                            entry_price = float(pos.get('entryPrice', 0))
+                            current_price = float(pos.get('markPrice', 0))
+                            pnl_pct = ((current_price - entry_price) / entry_price * 100 *
+                                      (-1 if float(pos.get('positionAmt', 0)) < 0 else 1))
+
+                            decision_record['position_snapshot'] = {
+                                'direction': 'SHORT' if float(pos.get('positionAmt', 0)) < 0 else 'LONG',
+                                'quantity': abs(float(pos.get('positionAmt', 0))),
+                                'leverage': int(pos.get('leverage', 1)),
+                                'entry_price': entry_price,
+                                'current_price': current_price,
+                                'unrealized_pnl': float(pos.get('unRealizedProfit', 0)),
+                                'unrealized_pnl_pct': round(pnl_pct, 2)
+                            }
+                            break
+
+                decisions.append(decision_record)
+
+                # 只保留最近200条决策
+                decisions = decisions[-200:]
+
+                # 保存
+                with open('ai_decisions.json', 'w') as f:
+                    json.dump(decisions, f, indent=2, ensure_ascii=False)
 
-        except Exception as e:
-            self.logger.error(f"保存AI决策失败: {e}")
+            except Exception as e:
+                self.logger.error(f"保存AI决策失败: {e}")
 
     def _display_performance(self):
         """显示性能摘要"""
@@ -794,7 +991,7 @@ class AlphaArenaBot:
 
             # 1. 验证当前浮盈是否达到阈值
             unrealized_pnl = float(position.get('unRealizedProfit', 0))
-            account_balance = self.binance.get_futures_usdt_balance()
+            account_balance = self.account_snapshot.get_balance()
             account_value = account_balance + unrealized_pnl
 
             profit_ratio = (unrealized_pnl / account_value) * 100 if account_value > 0 else 0
@@ -956,12 +1153,77 @@ class AlphaArenaBot:
             # 保存数据
             self.logger.info("💾 保存数据...")
 
+            if self.stream_client is not None:
+                self.stream_client.stop()
+            if self.user_data_stream is not None:
+                self.user_data_stream.stop()
+            self.async_binance.close()
+            self._symbol_executor.shutdown(wait=False)
+            self._exit_order_executor.shutdown(wait=False)
+
+            if self.indicator_state_path:
+                self.market_analyzer.indicator_streams.save(self.indicator_state_path)
+
             self.logger.info("[OK] 关闭完成")
 
         except Exception as e:
             self.logger.error(f"关闭过程出错: {e}")
 
 
+    def _on_user_data_event(self, event_type: str, data: Dict):
+        """
+        用户数据推送回调（推送线程中调用，镜像已按本次推送更新）
+
+        账户或订单变化后立即失效账户快照；止损/止盈成交且持仓归零后撤掉同交易对剩余的保护单。
+        成交和持仓变化的推送先后不定：成交时镜像已无持仓则直接撤单，否则等 ACCOUNT_UPDATE
+        显示该交易对仓位为0时再撤（部分止盈后仍有持仓则保留）
+        """
+        if event_type not in ('ACCOUNT_UPDATE', 'ORDER_TRADE_UPDATE'):
+            return
+        self.account_snapshot.invalidate()
+
+        if event_type == 'ACCOUNT_UPDATE':
+            amounts: Dict[str, List[float]] = {}
+            for position in data.get('a', {}).get('P', []):
+                amounts.setdefault(position['s'], []).append(float(position.get('pa', 0)))
+            with self._exit_lock:
+                symbols = [s for s in amounts if s in self._pending_exit_symbols]
+                self._pending_exit_symbols.difference_update(symbols)
+            for symbol in symbols:
+                if not any(amounts[symbol]) and self._mirror_position_closed(symbol) is not False:
+                    self._exit_order_executor.submit(self._cancel_remaining_exit_orders, symbol)
+            return
+
+        order = data['o']
+        order_type = order.get('ot', order.get('o'))
+        if order.get('X') == 'FILLED' and order_type in ('STOP_MARKET', 'TAKE_PROFIT_MARKET',
+                                                        'TRAILING_STOP_MARKET'):
+            symbol = order['s']
+            self.logger.info(
+                f"[FILL] {symbol} {order_type} 已成交 | 均价: {order.get('ap')} | 已实现盈亏: {order.get('rp')}"
+            )
+            if self._mirror_position_closed(symbol):
+                self._exit_order_executor.submit(self._cancel_remaining_exit_orders, symbol)
+            else:
+                with self._exit_lock:
+                    self._pending_exit_symbols.add(symbol)
+
+    def _mirror_position_closed(self, symbol: str) -> Optional[bool]:
+        """用户数据流镜像中该交易对是否已无持仓，镜像不可用或未同步时返回None"""
+        stream = self.user_data_stream
+        if stream is None or not stream.is_synced():
+            return None
+        return stream.get_position(symbol) is None
+
+    def _cancel_remaining_exit_orders(self, symbol: str):
+        """止损/止盈触发平仓后撤掉剩余的保护单"""
+        try:
+            result = self.binance.cancel_stop_orders(symbol)
+            if result.get('cancelled_count'):
+                self.logger.info(f"[FILL] {symbol} 已平仓，撤销剩余 {result['cancelled_count']} 个止损止盈单")
+        except Exception as e:
+            self.logger.warning(f"[FILL] {symbol} 撤销剩余保护单失败: {e}")
+
     def _check_and_force_close_if_profit_target(self, symbol: str, position: Dict) -> bool:
         """
         [NEW V3.6] 强制止盈检查: 赚够$2立即平仓
@@ -1051,37 +1313,25 @@ class AlphaArenaBot:
                     position_side = 'LONG' if pos_amt > 0 else 'SHORT'
                     leverage = int(position.get('leverage', 30))
 
-                    # 获取交易对精度（统一处理）
-                    precision = self._get_quantity_precision(symbol)
-                    min_qty = 10 ** (-precision) if precision > 0 else 1.0
+                    # 获取交易所规则（数量步长、最小数量、最小名义价值）
+                    filters = self.binance.exchange_filters.get(symbol)
+                    precision = filters.quantity_precision
+                    min_qty = float(filters.market_min_qty)
 
-                    # 先根据精度调整roll_quantity
-                    roll_quantity = round(abs(roll_quantity), precision)
+                    # 先按步长调整roll_quantity
+                    roll_quantity = filters.quantize_qty(roll_quantity)
                     if pos_amt < 0:
                         roll_quantity = -roll_quantity
 
-                    # 检查最小订单价值（币安要求至少20 USDT）
-                    min_notional = 20.0  # 最小订单名义价值
+                    # 检查最小订单价值（交易所 MIN_NOTIONAL）
+                    min_notional = float(filters.min_notional)
                     order_notional = abs(roll_quantity) * mark_price
                     
                     if order_notional < min_notional:
-                        # 尝试调整数量以满足最小价值要求
-                        adjusted_quantity = min_notional / mark_price
-                        # 根据交易对精度调整并向上取整到最小精度单位
-                        adjusted_quantity = round(adjusted_quantity, precision)
-                        # 确保满足最小数量要求
-                        if adjusted_quantity < min_qty:
-                            adjusted_quantity = min_qty
+                        # 调整到满足最小数量和最小价值要求的最小数量（已向上取整到步长）
+                        adjusted_quantity = filters.min_order_qty(mark_price)
                         adjusted_notional = adjusted_quantity * mark_price
                         
-                        if adjusted_notional < min_notional:
-                            # 即使调整后仍不足，跳过本次滚仓
-                            self.logger.warning(
-                                f"   ⚠️ 滚仓订单价值不足 (${order_notional:.2f} < ${min_notional:.2f})，"
-                                f"调整后仍不足 (${adjusted_notional:.2f})，跳过本次滚仓"
-                            )
-                            return
-                        
                         roll_quantity = adjusted_quantity if pos_amt > 0 else -adjusted_quantity
                         self.logger.info(
                             f"   📊 订单价值调整: ${order_notional:.2f} -> ${adjusted_notional:.2f} "
@@ -1089,7 +1339,7 @@ class AlphaArenaBot:
                         )
                     
                     # 最终精度检查和最小数量验证
-                    roll_quantity = round(abs(roll_quantity), precision)
+                    roll_quantity = filters.quantize_qty(roll_quantity)
                     if pos_amt < 0:
                         roll_quantity = -roll_quantity
                     
@@ -1102,8 +1352,7 @@ class AlphaArenaBot:
                     
                     # 检查可用保证金
                     try:
-                        account_info = self.binance.get_futures_account_info()
-                        available_balance = float(account_info.get('availableBalance', 0))
+                        available_balance = self.account_snapshot.get_available_balance()
                         required_margin = abs(roll_quantity) * mark_price / leverage
                         
                         if required_margin > available_balance:
@@ -0,0 +1,123 @@
+"""
+Binance API 异步客户端
+在 BinanceClient 之上提供 asyncio 接口（方法名与 BinanceClient 相同，返回协程），
+同步请求放到线程池执行，多个相互独立的请求可以并发发出
+"""
+
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+
+# get_comprehensive_market_context 需要的K线 (周期, 数量)
+DEFAULT_KLINE_REQUESTS: Tuple[Tuple[str, int], ...] = (
+    ('1m', 1),
+    ('3m', 30),
+    ('1h', 500),    # 支撑/阻力位使用更长的1小时历史，指标取其中最近100根
+    ('4h', 10),
+)
+
+# gather_market_context 中K线以外的数据项
+MARKET_DATA_ITEMS: Tuple[str, ...] = ('ticker_24h', 'order_book', 'funding_rate', 'open_interest', 'open_interest_hist')
+
+
+class AsyncBinanceClient:
+    """BinanceClient 的 asyncio 版本"""
+
+    def __init__(self, client, max_concurrency: int = 16):
+        """
+        初始化异步客户端
+
+        Args:
+            client: BinanceClient实例（共享其连接池，pool_maxsize 应不小于 max_concurrency）
+            max_concurrency: 最大并发请求数
+        """
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.logger = logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix='binance-async')
+
+    async def _call(self, func: Callable, *args, **kwargs):
+        """在线程池中执行同步调用"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name: str):
+        """BinanceClient 的公开方法都映射为同名协程，例如 await client.get_futures_klines(...)"""
+        attr = getattr(self.client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def wrapper(*args, **kwargs):
+            return await self._call(attr, *args, **kwargs)
+
+        return wrapper
+
+    async def gather_market_context(self, symbol: str,
+                                    kline_requests: Iterable[Tuple[str, int]] = DEFAULT_KLINE_REQUESTS,
+                                    kline_fetcher: Optional[Callable] = None,
+                                    order_book_depth: int = 20,
+                                    oi_period: str = '5m', oi_limit: int = 10,
+                                    skip: Iterable[str] = ()) -> Dict:
+        """
+        并发获取单个交易对的全部行情数据
+
+        Args:
+            symbol: 交易对
+            kline_requests: 需要的K线 (周期, 数量) 列表
+            kline_fetcher: K线获取函数 fetch(symbol, interval, limit)，默认 get_futures_klines
+                           （传 KlineStore.get_klines 可以并发预热K线缓存）
+            order_book_depth: 订单簿深度
+            oi_period: 持仓量统计周期
+            oi_limit: 持仓量统计数量
+            skip: 不需要请求的数据项（如已由全市场快照提供的 'ticker_24h', 'funding_rate'）
+
+        Returns:
+            {'ticker_24h', 'order_book', 'funding_rate', 'open_interest',
+             'open_interest_hist', 'klines': {interval: [...]}, 'errors': {name: str}}
+            单个请求失败不影响其他请求，失败项为 None 并记录在 errors 中
+        """
+        fetch_klines = kline_fetcher or self.client.get_futures_klines
+
+        calls = {
+            'ticker_24h': (self.client.get_futures_24h_ticker, (symbol,), {}),
+            'order_book': (self.client.get_order_book, (symbol, order_book_depth), {}),
+            'funding_rate': (self.client.get_current_funding_rate, (symbol,), {}),
+            'open_interest': (self.client.get_open_interest, (symbol,), {}),
+            'open_interest_hist': (self.client.get_open_interest_statistics, (symbol,),
+                                   {'period': oi_period, 'limit': oi_limit}),
+        }
+        tasks = {
+            name: self._call(func, *args, **kwargs)
+            for name, (func, args, kwargs) in calls.items() if name not in skip
+        }
+        for interval, limit in kline_requests:
+            tasks[f'klines_{interval}'] = self._call(fetch_klines, symbol, interval, limit)
+
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        context = {'symbol': symbol, 'klines': {}, 'errors': {}}
+        for name, result in zip(tasks.keys(), results):
+            if isinstance(result, Exception):
+                self.logger.warning(f"[ASYNC] {symbol} {name} 获取失败: {result}")
+                context['errors'][name] = str(result)
+                result = None
+            if name.startswith('klines_'):
+                context['klines'][name[len('klines_'):]] = result
+            else:
+                context[name] = result
+        return context
+
+    async def gather_many(self, symbols: Iterable[str], **kwargs) -> Dict[str, Dict]:
+        """并发获取多个交易对的行情数据"""
+        symbols = list(symbols)
+        contexts = await asyncio.gather(*(self.gather_market_context(s, **kwargs) for s in symbols))
+        return dict(zip(symbols, contexts))
+
+    def close(self):
+        """关闭线程池"""
+        self._executor.shutdown(wait=False)
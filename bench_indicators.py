@@ -0,0 +1,148 @@
+"""
+技术指标计算基准测试（离线，不访问网络）
+对比原来的 pandas 路径（K线 → DataFrame → 逐个 calculate_*）和 indicators.compute_all，
+并校验两者结果一致
+
+另外对比多个交易对逐个 compute_all 和 compute_batch 一次向量化计算
+
+用法:
+    python bench_indicators.py                 # 默认 100 / 500 / 1500 根K线
+    python bench_indicators.py --bars 1000 --repeat 500
+    python bench_indicators.py --symbols 50 200
+"""
+
+import time
+import argparse
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+
+def make_klines(count: int, seed: int = 7) -> List[List]:
+    """随机游走的合成K线（币安K线数组格式，价格为字符串）"""
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 50, count))
+    klines = []
+    for i, price in enumerate(close):
+        high = price + abs(rng.normal(0, 30))
+        low = price - abs(rng.normal(0, 30))
+        open_ = price + rng.normal(0, 10)
+        open_time = 1_700_000_000_000 + i * 60_000
+        klines.append([open_time, str(open_), str(high), str(low), str(price), str(abs(rng.normal(100, 20))),
+                       open_time + 59_999, '0', 0, '0', '0', '0'])
+    return klines
+
+
+def pandas_path(klines: List[List]) -> Dict[str, pd.Series]:
+    """原 MarketAnalyzer 的 pandas 实现（构建 DataFrame 后逐个计算）"""
+    df = pd.DataFrame(klines, columns=[
+        'timestamp', 'open', 'high', 'low', 'close', 'volume',
+        'close_time', 'quote_volume', 'trades', 'taker_buy_base',
+        'taker_buy_quote', 'ignore'
+    ])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        df[column] = df[column].astype(float)
+    close = df['close']
+
+    result = {
+        'sma20': close.rolling(window=20).mean(),
+        'sma50': close.rolling(window=50).mean(),
+    }
+    for period in (12, 20, 26, 50):
+        result[f'ema{period}'] = close.ewm(span=period, adjust=False).mean()
+
+    delta = close.diff()
+    for period in (7, 14):
+        gain = delta.where(delta > 0, 0).rolling(window=period).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        result[f'rsi{period}'] = 100 - (100 / (1 + gain / loss))
+
+    macd_line = result['ema12'] - result['ema26']
+    result['macd'] = macd_line
+    result['macd_signal'] = macd_line.ewm(span=9, adjust=False).mean()
+    result['macd_hist'] = macd_line - result['macd_signal']
+
+    std = close.rolling(window=20).std()
+    result['bb_upper'] = result['sma20'] + std * 2
+    result['bb_middle'] = result['sma20']
+    result['bb_lower'] = result['sma20'] - std * 2
+
+    true_range = pd.concat([
+        df['high'] - df['low'],
+        np.abs(df['high'] - close.shift()),
+        np.abs(df['low'] - close.shift())
+    ], axis=1).max(axis=1)
+    for period in (3, 14):
+        result[f'atr{period}'] = true_range.rolling(window=period).mean()
+    return result
+
+
+def numpy_path(klines: List[List]) -> Dict[str, np.ndarray]:
+    """K线 → float64 数组 → compute_all"""
+    bars = indicators.klines_to_arrays(klines)
+    return indicators.compute_all(bars['close'], bars['high'], bars['low'])
+
+
+def timeit(func: Callable, arg, repeat: int) -> float:
+    """平均耗时（微秒）"""
+    func(arg)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(arg)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def check(klines: List[List]):
+    """校验两条路径结果一致"""
+    expected = pandas_path(klines)
+    actual = numpy_path(klines)
+    for name, series in expected.items():
+        if not np.allclose(series.to_numpy(), actual[name], rtol=1e-9, atol=1e-9, equal_nan=True):
+            raise AssertionError(f"{name} 与 pandas 结果不一致")
+
+
+def bench_batch(symbol_count: int, bars: int, repeat: int):
+    """多个交易对：逐个计算 vs 对齐后批量计算（只计指标计算，不含K线解析）"""
+    klines_by_symbol = {f'SYM{i}USDT': make_klines(bars, seed=i)[i % 20:] for i in range(symbol_count)}
+    arrays = {symbol: indicators.klines_to_arrays(klines) for symbol, klines in klines_by_symbol.items()}
+    _, aligned = indicators.align_klines(klines_by_symbol)
+
+    def per_symbol(_):
+        for bar in arrays.values():
+            indicators.compute_all(bar['close'], bar['high'], bar['low'])
+
+    def batched(_):
+        indicators.compute_batch(aligned['close'], aligned['high'], aligned['low'])
+
+    loop_us = timeit(per_symbol, None, repeat)
+    batch_us = timeit(batched, None, repeat)
+    print(f"{symbol_count:>6}  {loop_us / 1000:>10.2f}  {batch_us / 1000:>10.2f}  {loop_us / batch_us:>5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='技术指标计算基准测试')
+    parser.add_argument('--bars', type=int, nargs='+', default=[100, 500, 1500], help='K线数量')
+    parser.add_argument('--repeat', type=int, default=200, help='每组重复次数')
+    parser.add_argument('--symbols', type=int, nargs='*', default=[50, 200], help='批量计算的交易对数量')
+    args = parser.parse_args()
+
+    print(f"{'K线数':>6}  {'pandas(us)':>11}  {'numpy(us)':>10}  {'加速':>6}")
+    for count in args.bars:
+        klines = make_klines(count)
+        check(klines)
+        pandas_us = timeit(pandas_path, klines, args.repeat)
+        numpy_us = timeit(numpy_path, klines, args.repeat)
+        print(f"{count:>6}  {pandas_us:>11.1f}  {numpy_us:>10.1f}  {pandas_us / numpy_us:>5.1f}x")
+
+    if args.symbols:
+        print(f"\n{'交易对':>6}  {'逐个(ms)':>10}  {'批量(ms)':>10}  {'加速':>6}")
+        for symbol_count in args.symbols:
+            bench_batch(symbol_count, 100, max(args.repeat // 10, 5))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+K线解析基准测试（离线，不访问网络）
+对比原 get_kline_data（K线列表 → DataFrame → to_datetime → 5次 astype）、
+kline_parser 结构化数组 + DataFrame、只解析结构化数组三条路径，并校验结果一致；
+另外对比 json 和 orjson 解析 /fapi/v1/klines 原始响应体
+
+用法:
+    python bench_kline_parser.py                 # 默认 100 / 500 / 1000 根K线
+    python bench_kline_parser.py --bars 1500 --repeat 500
+"""
+
+import json
+import argparse
+from typing import List
+
+import pandas as pd
+
+import kline_parser
+from bench_indicators import make_klines, timeit
+
+
+def exchange_klines(count: int) -> List[List]:
+    """与币安返回格式一致的合成K线（价格保留2位、成交量3位小数的字符串）"""
+    klines = make_klines(count)
+    for k in klines:
+        for i in (1, 2, 3, 4):
+            k[i] = f"{float(k[i]):.2f}"
+        volume = float(k[5])
+        k[5] = f"{volume:.3f}"
+        k[7] = f"{volume * float(k[4]):.5f}"
+        k[8] = int(volume * 10)
+        k[9] = f"{volume / 2:.3f}"
+        k[10] = f"{volume * float(k[4]) / 2:.5f}"
+    return klines
+
+
+def legacy_dataframe(klines: List[List]) -> pd.DataFrame:
+    """原 MarketAnalyzer.get_kline_data 的转换"""
+    df = pd.DataFrame(klines, columns=[
+        'timestamp', 'open', 'high', 'low', 'close', 'volume',
+        'close_time', 'quote_volume', 'trades', 'taker_buy_base',
+        'taker_buy_quote', 'ignore'
+    ])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df['open'] = df['open'].astype(float)
+    df['high'] = df['high'].astype(float)
+    df['low'] = df['low'].astype(float)
+    df['close'] = df['close'].astype(float)
+    df['volume'] = df['volume'].astype(float)
+    return df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
+
+
+def parsed_dataframe(klines: List[List]) -> pd.DataFrame:
+    """现 MarketAnalyzer.get_kline_data 的转换"""
+    parsed = kline_parser.parse_klines(klines, kline_parser.OHLCV_FIELDS)
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(parsed['open_time'], unit='ms'),
+        'open': parsed['open'],
+        'high': parsed['high'],
+        'low': parsed['low'],
+        'close': parsed['close'],
+        'volume': parsed['volume']
+    })
+
+
+def parsed_array(klines: List[List]):
+    """只解析为结构化数组（指标计算路径）"""
+    return kline_parser.parse_klines(klines, kline_parser.OHLCV_FIELDS)
+
+
+def check(klines: List[List]):
+    """校验新旧 DataFrame 完全一致"""
+    pd.testing.assert_frame_equal(parsed_dataframe(klines), legacy_dataframe(klines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='K线解析基准测试')
+    parser.add_argument('--bars', type=int, nargs='+', default=[100, 500, 1000], help='K线数量')
+    parser.add_argument('--repeat', type=int, default=300, help='每组重复次数')
+    args = parser.parse_args()
+
+    print(f"{'K线数':>6}  {'原DataFrame(us)':>15}  {'新DataFrame(us)':>15}  {'结构化数组(us)':>14}  {'加速':>6}")
+    for count in args.bars:
+        klines = exchange_klines(count)
+        check(klines)
+        legacy_us = timeit(legacy_dataframe, klines, args.repeat)
+        frame_us = timeit(parsed_dataframe, klines, args.repeat)
+        array_us = timeit(parsed_array, klines, args.repeat)
+        print(f"{count:>6}  {legacy_us:>15.1f}  {frame_us:>15.1f}  {array_us:>14.1f}  {legacy_us / frame_us:>5.1f}x")
+
+    decoder = 'orjson' if kline_parser.ORJSON_AVAILABLE else 'json（未安装 orjson）'
+    print(f"\n{'K线数':>6}  {'json(us)':>10}  {'kline_parser.loads(us)':>22}  解析器: {decoder}")
+    for count in args.bars:
+        body = json.dumps(exchange_klines(count)).encode()
+        json_us = timeit(json.loads, body, args.repeat)
+        fast_us = timeit(kline_parser.loads, body, args.repeat)
+        print(f"{count:>6}  {json_us:>10.1f}  {fast_us:>22.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,14 +5,37 @@ Binance API客户端 - 用于AI代理操控交易账户
 
 import hmac
 import hashlib
+import copy
+import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import requests
 import logging
 from typing import Dict, List, Optional, Any
+from decimal import Decimal
 from urllib.parse import urlencode
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from rate_limiter import endpoint_weight, get_shared_limiter
+from exchange_filters import ExchangeFilters
+from cassette import wrap_session
+from request_telemetry import RequestTelemetry
+from kline_parser import loads as json_loads
+
+
+class _InflightCall:
+    """进行中的GET请求（等待者共享结果或异常）"""
+
+    def __init__(self, generation: int):
+        self.event = threading.Event()
+        self.generation = generation
+        self.followers = 0
+        self.result = None
+        self.error: Optional[Exception] = None
+
 
 class BinanceClient:
     """Binance API客户端，供AI代理使用"""
@@ -20,7 +43,28 @@ class BinanceClient:
     BASE_URL = "https://api.binance.com"
     FUTURES_URL = "https://fapi.binance.com"
 
-    def __init__(self, api_key: str, api_secret: str, testnet: bool = False):
+    # /fapi/v1/batchOrders 单次最多订单数
+    BATCH_ORDER_LIMIT = 5
+
+    # 请求超时（秒）：GET 按接口观测到的 p99 × 倍数自适应，限制在 [MIN_TIMEOUT, DEFAULT_TIMEOUT]
+    DEFAULT_TIMEOUT = 30
+    MIN_TIMEOUT = 3.0
+    TIMEOUT_P99_MULTIPLIER = 4
+
+    # 对冲请求：幂等的公开行情GET超过 p95 仍未返回时再发一个相同请求，取先返回的结果
+    HEDGE_PERCENTILE = 95
+    HEDGE_MIN_DELAY = 0.05
+    HEDGED_ENDPOINTS = frozenset({
+        '/fapi/v1/klines', '/fapi/v1/markPriceKlines', '/fapi/v1/depth',
+        '/fapi/v1/ticker/24hr', '/fapi/v1/ticker/price', '/fapi/v1/ticker/bookTicker',
+        '/fapi/v1/premiumIndex', '/fapi/v1/fundingRate', '/fapi/v1/openInterest',
+        '/futures/data/openInterestHist',
+        '/api/v3/klines', '/api/v3/depth', '/api/v3/ticker/24hr', '/api/v3/ticker/price',
+    })
+
+    def __init__(self, api_key: str, api_secret: str, testnet: bool = False,
+                 pool_maxsize: int = 32, get_cache_ttl: float = 0.25,
+                 adaptive_timeout: bool = True, hedge_requests: bool = False):
         """
         初始化Binance客户端
 
@@ -28,18 +72,62 @@ class BinanceClient:
             api_key: Binance API密钥
             api_secret: Binance API密钥对应的Secret
             testnet: 是否使用测试网（默认：否）
+            pool_maxsize: 每个主机的最大连接数（并发请求时需要不小于并发数）
+            get_cache_ttl: 相同GET请求结果的复用时间（秒，0 表示只合并并发中的请求）
+            adaptive_timeout: GET 请求按接口观测延迟自适应超时（否则固定 DEFAULT_TIMEOUT）
+            hedge_requests: 公开行情GET超过 p95 延迟未返回时发送对冲请求
         """
         self.api_key = api_key
         self.api_secret = api_secret
         self.testnet = testnet
+        self.pool_maxsize = pool_maxsize
         self.logger = logging.getLogger(__name__)
 
         if testnet:
             self.BASE_URL = "https://testnet.binance.vision"
             self.FUTURES_URL = "https://testnet.binancefuture.com"
 
-        # 创建带重试机制的session
-        self.session = self._create_session()
+        # 创建带重试机制的session（CASSETTE_MODE 启用时包装为录制/回放 session）
+        self.session = wrap_session(self._create_session())
+
+        # 请求权重限流器（同一主机的所有客户端实例共享额度）
+        self.futures_rate_limiter = get_shared_limiter(self.FUTURES_URL)
+        self.spot_rate_limiter = get_shared_limiter(self.BASE_URL)
+
+        # 合约交易规则缓存（数量/价格精度、最小名义价值），首次使用时加载
+        self.exchange_filters = ExchangeFilters(self)
+
+        # 下单监听：签名的 POST/DELETE 请求（下单、撤单、调杠杆）成功后回调 callback(method, endpoint)
+        self._order_listeners: List = []
+
+        # 用户数据流镜像（attach_user_data_stream 后，持仓/挂单在同步状态下直接读推送维护的镜像）
+        self.user_data_stream = None
+
+        # 请求遥测：按接口记录延迟直方图、重试、状态码和已用权重（stats() 查询）
+        self.telemetry = RequestTelemetry()
+
+        # 相同GET请求合并（single-flight）：并发中的相同请求共享一次HTTP调用，结果复用 get_cache_ttl 秒
+        self.get_cache_ttl = get_cache_ttl
+        self._inflight_lock = threading.Lock()
+        self._inflight: Dict[tuple, '_InflightCall'] = {}
+        self._get_cache: Dict[tuple, tuple] = {}
+        self._cache_generation = 0
+        self.coalesce_stats = {
+            'http_gets': 0,
+            'coalesced': 0,
+            'cache_hits': 0
+        }
+
+        # 自适应超时和对冲请求
+        self.adaptive_timeout = adaptive_timeout
+        self.hedge_requests = hedge_requests
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_lock = threading.Lock()
+        self.hedge_stats = {
+            'hedged': 0,
+            'hedge_wins': 0,
+            'skipped_rate_limit': 0
+        }
 
     def _create_session(self) -> requests.Session:
         """
@@ -49,14 +137,17 @@ class BinanceClient:
         - SSL错误: 重试3次
         - 连接错误: 重试3次
         - 指数退避: 0.5s, 1s, 2s
+        - 429 不在此重试，由限流器按 Retry-After 处理
+        - 读超时不在此重试，由 _request 按自适应超时重试（避免两层重试叠加成分钟级阻塞）
         """
         session = requests.Session()
 
         # 配置重试策略
         retry_strategy = Retry(
             total=3,  # 总共重试3次
+            read=0,  # 读超时/读错误不重试（请求可能已被服务器处理）
             backoff_factor=0.5,  # 指数退避因子: 0.5s, 1s, 2s
-            status_forcelist=[429, 500, 502, 503, 504],  # 这些状态码触发重试
+            status_forcelist=[500, 502, 503, 504],  # 这些状态码触发重试
             allowed_methods=["GET", "POST", "DELETE"],  # 允许重试的HTTP方法
             raise_on_status=False  # 不自动抛出HTTPError
         )
@@ -65,7 +156,7 @@ class BinanceClient:
         adapter = HTTPAdapter(
             max_retries=retry_strategy,
             pool_connections=10,  # 连接池大小
-            pool_maxsize=10  # 最大连接数
+            pool_maxsize=self.pool_maxsize  # 每个主机的最大连接数
         )
 
         # 挂载到session
@@ -87,20 +178,115 @@ class BinanceClient:
     def _request(self, method: str, endpoint: str, params: Dict = None,
                  signed: bool = False, futures: bool = False) -> Dict:
         """
+        向Binance API发送请求
+
+        GET 请求按 (接口, 参数, 是否签名) 合并：已有相同请求在进行中时等待它的结果，
+        get_cache_ttl 内的相同请求直接复用上次结果（每个调用方拿到独立副本）。
+        签名的下单/撤单请求成功后清空复用结果。
+
+        Args:
+            method: HTTP方法 (GET, POST, PUT, DELETE)
+            endpoint: API端点
+            params: 请求参数
+            signed: 是否需要签名
+            futures: 是否使用合约API
+
+        Returns:
+            API响应字典
+        """
+        if method != 'GET':
+            return self._send_request(method, endpoint, params, signed, futures)
+
+        key = (futures, endpoint, signed,
+               tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+
+        with self._inflight_lock:
+            cached = self._get_cache.get(key)
+            if cached is not None and time.time() - cached[0] < self.get_cache_ttl:
+                self.coalesce_stats['cache_hits'] += 1
+                shared = cached[1]
+                call = None
+            else:
+                shared = None
+                call = self._inflight.get(key)
+                if call is not None:
+                    call.followers += 1
+                    self.coalesce_stats['coalesced'] += 1
+                else:
+                    leader = _InflightCall(self._cache_generation)
+                    self._inflight[key] = leader
+                    self.coalesce_stats['http_gets'] += 1
+
+        if shared is not None:
+            return copy.deepcopy(shared)
+
+        if call is not None:
+            # 等待进行中的相同请求
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = self._send_request(method, endpoint, params, signed, futures)
+            with self._inflight_lock:
+                # 之后不会再有等待者：只有需要共享时才复制
+                if leader.followers or self.get_cache_ttl > 0:
+                    leader.result = copy.deepcopy(result)
+                # 请求期间有下单成功时不写入复用结果
+                if self.get_cache_ttl > 0 and leader.generation == self._cache_generation:
+                    self._get_cache[key] = (time.time(), leader.result)
+        except BaseException as e:
+            # 包括 KeyboardInterrupt 等：等待者同样收到异常，不会一直阻塞
+            leader.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            leader.event.set()
+        return result
+
+    def clear_get_cache(self):
+        """清空GET复用结果（下单/撤单成功后自动调用）"""
+        with self._inflight_lock:
+            self._get_cache.clear()
+            self._cache_generation += 1
+
+    def _send_request(self, method: str, endpoint: str, params: Dict = None,
+                      signed: bool = False, futures: bool = False) -> Dict:
+        """发送请求并记录遥测（整个调用耗时、重试次数、成功与否）"""
+        trace = {'attempts': 0}
+        started = time.perf_counter()
+        success = False
+        try:
+            result = self._send_with_retries(method, endpoint, params, signed, futures, trace)
+            success = True
+            return result
+        finally:
+            self.telemetry.record_request(method, endpoint, time.perf_counter() - started,
+                                          trace['attempts'], success)
+
+    def _send_with_retries(self, method: str, endpoint: str, params: Dict = None,
+                           signed: bool = False, futures: bool = False,
+                           trace: Dict = None) -> Dict:
+        """
         向Binance API发送HTTP请求（增强版：自动重试+详细日志）
 
         Args:
-            method: HTTP方法 (GET, POST, DELETE)
+            method: HTTP方法 (GET, POST, PUT, DELETE)
             endpoint: API端点
             params: 请求参数
             signed: 是否需要签名
             futures: 是否使用合约API
+            trace: 记录实际尝试次数 {'attempts': n}
 
         Returns:
             API响应字典
         """
         if params is None:
             params = {}
+        if trace is None:
+            trace = {}
 
         base_url = self.FUTURES_URL if futures else self.BASE_URL
         url = f"{base_url}{endpoint}"
@@ -109,28 +295,67 @@ class BinanceClient:
             'X-MBX-APIKEY': self.api_key
         }
 
-        if signed:
-            params['timestamp'] = int(time.time() * 1000)
-            params['signature'] = self._generate_signature(params)
+        rate_limiter = self.futures_rate_limiter if futures else self.spot_rate_limiter
+        weight = endpoint_weight(method, endpoint, params)
+        base_timeout = self._timeout_for(method, endpoint)
+        hedge = self.hedge_requests and method == 'GET' and not signed and endpoint in self.HEDGED_ENDPOINTS
+        unsigned_params = params
 
         # 尝试发送请求（自动重试机制由session处理）
         max_attempts = 3
         last_error = None
 
         for attempt in range(1, max_attempts + 1):
+            trace['attempts'] = attempt
+            response = None
+            http_started = None
+            limiter_wait = 0.0
+            hedge_trace = {}
             try:
-                # 使用带重试机制的session
+                # 接近权重上限时在这里等待
+                wait_started = time.perf_counter()
+                rate_limiter.acquire(weight)
+                limiter_wait = time.perf_counter() - wait_started
+
+                # 限流等待后重新签名，避免 timestamp 超出 recvWindow
+                if signed:
+                    params = dict(unsigned_params)
+                    params['timestamp'] = int(time.time() * 1000)
+                    params['signature'] = self._generate_signature(params)
+
+                # 使用带重试机制的session（超时后的重试逐次放宽超时）
+                timeout = min(base_timeout * attempt, self.DEFAULT_TIMEOUT)
+                http_started = time.perf_counter()
                 if method == 'GET':
-                    response = self.session.get(url, params=params, headers=headers, timeout=30)
+                    if hedge:
+                        response = self._hedged_get(url, params, headers, timeout, endpoint,
+                                                    rate_limiter, weight, limiter_wait, hedge_trace)
+                    else:
+                        response = self.session.get(url, params=params, headers=headers, timeout=timeout)
                 elif method == 'POST':
-                    response = self.session.post(url, params=params, headers=headers, timeout=30)
+                    response = self.session.post(url, params=params, headers=headers, timeout=timeout)
+                elif method == 'PUT':
+                    response = self.session.put(url, params=params, headers=headers, timeout=timeout)
                 elif method == 'DELETE':
-                    response = self.session.delete(url, params=params, headers=headers, timeout=30)
+                    response = self.session.delete(url, params=params, headers=headers, timeout=timeout)
                 else:
                     raise ValueError(f"不支持的HTTP方法: {method}")
 
+                rate_limiter.update_from_headers(response.headers)
+
+                # 429: 触发限流，按 Retry-After 暂停后重试；418: IP已被封禁，暂停并报错
+                if response.status_code in (418, 429):
+                    retry_after = response.headers.get('Retry-After')
+                    rate_limiter.block(float(retry_after) if retry_after else None, response.status_code)
+                    if response.status_code == 429 and attempt < max_attempts:
+                        last_error = Exception("HTTP 429 请求过于频繁")
+                        continue
+
                 response.raise_for_status()
-                return response.json()
+                result = self._decode_json(response)
+                if signed and method != 'GET':
+                    self._notify_order_listeners(method, endpoint)
+                return result
 
             except requests.exceptions.SSLError as e:
                 last_error = e
@@ -176,11 +401,149 @@ class BinanceClient:
                 self.logger.error(f"未知错误: {type(e).__name__} - {str(e)}")
                 raise Exception(f"API请求失败: {str(e)}")
 
+            finally:
+                # 每次HTTP往返单独记录（网络异常时状态码为None）；
+                # 发出对冲时由首个请求结束后自己记录，避免先返回的一方拉低延迟分位数
+                if http_started is not None and not hedge_trace.get('hedged'):
+                    self._record_attempt(method, endpoint, time.perf_counter() - http_started,
+                                         response, limiter_wait)
+
         # 所有重试都失败
         error_msg = f"API请求失败（{max_attempts}次重试后）: {type(last_error).__name__} - {str(last_error)}"
         self.logger.error(error_msg)
         raise Exception(error_msg)
 
+    def _record_attempt(self, method: str, endpoint: str, elapsed: float, response, limiter_wait: float = 0.0):
+        """记录一次HTTP往返的遥测（response 为None表示网络异常）"""
+        used_weight = None
+        if response is not None:
+            used = response.headers.get('X-MBX-USED-WEIGHT-1M') or \
+                response.headers.get('X-MBX-USED-WEIGHT-1m')
+            used_weight = int(used) if used is not None else None
+        self.telemetry.record_attempt(
+            method, endpoint, elapsed,
+            response.status_code if response is not None else None,
+            used_weight, limiter_wait
+        )
+
+    @staticmethod
+    def _decode_json(response):
+        """解析响应体（直接解析原始字节，安装了 orjson 时优先使用）"""
+        content = getattr(response, 'content', None)
+        if isinstance(content, (bytes, str)):
+            return json_loads(content)
+        return response.json()
+
+    def _timeout_for(self, method: str, endpoint: str) -> float:
+        """
+        请求超时（秒）
+
+        GET 请求在样本足够时取该接口 p99 × TIMEOUT_P99_MULTIPLIER；
+        下单等非GET请求超时后状态未知，保持固定超时
+        """
+        if not self.adaptive_timeout or method != 'GET':
+            return self.DEFAULT_TIMEOUT
+        p99 = self.telemetry.http_percentile(method, endpoint, 99)
+        if p99 is None:
+            return self.DEFAULT_TIMEOUT
+        return min(max(p99 * self.TIMEOUT_P99_MULTIPLIER, self.MIN_TIMEOUT), self.DEFAULT_TIMEOUT)
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=self.pool_maxsize,
+                                                          thread_name_prefix='binance-hedge')
+            return self._hedge_executor
+
+    def _hedged_get(self, url: str, params: Dict, headers: Dict, timeout: float,
+                    endpoint: str, rate_limiter, weight: int, limiter_wait: float = 0.0,
+                    trace: Dict = None):
+        """
+        对冲GET：首个请求超过该接口 p95 延迟仍未返回时，再发一个相同请求，取先成功的响应
+
+        样本不足或限流器余量不足（超过软上限）时退化为普通请求；
+        落后的请求在后台结束，结果丢弃。发出对冲时 trace['hedged'] 为True，
+        遥测记录首个请求自身的耗时（结束时记录），不记录先返回一方的耗时
+        """
+        if trace is None:
+            trace = {}
+        delay = self.telemetry.http_percentile('GET', endpoint, self.HEDGE_PERCENTILE)
+        if delay is None:
+            return self.session.get(url, params=params, headers=headers, timeout=timeout)
+
+        executor = self._get_hedge_executor()
+        primary_started = time.perf_counter()
+        primary = executor.submit(self.session.get, url, params=params, headers=headers, timeout=timeout)
+        try:
+            return primary.result(timeout=max(delay, self.HEDGE_MIN_DELAY))
+        except FutureTimeoutError:
+            pass
+
+        if not rate_limiter.try_acquire(weight):
+            with self._hedge_lock:
+                self.hedge_stats['skipped_rate_limit'] += 1
+            return primary.result()
+
+        with self._hedge_lock:
+            self.hedge_stats['hedged'] += 1
+        trace['hedged'] = True
+
+        def record_primary(future):
+            response = future.result() if future.exception() is None else None
+            self._record_attempt('GET', endpoint, time.perf_counter() - primary_started, response, limiter_wait)
+
+        primary.add_done_callback(record_primary)
+        hedge = executor.submit(self.session.get, url, params=params, headers=headers, timeout=timeout)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._hedge_lock:
+                            self.hedge_stats['hedge_wins'] += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def add_order_listener(self, callback):
+        """注册下单监听（账户状态变化后需要失效的缓存使用）"""
+        self._order_listeners.append(callback)
+
+    def _notify_order_listeners(self, method: str, endpoint: str):
+        self.clear_get_cache()
+        for callback in self._order_listeners:
+            try:
+                callback(method, endpoint)
+            except Exception as e:
+                self.logger.warning(f"下单监听回调失败: {e}")
+
+    def stats(self) -> Dict:
+        """
+        请求统计
+
+        Returns:
+            {'endpoints': 各接口延迟/重试/状态码, 'coalesce': GET合并统计,
+             'hedge': 对冲请求统计, 'rate_limit': 合约限流状态}
+        """
+        return {
+            'endpoints': self.telemetry.snapshot(),
+            'coalesce': dict(self.coalesce_stats),
+            'hedge': dict(self.hedge_stats),
+            'rate_limit': self.get_rate_limit_status()
+        }
+
+    def get_rate_limit_status(self, futures: bool = True) -> Dict:
+        """
+        获取请求权重使用情况
+
+        Returns:
+            {'used_weight', 'weight_limit', 'hard_limit', 'headroom', 'window_reset_in', 'blocked_for', ...}
+        """
+        limiter = self.futures_rate_limiter if futures else self.spot_rate_limiter
+        return limiter.get_status()
+
     # ========== 账户信息接口 ==========
 
     def get_account_info(self) -> Dict:
@@ -214,10 +577,16 @@ class BinanceClient:
         return self._request('GET', '/fapi/v2/positionRisk', signed=True, futures=True)
 
     def get_active_positions(self) -> List[Dict]:
-        """获取活跃持仓（非零仓位）"""
+        """获取活跃持仓（非零仓位；用户数据流同步时读本地镜像）"""
+        if self.user_data_stream is not None and self.user_data_stream.is_synced():
+            return self.user_data_stream.get_positions()
         positions = self.get_futures_positions()
         return [p for p in positions if float(p.get('positionAmt', 0)) != 0]
 
+    def attach_user_data_stream(self, stream):
+        """挂载用户数据流（UserDataStream），断线或未对账时自动回退REST"""
+        self.user_data_stream = stream
+
     # ========== 市场数据接口 ==========
 
     def get_ticker_price(self, symbol: str = None) -> Dict:
@@ -491,6 +860,18 @@ class BinanceClient:
             reduce_only: 只减仓
             time_in_force: 有效期
         """
+        params = self._build_futures_order_params(symbol, side, order_type, quantity, price,
+                                                  position_side, reduce_only, time_in_force, **kwargs)
+        return self._request('POST', '/fapi/v1/order', params=params,
+                           signed=True, futures=True)
+
+    @staticmethod
+    def _build_futures_order_params(symbol: str, side: str, order_type: str,
+                                    quantity: float = None, price: float = None,
+                                    position_side: str = 'BOTH',
+                                    reduce_only: bool = False,
+                                    time_in_force: str = 'GTC', **kwargs) -> Dict:
+        """合约下单参数（create_futures_order 和批量下单共用）"""
         params = {
             'symbol': symbol,
             'side': side,
@@ -508,8 +889,57 @@ class BinanceClient:
             params['timeInForce'] = time_in_force
 
         params.update(kwargs)
-        return self._request('POST', '/fapi/v1/order', params=params,
-                           signed=True, futures=True)
+        return params
+
+    @staticmethod
+    def _format_batch_value(value) -> str:
+        """批量下单的参数值必须是字符串（浮点数不使用科学计数法）"""
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, float):
+            return format(Decimal(repr(value)).normalize(), 'f')
+        return str(value)
+
+    def create_batch_futures_orders(self, orders: List[Dict]) -> List[Dict]:
+        """
+        批量创建合约订单（/fapi/v1/batchOrders，一次最多5个，一个请求往返）
+
+        同一批订单由交易所并发处理，不保证成交顺序；每个订单单独成功或失败
+
+        Args:
+            orders: 订单列表，每项是 create_futures_order 的关键字参数，例如
+                {'symbol': 'BTCUSDT', 'side': 'SELL', 'order_type': 'STOP_MARKET',
+                 'quantity': 0.01, 'position_side': 'LONG', 'stopPrice': 59000}
+
+        Returns:
+            与 orders 一一对应的结果列表:
+                成功: {'success': True, 'order': 订单信息}
+                失败: {'success': False, 'error': 错误信息, 'code': 错误码}
+        """
+        if not orders:
+            return []
+        if len(orders) > self.BATCH_ORDER_LIMIT:
+            raise ValueError(f"批量下单一次最多 {self.BATCH_ORDER_LIMIT} 个订单，收到 {len(orders)} 个")
+
+        batch = []
+        for order in orders:
+            params = self._build_futures_order_params(**order)
+            batch.append({k: self._format_batch_value(v) for k, v in params.items()})
+
+        response = self._request('POST', '/fapi/v1/batchOrders',
+                                 params={'batchOrders': json.dumps(batch, separators=(',', ':'))},
+                                 signed=True, futures=True)
+
+        results = []
+        for i in range(len(orders)):
+            item = response[i] if isinstance(response, list) and i < len(response) else None
+            if isinstance(item, dict) and 'orderId' in item:
+                results.append({'success': True, 'order': item})
+            elif isinstance(item, dict):
+                results.append({'success': False, 'error': item.get('msg', str(item)), 'code': item.get('code')})
+            else:
+                results.append({'success': False, 'error': '批量下单响应缺少该订单结果', 'code': None})
+        return results
 
     def cancel_futures_order(self, symbol: str, order_id: int = None,
                             orig_client_order_id: str = None) -> Dict:
@@ -537,8 +967,10 @@ class BinanceClient:
         return self._request('GET', '/fapi/v1/order', params=params,
                            signed=True, futures=True)
 
-    def get_futures_open_orders(self, symbol: str = None) -> List[Dict]:
-        """获取所有合约挂单"""
+    def get_futures_open_orders(self, symbol: str = None, use_stream: bool = True) -> List[Dict]:
+        """获取所有合约挂单（用户数据流同步时读本地镜像，use_stream=False 强制请求REST）"""
+        if use_stream and self.user_data_stream is not None and self.user_data_stream.is_synced():
+            return self.user_data_stream.get_open_orders(symbol)
         params = {}
         if symbol:
             params['symbol'] = symbol
@@ -764,19 +1196,8 @@ class BinanceClient:
             # 计算平仓数量
             close_quantity = abs(position_amt) * (percentage / 100)
 
-            # 根据交易对设置精度（与开仓逻辑保持一致）
-            if 'BTC' in symbol:
-                close_quantity = round(close_quantity, 3)  # BTC: 0.001
-            elif 'ETH' in symbol:
-                close_quantity = round(close_quantity, 3)  # ETH: 0.001
-            elif 'BNB' in symbol:
-                close_quantity = round(close_quantity, 1)  # BNB: 0.1
-            elif 'SOL' in symbol:
-                close_quantity = round(close_quantity, 1)  # SOL: 0.1
-            elif 'DOGE' in symbol:
-                close_quantity = round(close_quantity, 0)  # DOGE: 整数
-            else:
-                close_quantity = round(close_quantity, 1)  # 默认: 0.1
+            # 按交易所 MARKET_LOT_SIZE 步长向下取整
+            close_quantity = self.exchange_filters.get(symbol).quantize_qty(close_quantity)
 
             # 确保不为0
             if close_quantity == 0:
@@ -837,6 +1258,21 @@ class BinanceClient:
                 'cancelled_count': 0
             }
 
+    # ========== 用户数据流 ==========
+
+    def create_listen_key(self) -> str:
+        """创建（或获取当前有效的）合约用户数据流 listenKey"""
+        result = self._request('POST', '/fapi/v1/listenKey', futures=True)
+        return result['listenKey']
+
+    def keepalive_listen_key(self) -> Dict:
+        """延长 listenKey 有效期（60分钟内至少调用一次）"""
+        return self._request('PUT', '/fapi/v1/listenKey', futures=True)
+
+    def close_listen_key(self) -> Dict:
+        """关闭用户数据流"""
+        return self._request('DELETE', '/fapi/v1/listenKey', futures=True)
+
     # ========== 便捷方法 ==========
 
     def get_usdt_balance(self) -> float:
@@ -866,6 +1302,21 @@ class BinanceClient:
 
     # ========== 高级订单类型 ==========
 
+    def get_close_position_side(self, side: str) -> str:
+        """
+        平仓/保护单的 positionSide（按账户持仓模式）
+
+        Args:
+            side: 平仓方向 (SELL 平多 / BUY 平空)
+
+        Returns:
+            双向持仓模式下为 LONG/SHORT，单向持仓模式下为 BOTH
+        """
+        mode = self.get_position_mode()
+        if mode.get('dualSidePosition'):
+            return 'LONG' if side == 'SELL' else 'SHORT'
+        return 'BOTH'
+
     def create_stop_loss_order(self, symbol: str, side: str, quantity: float,
                                stop_price: float, price: float = None,
                                futures: bool = False, position_side: str = None) -> Dict:
@@ -894,11 +1345,7 @@ class BinanceClient:
 
             # 自动检测持仓模式
             if position_side is None:
-                mode = self.get_position_mode()
-                if mode.get('dualSidePosition'):
-                    position_side = 'LONG' if side == 'SELL' else 'SHORT'
-                else:
-                    position_side = 'BOTH'
+                position_side = self.get_close_position_side(side)
 
             params['positionSide'] = position_side
 
@@ -943,11 +1390,7 @@ class BinanceClient:
 
             # 自动检测持仓模式
             if position_side is None:
-                mode = self.get_position_mode()
-                if mode.get('dualSidePosition'):
-                    position_side = 'LONG' if side == 'SELL' else 'SHORT'
-                else:
-                    position_side = 'BOTH'
+                position_side = self.get_close_position_side(side)
 
             params['positionSide'] = position_side
 
@@ -1147,6 +1590,30 @@ class BinanceClient:
         params = {'symbol': symbol}
         return self._request('GET', '/fapi/v1/ticker/24hr', params=params, futures=True)
 
+    def get_all_futures_24h_tickers(self) -> List[Dict]:
+        """
+        获取全部合约交易对的24小时价格统计（单次请求，权重40）
+
+        Returns:
+            24小时统计数据列表
+        """
+        return self._request('GET', '/fapi/v1/ticker/24hr', futures=True)
+
+    def get_premium_index(self, symbol: str = None):
+        """
+        获取标记价格、指数价格和当前资金费率
+
+        Args:
+            symbol: 交易对（不填则返回全部交易对列表，权重10）
+
+        Returns:
+            指定交易对时返回字典，否则返回列表
+        """
+        params = {}
+        if symbol:
+            params['symbol'] = symbol
+        return self._request('GET', '/fapi/v1/premiumIndex', params=params, futures=True)
+
     def get_spot_exchange_info(self, symbol: str = None) -> Dict:
         """获取现货交易规则和交易对信息"""
         params = {}
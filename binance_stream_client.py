@@ -0,0 +1,314 @@
+"""
+Binance 合约行情 WebSocket 客户端
+订阅 kline / markPrice / bookTicker（可选增量深度）组合流，维护线程安全的最新行情缓存
+断线或数据过期时读取接口返回 None，调用方自动回退到 REST
+"""
+
+import json
+import time
+import random
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    import websocket  # websocket-client
+    WEBSOCKET_AVAILABLE = True
+except ImportError:
+    WEBSOCKET_AVAILABLE = False
+
+
+class BinanceStreamClient:
+    """币安合约行情组合流客户端"""
+
+    STREAM_URL = "wss://fstream.binance.com"
+    TESTNET_STREAM_URL = "wss://stream.binancefuture.com"
+
+    def __init__(self, symbols: Iterable[str], kline_intervals: Iterable[str] = ('1m',),
+                 testnet: bool = False, stream_url: str = None,
+                 stale_after: float = 10.0, record_path: str = None, depth_updates: bool = False):
+        """
+        初始化行情流客户端
+
+        Args:
+            symbols: 订阅的交易对列表
+            kline_intervals: 订阅的K线周期
+            testnet: 是否使用测试网
+            stream_url: 自定义流地址（本地回放服务器用）
+            stale_after: 数据超过多少秒未更新视为过期（秒）
+            record_path: 原始消息录制文件路径（JSONL，可用于离线回放）
+            depth_updates: 是否订阅增量深度流（<symbol>@depth@100ms，供本地订单簿使用）
+        """
+        self.symbols = [s.upper() for s in symbols]
+        self.kline_intervals = list(kline_intervals)
+        self.stream_url = stream_url or (self.TESTNET_STREAM_URL if testnet else self.STREAM_URL)
+        self.stale_after = stale_after
+        self.record_path = record_path
+        self.depth_updates = depth_updates
+        self.logger = logging.getLogger(__name__)
+
+        # 最新行情缓存
+        self._lock = threading.RLock()
+        self._klines: Dict[tuple, Dict] = {}       # (symbol, interval) -> {'bar': [...], 'closed': bool, 'received_at': float}
+        self._mark_prices: Dict[str, Dict] = {}    # symbol -> 标记价格数据
+        self._book_tickers: Dict[str, Dict] = {}   # symbol -> 最优挂单数据
+        self._listeners: List[Callable[[str, Dict], None]] = []
+
+        # 连接状态
+        self.connected = False
+        self._running = False
+        self._stop_event = threading.Event()
+        self._ws = None
+        self._thread = None
+        self._record_file = None
+        self._next_request_id = 1
+
+        self.stats = {
+            'messages': 0,
+            'reconnects': 0,
+            'errors': 0
+        }
+
+    # ========== 生命周期 ==========
+
+    def start(self) -> bool:
+        """
+        启动后台连接线程
+
+        Returns:
+            是否成功启动（未安装 websocket-client 时返回False，调用方继续使用REST）
+        """
+        if not WEBSOCKET_AVAILABLE:
+            self.logger.warning("[STREAM] 未安装 websocket-client，行情流不可用，继续使用REST轮询")
+            return False
+        if self._running:
+            return True
+
+        if self.record_path:
+            self._record_file = open(self.record_path, 'a', encoding='utf-8')
+
+        self._running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='binance-stream', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """停止连接"""
+        self._running = False
+        self._stop_event.set()
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        if self._record_file is not None:
+            self._record_file.close()
+            self._record_file = None
+        self.connected = False
+
+    def wait_until_connected(self, timeout: float = 10.0) -> bool:
+        """等待连接建立"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.connected:
+                return True
+            time.sleep(0.05)
+        return self.connected
+
+    def _run_loop(self):
+        """连接主循环（断线自动重连，指数退避）"""
+        backoff = 1.0
+        while self._running:
+            # 还没有订阅任何交易对时等待 add_symbols
+            if not self.symbols:
+                self._stop_event.wait(0.5)
+                continue
+
+            url = self._build_url()
+            self._ws = websocket.WebSocketApp(
+                url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            started = time.time()
+            try:
+                self._ws.run_forever(ping_interval=60, ping_timeout=10)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.warning(f"[STREAM] 连接异常: {e}")
+
+            self.connected = False
+            if not self._running:
+                break
+
+            # 连接维持较久说明网络正常，重置退避
+            if time.time() - started > 60:
+                backoff = 1.0
+            self.stats['reconnects'] += 1
+            self.logger.warning(f"[STREAM] 行情流断开，{backoff:.0f}秒后重连（期间回退REST）")
+            self._stop_event.wait(backoff + random.uniform(0, 0.5))
+            backoff = min(backoff * 2, 30.0)
+
+    def _build_url(self) -> str:
+        """构建组合流地址"""
+        streams = self._stream_names(self.symbols)
+        return f"{self.stream_url}/stream?streams={'/'.join(streams)}"
+
+    def _stream_names(self, symbols: Iterable[str]) -> List[str]:
+        """交易对 -> 订阅流名称"""
+        streams = []
+        for symbol in symbols:
+            s = symbol.lower()
+            for interval in self.kline_intervals:
+                streams.append(f"{s}@kline_{interval}")
+            streams.append(f"{s}@markPrice@1s")
+            streams.append(f"{s}@bookTicker")
+            if self.depth_updates:
+                streams.append(f"{s}@depth@100ms")
+        return streams
+
+    def add_symbols(self, symbols: Iterable[str]):
+        """动态追加订阅的交易对（已连接时发送SUBSCRIBE，否则在下次连接时生效）"""
+        new_symbols = [s.upper() for s in symbols if s.upper() not in self.symbols]
+        if not new_symbols:
+            return
+        self.symbols.extend(new_symbols)
+
+        if self.connected and self._ws is not None:
+            try:
+                self._ws.send(json.dumps({
+                    'method': 'SUBSCRIBE',
+                    'params': self._stream_names(new_symbols),
+                    'id': self._next_request_id
+                }))
+                self._next_request_id += 1
+            except Exception as e:
+                self.logger.warning(f"[STREAM] 追加订阅失败: {e}")
+
+    # ========== WebSocket 回调 ==========
+
+    def _on_open(self, ws):
+        self.connected = True
+        self.logger.info(f"[STREAM] 行情流已连接 ({len(self.symbols)} 个交易对)")
+
+    def _on_close(self, ws, close_status_code=None, close_msg=None):
+        self.connected = False
+
+    def _on_error(self, ws, error):
+        self.stats['errors'] += 1
+        self.logger.warning(f"[STREAM] 行情流错误: {error}")
+
+    def _on_message(self, ws, message: str):
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            return
+
+        # 订阅响应 {"result": null, "id": 1}
+        if 'data' not in payload:
+            return
+
+        if self._record_file is not None:
+            self._record_file.write(message.strip() + '\n')
+
+        self.stats['messages'] += 1
+        self.handle_event(payload.get('stream', ''), payload['data'])
+
+    def handle_event(self, stream: str, data: Dict):
+        """处理单条行情事件并更新缓存"""
+        event_type = data.get('e')
+        received_at = time.time()
+
+        with self._lock:
+            if event_type == 'kline':
+                k = data['k']
+                bar = [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'],
+                       k['T'], k['q'], k['n'], k['V'], k['Q'], k.get('B', '0')]
+                self._klines[(data['s'], k['i'])] = {
+                    'bar': bar,
+                    'closed': k['x'],
+                    'received_at': received_at
+                }
+            elif event_type == 'markPriceUpdate':
+                self._mark_prices[data['s']] = {
+                    'mark_price': float(data['p']),
+                    'index_price': float(data.get('i', 0)),
+                    'funding_rate': float(data.get('r') or 0),
+                    'next_funding_time': data.get('T'),
+                    'event_time': data.get('E'),
+                    'received_at': received_at
+                }
+            elif event_type == 'bookTicker':
+                self._book_tickers[data['s']] = {
+                    'bid_price': float(data['b']),
+                    'bid_qty': float(data['B']),
+                    'ask_price': float(data['a']),
+                    'ask_qty': float(data['A']),
+                    'received_at': received_at
+                }
+
+        for listener in list(self._listeners):
+            try:
+                listener(stream, data)
+            except Exception as e:
+                self.logger.warning(f"[STREAM] 行情监听器异常: {e}")
+
+    def add_listener(self, callback: Callable[[str, Dict], None]):
+        """注册行情事件监听器 callback(stream, data)"""
+        self._listeners.append(callback)
+
+    # ========== 最新行情读取（过期返回None） ==========
+
+    def _is_fresh(self, entry: Optional[Dict]) -> bool:
+        return (entry is not None and self.connected and
+                time.time() - entry['received_at'] <= self.stale_after)
+
+    def is_healthy(self) -> bool:
+        """连接正常且最近收到过数据"""
+        if not self.connected:
+            return False
+        with self._lock:
+            latest = max(
+                [e['received_at'] for e in self._mark_prices.values()] +
+                [e['received_at'] for e in self._book_tickers.values()] +
+                [e['received_at'] for e in self._klines.values()],
+                default=0
+            )
+        return time.time() - latest <= self.stale_after
+
+    def get_mark_price(self, symbol: str) -> Optional[float]:
+        """获取最新标记价格"""
+        with self._lock:
+            entry = self._mark_prices.get(symbol)
+            return entry['mark_price'] if self._is_fresh(entry) else None
+
+    def get_mark_price_info(self, symbol: str) -> Optional[Dict]:
+        """获取最新标记价格、指数价格和资金费率"""
+        with self._lock:
+            entry = self._mark_prices.get(symbol)
+            return dict(entry) if self._is_fresh(entry) else None
+
+    def get_book_ticker(self, symbol: str) -> Optional[Dict]:
+        """获取最优买卖挂单"""
+        with self._lock:
+            entry = self._book_tickers.get(symbol)
+            return dict(entry) if self._is_fresh(entry) else None
+
+    def get_latest_kline(self, symbol: str, interval: str) -> Optional[List]:
+        """获取最新一根K线（REST格式），可能未收盘"""
+        with self._lock:
+            entry = self._klines.get((symbol, interval))
+            return list(entry['bar']) if self._is_fresh(entry) else None
+
+    def get_last_price(self, symbol: str) -> Optional[float]:
+        """获取最新成交价（取订阅的最小周期K线收盘价）"""
+        for interval in self.kline_intervals:
+            bar = self.get_latest_kline(symbol, interval)
+            if bar is not None:
+                return float(bar[4])
+        return None
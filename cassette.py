@@ -0,0 +1,334 @@
+"""
+HTTP 录制/回放层（cassette）
+包装 requests.Session：录制模式下把请求/响应对写入 gzip 压缩的 JSONL 文件，
+回放模式下按请求匹配录制的响应（可按录制耗时模拟延迟），用于离线复现交易循环和延迟基准测试
+
+环境变量:
+    CASSETTE_MODE=record|replay   （默认关闭）
+    CASSETTE_PATH=cassettes/cycle.jsonl.gz
+    CASSETTE_LATENCY=1.0          （回放时按录制耗时 × 系数等待，0 表示不等待）
+
+用法:
+    python cassette.py cassettes/cycle.jsonl.gz   # 按接口汇总请求数和耗时
+"""
+
+import os
+import sys
+import json
+import gzip
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+# 每次请求都会变化的参数，不参与匹配，也不写入文件
+VOLATILE_PARAMS = ('timestamp', 'signature', 'recvWindow')
+
+# 需要保留的响应头（限流器校准和 Retry-After 使用）
+RECORDED_HEADERS = ('content-type', 'retry-after', 'x-mbx-used-weight-1m', 'x-mbx-order-count-1m',
+                    'x-mbx-order-count-10s')
+
+# 录制的网络异常，回放时按名称重新抛出
+RECORDED_ERRORS = {
+    'Timeout': requests.exceptions.Timeout,
+    'ReadTimeout': requests.exceptions.ReadTimeout,
+    'ConnectTimeout': requests.exceptions.ConnectTimeout,
+    'ConnectionError': requests.exceptions.ConnectionError,
+    'SSLError': requests.exceptions.SSLError,
+}
+
+
+class CassetteMissError(Exception):
+    """回放模式下没有与请求匹配的录制"""
+
+
+class CassetteResponse:
+    """回放的响应（提供 BinanceClient / DeepSeekClient 用到的 requests.Response 接口）"""
+
+    def __init__(self, status_code: int, text: str, headers: Dict = None, url: str = ''):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.url = url
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def _canonical_params(params: Optional[Dict]) -> Dict:
+    return {k: str(v) for k, v in sorted((params or {}).items()) if k not in VOLATILE_PARAMS}
+
+
+def _body_digest(body) -> str:
+    if body is None:
+        return ''
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _endpoint(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.netloc}{parsed.path}"
+
+
+class Cassette:
+    """一个录制文件（gzip JSONL，每行一次请求/响应）"""
+
+    def __init__(self, path: str, mode: str = 'replay', latency_scale: float = 0.0):
+        """
+        Args:
+            path: 录制文件路径（.jsonl.gz）
+            mode: 'record' 或 'replay'
+            latency_scale: 回放时的延迟系数（按录制耗时 × 系数等待，0 表示不等待）
+        """
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"不支持的 cassette 模式: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._file = None
+        self.interactions: List[Dict] = []
+        self._used: List[bool] = []
+        self._strict: Dict[tuple, List[int]] = {}
+        self._loose: Dict[tuple, List[int]] = {}
+        self._positions: Dict[tuple, int] = {}
+
+        self.stats = {
+            'recorded': 0,
+            'replayed': 0,
+            'loose_matches': 0,
+            'repeats': 0,
+            'misses': 0
+        }
+
+        if mode == 'record':
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = gzip.open(path, 'at', encoding='utf-8')
+        else:
+            self._load()
+
+    def _load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    self._index(json.loads(line))
+        self.logger.info(f"[CASSETTE] 已加载 {len(self.interactions)} 条录制: {self.path}")
+
+    def _index(self, interaction: Dict):
+        index = len(self.interactions)
+        self.interactions.append(interaction)
+        self._used.append(False)
+        strict_key, loose_key = self._keys(interaction['method'], interaction['url'],
+                                           interaction.get('params'), interaction.get('body_digest', ''))
+        self._strict.setdefault(strict_key, []).append(index)
+        self._loose.setdefault(loose_key, []).append(index)
+
+    @staticmethod
+    def _keys(method: str, url: str, params: Optional[Dict], body_digest: str):
+        endpoint = _endpoint(url)
+        params_key = json.dumps(_canonical_params(params), sort_keys=True)
+        return ('strict', method, endpoint, params_key, body_digest), ('loose', method, endpoint)
+
+    # ========== 录制 ==========
+
+    def record(self, method: str, url: str, params: Optional[Dict], body, elapsed: float,
+               response=None, error: Exception = None):
+        """写入一次请求/响应（或网络异常）"""
+        interaction = {
+            'method': method,
+            'url': url.split('?')[0],
+            'params': _canonical_params(params),
+            'body_digest': _body_digest(body),
+            'elapsed': round(elapsed, 6),
+            'recorded_at': time.time()
+        }
+        if error is not None:
+            interaction['error'] = type(error).__name__
+            interaction['error_message'] = str(error)[:200]
+        else:
+            interaction['status'] = response.status_code
+            interaction['headers'] = {k: v for k, v in response.headers.items()
+                                      if k.lower() in RECORDED_HEADERS}
+            interaction['response'] = response.text
+
+        line = json.dumps(interaction, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.stats['recorded'] += 1
+
+    # ========== 回放 ==========
+
+    def _take(self, key: tuple) -> Optional[int]:
+        """按录制顺序取下一条未使用的记录"""
+        indexes = self._strict.get(key) if key[0] == 'strict' else self._loose.get(key)
+        if not indexes:
+            return None
+        position = self._positions.get(key, 0)
+        while position < len(indexes) and self._used[indexes[position]]:
+            position += 1
+        self._positions[key] = position
+        return indexes[position] if position < len(indexes) else None
+
+    def match(self, method: str, url: str, params: Optional[Dict], body) -> Dict:
+        """
+        查找与请求匹配的录制
+
+        先按 方法+地址+参数+请求体 精确匹配，失败时退化为同一接口按录制顺序匹配
+        （提示词中含时间等每次不同的内容）；录制用完后重复返回最后一条
+
+        Raises:
+            CassetteMissError: 该接口没有任何录制
+        """
+        strict_key, loose_key = self._keys(method, url, params, _body_digest(body))
+        with self._lock:
+            index = self._take(strict_key)
+            if index is None:
+                index = self._take(loose_key)
+                if index is not None:
+                    self.stats['loose_matches'] += 1
+            if index is None:
+                candidates = self._strict.get(strict_key) or self._loose.get(loose_key)
+                if not candidates:
+                    self.stats['misses'] += 1
+                    raise CassetteMissError(f"没有匹配的录制: {method} {_endpoint(url)} {_canonical_params(params)}")
+                index = candidates[-1]
+                self.stats['repeats'] += 1
+            else:
+                self._used[index] = True
+            self.stats['replayed'] += 1
+            return self.interactions[index]
+
+    def replay(self, method: str, url: str, params: Optional[Dict], body) -> CassetteResponse:
+        """回放一次请求（可模拟录制时的耗时）"""
+        interaction = self.match(method, url, params, body)
+        if self.latency_scale > 0:
+            time.sleep(interaction.get('elapsed', 0) * self.latency_scale)
+
+        if 'error' in interaction:
+            error_class = RECORDED_ERRORS.get(interaction['error'], requests.exceptions.ConnectionError)
+            raise error_class(interaction.get('error_message', interaction['error']))
+        return CassetteResponse(interaction['status'], interaction['response'],
+                                interaction.get('headers'), url)
+
+    def close(self):
+        """关闭录制文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CassetteSession:
+    """requests.Session 的录制/回放包装（只实现客户端用到的 get/post/put/delete）"""
+
+    def __init__(self, cassette: Cassette, session=None):
+        """
+        Args:
+            cassette: 录制文件
+            session: 实际发送请求的 requests.Session（录制模式需要）
+        """
+        self.cassette = cassette
+        self.session = session or requests.Session()
+
+    def request(self, method: str, url: str, params: Dict = None, json: Dict = None, **kwargs):
+        method = method.upper()
+        if self.cassette.mode == 'replay':
+            return self.cassette.replay(method, url, params, json)
+
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, params=params, json=json, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self.cassette.record(method, url, params, json, time.perf_counter() - started, error=e)
+            raise
+        self.cassette.record(method, url, params, json, time.perf_counter() - started, response=response)
+        return response
+
+    def get(self, url: str, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url: str, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+# ========== 按环境变量启用 ==========
+
+_env_cassette = None
+_env_lock = threading.Lock()
+
+
+def get_env_cassette() -> Optional[Cassette]:
+    """按 CASSETTE_MODE / CASSETTE_PATH 创建进程内共享的录制文件（未启用时返回None）"""
+    global _env_cassette
+    mode = os.getenv('CASSETTE_MODE', '').lower()
+    if mode not in ('record', 'replay'):
+        return None
+    with _env_lock:
+        if _env_cassette is None:
+            _env_cassette = Cassette(
+                os.getenv('CASSETTE_PATH', 'cassettes/cycle.jsonl.gz'),
+                mode=mode,
+                latency_scale=float(os.getenv('CASSETTE_LATENCY', 0))
+            )
+        return _env_cassette
+
+
+def wrap_session(session):
+    """CASSETTE_MODE 启用时返回包装后的 session，否则原样返回"""
+    cassette = get_env_cassette()
+    if cassette is None:
+        return session
+    return CassetteSession(cassette, session)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__)
+        return 1
+
+    cassette = Cassette(sys.argv[1], mode='replay')
+    summary: Dict[tuple, List[float]] = {}
+    for interaction in cassette.interactions:
+        key = (interaction['method'], _endpoint(interaction['url']))
+        summary.setdefault(key, []).append(interaction.get('elapsed', 0))
+
+    print(f"{'请求数':>6}  {'平均(ms)':>9}  {'最大(ms)':>9}  {'合计(s)':>8}  接口")
+    for (method, endpoint), elapsed in sorted(summary.items(), key=lambda item: -sum(item[1])):
+        print(f"{len(elapsed):>6}  {sum(elapsed) / len(elapsed) * 1000:>9.1f}  "
+              f"{max(elapsed) * 1000:>9.1f}  {sum(elapsed):>8.2f}  {method} {endpoint}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
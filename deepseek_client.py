@@ -10,6 +10,28 @@ import logging
 from datetime import datetime
 import pytz
 
+from cassette import wrap_session
+
+
+# 批量决策的系统提示词（一次调用返回所有交易对的决策）
+BATCH_SYSTEM_PROMPT = """你是专业的加密货币交易员，根据账户规模动态调整策略：
+小账户（余额 < $1000）激进增长，大账户稳健增长、优先保护本金。
+基于提示词中每个交易对的价格、指标、持仓量、资金费率和账户持仓，为每个交易对分别做出决策。
+
+## 可用操作
+- 无持仓的交易对: OPEN_LONG（开多）、OPEN_SHORT（开空）、HOLD（观望）
+- 已有持仓的交易对: CLOSE（平仓）、HOLD（继续持有）
+
+## 系统自动处理
+- 盈利≥$2自动平仓(强制止盈保护)
+- 浮盈滚仓(盈利≥0.8%自动加仓)
+- 风险控制和订单执行
+
+## 回复格式
+只返回一个JSON数组，每个交易对一个元素，不要遗漏:
+[{"symbol": "BTCUSDT", "action": "OPEN_LONG", "confidence": 0-100, "reasoning": "决策理由",
+  "leverage": 1-10, "position_size": 1-100, "stop_loss_pct": 数字, "take_profit_pct": 数字}, ...]"""
+
 
 class DeepSeekClient:
     """DeepSeek API 客户端"""
@@ -33,6 +55,9 @@ class DeepSeekClient:
         }
         self.logger = logging.getLogger(__name__)
 
+        # 复用连接；CASSETTE_MODE 启用时包装为录制/回放 session
+        self.session = wrap_session(requests.Session())
+
     def get_trading_session(self) -> Dict:
         """获取当前交易时段信息(仅用于日志记录)"""
         try:
@@ -100,7 +125,7 @@ class DeepSeekClient:
                     official_payload = payload.copy()
                     official_payload["model"] = self.model_name
                     
-                    response = requests.post(
+                    response = self.session.post(
                         f"{self.base_url}/chat/completions",
                         headers=self.headers,
                         json=official_payload,
@@ -113,7 +138,7 @@ class DeepSeekClient:
                     if attempt == 0:  # 只在第一次失败时尝试备用
                         self.logger.warning(f"官方API失败，尝试ZenMux备用: {api_error}")
                         payload["model"] = self.zenmux_model
-                        response = requests.post(
+                        response = self.session.post(
                             f"{self.zenmux_url}/chat/completions",
                             headers=self.headers,
                             json=payload,
@@ -241,7 +266,7 @@ JSON,包含: action, confidence(0-100), reasoning, leverage(1-10), position_size
         for attempt in range(2):
             try:
                 self.logger.info(f"API调用尝试 {attempt + 1}/2...")
-                response = requests.post(
+                response = self.session.post(
                     f"{self.base_url}/chat/completions",
                     headers=self.headers,
                     json={
@@ -342,7 +367,7 @@ JSON: {"action": "CLOSE或HOLD", "confidence": 0-100, "narrative": "决策说明
         ]
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
                 headers=self.headers,
                 json={
@@ -497,6 +522,103 @@ JSON,包含: action, confidence(0-100), reasoning, leverage(1-10), position_size
 
         return prompt
 
+    def analyze_batch_and_decide(self, prompt: str, symbols: List[str]) -> Dict:
+        """
+        一次调用为多个交易对做出决策
+
+        Args:
+            prompt: 覆盖全部交易对的提示词（EnhancedDecisionEngine.generate_comprehensive_prompt）
+            symbols: 需要决策的交易对
+
+        Returns:
+            {'success', 'decisions': {symbol: decision}, 'missing': [未返回决策的交易对], 'raw_response'}
+            调用失败或无法解析时 success 为 False，调用方应逐个交易对单独决策
+        """
+        messages = [
+            {
+                "role": "system",
+                "content": BATCH_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": f"{prompt}\n需要决策的交易对: {', '.join(symbols)}"
+            }
+        ]
+
+        try:
+            # 输出长度随交易对数量增加
+            result = self.chat_completion(messages, max_tokens=min(8000, 500 + 300 * len(symbols)),
+                                          timeout=180, max_retries=1)
+            content = result['choices'][0]['message']['content']
+        except Exception as e:
+            self.logger.error(f"批量决策调用失败: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+        decisions = self._parse_batch_decisions(content, symbols)
+        if not decisions:
+            return {
+                'success': False,
+                'error': '无法解析批量决策',
+                'raw_response': content
+            }
+        return {
+            'success': True,
+            'decisions': decisions,
+            'missing': [symbol for symbol in symbols if symbol not in decisions],
+            'raw_response': content,
+            'model_used': 'deepseek-chat'
+        }
+
+    def _parse_batch_decisions(self, content: str, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        解析批量决策的JSON数组（忽略不在 symbols 中的交易对，无法解析时返回空字典）
+
+        从每个 '[' 处尝试解码，取第一个包含对象的数组，前后说明文字中的方括号不影响解析
+        """
+        content = content or ''
+        decoder = json.JSONDecoder()
+        items = None
+        start = content.find('[')
+        while start >= 0:
+            try:
+                value, _ = decoder.raw_decode(content, start)
+            except ValueError:
+                value = None
+            if isinstance(value, list) and any(isinstance(item, dict) for item in value):
+                items = value
+                break
+            start = content.find('[', start + 1)
+        if items is None:
+            self.logger.error("批量决策中没有可解析的JSON数组")
+            return {}
+
+        wanted = set(symbols)
+        decisions = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            symbol = str(item.get('symbol', '')).upper()
+            if symbol in wanted and symbol not in decisions:
+                decisions[symbol] = self._normalize_decision(item, content)
+        return decisions
+
+    @staticmethod
+    def _normalize_decision(decision: Dict, content: str = '') -> Dict:
+        """AI返回的决策字段补全默认值"""
+        return {
+            "action": decision.get("action", "HOLD"),
+            "confidence": decision.get("confidence", 50),
+            "reasoning": decision.get("reasoning", decision.get("narrative", content[:200])),
+            "leverage": decision.get("leverage", 10),
+            "position_size": decision.get("position_size", 30),
+            "stop_loss_pct": decision.get("stop_loss_pct", 3),
+            "take_profit_pct": decision.get("take_profit_pct", 8),
+            "narrative": decision.get("narrative", decision.get("reasoning", ""))
+        }
+
     def _parse_decision(self, content: str) -> Dict:
         """解析AI返回的决策"""
         try:
@@ -504,17 +626,7 @@ JSON,包含: action, confidence(0-100), reasoning, leverage(1-10), position_size
             import re
             json_match = re.search(r'\{[^{}]*\}', content, re.DOTALL)
             if json_match:
-                decision = json.loads(json_match.group())
-                return {
-                    "action": decision.get("action", "HOLD"),
-                    "confidence": decision.get("confidence", 50),
-                    "reasoning": decision.get("reasoning", decision.get("narrative", content[:200])),
-                    "leverage": decision.get("leverage", 10),
-                    "position_size": decision.get("position_size", 30),
-                    "stop_loss_pct": decision.get("stop_loss_pct", 3),
-                    "take_profit_pct": decision.get("take_profit_pct", 8),
-                    "narrative": decision.get("narrative", decision.get("reasoning", ""))
-                }
+                return self._normalize_decision(json.loads(json_match.group()), content)
         except Exception as e:
             self.logger.error(f"解析AI决策失败: {e}")
 
@@ -15,7 +15,11 @@ logger = logging.getLogger(__name__)
 class EnhancedDecisionEngine:
     """增强的决策引擎，整合所有市场上下文"""
 
-    def __init__(self, binance_client, market_analyzer, runtime_state_manager):
+    # 提示词读取的市场上下文字段
+    CONTEXT_FIELDS = ('current_snapshot', 'intraday_series', 'long_term_context_4h', 'futures_market')
+
+    def __init__(self, binance_client, market_analyzer, runtime_state_manager,
+                 account_snapshot=None):
         """
         初始化增强决策引擎
 
@@ -23,8 +27,10 @@ class EnhancedDecisionEngine:
             binance_client: Binance客户端
             market_analyzer: 市场分析器
             runtime_state_manager: 运行状态管理器
+            account_snapshot: 账户/持仓快照（可选，同一轮循环内共享）
         """
         self.binance_client = binance_client
+        self.account_snapshot = account_snapshot
         self.market_analyzer = market_analyzer
         self.runtime_state = runtime_state_manager
 
@@ -36,7 +42,10 @@ class EnhancedDecisionEngine:
             持仓信息列表
         """
         try:
-            positions = self.binance_client.get_active_positions()
+            if self.account_snapshot is not None:
+                positions = self.account_snapshot.get_positions()
+            else:
+                positions = self.binance_client.get_active_positions()
             enriched_positions = []
 
             for pos in positions:
@@ -76,7 +85,10 @@ class EnhancedDecisionEngine:
             账户摘要
         """
         try:
-            account_info = self.binance_client.get_futures_account_info()
+            if self.account_snapshot is not None:
+                account_info = self.account_snapshot.get_account_info()
+            else:
+                account_info = self.binance_client.get_futures_account_info()
             total_wallet_balance = float(account_info.get('totalWalletBalance', 0))
             total_unrealized_profit = float(account_info.get('totalUnrealizedProfit', 0))
             total_margin_balance = float(account_info.get('totalMarginBalance', 0))
@@ -130,13 +142,22 @@ CURRENT MARKET STATE FOR ALL COINS
 
 """
 
+        # 所有交易对的指标一次向量化计算，失败时各交易对单独计算
+        try:
+            precomputed = self.market_analyzer.precompute_market_indicators(symbols)
+        except Exception as e:
+            logger.warning(f"批量计算指标失败，逐个计算: {e}")
+            precomputed = {}
+
         # 为每个交易对生成数据
         for symbol in symbols:
             try:
                 logger.info(f"正在生成 {symbol} 的市场数据...")
 
-                # 获取完整市场上下文
-                market_context = self.market_analyzer.get_comprehensive_market_context(symbol)
+                # 获取完整市场上下文（只并发预取下面用到的字段）
+                market_context = self.market_analyzer.get_comprehensive_market_context(
+                    symbol, precomputed.get(symbol)
+                ).prefetch(self.CONTEXT_FIELDS)
 
                 snapshot = market_context['current_snapshot']
                 intraday = market_context['intraday_series']
@@ -0,0 +1,205 @@
+"""
+交易所规则缓存
+从 get_futures_exchange_info 一次性加载所有交易对的 LOT_SIZE / MARKET_LOT_SIZE /
+PRICE_FILTER / MIN_NOTIONAL，预先计算数量和价格的量化参数，按TTL后台刷新；
+下单前的数量/价格取整变为O(1)查表，不再依赖按交易对名称硬编码的精度
+"""
+
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_DOWN, ROUND_UP, ROUND_HALF_UP
+from typing import Dict, Optional
+
+
+def _decimals(step: Decimal) -> int:
+    """步长对应的小数位数（0.001 -> 3, 1 -> 0）"""
+    return max(-step.normalize().as_tuple().exponent, 0)
+
+
+@dataclass(frozen=True)
+class SymbolFilters:
+    """单个交易对的下单规则"""
+    symbol: str
+    step_size: Decimal          # LOT_SIZE 数量步长（限价单）
+    min_qty: Decimal
+    max_qty: Decimal
+    market_step_size: Decimal   # MARKET_LOT_SIZE 数量步长（市价单）
+    market_min_qty: Decimal
+    market_max_qty: Decimal
+    tick_size: Decimal          # PRICE_FILTER 价格步长
+    min_price: Decimal
+    max_price: Decimal
+    min_notional: Decimal       # MIN_NOTIONAL 最小名义价值
+    quantity_precision: int
+    price_precision: int
+
+    @classmethod
+    def from_exchange_info(cls, info: Dict) -> 'SymbolFilters':
+        """从 exchangeInfo 中单个交易对的数据构建"""
+        filters = {f['filterType']: f for f in info.get('filters', [])}
+        lot = filters.get('LOT_SIZE', {})
+        market_lot = filters.get('MARKET_LOT_SIZE', lot)
+        price = filters.get('PRICE_FILTER', {})
+        notional = filters.get('MIN_NOTIONAL', {})
+
+        step_size = Decimal(lot.get('stepSize', '1'))
+        market_step = Decimal(market_lot.get('stepSize', lot.get('stepSize', '1')))
+        tick_size = Decimal(price.get('tickSize', '0.01'))
+
+        return cls(
+            symbol=info['symbol'],
+            step_size=step_size,
+            min_qty=Decimal(lot.get('minQty', '0')),
+            max_qty=Decimal(lot.get('maxQty', '0')),
+            market_step_size=market_step,
+            market_min_qty=Decimal(market_lot.get('minQty', lot.get('minQty', '0'))),
+            market_max_qty=Decimal(market_lot.get('maxQty', lot.get('maxQty', '0'))),
+            tick_size=tick_size,
+            min_price=Decimal(price.get('minPrice', '0')),
+            max_price=Decimal(price.get('maxPrice', '0')),
+            min_notional=Decimal(notional.get('notional', notional.get('minNotional', '0'))),
+            quantity_precision=_decimals(max(step_size, market_step)),
+            price_precision=_decimals(tick_size)
+        )
+
+    def quantize_qty(self, quantity: float, market: bool = True, rounding=ROUND_DOWN) -> float:
+        """
+        数量按步长取整（默认向下，避免超出可用保证金）
+
+        Args:
+            quantity: 原始数量
+            market: 是否市价单（使用 MARKET_LOT_SIZE）
+            rounding: 取整方式
+
+        Returns:
+            取整后的数量；超过最大数量时截断为最大数量
+        """
+        step = self.market_step_size if market else self.step_size
+        max_qty = self.market_max_qty if market else self.max_qty
+        steps = (Decimal(str(abs(quantity))) / step).to_integral_value(rounding=rounding)
+        result = steps * step
+        if max_qty > 0 and result > max_qty:
+            result = (max_qty / step).to_integral_value(rounding=ROUND_DOWN) * step
+        return float(result)
+
+    def quantize_price(self, price: float, rounding=ROUND_HALF_UP) -> float:
+        """价格按 tickSize 取整"""
+        ticks = (Decimal(str(price)) / self.tick_size).to_integral_value(rounding=rounding)
+        return float(ticks * self.tick_size)
+
+    def min_order_qty(self, price: float, market: bool = True) -> float:
+        """同时满足最小数量和最小名义价值的最小下单数量（向上取整到步长）"""
+        min_qty = self.market_min_qty if market else self.min_qty
+        step = self.market_step_size if market else self.step_size
+        if price > 0 and self.min_notional > 0:
+            by_notional = (self.min_notional / Decimal(str(price)) / step).to_integral_value(rounding=ROUND_UP) * step
+        else:
+            by_notional = Decimal(0)
+        return float(max(min_qty, by_notional, step))
+
+    def min_order_notional(self, price: float, market: bool = True) -> float:
+        """最小下单数量对应的名义价值"""
+        return self.min_order_qty(price, market) * price
+
+    def is_valid_order(self, quantity: float, price: float, market: bool = True) -> bool:
+        """数量是否满足最小数量和最小名义价值"""
+        min_qty = self.market_min_qty if market else self.min_qty
+        return quantity >= float(min_qty) and quantity * price >= float(self.min_notional)
+
+
+class ExchangeFilters:
+    """全部交易对的下单规则缓存"""
+
+    def __init__(self, client, ttl: float = 3600.0):
+        """
+        初始化规则缓存（首次查询时加载）
+
+        Args:
+            client: BinanceClient实例
+            ttl: 刷新间隔（秒）
+        """
+        self.client = client
+        self.ttl = ttl
+        self.logger = logging.getLogger(__name__)
+
+        self._filters: Dict[str, SymbolFilters] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresh_thread = None
+
+    def load(self) -> bool:
+        """
+        从交易所加载全部交易对规则
+
+        Returns:
+            是否加载成功（失败时保留旧数据）
+        """
+        try:
+            info = self.client.get_futures_exchange_info()
+        except Exception as e:
+            self.logger.warning(f"[FILTERS] 加载交易规则失败: {e}")
+            return False
+
+        filters = {}
+        for symbol_info in info.get('symbols', []):
+            try:
+                filters[symbol_info['symbol']] = SymbolFilters.from_exchange_info(symbol_info)
+            except (KeyError, ArithmeticError) as e:
+                self.logger.warning(f"[FILTERS] 解析 {symbol_info.get('symbol')} 规则失败: {e}")
+
+        with self._lock:
+            self._filters = filters
+            self._loaded_at = time.time()
+        self.logger.info(f"[FILTERS] 已加载 {len(filters)} 个交易对的下单规则")
+        return True
+
+    def get(self, symbol: str) -> SymbolFilters:
+        """
+        获取交易对规则
+
+        Raises:
+            KeyError: 交易所没有该交易对（或规则无法加载）
+        """
+        filters = self._filters.get(symbol)
+        if filters is None:
+            # 首次使用或新上市交易对：同步加载一次
+            with self._lock:
+                loaded_at = self._loaded_at
+            if time.time() - loaded_at > 60 or not self._filters:
+                self.load()
+            filters = self._filters.get(symbol)
+        if filters is None:
+            raise KeyError(f"未找到 {symbol} 的交易规则")
+        return filters
+
+    def find(self, symbol: str) -> Optional[SymbolFilters]:
+        """获取交易对规则，不存在时返回None"""
+        try:
+            return self.get(symbol)
+        except KeyError:
+            return None
+
+    # ========== 后台刷新 ==========
+
+    def start_background_refresh(self):
+        """启动后台TTL刷新线程"""
+        if self._refresh_thread is not None:
+            return
+        self._stop_event.clear()
+        self._refresh_thread = threading.Thread(target=self._refresh_loop, name='exchange-filters',
+                                                daemon=True)
+        self._refresh_thread.start()
+
+    def stop(self):
+        """停止后台刷新"""
+        self._stop_event.set()
+        self._refresh_thread = None
+
+    def _refresh_loop(self):
+        if not self._filters:
+            self.load()
+        while not self._stop_event.wait(self.ttl):
+            self.load()
@@ -0,0 +1,373 @@
+"""
+技术指标计算（纯 NumPy）
+在连续的 float64 数组上计算 SMA / EMA / RSI / MACD / 布林带 / ATR，
+结果与 MarketAnalyzer 原来的 pandas 实现一致（rolling / ewm(adjust=False) 语义），
+不需要为每次计算构建 DataFrame；pandas 只作为可选的输入输出适配
+
+约定：
+- 输入为 float64 数组（从旧到新），沿最后一维计算，输出与输入同形状；
+  一维为单个交易对，二维 (交易对 × K线) 为多个交易对一次向量化计算
+- 窗口未满的位置为 NaN（与 pandas rolling 一致）；EMA 从第一根开始有值
+- 历史长度不同的多个交易对先用 align_klines 对齐（前部补 NaN），再交给 compute_batch
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import kline_parser
+
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+
+# 行情分析使用的K线字段（解析见 kline_parser）
+KLINE_FIELDS = kline_parser.OHLCV_FIELDS
+
+
+def klines_to_arrays(klines: List[List]) -> Dict[str, np.ndarray]:
+    """
+    币安K线数组 → 各字段的连续数组（价格/成交量为 float64，open_time 为 int64）
+
+    Returns:
+        {'open_time', 'open', 'high', 'low', 'close', 'volume'}
+    """
+    return kline_parser.to_columns(kline_parser.parse_klines(klines, KLINE_FIELDS))
+
+
+def _as_array(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _check_period(period: int):
+    if period <= 0:
+        raise ValueError(f"指标周期必须大于0: {period}")
+
+
+# ========== 基础指标 ==========
+
+def sma(values, period: int) -> np.ndarray:
+    """简单移动平均（窗口未满为NaN）"""
+    _check_period(period)
+    x = _as_array(values)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= period:
+        out[..., period - 1:] = sliding_window_view(x, period, axis=-1).mean(axis=-1)
+    return out
+
+
+def rolling_std(values, period: int, ddof: int = 1) -> np.ndarray:
+    """滚动标准差（样本标准差，与 pandas rolling().std() 一致）"""
+    _check_period(period)
+    x = _as_array(values)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= period and period > ddof:
+        out[..., period - 1:] = sliding_window_view(x, period, axis=-1).std(axis=-1, ddof=ddof)
+    return out
+
+
+def ema(values, period: int) -> np.ndarray:
+    """
+    指数移动平均（与 pandas ewm(span=period, adjust=False) 一致）
+
+    递推 y[t] = a*x[t] + (1-a)*y[t-1] 展开为分块的累加和：块内 (1-a)^-k 不会溢出
+    """
+    _check_period(period)
+    x = _as_array(values)
+    n = x.shape[-1]
+    out = np.empty(x.shape)
+    if n == 0:
+        return out
+
+    alpha = 2.0 / (period + 1)
+    decay = 1.0 - alpha
+    if decay == 0.0:
+        out[:] = x
+        return out
+
+    # 块长度保证 decay**-block 不超过 e^500
+    block = max(1, int(500 / -math.log(decay)))
+    prev = x[..., :1]
+    for start in range(0, n, block):
+        segment = x[..., start:start + block]
+        powers = decay ** np.arange(1, segment.shape[-1] + 1)
+        y = powers * (prev + alpha * np.cumsum(segment / powers, axis=-1))
+        out[..., start:start + segment.shape[-1]] = y
+        prev = y[..., -1:]
+    return out
+
+
+def _delta(x: np.ndarray) -> np.ndarray:
+    """逐根涨跌幅（第一根记为0）"""
+    delta = np.zeros(x.shape)
+    np.subtract(x[..., 1:], x[..., :-1], out=delta[..., 1:])
+    return delta
+
+
+def rsi(values, period: int = 14) -> np.ndarray:
+    """
+    RSI（涨跌幅的简单移动平均，与 MarketAnalyzer 原实现一致）
+
+    平均跌幅为0时为100，窗口内没有涨跌时为NaN
+    """
+    _check_period(period)
+    delta = _delta(_as_array(values))
+    gain = sma(np.where(delta > 0, delta, 0.0), period)
+    loss = sma(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+def macd(values, fast_period: int = 12, slow_period: int = 26,
+         signal_period: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    MACD
+
+    Returns:
+        (MACD线, 信号线, 柱状图)
+    """
+    x = _as_array(values)
+    macd_line = ema(x, fast_period) - ema(x, slow_period)
+    signal_line = ema(macd_line, signal_period)
+    return macd_line, signal_line, macd_line - signal_line
+
+
+def bollinger_bands(values, period: int = 20,
+                    std_dev: float = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    布林带
+
+    Returns:
+        (上轨, 中轨, 下轨)
+    """
+    middle = sma(values, period)
+    std = rolling_std(values, period)
+    return middle + std * std_dev, middle, middle - std * std_dev
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """真实波幅（第一根为 high-low）"""
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    tr = high - low
+    if tr.shape[-1] > 1:
+        prev_close = close[..., :-1]
+        np.maximum(tr[..., 1:], np.abs(high[..., 1:] - prev_close), out=tr[..., 1:])
+        np.maximum(tr[..., 1:], np.abs(low[..., 1:] - prev_close), out=tr[..., 1:])
+    return tr
+
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """平均真实波幅（真实波幅的简单移动平均）"""
+    return sma(true_range(high, low, close), period)
+
+
+# ========== 一次计算全部指标 ==========
+
+DEFAULT_SPEC = {
+    'sma': (20, 50),
+    'ema': (12, 20, 26, 50),
+    'rsi': (7, 14),
+    'atr': (3, 14),
+    'macd': (12, 26, 9),
+    'bollinger': (20, 2),
+}
+
+
+def compute_all(close, high=None, low=None, spec: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """
+    一次计算一组指标（共享同一份 float64 数组和中间结果）
+
+    Args:
+        close: 收盘价
+        high / low: 最高价 / 最低价（计算ATR时需要）
+        spec: 指标周期配置，默认 DEFAULT_SPEC
+
+    Returns:
+        {'sma20', 'sma50', 'ema12', ..., 'rsi14', 'macd', 'macd_signal', 'macd_hist',
+         'bb_upper', 'bb_middle', 'bb_lower', 'atr14', ...}
+    """
+    spec = DEFAULT_SPEC if spec is None else spec
+    close = _as_array(close)
+    n = close.shape[-1]
+    result: Dict[str, np.ndarray] = {}
+
+    for period in spec.get('sma', ()):
+        result[f'sma{period}'] = sma(close, period)
+
+    ema_cache: Dict[int, np.ndarray] = {}
+
+    def cached_ema(period: int) -> np.ndarray:
+        if period not in ema_cache:
+            ema_cache[period] = ema(close, period)
+        return ema_cache[period]
+
+    for period in spec.get('ema', ()):
+        result[f'ema{period}'] = cached_ema(period)
+
+    if spec.get('rsi') and n:
+        # 涨跌幅只计算一次
+        delta = _delta(close)
+        gains = np.where(delta > 0, delta, 0.0)
+        losses = np.where(delta < 0, -delta, 0.0)
+        for period in spec['rsi']:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[f'rsi{period}'] = 100.0 - 100.0 / (1.0 + sma(gains, period) / sma(losses, period))
+
+    if spec.get('macd') and n:
+        fast, slow, signal = spec['macd']
+        macd_line = cached_ema(fast) - cached_ema(slow)
+        signal_line = ema(macd_line, signal)
+        result['macd'] = macd_line
+        result['macd_signal'] = signal_line
+        result['macd_hist'] = macd_line - signal_line
+
+    if spec.get('bollinger'):
+        period, std_dev = spec['bollinger']
+        middle = result.get(f'sma{period}')
+        if middle is None:
+            middle = sma(close, period)
+        std = rolling_std(close, period)
+        result['bb_upper'] = middle + std * std_dev
+        result['bb_middle'] = middle
+        result['bb_lower'] = middle - std * std_dev
+
+    if spec.get('atr') and high is not None and low is not None:
+        tr = true_range(high, low, close)
+        for period in spec['atr']:
+            result[f'atr{period}'] = sma(tr, period)
+
+    return result
+
+
+# ========== 多交易对批量计算 ==========
+
+def align_klines(klines_by_symbol: Dict[str, List[List]],
+                 limit: Optional[int] = None) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """
+    多个交易对的K线按开盘时间对齐为 (交易对 × K线) 矩阵
+
+    上市较晚（历史较短）的交易对前部补 NaN；中间或尾部缺失的K线用前一根收盘价补齐，成交量记为0
+
+    Args:
+        klines_by_symbol: {symbol: 币安K线数组}
+        limit: 只保留最近 limit 个开盘时间
+
+    Returns:
+        (交易对列表, {'open_time': 一维, 'open'/'high'/'low'/'close'/'volume': 二维})
+    """
+    symbols = list(klines_by_symbol)
+    per_symbol = {symbol: klines_to_arrays(klines) for symbol, klines in klines_by_symbol.items()}
+    grid = np.unique(np.concatenate(
+        [arrays['open_time'] for arrays in per_symbol.values()] or [np.empty(0, dtype=np.int64)]
+    ))
+    if limit is not None:
+        grid = grid[-limit:]
+
+    shape = (len(symbols), len(grid))
+    aligned = {name: np.full(shape, np.nan) for name in KLINE_FIELDS if name != 'open_time'}
+    aligned['open_time'] = grid
+    for row, symbol in enumerate(symbols):
+        arrays = per_symbol[symbol]
+        if len(grid) == 0 or len(arrays['open_time']) == 0:
+            continue
+        pos = np.searchsorted(grid, arrays['open_time'])
+        keep = (pos < len(grid)) & (grid[np.minimum(pos, len(grid) - 1)] == arrays['open_time'])
+        for name in aligned:
+            if name != 'open_time':
+                aligned[name][row, pos[keep]] = arrays[name][keep]
+
+    # 首根之后的缺口：价格沿用前一根收盘价
+    close = aligned['close']
+    filled = _forward_fill(close)
+    gap = np.isnan(close) & ~np.isnan(filled)
+    for name in ('open', 'high', 'low', 'close'):
+        aligned[name][gap] = filled[gap]
+    aligned['volume'][gap] = 0.0
+    return symbols, aligned
+
+
+def _forward_fill(x: np.ndarray) -> np.ndarray:
+    """沿最后一维用前一个有效值补齐 NaN（首个有效值之前保持 NaN）"""
+    index = np.where(np.isnan(x), 0, np.arange(x.shape[-1]))
+    np.maximum.accumulate(index, axis=-1, out=index)
+    return np.take_along_axis(x, index, axis=-1)
+
+
+def _first_valid(x: np.ndarray) -> np.ndarray:
+    """每行第一个有效值的位置（全部为 NaN 时为列数）"""
+    valid = ~np.isnan(x)
+    return np.where(valid.any(axis=-1), valid.argmax(axis=-1), x.shape[-1])
+
+
+def _lookbacks(spec: Dict) -> Dict[str, int]:
+    """各指标第一个有效值需要的K线数量（未列出的为1）"""
+    lookbacks = {}
+    for kind in ('sma', 'rsi', 'atr'):
+        for period in spec.get(kind, ()):
+            lookbacks[f'{kind}{period}'] = period
+    if spec.get('bollinger'):
+        for name in ('bb_upper', 'bb_middle', 'bb_lower'):
+            lookbacks[name] = spec['bollinger'][0]
+    return lookbacks
+
+
+def compute_batch(close, high=None, low=None, spec: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """
+    一次向量化计算多个交易对的全部指标
+
+    每行的结果与对该行有效部分单独调用 compute_all 一致：
+    前部的 NaN 先用首个有效值补齐（EMA 保持初值不变、涨跌幅为0），计算后再按指标窗口屏蔽
+
+    Args:
+        close / high / low: (交易对 × K线) 矩阵，前部可以为 NaN（见 align_klines）
+        spec: 指标周期配置，默认 DEFAULT_SPEC
+
+    Returns:
+        {'sma20': (交易对 × K线), ...}
+    """
+    spec = DEFAULT_SPEC if spec is None else spec
+    close = np.atleast_2d(_as_array(close))
+    n = close.shape[-1]
+    starts = _first_valid(close)
+
+    # 首个有效值之前的位置取首个有效值
+    index = np.minimum(np.maximum(np.arange(n), starts[:, None]), max(n - 1, 0))
+
+    def fill(values):
+        return None if values is None else np.take_along_axis(np.atleast_2d(_as_array(values)), index, axis=-1)
+
+    result = compute_all(fill(close), fill(high), fill(low), spec)
+
+    lookbacks = _lookbacks(spec)
+    positions = np.arange(n)
+    for name, values in result.items():
+        values[positions < starts[:, None] + lookbacks.get(name, 1) - 1] = np.nan
+    return result
+
+
+def last(values: np.ndarray, default=None):
+    """最后一个值（空数组或NaN时返回 default）"""
+    if len(values) == 0:
+        return default
+    value = float(values[-1])
+    return default if math.isnan(value) else value
+
+
+# ========== pandas 适配 ==========
+
+def arrays_from_dataframe(df) -> Dict[str, np.ndarray]:
+    """DataFrame（含 open/high/low/close/volume 列）→ float64 数组"""
+    return {name: df[name].to_numpy(dtype=np.float64)
+            for name in ('open', 'high', 'low', 'close', 'volume') if name in df}
+
+
+def to_series(values: np.ndarray, index=None):
+    """数组 → pandas.Series（需要安装 pandas）"""
+    if not PANDAS_AVAILABLE:
+        raise ImportError("需要安装 pandas")
+    return pd.Series(values, index=index)
@@ -0,0 +1,349 @@
+"""
+历史K线归档
+按时间范围分页回补合约K线（startTime/endTime，每页1000根，有界并发），
+按 (交易对, 周期) 以列式 .npy 文件落盘（增量更新只在各列末尾追加），读取时内存映射 + 二分查找，支持快速区间读取，
+用于回测、启动时预热指标和多日数据分析
+
+目录结构:
+    data/klines/BTCUSDT/1h/open_time.npy, open.npy, high.npy, ...
+
+用法:
+    python kline_archive.py BTCUSDT 1h --start 2024-01-01 --end 2024-03-01
+"""
+
+import os
+import time
+import shutil
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import kline_parser
+from kline_store import INTERVAL_MS, MAX_KLINES_PER_REQUEST, CLOSE_GRACE_MS
+
+
+# 列名和类型（与币安K线数组的字段顺序一致，最后的 ignore 字段不保存）
+COLUMNS: Tuple[Tuple[str, type], ...] = tuple((name, dtype) for name, _, dtype in kline_parser.KLINE_COLUMNS)
+
+DEFAULT_ROOT = os.path.join('data', 'klines')
+
+
+def rows_to_columns(rows: List[List]) -> Dict[str, np.ndarray]:
+    """币安K线数组列表 → 列式数组（价格等字符串字段由 numpy 直接解析）"""
+    return kline_parser.to_columns(kline_parser.parse_klines(rows))
+
+
+class KlineArchive:
+    """列式K线归档（每个 symbol+interval 一个目录，每列一个 .npy 文件）"""
+
+    def __init__(self, client=None, root: str = DEFAULT_ROOT, max_workers: int = 4):
+        """
+        初始化K线归档
+
+        Args:
+            client: BinanceClient实例（只读取时可以为None）
+            root: 数据目录
+            max_workers: 回补时的最大并发请求数
+        """
+        self.client = client
+        self.root = root
+        self.max_workers = max_workers
+        self.logger = logging.getLogger(__name__)
+
+        self._mmaps: Dict[Tuple[str, str], Dict[str, np.ndarray]] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        # 统计信息
+        self.stats = {
+            'pages_fetched': 0,
+            'bars_fetched': 0,
+            'bars_written': 0
+        }
+
+    def _get_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def _path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    # ========== 读取 ==========
+
+    def _load(self, symbol: str, interval: str) -> Optional[Dict[str, np.ndarray]]:
+        """内存映射全部列（没有数据返回None）"""
+        key = (symbol.upper(), interval)
+        columns = self._mmaps.get(key)
+        if columns is not None:
+            return columns
+
+        path = self._path(symbol, interval)
+        if not os.path.isdir(path) and os.path.isdir(path + '.old'):
+            # 上次替换目录时中断：恢复旧数据
+            os.replace(path + '.old', path)
+        if not os.path.exists(os.path.join(path, 'open_time.npy')):
+            return None
+
+        columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                   for name, _ in COLUMNS}
+        # 追加中断时各列数量可能不同，只使用各列都已写入的部分
+        count = min(len(column) for column in columns.values())
+        columns = {name: column[:count] for name, column in columns.items()}
+        self._mmaps[key] = columns
+        return columns
+
+    def coverage(self, symbol: str, interval: str) -> Optional[Tuple[int, int, int]]:
+        """
+        已归档范围
+
+        Returns:
+            (第一根开盘时间, 最后一根开盘时间, K线数量)，没有数据返回None
+        """
+        columns = self._load(symbol, interval)
+        if columns is None or len(columns['open_time']) == 0:
+            return None
+        open_time = columns['open_time']
+        return int(open_time[0]), int(open_time[-1]), len(open_time)
+
+    def read(self, symbol: str, interval: str, start_ms: int = None,
+             end_ms: int = None) -> Dict[str, np.ndarray]:
+        """
+        读取开盘时间在 [start_ms, end_ms] 内的K线（列式，只读的内存映射切片）
+
+        Returns:
+            {'open_time': array, 'open': array, ...}，没有数据时各列为空数组
+        """
+        columns = self._load(symbol, interval)
+        if columns is None:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+
+        open_time = columns['open_time']
+        lo = 0 if start_ms is None else int(np.searchsorted(open_time, start_ms, side='left'))
+        hi = len(open_time) if end_ms is None else int(np.searchsorted(open_time, end_ms, side='right'))
+        return {name: column[lo:hi] for name, column in columns.items()}
+
+    def read_klines(self, symbol: str, interval: str, start_ms: int = None,
+                    end_ms: int = None) -> List[List]:
+        """读取为币安K线数组格式（可直接交给 KlineStore / MarketAnalyzer 预热）"""
+        columns = self.read(symbol, interval, start_ms, end_ms)
+        lists = [columns[name].tolist() for name, _ in COLUMNS]
+        return [list(row) + ['0'] for row in zip(*lists)]
+
+    # ========== 写入 ==========
+
+    def _write(self, symbol: str, interval: str, columns: Dict[str, np.ndarray]):
+        """整体写入新目录后替换（中断时保留旧数据）"""
+        path = self._path(symbol, interval)
+        tmp_path = path + '.tmp'
+        old_path = path + '.old'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, dtype in COLUMNS:
+            with open(os.path.join(tmp_path, f'{name}.npy'), 'wb') as f:
+                np.save(f, np.ascontiguousarray(columns[name], dtype=dtype))
+
+        # 释放旧的内存映射后再替换目录
+        self._mmaps.pop((symbol.upper(), interval), None)
+        if os.path.isdir(path):
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def _append_tail(self, symbol: str, interval: str, count: int, new: Dict[str, np.ndarray]) -> bool:
+        """
+        在每列 .npy 文件末尾追加新K线（只写新数据，不重写已有数据）
+
+        先写所有列的数据再改文件头里的数量，中断时多写的数据不会被读取（_load 按各列共同的数量截取）；
+        文件头不是 1.0 版本（无法原地修改）时返回False，由调用方整体重写
+        """
+        path = self._path(symbol, interval)
+        self._mmaps.pop((symbol.upper(), interval), None)
+
+        files = []
+        try:
+            for name, dtype in COLUMNS:
+                f = open(os.path.join(path, f'{name}.npy'), 'r+b')
+                files.append(f)
+                if np.lib.format.read_magic(f) != (1, 0):
+                    return False
+                np.lib.format.read_array_header_1_0(f)
+
+            for (name, dtype), f in zip(COLUMNS, files):
+                data_offset = f.tell()
+                f.seek(data_offset + count * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(new[name], dtype=dtype).tobytes())
+                f.truncate()
+                f.flush()
+
+                # numpy 写入文件头时为数量预留了增长空间，修改数量不改变文件头长度
+                f.seek(0)
+                np.lib.format.write_array_header_1_0(f, {
+                    'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                    'fortran_order': False,
+                    'shape': (count + len(new[name]),)
+                })
+                if f.tell() != data_offset:
+                    raise IOError(f"{name}.npy 文件头长度变化，归档可能已损坏")
+        finally:
+            for f in files:
+                f.close()
+        return True
+
+    def append(self, symbol: str, interval: str, rows: List[List]) -> int:
+        """
+        合并K线写入归档（按开盘时间去重排序，新数据覆盖旧数据）
+
+        新K线都在已归档范围之后时只在各列末尾追加（增量更新的开销与新数据量成正比）；
+        与已有数据重叠的回补才合并后整体重写
+
+        Returns:
+            归档中的K线总数
+        """
+        if not rows:
+            coverage = self.coverage(symbol, interval)
+            return coverage[2] if coverage else 0
+
+        with self._get_lock((symbol.upper(), interval)):
+            new = rows_to_columns(rows)
+            # np.unique 保留首次出现，并按开盘时间排序
+            _, index = np.unique(new['open_time'], return_index=True)
+            new = {name: column[index] for name, column in new.items()}
+
+            existing = self._load(symbol, interval)
+            if existing is not None and len(existing['open_time']) > 0:
+                count = len(existing['open_time'])
+                if new['open_time'][0] > existing['open_time'][-1] and \
+                        self._append_tail(symbol, interval, count, new):
+                    self.stats['bars_written'] += len(rows)
+                    return count + len(index)
+
+            if existing is not None:
+                merged = {name: np.concatenate([new[name], existing[name]]) for name, _ in COLUMNS}
+                # np.unique 保留首次出现（新数据在前），并按开盘时间排序
+                _, index = np.unique(merged['open_time'], return_index=True)
+                merged = {name: column[index] for name, column in merged.items()}
+            else:
+                merged = new
+
+            self._write(symbol, interval, merged)
+            self.stats['bars_written'] += len(rows)
+            return len(merged['open_time'])
+
+    # ========== 回补 ==========
+
+    def _pages(self, symbol: str, interval: str, start_ms: int, end_ms: int) -> List[Tuple[int, int]]:
+        """需要请求的分页（完全落在已归档范围内的分页跳过）"""
+        interval_ms = INTERVAL_MS[interval]
+        page_ms = interval_ms * MAX_KLINES_PER_REQUEST
+        start_ms = start_ms - start_ms % interval_ms
+        coverage = self.coverage(symbol, interval)
+
+        pages = []
+        for page_start in range(start_ms, end_ms + 1, page_ms):
+            page_end = min(page_start + page_ms - 1, end_ms)
+            if coverage and page_start >= coverage[0] and page_end <= coverage[1] + interval_ms - 1:
+                continue
+            pages.append((page_start, page_end))
+        return pages
+
+    def _fetch_page(self, symbol: str, interval: str, page: Tuple[int, int]) -> List[List]:
+        rows = self.client.get_futures_klines(symbol, interval, limit=MAX_KLINES_PER_REQUEST,
+                                              startTime=page[0], endTime=page[1])
+        self.stats['pages_fetched'] += 1
+        return rows or []
+
+    def backfill(self, symbol: str, interval: str, start_ms: int, end_ms: int = None) -> int:
+        """
+        回补 [start_ms, end_ms] 范围的已收盘K线
+
+        Args:
+            symbol: 交易对
+            interval: K线周期
+            start_ms: 开始时间（毫秒）
+            end_ms: 结束时间（毫秒，默认当前时间）
+
+        Returns:
+            新获取的K线数量
+        """
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"不支持归档的K线周期: {interval}")
+        if self.client is None:
+            raise ValueError("回补需要 BinanceClient")
+
+        now_ms = int(time.time() * 1000)
+        end_ms = min(end_ms or now_ms, now_ms)
+        pages = self._pages(symbol, interval, start_ms, end_ms)
+        if not pages:
+            return 0
+
+        self.logger.info(f"[ARCHIVE] {symbol} {interval} 回补 {len(pages)} 页")
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='kline-archive') as executor:
+            results = list(executor.map(lambda page: self._fetch_page(symbol, interval, page), pages))
+
+        # 只保存已收盘的K线
+        closed_before = now_ms - CLOSE_GRACE_MS
+        rows = [row for page_rows in results for row in page_rows
+                if start_ms <= int(row[0]) <= end_ms and int(row[6]) < closed_before]
+        self.stats['bars_fetched'] += len(rows)
+
+        total = self.append(symbol, interval, rows)
+        self.logger.info(f"[ARCHIVE] {symbol} {interval} 新增 {len(rows)} 根，共 {total} 根")
+        return len(rows)
+
+    def update(self, symbol: str, interval: str, lookback_ms: int = None) -> int:
+        """
+        增量更新到当前时间（没有归档时回补 lookback_ms，默认1000根）
+
+        Returns:
+            新获取的K线数量
+        """
+        coverage = self.coverage(symbol, interval)
+        if coverage is not None:
+            start_ms = coverage[1] + INTERVAL_MS[interval]
+        else:
+            lookback_ms = lookback_ms or INTERVAL_MS[interval] * MAX_KLINES_PER_REQUEST
+            start_ms = int(time.time() * 1000) - lookback_ms
+        return self.backfill(symbol, interval, start_ms)
+
+
+def _parse_date(value: str) -> int:
+    """YYYY-MM-DD（UTC）→ 毫秒时间戳"""
+    return int(datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回补合约历史K线到列式归档')
+    parser.add_argument('symbol', help='交易对，如 BTCUSDT')
+    parser.add_argument('interval', help='K线周期，如 1h')
+    parser.add_argument('--start', required=True, help='开始日期 YYYY-MM-DD（UTC）')
+    parser.add_argument('--end', help='结束日期 YYYY-MM-DD（UTC，默认现在）')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='数据目录')
+    parser.add_argument('--workers', type=int, default=4, help='并发请求数')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from binance_client import BinanceClient
+
+    # K线是公开接口，不需要API密钥
+    archive = KlineArchive(BinanceClient('', ''), root=args.root, max_workers=args.workers)
+    archive.backfill(args.symbol.upper(), args.interval, _parse_date(args.start),
+                     _parse_date(args.end) if args.end else None)
+
+    coverage = archive.coverage(args.symbol, args.interval)
+    if coverage:
+        first, last, count = coverage
+        fmt = lambda ms: datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M')
+        print(f"{args.symbol.upper()} {args.interval}: {count} 根  {fmt(first)} ~ {fmt(last)} UTC")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+K线解析
+币安K线（12个元素的数组，价格/成交量为字符串）→ 预分配的 NumPy 结构化数组
+（时间为 int64，OHLCV 为 float64），每个字段由 numpy 直接从字符串解析一次，
+不构建 DataFrame、不做逐列 astype；安装了 orjson 时用它解析接口返回的 JSON
+"""
+
+import json
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# 字段名、在币安K线数组中的下标、类型（最后的 ignore 字段不解析）
+KLINE_COLUMNS = (
+    ('open_time', 0, np.int64),
+    ('open', 1, np.float64),
+    ('high', 2, np.float64),
+    ('low', 3, np.float64),
+    ('close', 4, np.float64),
+    ('volume', 5, np.float64),
+    ('close_time', 6, np.int64),
+    ('quote_volume', 7, np.float64),
+    ('trades', 8, np.int64),
+    ('taker_buy_base', 9, np.float64),
+    ('taker_buy_quote', 10, np.float64),
+)
+
+KLINE_DTYPE = np.dtype([(name, dtype) for name, _, dtype in KLINE_COLUMNS])
+
+# 行情分析常用的字段
+OHLCV_FIELDS = ('open_time', 'open', 'high', 'low', 'close', 'volume')
+
+_COLUMN_INDEX = {name: index for name, index, _ in KLINE_COLUMNS}
+
+
+def loads(data: Union[bytes, str]):
+    """解析 JSON（优先 orjson）"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def kline_dtype(fields: Optional[Iterable[str]] = None) -> np.dtype:
+    """指定字段的结构化数组类型（默认全部字段）"""
+    if fields is None:
+        return KLINE_DTYPE
+    return np.dtype([(name, KLINE_DTYPE.fields[name][0]) for name in fields])
+
+
+def parse_klines(klines: List[List], fields: Optional[Iterable[str]] = None) -> np.ndarray:
+    """
+    币安K线数组 → 结构化数组
+
+    Args:
+        klines: get_futures_klines 返回的K线列表
+        fields: 需要的字段（默认全部，如 OHLCV_FIELDS 只解析6列）
+
+    Returns:
+        结构化数组，parsed['close'] 等为对应字段的视图（不复制）
+    """
+    dtype = kline_dtype(fields)
+    parsed = np.empty(len(klines), dtype=dtype)
+    if not klines:
+        return parsed
+    for name in dtype.names:
+        index = _COLUMN_INDEX[name]
+        # 先解析成连续数组再写入字段，比直接向跨步字段赋字符串列表快
+        parsed[name] = np.array([k[index] for k in klines], dtype=dtype.fields[name][0])
+    return parsed
+
+
+def parse_klines_json(data: Union[bytes, str], fields: Optional[Iterable[str]] = None) -> np.ndarray:
+    """/fapi/v1/klines 原始响应体 → 结构化数组"""
+    return parse_klines(loads(data), fields)
+
+
+def to_columns(parsed: np.ndarray) -> Dict[str, np.ndarray]:
+    """结构化数组 → 各字段的连续数组（指标计算按列顺序读取）"""
+    return {name: np.ascontiguousarray(parsed[name]) for name in parsed.dtype.names}
@@ -0,0 +1,171 @@
+"""
+多周期K线重采样
+每个交易对只维护一份1分钟基础K线（REST 增量或行情流推送），3m / 15m / 1h / 4h K线
+在1分钟K线收盘时增量聚合，并用尚未收盘的1分钟K线生成当前未收盘的高周期K线，
+同一轮循环内各周期数据来自同一份基础K线，互相一致
+
+1分钟缓冲区覆盖不到的更早历史（如100根1小时K线）只在首次读取或需要更深历史时
+通过 REST 补一次，之后高周期K线不再请求REST
+"""
+
+from bisect import bisect_left
+from collections import deque
+from typing import Iterable, List, Optional, Tuple
+import time
+
+from kline_store import KlineStore, INTERVAL_MS, MAX_KLINES_PER_REQUEST
+
+
+BASE_INTERVAL = '1m'
+BASE_MS = INTERVAL_MS[BASE_INTERVAL]
+
+# 由1分钟K线聚合的周期
+DEFAULT_DERIVED_INTERVALS = ('3m', '15m', '1h', '4h')
+
+
+def aggregate_bars(bars: List[List], open_time: int, interval_ms: int) -> List:
+    """
+    把同一周期内的1分钟K线聚合为一根K线（币安K线数组格式）
+
+    Args:
+        bars: 该周期内的1分钟K线（从旧到新，非空）
+        open_time: 周期开盘时间（毫秒）
+        interval_ms: 周期长度（毫秒）
+
+    Returns:
+        [open_time, open, high, low, close, volume, close_time, quote_volume,
+         trades, taker_buy_base, taker_buy_quote, '0']
+    """
+    high = max(bars, key=lambda b: float(b[2]))[2]
+    low = min(bars, key=lambda b: float(b[3]))[3]
+
+    def total(index: int) -> str:
+        return str(sum(float(b[index]) for b in bars))
+
+    return [open_time, bars[0][1], high, low, bars[-1][4], total(5), open_time + interval_ms - 1,
+            total(7), sum(int(b[8]) for b in bars), total(9), total(10), '0']
+
+
+class ResampledKlineStore(KlineStore):
+    """K线缓存：高周期K线由1分钟基础K线聚合（接口与 KlineStore 相同）"""
+
+    def __init__(self, client, max_bars: int = MAX_KLINES_PER_REQUEST, min_refresh_interval: float = 2.0,
+                 derived_intervals: Iterable[str] = DEFAULT_DERIVED_INTERVALS,
+                 base_bars: int = MAX_KLINES_PER_REQUEST):
+        """
+        初始化重采样K线缓存
+
+        Args:
+            client: BinanceClient实例
+            max_bars: 每个缓冲区最多保留的K线数量（不超过1000）
+            min_refresh_interval: 1分钟基础K线的最小刷新间隔（秒）
+            derived_intervals: 由1分钟K线聚合的周期（须为1分钟的整数倍）
+            base_bars: 1分钟基础K线保留数量（决定高周期K线能在多长的断档内继续增量聚合）
+        """
+        super().__init__(client, max_bars, min_refresh_interval)
+        self.derived_intervals = tuple(i for i in derived_intervals if i in INTERVAL_MS and i != BASE_INTERVAL)
+        self.base_bars = min(base_bars, self.max_bars)
+
+        self.stats.update({
+            'derived_reads': 0,
+            'history_seeds': 0,
+            'bars_aggregated': 0
+        })
+
+    def get_klines(self, symbol: str, interval: str, limit: int = 100) -> List[List]:
+        """获取最近 limit 根K线（高周期由1分钟K线聚合，最后一根为未收盘K线）"""
+        if interval not in self.derived_intervals or limit > self.max_bars:
+            return super().get_klines(symbol, interval, limit)
+
+        key = (symbol, interval)
+        base = super().get_klines(symbol, BASE_INTERVAL, self.base_bars)
+        with self._get_lock(key):
+            partial = self._refresh_derived(key, limit, base)
+            buffer = self._buffers[key]
+            closed = limit - len(partial)
+            start = max(0, len(buffer) - closed)
+            self.stats['derived_reads'] += 1
+            return [list(bar) for bar in list(buffer)[start:]] + partial
+
+    def get_last_closed_open_time(self, symbol: str, interval: str, limit: int = 100) -> Optional[int]:
+        """最后一根已收盘K线的开盘时间（高周期取最后一根聚合完成的K线）"""
+        if interval not in self.derived_intervals or limit > self.max_bars:
+            return super().get_last_closed_open_time(symbol, interval, limit)
+
+        key = (symbol, interval)
+        base = super().get_klines(symbol, BASE_INTERVAL, self.base_bars)
+        with self._get_lock(key):
+            self._refresh_derived(key, limit, base)
+            buffer = self._buffers[key]
+            return int(buffer[-1][0]) if buffer else None
+
+    def apply_stream_kline(self, symbol: str, interval: str, bar: List):
+        """行情流推送：只写入1分钟基础K线，高周期推送忽略（由基础K线聚合）"""
+        if interval in self.derived_intervals:
+            return
+        super().apply_stream_kline(symbol, interval, bar)
+
+    # ========== 聚合 ==========
+
+    def _refresh_derived(self, key: Tuple[str, str], limit: int, base: List[List]) -> List[List]:
+        """
+        把新收盘的周期追加到高周期缓冲区（基础K线覆盖不到的历史用 REST 补齐）
+
+        Returns:
+            当前未收盘的高周期K线（0或1根）
+        """
+        symbol, interval = key
+        step = INTERVAL_MS[interval]
+        if not base:
+            self._buffers.setdefault(key, deque(maxlen=self.max_bars))
+            return []
+
+        opens = [int(bar[0]) for bar in base]
+        last_closed = self._last_closed_open(base, int(time.time() * 1000))
+        closed_end = (last_closed + BASE_MS) if last_closed is not None else opens[0]
+        # 含第一根未收盘1分钟K线的周期（之前的周期均已收盘）
+        current = closed_end - closed_end % step
+
+        buffer = self._buffers.get(key)
+        depth = min(max(limit, self._loaded_depth.get(key, 0)), self.max_bars)
+        if buffer is None or depth > self._loaded_depth.get(key, 0):
+            oldest = current - (depth - 1) * step
+            if opens[0] <= oldest:
+                buffer = deque(maxlen=self.max_bars)
+                next_open = oldest
+            else:
+                buffer, next_open = self._seed_history(key, depth, current)
+            self._buffers[key] = buffer
+            self._loaded_depth[key] = depth
+        else:
+            next_open = int(buffer[-1][0]) + step if buffer else current - (depth - 1) * step
+            if next_open < current and next_open < opens[0]:
+                # 断档超过基础K线覆盖范围，重新补历史
+                buffer, next_open = self._seed_history(key, depth, current)
+                self._buffers[key] = buffer
+
+        # 逐个周期聚合已收盘的1分钟K线
+        while next_open < current:
+            lo = bisect_left(opens, next_open)
+            hi = bisect_left(opens, next_open + step)
+            if hi > lo:
+                buffer.append(aggregate_bars(base[lo:hi], next_open, step))
+                self.stats['bars_aggregated'] += 1
+            next_open += step
+        self._last_refresh[key] = time.time()
+
+        lo = bisect_left(opens, current)
+        return [aggregate_bars(base[lo:], current, step)] if lo < len(base) else []
+
+    def _seed_history(self, key: Tuple[str, str], depth: int, current: int) -> Tuple[deque, int]:
+        """REST 补一次高周期历史（只保留 current 之前的已收盘K线）"""
+        symbol, interval = key
+        klines = self.client.get_futures_klines(symbol, interval, depth)
+        closed = [bar for bar in klines if int(bar[0]) < current]
+        self.stats['history_seeds'] += 1
+        self.stats['bars_fetched'] += len(klines)
+
+        buffer = deque(closed, maxlen=self.max_bars)
+        step = INTERVAL_MS[interval]
+        next_open = int(closed[-1][0]) + step if closed else current
+        return buffer, next_open
@@ -0,0 +1,222 @@
+"""
+K线增量缓存
+按 (交易对, 周期) 维护内存环形缓冲区，只增量拉取最后一根已收盘K线之后的新数据，
+所有调用方共享同一份缓冲区，避免每轮循环重复下载上百根K线
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+
+# K线周期对应的毫秒数（1M 月线长度不固定，不做增量）
+INTERVAL_MS = {
+    '1m': 60_000,
+    '3m': 3 * 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 60 * 60_000,
+    '2h': 2 * 60 * 60_000,
+    '4h': 4 * 60 * 60_000,
+    '6h': 6 * 60 * 60_000,
+    '8h': 8 * 60 * 60_000,
+    '12h': 12 * 60 * 60_000,
+    '1d': 24 * 60 * 60_000,
+    '3d': 3 * 24 * 60 * 60_000,
+    '1w': 7 * 24 * 60 * 60_000,
+}
+
+# 币安单次K线请求上限
+MAX_KLINES_PER_REQUEST = 1000
+
+# 收盘判定宽限期（毫秒），防止本地时钟略快于服务器时把未收盘K线当成已收盘
+CLOSE_GRACE_MS = 2000
+
+
+class KlineStore:
+    """K线增量缓存（每个 symbol+interval 一个环形缓冲区）"""
+
+    def __init__(self, client, max_bars: int = MAX_KLINES_PER_REQUEST,
+                 min_refresh_interval: float = 2.0):
+        """
+        初始化K线缓存
+
+        Args:
+            client: BinanceClient实例
+            max_bars: 每个缓冲区最多保留的K线数量（不超过1000）
+            min_refresh_interval: 最小刷新间隔（秒），间隔内的重复读取直接命中缓存
+        """
+        self.client = client
+        self.max_bars = min(max_bars, MAX_KLINES_PER_REQUEST)
+        self.min_refresh_interval = min_refresh_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._buffers: Dict[Tuple[str, str], deque] = {}
+        self._loaded_depth: Dict[Tuple[str, str], int] = {}
+        self._last_refresh: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        # 统计信息
+        self.stats = {
+            'full_loads': 0,
+            'incremental_loads': 0,
+            'cache_hits': 0,
+            'stream_updates': 0,
+            'bars_fetched': 0
+        }
+
+    def _get_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        """获取某个缓冲区的锁"""
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[key] = lock
+            return lock
+
+    def get_klines(self, symbol: str, interval: str, limit: int = 100) -> List[List]:
+        """
+        获取最近 limit 根K线（与 get_futures_klines 返回格式相同）
+
+        Args:
+            symbol: 交易对
+            interval: K线周期
+            limit: 数量
+
+        Returns:
+            K线列表（从旧到新），最后一根可能是未收盘K线
+        """
+        # 超出缓存能力的请求直接透传
+        if limit > self.max_bars or interval not in INTERVAL_MS:
+            return self.client.get_futures_klines(symbol, interval, limit)
+
+        key = (symbol, interval)
+        with self._get_lock(key):
+            self._refresh(key, limit)
+            buffer = self._buffers[key]
+            start = max(0, len(buffer) - limit)
+            return list(islice(buffer, start, None))
+
+    def get_last_closed_open_time(self, symbol: str, interval: str, limit: int = 100) -> Optional[int]:
+        """
+        最后一根已收盘K线的开盘时间（与 get_klines 相同的刷新规则，不复制K线）
+
+        用作指标缓存的版本号：只有新K线收盘时才变化
+
+        Returns:
+            开盘时间（毫秒）；超出缓存能力的请求或没有已收盘K线时返回None
+        """
+        if limit > self.max_bars or interval not in INTERVAL_MS:
+            return None
+
+        key = (symbol, interval)
+        with self._get_lock(key):
+            self._refresh(key, limit)
+            return self._last_closed_open(self._buffers[key], int(time.time() * 1000))
+
+    def _refresh(self, key: Tuple[str, str], limit: int):
+        """按需全量/增量加载，间隔内的重复读取直接命中缓存"""
+        if key not in self._buffers or limit > self._loaded_depth.get(key, 0):
+            self._full_load(key, limit)
+        elif time.time() - self._last_refresh.get(key, 0) < self.min_refresh_interval:
+            self.stats['cache_hits'] += 1
+        else:
+            self._incremental_load(key)
+
+    @staticmethod
+    def _last_closed_open(buffer: deque, now_ms: int) -> Optional[int]:
+        """最后一根已收盘K线（close_time 在 now 之前）的开盘时间"""
+        for bar in reversed(buffer):
+            if int(bar[6]) + CLOSE_GRACE_MS < now_ms:
+                return int(bar[0])
+        return None
+
+    def _full_load(self, key: Tuple[str, str], limit: int):
+        """全量加载（首次访问或需要更多历史时）"""
+        symbol, interval = key
+        depth = min(max(limit, self._loaded_depth.get(key, 0)), self.max_bars)
+        klines = self.client.get_futures_klines(symbol, interval, depth)
+
+        self._buffers[key] = deque(klines, maxlen=self.max_bars)
+        # 返回数量不足说明历史已到头（新上市交易对），按请求深度记账，避免反复全量加载
+        self._loaded_depth[key] = depth
+        self._last_refresh[key] = time.time()
+        self.stats['full_loads'] += 1
+        self.stats['bars_fetched'] += len(klines)
+
+    def _incremental_load(self, key: Tuple[str, str]):
+        """增量加载：只拉取最后一根已收盘K线之后的数据"""
+        symbol, interval = key
+        buffer = self._buffers[key]
+        interval_ms = INTERVAL_MS[interval]
+        now_ms = int(time.time() * 1000)
+
+        # 找到最后一根已收盘K线
+        last_closed_open = self._last_closed_open(buffer, now_ms)
+        if last_closed_open is None:
+            self._full_load(key, self._loaded_depth.get(key, len(buffer)))
+            return
+
+        start_time = last_closed_open + interval_ms
+        missing = (now_ms - start_time) // interval_ms + 1
+
+        # 断档太久（超过缓冲区容量），增量没有意义，直接全量重建
+        if missing >= self.max_bars:
+            self._full_load(key, self._loaded_depth.get(key, len(buffer)))
+            return
+
+        klines = self.client.get_futures_klines(
+            symbol, interval, limit=int(missing) + 1, startTime=start_time
+        )
+
+        # 丢弃未收盘（将被新数据替换）的尾部K线
+        while buffer and int(buffer[-1][0]) >= start_time:
+            buffer.pop()
+        buffer.extend(klines)
+
+        self._last_refresh[key] = time.time()
+        self.stats['incremental_loads'] += 1
+        self.stats['bars_fetched'] += len(klines)
+
+    def apply_stream_kline(self, symbol: str, interval: str, bar: List):
+        """
+        用行情流推送的K线更新缓冲区（替换未收盘K线或追加新K线）
+
+        只有与缓冲区尾部连续时才会写入，并刷新 last_refresh，
+        使行情流正常期间 get_klines 直接命中缓存；流断开后自动回到REST增量拉取。
+        """
+        key = (symbol, interval)
+        if key not in self._buffers or interval not in INTERVAL_MS:
+            return
+
+        with self._get_lock(key):
+            buffer = self._buffers.get(key)
+            if not buffer:
+                return
+
+            open_time = int(bar[0])
+            last_open = int(buffer[-1][0])
+            if open_time == last_open:
+                buffer[-1] = bar
+            elif open_time == last_open + INTERVAL_MS[interval]:
+                buffer.append(bar)
+            else:
+                # 出现缺口或乱序，交给下一次REST增量拉取补齐
+                return
+
+            self._last_refresh[key] = time.time()
+            self.stats['stream_updates'] += 1
+
+    def clear(self, symbol: str = None):
+        """清空缓存（指定交易对或全部）"""
+        for key in list(self._buffers.keys()):
+            if symbol is None or key[0] == symbol:
+                with self._get_lock(key):
+                    self._buffers.pop(key, None)
+                    self._loaded_depth.pop(key, None)
+                    self._last_refresh.pop(key, None)
@@ -0,0 +1,347 @@
+"""
+本地订单簿
+REST 快照 + 增量深度流（<symbol>@depth@100ms）按币安合约的更新ID规则同步，
+之后读取深度不再请求 /fapi/v1/depth
+
+同步规则（USDⓈ-M 合约）：
+1. 未同步时先缓存推送事件，再取 REST 快照（lastUpdateId）
+2. 丢弃 u < lastUpdateId 的事件
+3. 第一条应用的事件须满足 U <= lastUpdateId <= u，否则快照过旧，重新同步
+4. 之后每条事件的 pu 须等于上一条的 u，否则视为丢包，清空订单簿重新同步
+5. 推送的数量是该价位的最新数量，0 表示删除该价位
+"""
+
+import time
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class BookSide:
+    """单边价位（价格升序的有序数组，二分查找定位价位）"""
+
+    def __init__(self):
+        self.prices: List[float] = []
+        self.quantities: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def clear(self):
+        self.prices.clear()
+        self.quantities.clear()
+
+    def update(self, price: float, quantity: float):
+        """设置价位数量（0 表示删除）"""
+        i = bisect_left(self.prices, price)
+        exists = i < len(self.prices) and self.prices[i] == price
+        if quantity > 0:
+            if exists:
+                self.quantities[i] = quantity
+            else:
+                self.prices.insert(i, price)
+                self.quantities.insert(i, quantity)
+        elif exists:
+            del self.prices[i]
+            del self.quantities[i]
+
+    def load(self, levels: List):
+        """用快照价位重建（[[价格, 数量], ...]，价格字符串或数字均可）"""
+        self.clear()
+        for price, quantity in sorted((float(p), float(q)) for p, q, *_ in levels):
+            if quantity > 0:
+                self.prices.append(price)
+                self.quantities.append(quantity)
+
+
+class LocalOrderBook:
+    """单个交易对的本地订单簿"""
+
+    def __init__(self, symbol: str, client=None, snapshot_limit: int = 1000, max_buffer: int = 1000):
+        """
+        初始化本地订单簿
+
+        Args:
+            symbol: 交易对
+            client: BinanceClient实例（同步时获取 REST 快照，可选）
+            snapshot_limit: 快照深度
+            max_buffer: 未同步期间最多缓存的推送事件数
+        """
+        self.symbol = symbol
+        self.client = client
+        self.snapshot_limit = snapshot_limit
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.RLock()
+        self.bids = BookSide()
+        self.asks = BookSide()
+        self.last_update_id: Optional[int] = None
+        self.synced = False
+        self.updated_at = 0.0
+        self._awaiting_first = False                 # 快照后尚未应用第一条事件
+        self._buffer: deque = deque(maxlen=max_buffer)
+
+        self.stats = {
+            'events': 0,
+            'dropped': 0,
+            'gaps': 0,
+            'syncs': 0
+        }
+
+    @classmethod
+    def from_snapshot(cls, symbol: str, snapshot: Dict) -> 'LocalOrderBook':
+        """由 REST 深度快照构建（只用于查询，不接收推送）"""
+        book = cls(symbol)
+        book.load_snapshot(snapshot)
+        return book
+
+    # ========== 同步 ==========
+
+    def handle_event(self, data: Dict):
+        """处理一条 depthUpdate 推送"""
+        with self._lock:
+            self.stats['events'] += 1
+            if not self.synced:
+                self._buffer.append(data)
+                return
+            self._apply(data)
+
+    def sync(self, snapshot: Optional[Dict] = None) -> bool:
+        """
+        用 REST 快照同步，并应用快照之后缓存的推送事件
+
+        Args:
+            snapshot: 已获取的深度快照（不传则通过 client 获取）
+
+        Returns:
+            是否同步成功（缓存的事件与快照衔接不上时返回False，稍后重试）
+        """
+        if snapshot is None:
+            snapshot = self.client.get_order_book(self.symbol, self.snapshot_limit)
+
+        with self._lock:
+            buffered = list(self._buffer)
+            self._buffer.clear()
+            self.load_snapshot(snapshot)
+            self.stats['syncs'] += 1
+            for data in buffered:
+                if not self._apply(data):
+                    return False
+            return True
+
+    def load_snapshot(self, snapshot: Dict):
+        """载入深度快照（之后等待第一条衔接的推送事件）"""
+        with self._lock:
+            self.bids.load(snapshot.get('bids', []))
+            self.asks.load(snapshot.get('asks', []))
+            self.last_update_id = snapshot.get('lastUpdateId')
+            self.synced = True
+            self._awaiting_first = True
+            self.updated_at = time.time()
+
+    def _apply(self, data: Dict) -> bool:
+        """按更新ID规则应用一条事件；丢包时重置订单簿并返回False"""
+        first_id, final_id = data['U'], data['u']
+        if self._awaiting_first:
+            if final_id < self.last_update_id:
+                self.stats['dropped'] += 1
+                return True
+            if first_id > self.last_update_id:
+                self._reset(data)
+                return False
+        elif data.get('pu') != self.last_update_id:
+            self._reset(data)
+            return False
+
+        for price, quantity in data.get('b', []):
+            self.bids.update(float(price), float(quantity))
+        for price, quantity in data.get('a', []):
+            self.asks.update(float(price), float(quantity))
+        self.last_update_id = final_id
+        self._awaiting_first = False
+        self.updated_at = time.time()
+        return True
+
+    def _reset(self, data: Dict):
+        """丢包：清空订单簿，当前事件留作下次同步的第一条缓存"""
+        self.stats['gaps'] += 1
+        self.logger.warning(f"[ORDER_BOOK] {self.symbol} 更新ID不连续 "
+                            f"(本地 {self.last_update_id}, 事件 U={data['U']} pu={data.get('pu')})，等待重新同步")
+        self.bids.clear()
+        self.asks.clear()
+        self.synced = False
+        self._awaiting_first = False
+        self._buffer.clear()
+        self._buffer.append(data)
+
+    # ========== 查询 ==========
+
+    def best_bid(self) -> Optional[float]:
+        with self._lock:
+            return self.bids.prices[-1] if self.bids.prices else None
+
+    def best_ask(self) -> Optional[float]:
+        with self._lock:
+            return self.asks.prices[0] if self.asks.prices else None
+
+    def mid_price(self) -> Optional[float]:
+        """买一卖一中间价"""
+        with self._lock:
+            bid, ask = self.best_bid(), self.best_ask()
+            if bid is None or ask is None:
+                return None
+            return (bid + ask) / 2
+
+    def depth(self, limit: int = 20) -> Dict:
+        """前 limit 档深度（与 REST /fapi/v1/depth 相同格式，买单价格降序、卖单价格升序）"""
+        with self._lock:
+            start = max(len(self.bids) - limit, 0)
+            bids = [[p, q] for p, q in zip(reversed(self.bids.prices[start:]), reversed(self.bids.quantities[start:]))]
+            asks = [[p, q] for p, q in zip(self.asks.prices[:limit], self.asks.quantities[:limit])]
+            return {'lastUpdateId': self.last_update_id, 'bids': bids, 'asks': asks}
+
+    def depth_within(self, bps: float) -> Dict:
+        """
+        中间价上下 bps 基点以内的挂单量
+
+        Returns:
+            {'bid_qty', 'ask_qty', 'bid_notional', 'ask_notional'}
+        """
+        with self._lock:
+            mid = self.mid_price()
+            if mid is None:
+                return {'bid_qty': 0.0, 'ask_qty': 0.0, 'bid_notional': 0.0, 'ask_notional': 0.0}
+            start = bisect_left(self.bids.prices, mid * (1 - bps / 10000))
+            end = bisect_right(self.asks.prices, mid * (1 + bps / 10000))
+            bids = zip(self.bids.prices[start:], self.bids.quantities[start:])
+            asks = zip(self.asks.prices[:end], self.asks.quantities[:end])
+            bid_qty = bid_notional = ask_qty = ask_notional = 0.0
+            for price, quantity in bids:
+                bid_qty += quantity
+                bid_notional += price * quantity
+            for price, quantity in asks:
+                ask_qty += quantity
+                ask_notional += price * quantity
+            return {'bid_qty': bid_qty, 'ask_qty': ask_qty,
+                    'bid_notional': bid_notional, 'ask_notional': ask_notional}
+
+    def imbalance(self, bps: float = 10) -> float:
+        """中间价上下 bps 基点以内的买卖失衡度（-1 全是卖单，1 全是买单）"""
+        depth = self.depth_within(bps)
+        total = depth['bid_notional'] + depth['ask_notional']
+        return (depth['bid_notional'] - depth['ask_notional']) / total if total > 0 else 0.0
+
+    def estimate_slippage(self, side: str, notional: float) -> Dict:
+        """
+        按当前挂单估算市价成交 notional（计价货币）的滑点
+
+        Args:
+            side: 'BUY'（吃卖单）或 'SELL'（吃买单）
+            notional: 成交金额
+
+        Returns:
+            {'avg_price', 'slippage_bps'（相对中间价）, 'filled_notional', 'levels', 'complete'}
+        """
+        with self._lock:
+            mid = self.mid_price()
+            if side == 'BUY':
+                levels = zip(self.asks.prices, self.asks.quantities)
+            else:
+                levels = zip(reversed(self.bids.prices), reversed(self.bids.quantities))
+
+            remaining = notional
+            filled_qty = 0.0
+            consumed = 0
+            for price, quantity in levels:
+                if remaining <= 0:
+                    break
+                take = min(quantity, remaining / price)
+                filled_qty += take
+                remaining -= take * price
+                consumed += 1
+
+        filled = notional - max(remaining, 0.0)
+        if filled_qty == 0 or mid is None:
+            return {'avg_price': None, 'slippage_bps': None, 'filled_notional': 0.0, 'levels': 0, 'complete': False}
+        avg_price = filled / filled_qty
+        slippage = (avg_price - mid) / mid * 10000
+        return {
+            'avg_price': avg_price,
+            'slippage_bps': slippage if side == 'BUY' else -slippage,
+            'filled_notional': filled,
+            'levels': consumed,
+            'complete': remaining <= notional * 1e-12
+        }
+
+
+class OrderBookStore:
+    """多个交易对的本地订单簿（监听行情流的 depthUpdate 事件）"""
+
+    def __init__(self, client, stream_client=None, snapshot_limit: int = 1000,
+                 stale_after: float = 10.0):
+        """
+        初始化订单簿存储
+
+        Args:
+            client: BinanceClient实例（同步快照）
+            stream_client: BinanceStreamClient实例（需开启深度流；断线时读取返回None）
+            snapshot_limit: 同步快照深度
+            stale_after: 超过多少秒没有推送视为过期（秒）
+        """
+        self.client = client
+        self.stream_client = stream_client
+        self.snapshot_limit = snapshot_limit
+        self.stale_after = stale_after
+        self.logger = logging.getLogger(__name__)
+
+        self._books: Dict[str, LocalOrderBook] = {}
+        self._books_guard = threading.Lock()
+
+        if stream_client is not None:
+            stream_client.add_listener(self._on_stream_event)
+
+    def _on_stream_event(self, stream: str, data: Dict):
+        """行情流回调：深度增量写入对应交易对的订单簿"""
+        if data.get('e') == 'depthUpdate':
+            self._get_book(data['s']).handle_event(data)
+
+    def _get_book(self, symbol: str) -> LocalOrderBook:
+        with self._books_guard:
+            book = self._books.get(symbol)
+            if book is None:
+                book = LocalOrderBook(symbol, self.client, self.snapshot_limit)
+                self._books[symbol] = book
+            return book
+
+    def get_book(self, symbol: str) -> Optional[LocalOrderBook]:
+        """
+        已同步的本地订单簿（未同步但已收到推送时先用 REST 快照同步）
+
+        Returns:
+            LocalOrderBook；没有推送、行情流断开、数据过期或同步失败时返回None，调用方回退 REST
+        """
+        with self._books_guard:
+            book = self._books.get(symbol)
+        if book is None:
+            return None
+        if self.stream_client is not None and not self.stream_client.connected:
+            return None
+
+        if not book.synced:
+            try:
+                if not book.sync():
+                    return None
+            except Exception as e:
+                self.logger.warning(f"[ORDER_BOOK] {symbol} 快照同步失败: {e}")
+                return None
+
+        if time.time() - book.updated_at > self.stale_after:
+            return None
+        return book
+
+    def symbols(self) -> List[str]:
+        """已收到推送的交易对"""
+        with self._books_guard:
+            return list(self._books)
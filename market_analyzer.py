@@ -3,35 +3,118 @@
 提供技术指标、价格分析和交易信号
 """
 
+import time
+import asyncio
+import threading
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterable, List, Tuple, Optional
 from datetime import datetime, timedelta
 
+from kline_store import KlineStore, CLOSE_GRACE_MS
+from streaming_indicators import IndicatorStreams
+from local_order_book import LocalOrderBook, OrderBookStore
+from market_context import MarketContext
+from async_binance_client import DEFAULT_KLINE_REQUESTS, MARKET_DATA_ITEMS
+import indicators
+import kline_parser
+import support_resistance
+
+
+# 可缓存的指标：(已收盘K线数组, *参数) → 结果
+CACHED_INDICATORS: Dict[str, Callable] = {
+    'sma': lambda bars, period: indicators.sma(bars['close'], period),
+    'ema': lambda bars, period: indicators.ema(bars['close'], period),
+    'rsi': lambda bars, period: indicators.rsi(bars['close'], period),
+    'macd': lambda bars, fast, slow, signal: indicators.macd(bars['close'], fast, slow, signal),
+    'bollinger': lambda bars, period, std_dev: indicators.bollinger_bands(bars['close'], period, std_dev),
+    'atr': lambda bars, period: indicators.atr(bars['high'], bars['low'], bars['close'], period),
+    'zones': lambda bars, order, tolerance: support_resistance.find_zones(bars['high'], bars['low'], order, tolerance),
+}
+
 
 class MarketAnalyzer:
     """市场数据分析器"""
 
-    def __init__(self, client):
+    # 完整市场上下文使用的指标：3分钟快照和1小时向后兼容字段
+    SNAPSHOT_SPEC = {'ema': (12, 20, 26), 'rsi': (7,), 'macd': (12, 26, 9)}
+    HOURLY_SPEC = {'sma': (20, 50), 'ema': (12, 26), 'rsi': (14,), 'macd': (12, 26, 9), 'bollinger': (20, 2)}
+    # 支撑/阻力位检测使用的1小时K线数量
+    LEVELS_LOOKBACK = 500
+
+    def __init__(self, client, kline_store: Optional[KlineStore] = None, stream_client=None,
+                 async_client=None, market_snapshot=None, indicator_streams: Optional[IndicatorStreams] = None,
+                 indicator_cache_size: int = 256, order_books: Optional[OrderBookStore] = None):
         """
         初始化市场分析器
 
         Args:
             client: BinanceClient实例
+            kline_store: K线增量缓存（可选，不传则自动创建）
+            stream_client: BinanceStreamClient实例（可选，行情流正常时优先读取推送数据）
+            async_client: AsyncBinanceClient实例（可选，获取完整市场上下文时并发预取数据）
+            market_snapshot: MarketSnapshot实例（可选，ticker和资金费率从全市场快照读取）
+            indicator_streams: 流式指标（可选，不传则自动创建；日内序列和4小时上下文直接读取当前值）
+            indicator_cache_size: 指标缓存条数（LRU淘汰，按最后一根已收盘K线失效）
+            order_books: 本地订单簿（可选，已同步时订单簿分析不再请求REST深度）
         """
         self.client = client
+        # 所有K线读取共享同一份增量缓存
+        self.kline_store = kline_store or KlineStore(client)
+        self.stream_client = stream_client
+        self.async_client = async_client
+        self.market_snapshot = market_snapshot
+        self.indicator_streams = indicator_streams or IndicatorStreams(self.kline_store)
+        self.order_books = order_books
+
+        # 指标缓存：(交易对, 周期, 最后收盘K线开盘时间, 数量, 指标, 参数) → 结果
+        self.indicator_cache_size = indicator_cache_size
+        self._indicator_cache: OrderedDict = OrderedDict()
+        self._indicator_cache_lock = threading.Lock()
+        self.indicator_cache_stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0
+        }
+
+        if stream_client is not None:
+            # 推送的K线直接写入缓存，流正常期间不再轮询REST
+            stream_client.add_listener(self._on_stream_event)
+
+    def _on_stream_event(self, stream: str, data: Dict):
+        """行情流回调：K线事件写入K线缓存"""
+        if data.get('e') == 'kline':
+            k = data['k']
+            bar = [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'],
+                   k['T'], k['q'], k['n'], k['V'], k['Q'], k.get('B', '0')]
+            self.kline_store.apply_stream_kline(data['s'], k['i'], bar)
 
     def get_current_price(self, symbol: str) -> float:
-        """获取当前价格（使用期货API）"""
+        """获取当前价格（优先行情流，断线或过期时回退期货API）"""
+        if self.stream_client is not None:
+            price = self.stream_client.get_last_price(symbol)
+            if price is not None:
+                return price
+
         # 使用期货API获取24h ticker，从中提取lastPrice
         # 这样可以支持期货专用交易对（如1000SHIBUSDT）
-        ticker = self.client.get_futures_24h_ticker(symbol)
+        ticker = self._get_24h_ticker(symbol)
         return float(ticker['lastPrice'])
 
-    def get_price_change_24h(self, symbol: str) -> Dict:
-        """获取24小时价格变化（使用期货API）"""
+    def _get_24h_ticker(self, symbol: str) -> Dict:
+        """获取24h ticker（优先全市场快照，快照中没有时单独请求）"""
+        if self.market_snapshot is not None:
+            ticker = self.market_snapshot.get_ticker(symbol)
+            if ticker is not None:
+                return ticker
+        return self.client.get_futures_24h_ticker(symbol)
+
+    def get_price_change_24h(self, symbol: str, ticker: Dict = None) -> Dict:
+        """获取24小时价格变化（使用期货API，可传入已预取的ticker）"""
         # 使用期货API而不是现货API，以支持期货专用交易对
-        ticker = self.client.get_futures_24h_ticker(symbol)
+        if ticker is None:
+            ticker = self._get_24h_ticker(symbol)
         return {
             'symbol': symbol,
             'price': float(ticker['lastPrice']),
@@ -54,33 +137,154 @@ class MarketAnalyzer:
         Returns:
             包含OHLCV数据的DataFrame
         """
-        klines = self.client.get_klines(symbol, interval, limit)
+        klines = self.kline_store.get_klines(symbol, interval, limit)
+
+        # 一次解析成结构化数组（int64 时间、float64 OHLCV），不再逐列 astype
+        parsed = kline_parser.parse_klines(klines, kline_parser.OHLCV_FIELDS)
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(parsed['open_time'], unit='ms'),
+            'open': parsed['open'],
+            'high': parsed['high'],
+            'low': parsed['low'],
+            'close': parsed['close'],
+            'volume': parsed['volume']
+        })
+
+    def get_kline_arrays(self, symbol: str, interval: str = '1h', limit: int = 100) -> Dict[str, np.ndarray]:
+        """
+        获取K线数据并转换为 float64 数组（指标计算使用，不构建DataFrame）
+
+        Returns:
+            {'open_time', 'open', 'high', 'low', 'close', 'volume'}
+        """
+        klines = self.kline_store.get_klines(symbol, interval, limit)
+        return kline_parser.to_columns(kline_parser.parse_klines(klines, kline_parser.OHLCV_FIELDS))
+
+    # ========== 指标缓存（新K线收盘前复用计算结果）==========
+
+    def _memoize(self, key: Tuple, compute: Callable):
+        """LRU 缓存（计算在锁外进行，并发的相同计算只保留一份结果）"""
+        with self._indicator_cache_lock:
+            if key in self._indicator_cache:
+                self._indicator_cache.move_to_end(key)
+                self.indicator_cache_stats['hits'] += 1
+                return self._indicator_cache[key]
+
+        value = compute()
+        with self._indicator_cache_lock:
+            self.indicator_cache_stats['misses'] += 1
+            self._indicator_cache[key] = value
+            self._indicator_cache.move_to_end(key)
+            while len(self._indicator_cache) > self.indicator_cache_size:
+                self._indicator_cache.popitem(last=False)
+                self.indicator_cache_stats['evictions'] += 1
+        return value
+
+    def get_closed_kline_arrays(self, symbol: str, interval: str = '1h', limit: int = 100) -> Dict[str, np.ndarray]:
+        """
+        最近 limit 根K线中已收盘部分的数组（缓存到下一根K线收盘，调用方不要修改返回的数组）
+
+        K线缓存不支持的周期/数量不做缓存，返回包含未收盘K线的数组
+        """
+        last_closed = self.kline_store.get_last_closed_open_time(symbol, interval, limit)
+        if last_closed is None:
+            return self.get_kline_arrays(symbol, interval, limit)
+
+        def load():
+            klines = self.kline_store.get_klines(symbol, interval, limit)
+            closed = [k for k in klines if int(k[0]) <= last_closed]
+            return kline_parser.to_columns(kline_parser.parse_klines(closed, kline_parser.OHLCV_FIELDS))
+
+        return self._memoize((symbol, interval, last_closed, limit, 'bars', ()), load)
+
+    def get_cached_indicator(self, symbol: str, interval: str, name: str, *params, limit: int = 100):
+        """
+        基于已收盘K线计算的指标（同一根K线收盘前重复调用直接返回缓存结果）
 
-        df = pd.DataFrame(klines, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_volume', 'trades', 'taker_buy_base',
-            'taker_buy_quote', 'ignore'
-        ])
+        Args:
+            symbol: 交易对
+            interval: K线周期
+            name: 指标名（CACHED_INDICATORS 的键）
+            *params: 指标参数，如 get_cached_indicator('BTCUSDT', '1h', 'macd', 12, 26, 9)
+            limit: K线数量
+
+        Returns:
+            指标数组（MACD/布林带为三个数组的元组），调用方不要修改
+        """
+        last_closed = self.kline_store.get_last_closed_open_time(symbol, interval, limit)
+        compute = lambda: CACHED_INDICATORS[name](self.get_closed_kline_arrays(symbol, interval, limit), *params)
+        if last_closed is None:
+            return compute()
+        return self._memoize((symbol, interval, last_closed, limit, name, params), compute)
+
+    def _latest_close(self, symbol: str, interval: str) -> float:
+        """最新一根K线（可能未收盘）的收盘价"""
+        return float(self.kline_store.get_klines(symbol, interval, 1)[-1][4])
+
+    def clear_indicator_cache(self):
+        """清空指标缓存"""
+        with self._indicator_cache_lock:
+            self._indicator_cache.clear()
+
+    def get_batch_indicators(self, symbols: List[str], interval: str, limit: int,
+                             spec: Optional[Dict] = None, closed_only: bool = False) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        多个交易对按开盘时间对齐后一次向量化计算指标
+
+        Args:
+            symbols: 交易对列表
+            interval: K线周期
+            limit: K线数量
+            spec: 指标周期配置（默认 indicators.DEFAULT_SPEC）
+            closed_only: 只使用已收盘K线（与 get_cached_indicator 的口径一致）
 
-        # 转换数据类型
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df['open'] = df['open'].astype(float)
-        df['high'] = df['high'].astype(float)
-        df['low'] = df['low'].astype(float)
-        df['close'] = df['close'].astype(float)
-        df['volume'] = df['volume'].astype(float)
+        Returns:
+            {symbol: {'close': 数组, 'ema20': 数组, ...}}，获取K线失败的交易对不包含在内
+        """
+        klines_by_symbol = {}
+        for symbol in symbols:
+            try:
+                klines = self.kline_store.get_klines(symbol, interval, limit)
+            except Exception:
+                continue
+            if closed_only:
+                now_ms = int(time.time() * 1000)
+                klines = [k for k in klines if int(k[6]) + CLOSE_GRACE_MS < now_ms]
+            if klines:
+                klines_by_symbol[symbol] = klines
+        if not klines_by_symbol:
+            return {}
+
+        aligned_symbols, aligned = indicators.align_klines(klines_by_symbol, limit)
+        result = indicators.compute_batch(aligned['close'], aligned['high'], aligned['low'], spec)
+        return {
+            symbol: {'close': aligned['close'][row], **{name: values[row] for name, values in result.items()}}
+            for row, symbol in enumerate(aligned_symbols)
+        }
 
-        return df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
+    def precompute_market_indicators(self, symbols: List[str]) -> Dict[str, Dict[str, Dict[str, np.ndarray]]]:
+        """
+        批量计算 get_comprehensive_market_context 需要的指标（每个周期一次向量化计算）
 
-    # ========== 技术指标 ==========
+        Returns:
+            {symbol: {'3m': {...}, '1h': {...}}}，可逐个传给 get_comprehensive_market_context
+        """
+        short = self.get_batch_indicators(symbols, '3m', 30, self.SNAPSHOT_SPEC)
+        hourly = self.get_batch_indicators(symbols, '1h', 100, self.HOURLY_SPEC, closed_only=True)
+        return {
+            symbol: {'3m': short[symbol], '1h': hourly[symbol]}
+            for symbol in symbols if symbol in short and symbol in hourly
+        }
+
+    # ========== 技术指标（DataFrame 接口，计算由 indicators 模块完成）==========
 
     def calculate_sma(self, df: pd.DataFrame, period: int) -> pd.Series:
         """计算简单移动平均线"""
-        return df['close'].rolling(window=period).mean()
+        return pd.Series(indicators.sma(df['close'].to_numpy(dtype=np.float64), period), index=df.index)
 
     def calculate_ema(self, df: pd.DataFrame, period: int) -> pd.Series:
         """计算指数移动平均线"""
-        return df['close'].ewm(span=period, adjust=False).mean()
+        return pd.Series(indicators.ema(df['close'].to_numpy(dtype=np.float64), period), index=df.index)
 
     def calculate_rsi(self, df: pd.DataFrame, period: int = 14) -> pd.Series:
         """
@@ -93,13 +297,7 @@ class MarketAnalyzer:
         Returns:
             RSI值序列
         """
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+        return pd.Series(indicators.rsi(df['close'].to_numpy(dtype=np.float64), period), index=df.index)
 
     def calculate_macd(self, df: pd.DataFrame,
                        fast_period: int = 12,
@@ -111,14 +309,9 @@ class MarketAnalyzer:
         Returns:
             (MACD线, 信号线, 柱状图)
         """
-        ema_fast = self.calculate_ema(df, fast_period)
-        ema_slow = self.calculate_ema(df, slow_period)
-
-        macd_line = ema_fast - ema_slow
-        signal_line = macd_line.ewm(span=signal_period, adjust=False).mean()
-        histogram = macd_line - signal_line
-
-        return macd_line, signal_line, histogram
+        result = indicators.macd(df['close'].to_numpy(dtype=np.float64),
+                                 fast_period, slow_period, signal_period)
+        return tuple(pd.Series(values, index=df.index) for values in result)
 
     def calculate_bollinger_bands(self, df: pd.DataFrame,
                                   period: int = 20,
@@ -129,24 +322,14 @@ class MarketAnalyzer:
         Returns:
             (上轨, 中轨, 下轨)
         """
-        sma = self.calculate_sma(df, period)
-        std = df['close'].rolling(window=period).std()
-
-        upper_band = sma + (std * std_dev)
-        lower_band = sma - (std * std_dev)
-
-        return upper_band, sma, lower_band
+        result = indicators.bollinger_bands(df['close'].to_numpy(dtype=np.float64), period, std_dev)
+        return tuple(pd.Series(values, index=df.index) for values in result)
 
     def calculate_atr(self, df: pd.DataFrame, period: int = 14) -> pd.Series:
         """计算平均真实波幅（ATR）"""
-        high_low = df['high'] - df['low']
-        high_close = np.abs(df['high'] - df['close'].shift())
-        low_close = np.abs(df['low'] - df['close'].shift())
-
-        true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        atr = true_range.rolling(window=period).mean()
-
-        return atr
+        arrays = indicators.arrays_from_dataframe(df)
+        return pd.Series(indicators.atr(arrays['high'], arrays['low'], arrays['close'], period),
+                         index=df.index)
 
     # ========== 交易信号 ==========
 
@@ -157,17 +340,10 @@ class MarketAnalyzer:
         Returns:
             包含趋势分析的字典
         """
-        df = self.get_kline_data(symbol, interval, 100)
-
-        # 计算移动平均线
-        df['sma_20'] = self.calculate_sma(df, 20)
-        df['sma_50'] = self.calculate_sma(df, 50)
-        df['ema_12'] = self.calculate_ema(df, 12)
-        df['ema_26'] = self.calculate_ema(df, 26)
-
-        current_price = df['close'].iloc[-1]
-        sma_20 = df['sma_20'].iloc[-1]
-        sma_50 = df['sma_50'].iloc[-1]
+        # 移动平均线基于已收盘K线（缓存到下一根K线收盘），价格取最新值
+        current_price = self._latest_close(symbol, interval)
+        sma_20 = float(self.get_cached_indicator(symbol, interval, 'sma', 20)[-1])
+        sma_50 = float(self.get_cached_indicator(symbol, interval, 'sma', 50)[-1])
 
         # 判断趋势
         if current_price > sma_20 > sma_50:
@@ -198,10 +374,7 @@ class MarketAnalyzer:
         Returns:
             包含RSI分析的字典
         """
-        df = self.get_kline_data(symbol, interval, 100)
-        df['rsi'] = self.calculate_rsi(df, 14)
-
-        current_rsi = df['rsi'].iloc[-1]
+        current_rsi = float(self.get_cached_indicator(symbol, interval, 'rsi', 14)[-1])
 
         # 判断超买超卖
         if current_rsi > 70:
@@ -230,13 +403,12 @@ class MarketAnalyzer:
         Returns:
             包含MACD分析的字典
         """
-        df = self.get_kline_data(symbol, interval, 100)
-        macd_line, signal_line, histogram = self.calculate_macd(df)
+        macd_line, signal_line, histogram = self.get_cached_indicator(symbol, interval, 'macd', 12, 26, 9)
 
-        current_macd = macd_line.iloc[-1]
-        current_signal = signal_line.iloc[-1]
-        current_histogram = histogram.iloc[-1]
-        prev_histogram = histogram.iloc[-2]
+        current_macd = float(macd_line[-1])
+        current_signal = float(signal_line[-1])
+        current_histogram = float(histogram[-1])
+        prev_histogram = float(histogram[-2])
 
         # 判断信号
         if current_macd > current_signal and prev_histogram < 0 < current_histogram:
@@ -317,34 +489,40 @@ class MarketAnalyzer:
 
     # ========== 支撑阻力 ==========
 
-    def find_support_resistance(self, symbol: str, interval: str = '1h',
-                                lookback: int = 50) -> Dict:
+    def find_support_resistance(self, symbol: str, interval: str = '1h', lookback: int = LEVELS_LOOKBACK,
+                                current_price: Optional[float] = None, max_levels: int = 3,
+                                order: int = support_resistance.DEFAULT_ORDER,
+                                tolerance: float = support_resistance.DEFAULT_TOLERANCE) -> Dict:
         """
         寻找支撑位和阻力位
 
-        Returns:
-            包含支撑阻力位的字典
-        """
-        df = self.get_kline_data(symbol, interval, lookback)
-
-        # 找局部高点和低点
-        df['local_max'] = df['high'].rolling(window=5, center=True).max()
-        df['local_min'] = df['low'].rolling(window=5, center=True).min()
-
-        resistance_levels = df[df['high'] == df['local_max']]['high'].unique()
-        support_levels = df[df['low'] == df['local_min']]['low'].unique()
+        在已收盘K线上检测枢轴点并聚合成价格区间（同一根K线收盘前复用缓存），
+        再按当前价格划分支撑和阻力
 
-        # 排序并取最近的几个
-        resistance_levels = sorted(resistance_levels, reverse=True)[:3]
-        support_levels = sorted(support_levels, reverse=True)[:3]
+        Args:
+            symbol: 交易对
+            interval: K线周期
+            lookback: 使用的K线数量
+            current_price: 当前价格，默认取最新K线收盘价
+            max_levels: 支撑/阻力各保留的数量
+            order: 枢轴点左右比较的K线数量
+            tolerance: 枢轴点合并为同一区间的价格比例
 
-        current_price = df['close'].iloc[-1]
+        Returns:
+            包含支撑阻力位的字典，支撑/阻力均按距当前价格由近到远排列
+        """
+        zones = self.get_cached_indicator(symbol, interval, 'zones', order, tolerance, limit=lookback)
+        if current_price is None:
+            current_price = self._latest_close(symbol, interval)
+        levels = support_resistance.split_levels(zones, current_price, max_levels)
 
         return {
             'symbol': symbol,
             'current_price': current_price,
-            'resistance_levels': [float(r) for r in resistance_levels],
-            'support_levels': [float(s) for s in support_levels],
+            'resistance_levels': [zone['price'] for zone in levels['resistance']],
+            'support_levels': [zone['price'] for zone in levels['support']],
+            'resistance_zones': levels['resistance'],
+            'support_zones': levels['support'],
             'timestamp': datetime.now().isoformat()
         }
 
@@ -358,17 +536,15 @@ class MarketAnalyzer:
         Returns:
             波动率分析字典
         """
-        df = self.get_kline_data(symbol, interval, period + 10)
-
-        # 计算收益率
-        df['returns'] = df['close'].pct_change()
+        close = self.get_closed_kline_arrays(symbol, interval, period + 10)['close']
 
-        # 计算波动率（标准差）
-        volatility = df['returns'].std() * np.sqrt(period)
+        # 计算收益率和波动率（标准差）
+        returns = close[1:] / close[:-1] - 1
+        volatility = returns.std(ddof=1) * np.sqrt(period) if len(returns) > 1 else np.nan
 
         # 计算ATR
-        atr = self.calculate_atr(df, 14).iloc[-1]
-        current_price = df['close'].iloc[-1]
+        atr = float(self.get_cached_indicator(symbol, interval, 'atr', 14, limit=period + 10)[-1])
+        current_price = self._latest_close(symbol, interval)
         atr_percent = (atr / current_price) * 100
 
         return {
@@ -382,14 +558,22 @@ class MarketAnalyzer:
 
     # ========== 订单簿分析 ==========
 
-    def analyze_order_book(self, symbol: str, depth: int = 20) -> Dict:
+    def analyze_order_book(self, symbol: str, depth: int = 20, order_book: Dict = None) -> Dict:
         """
-        分析订单簿，找出买卖压力
+        分析订单簿，找出买卖压力（本地订单簿已同步时直接读取，否则请求REST快照）
 
         Returns:
             订单簿分析字典
         """
-        order_book = self.client.get_order_book(symbol, depth)
+        book = None
+        if order_book is None and self.order_books is not None:
+            book = self.order_books.get_book(symbol)
+        if book is not None:
+            order_book = book.depth(depth)
+        else:
+            if order_book is None:
+                order_book = self.client.get_order_book(symbol, depth)
+            book = LocalOrderBook.from_snapshot(symbol, order_book)
 
         bids = order_book['bids'][:depth]  # 买单
         asks = order_book['asks'][:depth]  # 卖单
@@ -419,22 +603,30 @@ class MarketAnalyzer:
             'buy_pressure': buy_pressure,
             'sell_pressure': sell_pressure,
             'market_sentiment': 'BULLISH' if buy_pressure > 0.55 else 'BEARISH' if sell_pressure > 0.55 else 'NEUTRAL',
+            # 中间价上下10个基点以内的挂单深度和买卖失衡度
+            'depth_10bps': book.depth_within(10),
+            'imbalance_10bps': book.imbalance(10),
             'timestamp': datetime.now().isoformat()
         }
 
     # ========== 市场概览 ==========
 
-    def get_market_overview(self, symbol: str) -> Dict:
+    def get_market_overview(self, symbol: str, prefetched: Dict = None) -> Dict:
         """
         获取完整的市场概览
 
+        Args:
+            symbol: 交易对
+            prefetched: prefetch_market_context 的结果（可选）
+
         Returns:
             综合市场分析
         """
-        price_info = self.get_price_change_24h(symbol)
+        prefetched = prefetched or {}
+        price_info = self.get_price_change_24h(symbol, ticker=prefetched.get('ticker_24h'))
         combined_signal = self.get_combined_signal(symbol)
         volatility = self.calculate_volatility(symbol)
-        order_book = self.analyze_order_book(symbol)
+        order_book = self.analyze_order_book(symbol, order_book=prefetched.get('order_book'))
 
         return {
             'symbol': symbol,
@@ -459,24 +651,40 @@ class MarketAnalyzer:
         Returns:
             包含价格和指标序列的字典
         """
-        df = self.get_kline_data(symbol, interval, limit)
+        # 流式指标：每根K线收盘时增量更新，这里只读取最近的值
+        state, open_bar = self.indicator_streams.get(symbol, interval)
+        if state is not None and state.available(open_bar) >= limit:
+            open_times = np.array(state.series('open_time', limit, open_bar), dtype=np.int64)
+            timestamps = np.datetime_as_string(open_times.astype('datetime64[ms]').astype('datetime64[s]'))
+            return {
+                'mid_prices': state.series('close', limit, open_bar),
+                'ema20_values': state.series('ema20', limit, open_bar),
+                'macd_values': np.nan_to_num(state.series('macd', limit, open_bar), nan=0.0).tolist(),
+                'rsi7_values': np.nan_to_num(state.series('rsi7', limit, open_bar), nan=50.0).tolist(),
+                'rsi14_values': np.nan_to_num(state.series('rsi14', limit, open_bar), nan=50.0).tolist(),
+                'timestamps': [t.replace('T', ' ') for t in timestamps]
+            }
 
-        # 计算各种指标
-        df['ema20'] = self.calculate_ema(df, 20 if len(df) >= 20 else len(df) // 2)
-        df['rsi7'] = self.calculate_rsi(df, min(7, len(df) - 1))
-        df['rsi14'] = self.calculate_rsi(df, min(14, len(df) - 1))
+        # 历史不足（新上市交易对等）：按现有K线批量计算
+        bars = self.get_kline_arrays(symbol, interval, limit)
+        close = bars['close']
+        n = len(close)
 
-        macd_line, signal_line, _ = self.calculate_macd(df)
-        df['macd'] = macd_line
+        # 计算各种指标
+        ema20 = indicators.ema(close, 20 if n >= 20 else n // 2)
+        rsi7 = indicators.rsi(close, min(7, n - 1))
+        rsi14 = indicators.rsi(close, min(14, n - 1))
+        macd_line, _, _ = indicators.macd(close)
 
         # 转换为列表（从旧到新）
+        timestamps = np.datetime_as_string(bars['open_time'].astype('datetime64[ms]').astype('datetime64[s]'))
         return {
-            'mid_prices': df['close'].tolist(),
-            'ema20_values': df['ema20'].fillna(df['close']).tolist(),
-            'macd_values': df['macd'].fillna(0).tolist(),
-            'rsi7_values': df['rsi7'].fillna(50).tolist(),
-            'rsi14_values': df['rsi14'].fillna(50).tolist(),
-            'timestamps': df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+            'mid_prices': close.tolist(),
+            'ema20_values': np.where(np.isnan(ema20), close, ema20).tolist(),
+            'macd_values': np.nan_to_num(macd_line, nan=0.0).tolist(),
+            'rsi7_values': np.nan_to_num(rsi7, nan=50.0).tolist(),
+            'rsi14_values': np.nan_to_num(rsi14, nan=50.0).tolist(),
+            'timestamps': [t.replace('T', ' ') for t in timestamps]
         }
 
     def get_4h_context(self, symbol: str, limit: int = 10) -> Dict:
@@ -490,56 +698,80 @@ class MarketAnalyzer:
         Returns:
             4小时级别的市场上下文
         """
-        df = self.get_kline_data(symbol, '4h', limit)
-
-        # 计算长期指标
-        df['ema20'] = self.calculate_ema(df, min(20, len(df)))
-        df['ema50'] = self.calculate_ema(df, min(50, len(df)))
-        df['atr3'] = self.calculate_atr(df, min(3, len(df) - 1))
-        df['atr14'] = self.calculate_atr(df, min(14, len(df) - 1))
-        df['rsi14'] = self.calculate_rsi(df, min(14, len(df) - 1))
-
-        macd_line, signal_line, _ = self.calculate_macd(df)
-        df['macd'] = macd_line
+        state, open_bar = self.indicator_streams.get(symbol, '4h')
+        if state is not None and state.available(open_bar) >= limit:
+            current = state.current(open_bar)
+            volumes = state.series('volume', limit, open_bar)
+            levels = {name: None if np.isnan(current[name]) else current[name]
+                      for name in ('ema20', 'ema50', 'atr3', 'atr14')}
+            return {
+                **levels,
+                'current_volume': current['volume'],
+                'average_volume': sum(volumes) / len(volumes),
+                'macd_series': np.nan_to_num(state.series('macd', 10, open_bar), nan=0.0).tolist(),
+                'rsi14_series': np.nan_to_num(state.series('rsi14', 10, open_bar), nan=50.0).tolist()
+            }
 
-        # 最新值
-        latest = df.iloc[-1]
+        # 历史不足：按现有K线批量计算
+        bars = self.get_kline_arrays(symbol, '4h', limit)
+        close, high, low = bars['close'], bars['high'], bars['low']
+        n = len(close)
 
-        # 平均成交量
-        avg_volume = df['volume'].mean()
+        # 计算长期指标
+        ema20 = indicators.ema(close, min(20, n))
+        ema50 = indicators.ema(close, min(50, n))
+        atr3 = indicators.atr(high, low, close, min(3, n - 1))
+        atr14 = indicators.atr(high, low, close, min(14, n - 1))
+        rsi14 = indicators.rsi(close, min(14, n - 1))
+        macd_line, _, _ = indicators.macd(close)
 
         return {
-            'ema20': float(latest['ema20']) if not pd.isna(latest['ema20']) else None,
-            'ema50': float(latest['ema50']) if not pd.isna(latest['ema50']) else None,
-            'atr3': float(latest['atr3']) if not pd.isna(latest['atr3']) else None,
-            'atr14': float(latest['atr14']) if not pd.isna(latest['atr14']) else None,
-            'current_volume': float(latest['volume']),
-            'average_volume': float(avg_volume),
-            'macd_series': df['macd'].fillna(0).tolist()[-10:],
-            'rsi14_series': df['rsi14'].fillna(50).tolist()[-10:]
+            'ema20': indicators.last(ema20),
+            'ema50': indicators.last(ema50),
+            'atr3': indicators.last(atr3),
+            'atr14': indicators.last(atr14),
+            'current_volume': float(bars['volume'][-1]),
+            'average_volume': float(bars['volume'].mean()),
+            'macd_series': np.nan_to_num(macd_line, nan=0.0).tolist()[-10:],
+            'rsi14_series': np.nan_to_num(rsi14, nan=50.0).tolist()[-10:]
         }
 
-    def get_futures_market_data(self, symbol: str) -> Dict:
+    def get_futures_market_data(self, symbol: str, prefetched: Dict = None) -> Dict:
         """
         获取合约市场数据（资金费率、持仓量）
 
         Args:
             symbol: 交易对
+            prefetched: prefetch_market_context 的结果（可选）
 
         Returns:
             合约市场数据
         """
+        prefetched = prefetched or {}
         try:
-            # 获取当前资金费率
-            funding_rate_data = self.client.get_current_funding_rate(symbol)
-            current_funding_rate = float(funding_rate_data.get('fundingRate', 0))
+            # 获取当前资金费率（行情流的 markPrice 事件已包含资金费率）
+            mark_info = self.stream_client.get_mark_price_info(symbol) if self.stream_client else None
+            snapshot_rate = self.market_snapshot.get_funding_rate(symbol) if self.market_snapshot else None
+            if mark_info is not None:
+                current_funding_rate = mark_info['funding_rate']
+            elif snapshot_rate is not None:
+                current_funding_rate = snapshot_rate
+            else:
+                funding_rate_data = prefetched.get('funding_rate')
+                if funding_rate_data is None:
+                    funding_rate_data = self.client.get_current_funding_rate(symbol)
+                current_funding_rate = float(funding_rate_data.get('fundingRate', 0))
 
             # 获取持仓量
-            open_interest_data = self.client.get_open_interest(symbol)
+            open_interest_data = prefetched.get('open_interest')
+            if open_interest_data is None:
+                open_interest_data = self.client.get_open_interest(symbol)
             current_open_interest = float(open_interest_data.get('openInterest', 0))
 
             # 获取持仓量历史（用于计算平均）
-            oi_history = self.client.get_open_interest_statistics(symbol, period='5m', limit=10)
+            oi_history = prefetched.get('open_interest_hist')
+            if oi_history is None:
+                oi_history = self.client.get_open_interest_statistics(symbol, period='5m', limit=10)
             if oi_history:
                 avg_open_interest = sum(float(item['sumOpenInterest']) for item in oi_history) / len(oi_history)
             else:
@@ -562,7 +794,41 @@ class MarketAnalyzer:
                 'error': str(e)
             }
 
-    def get_comprehensive_market_context(self, symbol: str) -> Dict:
+    def prefetch_market_context(self, symbol: str, items: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """
+        通过异步客户端并发获取单个交易对的行情数据
+
+        Args:
+            symbol: 交易对
+            items: 需要的数据项（gather_market_context 的数据项名或K线周期，默认全部）
+
+        Returns:
+            AsyncBinanceClient.gather_market_context 的结果；未配置异步客户端或失败时返回None
+        """
+        if self.async_client is None:
+            return None
+        kline_requests = DEFAULT_KLINE_REQUESTS
+        skip = ()
+        if items is not None:
+            items = set(items)
+            kline_requests = tuple((i, limit) for i, limit in DEFAULT_KLINE_REQUESTS if i in items)
+            skip = tuple(name for name in MARKET_DATA_ITEMS if name not in items)
+        # 全市场快照已包含 ticker 和资金费率，不再逐个请求
+        if self.market_snapshot is not None and self.market_snapshot.available():
+            skip += ('ticker_24h', 'funding_rate')
+        # 本地订单簿已同步时不再请求深度快照
+        if 'order_book' not in skip and self.order_books is not None \
+                and self.order_books.get_book(symbol) is not None:
+            skip += ('order_book',)
+        try:
+            return asyncio.run(self.async_client.gather_market_context(
+                symbol, kline_requests=kline_requests, kline_fetcher=self.kline_store.get_klines, skip=skip
+            ))
+        except RuntimeError:
+            # 已在事件循环中（调用方应直接 await gather_market_context），退回顺序请求
+            return None
+
+    def get_comprehensive_market_context(self, symbol: str, precomputed: Optional[Dict] = None) -> MarketContext:
         """
         获取完整的市场上下文（供AI决策使用）
 
@@ -572,79 +838,17 @@ class MarketAnalyzer:
         - 4小时级别上下文
         - 合约市场数据（资金费率、持仓量）
 
+        字段在读取时才计算（只读字段用到的K线、指标和接口），需要并发预取时调用
+        返回值的 prefetch(fields)
+
         Args:
             symbol: 交易对
+            precomputed: precompute_market_indicators 中该交易对的结果（可选，不传则单独计算）
 
         Returns:
-            完整的市场上下文数据
+            MarketContext（兼容原字典的只读访问）
         """
-        # 获取当前快照
-        df = self.get_kline_data(symbol, '1m', 1)
-        current_price = float(df['close'].iloc[-1])
-
-        # 获取短期技术指标
-        df_short = self.get_kline_data(symbol, '3m', 30)
-        current_ema20 = float(self.calculate_ema(df_short, 20).iloc[-1])
-        current_rsi7 = float(self.calculate_rsi(df_short, 7).iloc[-1])
-
-        macd_line, _, _ = self.calculate_macd(df_short)
-        current_macd = float(macd_line.iloc[-1])
-
-        # 获取日内序列
-        intraday_series = self.get_intraday_series(symbol, '3m', 10)
-
-        # 获取4小时上下文
-        context_4h = self.get_4h_context(symbol, 10)
-
-        # 获取合约数据
-        futures_data = self.get_futures_market_data(symbol)
-
-        # 获取市场概览（用于向后兼容）
-        overview = self.get_market_overview(symbol)
-        price_info = overview.get('price_info', {})
-
-        # 计算完整的技术指标（向后兼容）
-        df_1h = self.get_kline_data(symbol, '1h', 100)
-        rsi14 = self.calculate_rsi(df_1h, period=14)
-        macd_line, signal_line, histogram = self.calculate_macd(df_1h)
-        upper_band, middle_band, lower_band = self.calculate_bollinger_bands(df_1h, period=20)
-        sma_20 = self.calculate_sma(df_1h, 20)
-        sma_50 = self.calculate_sma(df_1h, 50)
-
-        return {
-            'symbol': symbol,
-            # 新格式：增强数据
-            'current_snapshot': {
-                'price': current_price,
-                'ema20': current_ema20,
-                'macd': current_macd,
-                'rsi7': current_rsi7
-            },
-            'intraday_series': intraday_series,
-            'long_term_context_4h': context_4h,
-            'futures_market': futures_data,
-            'timestamp': datetime.now().isoformat(),
-
-            # 旧格式：向后兼容字段
-            'current_price': current_price,
-            'price_change_24h': price_info.get('change_percent', 0),
-            'rsi': float(rsi14.iloc[-1]),
-            'macd': float(macd_line.iloc[-1]),
-            'macd_signal': float(signal_line.iloc[-1]),
-            'macd_histogram': float(histogram.iloc[-1]),
-            'bollinger_upper': float(upper_band.iloc[-1]),
-            'bollinger_middle': float(middle_band.iloc[-1]),
-            'bollinger_lower': float(lower_band.iloc[-1]),
-            'sma_20': float(sma_20.iloc[-1]),
-            'sma_50': float(sma_50.iloc[-1]),
-            'volume_24h': price_info.get('volume', 0),
-            'high_24h': price_info.get('high', current_price),
-            'low_24h': price_info.get('low', current_price),
-            'support_levels': [current_price * 0.98, current_price * 0.95],  # 简化
-            'resistance_levels': [current_price * 1.02, current_price * 1.05],  # 简化
-            'trend': 'uptrend' if current_price > float(sma_50.iloc[-1]) else 'downtrend',
-            'atr': context_4h.get('atr14', 0) if context_4h else 0
-        }
+        return MarketContext(self, symbol, precomputed)
 
     @staticmethod
     def calculate_liquidation_price(entry_price: float, leverage: int, side: str) -> float:
@@ -0,0 +1,262 @@
+"""
+惰性市场上下文
+get_comprehensive_market_context 的返回值：字段在第一次读取时才计算（K线来自 KlineStore，
+指标走 MarketAnalyzer 的指标缓存），读取后缓存；没有被读取的字段不发请求、不算指标。
+
+兼容原来的字典：支持 context['rsi']、context.get('trend')、'macd' in context、
+keys()/items()、dict(context) 等只读操作
+"""
+
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import indicators
+
+
+# 对外字段（顺序与原字典一致）
+CONTEXT_KEYS = (
+    # 新格式：增强数据
+    'symbol', 'current_snapshot', 'intraday_series', 'long_term_context_4h', 'futures_market', 'timestamp',
+    # 旧格式：向后兼容字段
+    'current_price', 'price_change_24h', 'rsi', 'macd', 'macd_signal', 'macd_histogram',
+    'bollinger_upper', 'bollinger_middle', 'bollinger_lower', 'sma_20', 'sma_50',
+    'volume_24h', 'high_24h', 'low_24h', 'support_levels', 'resistance_levels', 'trend', 'atr'
+)
+
+# 1小时指标字段（可由 precompute_market_indicators 的结果提供）
+HOURLY_KEYS = ('rsi', 'macd', 'macd_signal', 'macd_histogram', 'bollinger_upper', 'bollinger_middle',
+               'bollinger_lower', 'sma_20', 'sma_50', 'trend')
+
+# 字段 → 并发预取的数据项（gather_market_context 的数据项名，K线用周期表示）
+PREFETCH_ITEMS = {
+    'current_snapshot': ('1m', '3m'),
+    'intraday_series': ('3m',),
+    'long_term_context_4h': ('4h',),
+    'futures_market': ('funding_rate', 'open_interest', 'open_interest_hist'),
+    'current_price': ('1m',),
+    'price_change_24h': ('ticker_24h',),
+    'volume_24h': ('ticker_24h',),
+    'high_24h': ('ticker_24h',),
+    'low_24h': ('ticker_24h',),
+    'support_levels': ('1m', '1h'),
+    'resistance_levels': ('1m', '1h'),
+    'trend': ('1m',),
+    'atr': ('4h',),
+}
+
+
+class lazy_field:
+    """只读字段：第一次读取时计算，结果存入实例的 _values（兼容 __slots__）"""
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        values = obj._values
+        if self.name not in values:
+            try:
+                values[self.name] = self.func(obj)
+            except KeyError as e:
+                # 计算中的 KeyError 不能被 Mapping.get 当成字段不存在而吞掉
+                raise LookupError(f"{obj.symbol} {self.name} 计算失败: {e!r}") from e
+        return values[self.name]
+
+
+class MarketContext(Mapping):
+    """单个交易对的市场上下文（字段按需计算）"""
+
+    __slots__ = ('analyzer', 'symbol', 'timestamp', 'precomputed', 'prefetched', '_values')
+
+    def __init__(self, analyzer, symbol: str, precomputed: Optional[Dict] = None):
+        """
+        初始化市场上下文（不发请求）
+
+        Args:
+            analyzer: MarketAnalyzer实例
+            symbol: 交易对
+            precomputed: precompute_market_indicators 中该交易对的结果（可选）
+        """
+        self.analyzer = analyzer
+        self.symbol = symbol
+        self.timestamp = datetime.now().isoformat()
+        self.precomputed = precomputed or {}
+        self.prefetched: Optional[Dict] = None
+        self._values: Dict = {}
+
+    def prefetch(self, fields: Optional[Iterable[str]] = None) -> 'MarketContext':
+        """
+        并发预取即将读取的字段需要的数据（需要配置异步客户端，否则读取时顺序请求）
+
+        Args:
+            fields: 即将读取的字段（默认全部字段）
+
+        Returns:
+            self，便于链式调用
+        """
+        items = set()
+        for key in (CONTEXT_KEYS if fields is None else fields):
+            items.update(PREFETCH_ITEMS.get(key, ()))
+            if key in HOURLY_KEYS and '1h' not in self.precomputed:
+                items.add('1h')
+        if items:
+            self.prefetched = self.analyzer.prefetch_market_context(self.symbol, items=items)
+        return self
+
+    # ========== Mapping 接口 ==========
+
+    def __getitem__(self, key: str):
+        if key not in CONTEXT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(CONTEXT_KEYS)
+
+    def __len__(self) -> int:
+        return len(CONTEXT_KEYS)
+
+    def __contains__(self, key) -> bool:
+        return key in CONTEXT_KEYS
+
+    def to_dict(self) -> Dict:
+        """计算全部字段，返回普通字典"""
+        return {key: self[key] for key in CONTEXT_KEYS}
+
+    def __repr__(self) -> str:
+        return f"MarketContext({self.symbol!r}, computed={sorted(self._values)})"
+
+    # ========== 新格式字段 ==========
+
+    @lazy_field
+    def current_price(self) -> float:
+        """最新价（1分钟K线收盘价）"""
+        return float(self.analyzer.get_kline_arrays(self.symbol, '1m', 1)['close'][-1])
+
+    @lazy_field
+    def _short(self) -> Dict:
+        """3分钟快照指标"""
+        short = self.precomputed.get('3m')
+        if short is None:
+            closes = self.analyzer.get_kline_arrays(self.symbol, '3m', 30)['close']
+            short = indicators.compute_all(closes, spec=self.analyzer.SNAPSHOT_SPEC)
+        return short
+
+    @lazy_field
+    def current_snapshot(self) -> Dict:
+        """当前价格和3分钟指标"""
+        return {
+            'price': self.current_price,
+            'ema20': float(self._short['ema20'][-1]),
+            'macd': float(self._short['macd'][-1]),
+            'rsi7': float(self._short['rsi7'][-1])
+        }
+
+    @lazy_field
+    def intraday_series(self) -> Dict:
+        """日内序列（3分钟，10个点）"""
+        return self.analyzer.get_intraday_series(self.symbol, '3m', 10)
+
+    @lazy_field
+    def long_term_context_4h(self) -> Dict:
+        """4小时上下文"""
+        return self.analyzer.get_4h_context(self.symbol, 10)
+
+    @lazy_field
+    def futures_market(self) -> Dict:
+        """资金费率、持仓量"""
+        return self.analyzer.get_futures_market_data(self.symbol, self.prefetched)
+
+    # ========== 旧格式字段 ==========
+
+    @lazy_field
+    def _price_info(self) -> Dict:
+        """24小时行情"""
+        ticker = (self.prefetched or {}).get('ticker_24h')
+        return self.analyzer.get_price_change_24h(self.symbol, ticker=ticker)
+
+    @lazy_field
+    def price_change_24h(self) -> float:
+        return self._price_info.get('change_percent', 0)
+
+    @lazy_field
+    def volume_24h(self) -> float:
+        return self._price_info.get('volume_24h', 0)
+
+    @lazy_field
+    def high_24h(self) -> float:
+        return self._price_info.get('high_24h', self.current_price)
+
+    @lazy_field
+    def low_24h(self) -> float:
+        return self._price_info.get('low_24h', self.current_price)
+
+    def _hourly(self, key: str, name: str, *params, index: Optional[int] = None) -> float:
+        """1小时指标最新值（优先批量计算结果，否则与 get_market_overview 共用指标缓存）"""
+        batch = self.precomputed.get('1h')
+        if batch is not None:
+            return float(batch[key][-1])
+        result = self.analyzer.get_cached_indicator(self.symbol, '1h', name, *params)
+        return float((result if index is None else result[index])[-1])
+
+    @lazy_field
+    def rsi(self) -> float:
+        return self._hourly('rsi14', 'rsi', 14)
+
+    @lazy_field
+    def macd(self) -> float:
+        return self._hourly('macd', 'macd', 12, 26, 9, index=0)
+
+    @lazy_field
+    def macd_signal(self) -> float:
+        return self._hourly('macd_signal', 'macd', 12, 26, 9, index=1)
+
+    @lazy_field
+    def macd_histogram(self) -> float:
+        return self._hourly('macd_hist', 'macd', 12, 26, 9, index=2)
+
+    @lazy_field
+    def bollinger_upper(self) -> float:
+        return self._hourly('bb_upper', 'bollinger', 20, 2, index=0)
+
+    @lazy_field
+    def bollinger_middle(self) -> float:
+        return self._hourly('bb_middle', 'bollinger', 20, 2, index=1)
+
+    @lazy_field
+    def bollinger_lower(self) -> float:
+        return self._hourly('bb_lower', 'bollinger', 20, 2, index=2)
+
+    @lazy_field
+    def sma_20(self) -> float:
+        return self._hourly('sma20', 'sma', 20)
+
+    @lazy_field
+    def sma_50(self) -> float:
+        return self._hourly('sma50', 'sma', 50)
+
+    @lazy_field
+    def _levels(self) -> Dict:
+        """支撑/阻力位（更长的1小时历史，同一根K线收盘前复用缓存）"""
+        return self.analyzer.find_support_resistance(self.symbol, '1h', current_price=self.current_price)
+
+    @lazy_field
+    def support_levels(self) -> list:
+        return self._levels['support_levels']
+
+    @lazy_field
+    def resistance_levels(self) -> list:
+        return self._levels['resistance_levels']
+
+    @lazy_field
+    def trend(self) -> str:
+        return 'uptrend' if self.current_price > self.sma_50 else 'downtrend'
+
+    @lazy_field
+    def atr(self) -> float:
+        context_4h = self.long_term_context_4h
+        return context_4h.get('atr14', 0) if context_4h else 0
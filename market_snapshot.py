@@ -0,0 +1,127 @@
+"""
+全市场行情快照
+每轮循环用两次请求（全量24h ticker + 全量 premiumIndex）刷新所有交易对的
+价格、涨跌幅、成交量、标记价格和资金费率，单个交易对的查询直接读内存
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+
+class MarketSnapshot:
+    """全市场 ticker / 标记价格 / 资金费率快照"""
+
+    def __init__(self, client, max_age: float = 60.0, max_stale_age: Optional[float] = None):
+        """
+        初始化行情快照
+
+        Args:
+            client: BinanceClient实例
+            max_age: 快照最长有效期（秒），超过后下一次查询自动刷新
+            max_stale_age: 刷新失败时旧快照最多继续使用的时间（秒，默认 3 * max_age），
+                超过后查询返回None，由调用方回退单交易对接口
+        """
+        self.client = client
+        self.max_age = max_age
+        self.max_stale_age = max_stale_age if max_stale_age is not None else max_age * 3
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._tickers: Dict[str, Dict] = {}
+        self._premium: Dict[str, Dict] = {}
+        self._refreshed_at = 0.0
+        self._last_attempt = 0.0
+
+        # 统计信息
+        self.stats = {
+            'refreshes': 0,
+            'hits': 0,
+            'misses': 0,
+            'stale': 0,
+            'errors': 0
+        }
+
+    def refresh(self) -> bool:
+        """
+        刷新全市场快照（两次请求）
+
+        Returns:
+            是否刷新成功（失败时保留旧快照）
+        """
+        self._last_attempt = time.time()
+        try:
+            tickers = self.client.get_all_futures_24h_tickers()
+            premium = self.client.get_premium_index()
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.logger.warning(f"[SNAPSHOT] 刷新全市场行情失败: {e}")
+            return False
+
+        with self._lock:
+            self._tickers = {t['symbol']: t for t in tickers}
+            self._premium = {p['symbol']: p for p in premium}
+            self._refreshed_at = time.time()
+            self.stats['refreshes'] += 1
+        return True
+
+    def age(self) -> float:
+        """快照已存在的秒数"""
+        return time.time() - self._refreshed_at
+
+    def _ensure_fresh(self) -> bool:
+        """
+        必要时刷新快照
+
+        Returns:
+            快照是否可用（刷新失败时旧快照在 max_stale_age 内仍可用）
+        """
+        if self.age() > self.max_age:
+            # 并发查询只触发一次刷新；刷新失败后5秒内不重试
+            with self._refresh_lock:
+                if self.age() > self.max_age and time.time() - self._last_attempt > 5:
+                    self.refresh()
+        if self.age() > self.max_stale_age:
+            # 旧快照太久没有刷新成功，不再使用，由调用方回退单交易对接口
+            self.stats['stale'] += 1
+            return False
+        return True
+
+    def available(self) -> bool:
+        """快照是否可用（必要时先刷新），不可用时调用方应直接请求单交易对接口"""
+        return self._ensure_fresh()
+
+    def get_ticker(self, symbol: str) -> Optional[Dict]:
+        """
+        获取24h ticker（格式与 get_futures_24h_ticker 相同）
+
+        Returns:
+            ticker字典；快照中没有该交易对或快照过旧时返回None
+        """
+        if not self._ensure_fresh():
+            return None
+        with self._lock:
+            ticker = self._tickers.get(symbol)
+        self.stats['hits' if ticker is not None else 'misses'] += 1
+        return ticker
+
+    def get_premium_index(self, symbol: str) -> Optional[Dict]:
+        """获取标记价格、指数价格和资金费率（格式与 get_premium_index(symbol) 相同）"""
+        if not self._ensure_fresh():
+            return None
+        with self._lock:
+            premium = self._premium.get(symbol)
+        self.stats['hits' if premium is not None else 'misses'] += 1
+        return premium
+
+    def get_mark_price(self, symbol: str) -> Optional[float]:
+        """获取标记价格"""
+        premium = self.get_premium_index(symbol)
+        return float(premium['markPrice']) if premium else None
+
+    def get_funding_rate(self, symbol: str) -> Optional[float]:
+        """获取当前资金费率"""
+        premium = self.get_premium_index(symbol)
+        return float(premium.get('lastFundingRate') or 0) if premium else None
@@ -5,6 +5,7 @@ Alpha Arena 性能追踪系统
 
 import json
 import os
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List
 import numpy as np
@@ -25,6 +26,9 @@ class PerformanceTracker:
         self.initial_capital = initial_capital
         self.data_file = data_file
         self.logger = logging.getLogger(__name__)
+        # 多个交易对并发处理：_lock 保护 self.data 的修改和序列化，_save_lock 串行化写文件（共用同一个临时文件）
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
 
         # 加载或初始化数据
         self.data = self._load_data()
@@ -84,11 +88,15 @@ class PerformanceTracker:
                 os.makedirs(data_dir, exist_ok=True)
             
             temp_file = data_file_path + '.tmp'
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
-            
-            # 原子性替换原文件
-            shutil.move(temp_file, data_file_path)
+            with self._save_lock:
+                # 持锁只做序列化，写文件时其他线程可以继续记录
+                with self._lock:
+                    content = json.dumps(self.data, indent=2, ensure_ascii=False)
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    f.write(content)
+
+                # 原子性替换原文件
+                shutil.move(temp_file, data_file_path)
         except Exception as e:
             self.logger.error(f"保存数据失败: {e}")
             # 如果临时文件存在，尝试清理
@@ -122,12 +130,13 @@ class PerformanceTracker:
             'pnl': trade.get('pnl')  # 记录盈亏（如果有）
         }
 
-        self.data['trades'].append(trade_record)
-        
-        # 限制trades数组大小，防止内存溢出（只保留最近10000条）
-        if len(self.data['trades']) > 10000:
-            self.data['trades'] = self.data['trades'][-10000:]
-            self.logger.debug(f"已清理旧交易记录，保留最近10000条")
+        with self._lock:
+            self.data['trades'].append(trade_record)
+
+            # 限制trades数组大小，防止内存溢出（只保留最近10000条）
+            if len(self.data['trades']) > 10000:
+                self.data['trades'] = self.data['trades'][-10000:]
+                self.logger.debug(f"已清理旧交易记录，保留最近10000条")
         
         self._save_data()
 
@@ -141,7 +150,8 @@ class PerformanceTracker:
             position_info: 持仓信息（包含入场价、方向、数量、杠杆等）
         """
         # 查找对应的开仓记录
-        trades = self.data['trades']
+        with self._lock:
+            trades = list(self.data['trades'])
         entry_trade = None
 
         for trade in reversed(trades):
@@ -179,9 +189,10 @@ class PerformanceTracker:
             pnl = price_diff * quantity * leverage
 
             # 更新开仓记录的pnl
-            entry_trade['pnl'] = round(pnl, 2)
-            entry_trade['close_price'] = close_price
-            entry_trade['close_time'] = datetime.now().isoformat()
+            with self._lock:
+                entry_trade['pnl'] = round(pnl, 2)
+                entry_trade['close_price'] = close_price
+                entry_trade['close_time'] = datetime.now().isoformat()
 
             self._save_data()
             self.logger.info(f"记录平仓: {symbol}, 盈亏: ${pnl:.2f}")
@@ -204,11 +215,12 @@ class PerformanceTracker:
             'return_pct': ((current_value - self.initial_capital) / self.initial_capital) * 100 if self.initial_capital > 0 else 0
         }
 
-        self.data['portfolio_values'].append(snapshot)
+        with self._lock:
+            self.data['portfolio_values'].append(snapshot)
 
-        # 只保留最近 10000 个数据点
-        if len(self.data['portfolio_values']) > 10000:
-            self.data['portfolio_values'] = self.data['portfolio_values'][-10000:]
+            # 只保留最近 10000 个数据点
+            if len(self.data['portfolio_values']) > 10000:
+                self.data['portfolio_values'] = self.data['portfolio_values'][-10000:]
 
         # 保存数据
         try:
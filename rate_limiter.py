@@ -0,0 +1,251 @@
+"""
+Binance 请求权重限流器
+按接口权重记账，用响应头 X-MBX-USED-WEIGHT-1M 校准已用权重，
+只在接近限额时才节流；收到 429/418 时按 Retry-After 暂停该主机的全部请求
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+
+# 每分钟请求权重上限（按IP计算）
+FUTURES_WEIGHT_LIMIT = 2400
+SPOT_WEIGHT_LIMIT = 6000
+
+# 固定权重的接口（未列出的接口权重为1）
+ENDPOINT_WEIGHTS = {
+    '/fapi/v2/account': 5,
+    '/fapi/v2/balance': 5,
+    '/fapi/v2/positionRisk': 5,
+    '/fapi/v1/batchOrders': 5,
+    '/fapi/v1/userTrades': 5,
+    '/fapi/v1/allOrders': 5,
+    '/fapi/v1/income': 30,
+    '/fapi/v1/positionSide/dual': 30,
+    '/api/v3/account': 20,
+    '/api/v3/exchangeInfo': 20,
+}
+
+
+def _klines_weight(params: Dict) -> int:
+    limit = int(params.get('limit', 500))
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def _depth_weight(params: Dict) -> int:
+    limit = int(params.get('limit', 500))
+    if limit <= 50:
+        return 2
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 10
+    return 20
+
+
+def endpoint_weight(method: str, endpoint: str, params: Optional[Dict] = None) -> int:
+    """
+    计算单个请求的权重
+
+    Args:
+        method: HTTP方法
+        endpoint: API端点
+        params: 请求参数（部分接口的权重取决于 limit / symbol）
+
+    Returns:
+        请求权重
+    """
+    params = params or {}
+    if endpoint in ('/fapi/v1/klines', '/fapi/v1/markPriceKlines', '/fapi/v1/indexPriceKlines'):
+        return _klines_weight(params)
+    if endpoint == '/fapi/v1/depth':
+        return _depth_weight(params)
+    if endpoint == '/fapi/v1/ticker/24hr':
+        return 1 if 'symbol' in params else 40
+    if endpoint in ('/fapi/v1/ticker/price', '/fapi/v1/ticker/bookTicker'):
+        return 1 if 'symbol' in params else 2
+    if endpoint == '/fapi/v1/premiumIndex':
+        return 1 if 'symbol' in params else 10
+    if endpoint == '/fapi/v1/openOrders' and method == 'GET':
+        return 1 if 'symbol' in params else 40
+    return ENDPOINT_WEIGHTS.get(endpoint, 1)
+
+
+class RateLimiter:
+    """
+    请求权重限流器（与币安一致按自然分钟窗口计数）
+
+    - acquire(): 发请求前预扣权重；超过软上限时把剩余预算均摊到窗口剩余时间，
+      超过硬上限时等待下一个窗口
+    - update_from_headers(): 用服务器返回的已用权重校准（包含同IP其他进程的消耗）
+    - block(): 收到 429/418 后按 Retry-After 暂停
+    """
+
+    WINDOW_SECONDS = 60
+
+    def __init__(self, weight_limit: int = FUTURES_WEIGHT_LIMIT,
+                 safety_ratio: float = 0.9, soft_ratio: float = 0.7):
+        """
+        Args:
+            weight_limit: 每分钟权重上限
+            safety_ratio: 硬上限比例（为同IP的其他进程留出余量）
+            soft_ratio: 软上限比例，超过后开始匀速节流
+        """
+        self.weight_limit = weight_limit
+        self.hard_limit = int(weight_limit * safety_ratio)
+        self.soft_limit = int(weight_limit * soft_ratio)
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._window = self._current_window()
+        self._used_weight = 0
+        self._blocked_until = 0.0
+
+        # 统计信息
+        self.stats = {
+            'requests': 0,
+            'weight_consumed': 0,
+            'throttled_requests': 0,
+            'throttled_seconds': 0.0,
+            'rate_limit_hits': 0
+        }
+        self.order_count_10s = 0
+        self.order_count_1m = 0
+
+    def _current_window(self) -> int:
+        return int(time.time() // self.WINDOW_SECONDS)
+
+    def _roll_window(self):
+        """进入新的分钟窗口时清零（需持有锁）"""
+        window = self._current_window()
+        if window != self._window:
+            self._window = window
+            self._used_weight = 0
+
+    def _reserve(self, weight: int) -> Tuple[bool, float]:
+        """
+        尝试预扣权重
+
+        Returns:
+            (是否已预扣, 需要等待的秒数)；未预扣时等待后重试，已预扣时等待后直接发送
+        """
+        with self._lock:
+            now = time.time()
+            if now < self._blocked_until:
+                return False, self._blocked_until - now
+
+            self._roll_window()
+            window_remaining = (self._window + 1) * self.WINDOW_SECONDS - now
+            projected = self._used_weight + weight
+
+            if projected > self.hard_limit:
+                return False, window_remaining + 0.05
+
+            delay = 0.0
+            if projected > self.soft_limit:
+                # 把剩余预算均摊到窗口剩余时间内
+                budget_left = max(self.hard_limit - self._used_weight, 1)
+                delay = window_remaining * weight / budget_left
+
+            self._used_weight = projected
+            return True, delay
+
+    def try_acquire(self, weight: int = 1) -> bool:
+        """不等待的预扣：只在软上限以内且未被暂停时预扣（对冲请求等可选请求使用）"""
+        with self._lock:
+            if time.time() < self._blocked_until:
+                return False
+            self._roll_window()
+            if self._used_weight + weight > self.soft_limit:
+                return False
+            self._used_weight += weight
+            self.stats['requests'] += 1
+            self.stats['weight_consumed'] += weight
+            return True
+
+    def acquire(self, weight: int = 1):
+        """发请求前调用，必要时阻塞等待"""
+        waited = 0.0
+        while True:
+            reserved, wait = self._reserve(weight)
+            if wait > 0:
+                time.sleep(wait)
+                waited += wait
+            if reserved:
+                break
+
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['weight_consumed'] += weight
+            if waited > 0:
+                self.stats['throttled_requests'] += 1
+                self.stats['throttled_seconds'] += waited
+
+    def update_from_headers(self, headers):
+        """用响应头校准已用权重和下单计数"""
+        if headers is None:
+            return
+        used = headers.get('X-MBX-USED-WEIGHT-1M') or headers.get('X-MBX-USED-WEIGHT-1m')
+        with self._lock:
+            if used is not None:
+                self._roll_window()
+                # 服务器计数是权威值，但本地可能已预扣了尚未返回的并发请求
+                self._used_weight = max(self._used_weight, int(used))
+            order_10s = headers.get('X-MBX-ORDER-COUNT-10S') or headers.get('X-MBX-ORDER-COUNT-10s')
+            order_1m = headers.get('X-MBX-ORDER-COUNT-1M') or headers.get('X-MBX-ORDER-COUNT-1m')
+            if order_10s is not None:
+                self.order_count_10s = int(order_10s)
+            if order_1m is not None:
+                self.order_count_1m = int(order_1m)
+
+    def block(self, retry_after: Optional[float], status_code: int = 429):
+        """收到 429/418 后暂停请求"""
+        if retry_after is None:
+            # 没有 Retry-After 时等到下一个窗口
+            retry_after = (self._current_window() + 1) * self.WINDOW_SECONDS - time.time()
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.time() + float(retry_after))
+            self._used_weight = max(self._used_weight, self.hard_limit)
+            self.stats['rate_limit_hits'] += 1
+        self.logger.warning(f"[RATE_LIMIT] 收到 {status_code}，暂停请求 {float(retry_after):.1f} 秒")
+
+    def get_status(self) -> Dict:
+        """当前预算和余量"""
+        with self._lock:
+            self._roll_window()
+            now = time.time()
+            return {
+                'used_weight': self._used_weight,
+                'weight_limit': self.weight_limit,
+                'hard_limit': self.hard_limit,
+                'headroom': max(self.hard_limit - self._used_weight, 0),
+                'window_reset_in': round((self._window + 1) * self.WINDOW_SECONDS - now, 2),
+                'blocked_for': round(max(self._blocked_until - now, 0), 2),
+                'order_count_10s': self.order_count_10s,
+                'order_count_1m': self.order_count_1m,
+                **self.stats
+            }
+
+
+# 同一主机（同一IP额度）共享一个限流器，多个 BinanceClient 实例共用
+_shared_limiters: Dict[str, RateLimiter] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter(base_url: str) -> RateLimiter:
+    """获取某个API主机共享的限流器"""
+    with _shared_lock:
+        limiter = _shared_limiters.get(base_url)
+        if limiter is None:
+            is_futures = 'fapi' in base_url or 'binancefuture' in base_url
+            limiter = RateLimiter(FUTURES_WEIGHT_LIMIT if is_futures else SPOT_WEIGHT_LIMIT)
+            _shared_limiters[base_url] = limiter
+        return limiter
@@ -0,0 +1,236 @@
+"""
+请求遥测
+按接口记录请求延迟直方图（对数分桶，相对误差约2%）、重试次数、状态码和已用权重，
+可在进程内查询 p50/p90/p99，也可追加写入 JSONL 文件离线分析
+
+用法:
+    client.stats()                                  # 进程内查询
+    client.telemetry.dump_jsonl('logs/telemetry.jsonl')
+    python request_telemetry.py logs/telemetry.jsonl  # 打印最近一次的各接口延迟
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import threading
+from typing import Dict, List, Optional
+
+
+class LatencyHistogram:
+    """延迟直方图（按对数分桶，桶宽为上一桶的4%，内存与样本数无关）"""
+
+    RATIO = 1.04
+    _LOG_RATIO = math.log(RATIO)
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, seconds: float) -> int:
+        micros = max(seconds * 1e6, 1.0)
+        return int(math.log(micros) / self._LOG_RATIO)
+
+    def _value(self, index: int) -> float:
+        """桶的代表值（桶中点，秒）"""
+        low = self.RATIO ** index
+        return (low + low * self.RATIO) / 2 / 1e6
+
+    def record(self, seconds: float):
+        index = self._index(seconds)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, pct: float) -> float:
+        """分位数（秒），无样本返回0"""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(self.count * pct / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # 代表值不超出实际观测范围
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> Dict:
+        """延迟摘要（毫秒）"""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.mean() * 1000, 2),
+            'p50_ms': round(self.percentile(50) * 1000, 2),
+            'p90_ms': round(self.percentile(90) * 1000, 2),
+            'p99_ms': round(self.percentile(99) * 1000, 2),
+            'max_ms': round((self.max or 0) * 1000, 2)
+        }
+
+
+class EndpointStats:
+    """单个接口的请求统计"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()       # 整个调用（含限流等待和重试）
+        self.http_latency = LatencyHistogram()  # 每次HTTP往返
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.limiter_wait = 0.0
+        self.status_codes: Dict[str, int] = {}
+        self.last_used_weight: Optional[int] = None
+        self.max_used_weight = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'limiter_wait_s': round(self.limiter_wait, 3),
+            'status_codes': dict(self.status_codes),
+            'last_used_weight': self.last_used_weight,
+            'max_used_weight': self.max_used_weight,
+            'latency': self.latency.summary(),
+            'http_latency': self.http_latency.summary()
+        }
+
+
+class RequestTelemetry:
+    """按接口汇总的请求遥测（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self.started_at = time.time()
+
+    def _get(self, method: str, endpoint: str) -> EndpointStats:
+        key = f"{method} {endpoint}"
+        stats = self._endpoints.get(key)
+        if stats is None:
+            stats = self._endpoints[key] = EndpointStats()
+        return stats
+
+    def record_attempt(self, method: str, endpoint: str, elapsed: float,
+                       status_code: Optional[int] = None, used_weight: Optional[int] = None,
+                       limiter_wait: float = 0.0):
+        """
+        记录一次HTTP往返
+
+        Args:
+            elapsed: 往返耗时（秒）
+            status_code: 响应状态码（网络异常时为None）
+            used_weight: 响应头中的已用权重
+            limiter_wait: 本次发送前在限流器中等待的时间（秒）
+        """
+        with self._lock:
+            stats = self._get(method, endpoint)
+            stats.http_latency.record(elapsed)
+            stats.limiter_wait += limiter_wait
+            status = str(status_code) if status_code is not None else 'network_error'
+            stats.status_codes[status] = stats.status_codes.get(status, 0) + 1
+            if used_weight is not None:
+                stats.last_used_weight = used_weight
+                stats.max_used_weight = max(stats.max_used_weight, used_weight)
+
+    def record_request(self, method: str, endpoint: str, elapsed: float,
+                       attempts: int, success: bool):
+        """记录一次完整调用（attempts 为HTTP尝试次数，大于1表示发生重试）"""
+        with self._lock:
+            stats = self._get(method, endpoint)
+            stats.latency.record(elapsed)
+            stats.requests += 1
+            stats.retries += max(attempts - 1, 0)
+            if not success:
+                stats.errors += 1
+
+    def http_percentile(self, method: str, endpoint: str, pct: float,
+                        min_samples: int = 20) -> Optional[float]:
+        """
+        接口HTTP往返延迟的分位数（秒）
+
+        Returns:
+            样本数不足 min_samples 时返回None
+        """
+        with self._lock:
+            stats = self._endpoints.get(f"{method} {endpoint}")
+            if stats is None or stats.http_latency.count < min_samples:
+                return None
+            return stats.http_latency.percentile(pct)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """各接口统计 {'GET /fapi/v1/klines': {...}}"""
+        with self._lock:
+            return {key: stats.to_dict() for key, stats in sorted(self._endpoints.items())}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self.started_at = time.time()
+
+    def dump_jsonl(self, path: str, reset: bool = False):
+        """
+        追加写入一行 JSON（时间戳 + 各接口统计）
+
+        Args:
+            path: 输出文件
+            reset: 写入后清空统计（按周期导出时使用）
+        """
+        with self._lock:
+            line = json.dumps({
+                'timestamp': time.time(),
+                'since': self.started_at,
+                'endpoints': {key: stats.to_dict() for key, stats in sorted(self._endpoints.items())}
+            }, ensure_ascii=False)
+            if reset:
+                self._endpoints.clear()
+                self.started_at = time.time()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+def format_table(endpoints: Dict[str, Dict]) -> str:
+    """按总耗时排序的文本表格"""
+    lines = [f"{'请求数':>6}  {'重试':>4}  {'错误':>4}  {'p50(ms)':>8}  {'p99(ms)':>8}  "
+             f"{'最大(ms)':>9}  {'限流等待(s)':>10}  接口"]
+    rows = sorted(endpoints.items(),
+                  key=lambda item: -item[1]['latency']['mean_ms'] * item[1]['requests'])
+    for key, stats in rows:
+        latency = stats['latency']
+        lines.append(f"{stats['requests']:>6}  {stats['retries']:>4}  {stats['errors']:>4}  "
+                     f"{latency['p50_ms']:>8.1f}  {latency['p99_ms']:>8.1f}  {latency['max_ms']:>9.1f}  "
+                     f"{stats['limiter_wait_s']:>10.2f}  {key}")
+    return '\n'.join(lines)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__)
+        return 1
+
+    last: List[str] = []
+    with open(sys.argv[1], encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                last = [line]
+    if not last:
+        print("文件为空")
+        return 1
+    print(format_table(json.loads(last[0])['endpoints']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -35,13 +35,16 @@ class PositionRisk:
 class RiskManager:
     """交易风险管理器"""
 
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, account_snapshot=None):
         """
         初始化风险管理器
 
         Args:
             config: 风险管理配置
+            account_snapshot: 账户/持仓快照（可选，未传入持仓/余额时从快照读取）
         """
+        self.account_snapshot = account_snapshot
+
         # 资金风控限制
         self.max_portfolio_risk = config.get('max_portfolio_risk', 0.02)  # 单次最大风险2%
         self.max_position_size = config.get('max_position_size', 0.1)  # 单仓位最大10%
@@ -292,14 +295,23 @@ class RiskManager:
 
         return True, "订单验证通过"
 
-    def get_portfolio_risk_summary(self, positions: List[Dict],
-                                   account_balance: float) -> Dict:
+    def get_portfolio_risk_summary(self, positions: Optional[List[Dict]] = None,
+                                   account_balance: Optional[float] = None) -> Dict:
         """
         获取投资组合风险摘要
 
+        Args:
+            positions: 持仓列表（不传时读账户快照）
+            account_balance: 账户余额（不传时读账户快照）
+
         Returns:
             风险指标字典
         """
+        if positions is None:
+            positions = self.account_snapshot.get_positions()
+        if account_balance is None:
+            account_balance = self.account_snapshot.get_balance()
+
         total_unrealized_pnl = sum(float(p.get('unRealizedProfit', 0)) for p in positions)
         total_position_value = sum(
             abs(float(p.get('positionAmt', 0))) * float(p.get('entryPrice', 0))
@@ -366,13 +378,13 @@ class RiskManager:
 
         return None
 
-    def check_liquidation_risk(self, positions: List[Dict],
+    def check_liquidation_risk(self, positions: Optional[List[Dict]] = None,
                                liquidation_threshold: float = 0.03) -> List[Dict]:
         """
         检查清算风险预警
 
         Args:
-            positions: 持仓列表（来自Binance API）
+            positions: 持仓列表（来自Binance API，不传时读账户快照）
             liquidation_threshold: 清算价预警阈值（默认3% = 0.03）
 
         Returns:
@@ -385,6 +397,9 @@ class RiskManager:
             - risk_level: 风险等级 (CRITICAL/HIGH)
             - message: 预警消息
         """
+        if positions is None:
+            positions = self.account_snapshot.get_positions()
+
         warnings = []
 
         for position in positions:
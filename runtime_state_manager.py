@@ -7,6 +7,7 @@
 
 import json
 import logging
+import threading
 from datetime import datetime
 from typing import Dict, Any
 import os
@@ -24,6 +25,9 @@ class RuntimeStateManager:
             state_file: 状态文件路径
         """
         self.state_file = state_file
+        # 多个交易对并发处理：_lock 保护计数的修改和序列化，_save_lock 串行化写文件
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
         self.state = self._load_or_initialize()
 
     def _load_or_initialize(self) -> Dict[str, Any]:
@@ -61,23 +65,28 @@ class RuntimeStateManager:
             state = self.state
 
         try:
-            # 更新最后保存时间
-            state['last_update_timestamp'] = datetime.now().isoformat()
+            with self._save_lock:
+                # 更新最后保存时间（持锁只做序列化）
+                with self._lock:
+                    state['last_update_timestamp'] = datetime.now().isoformat()
+                    content = json.dumps(state, indent=2, ensure_ascii=False)
 
-            with open(self.state_file, 'w', encoding='utf-8') as f:
-                json.dump(state, f, indent=2, ensure_ascii=False)
+                with open(self.state_file, 'w', encoding='utf-8') as f:
+                    f.write(content)
 
         except Exception as e:
             logger.error(f"[ERROR] 保存状态文件失败: {e}")
 
     def increment_ai_calls(self):
         """增加AI调用计数"""
-        self.state['total_ai_calls'] += 1
+        with self._lock:
+            self.state['total_ai_calls'] += 1
         self._save()
 
     def increment_trading_loops(self):
         """增加交易循环计数"""
-        self.state['total_trading_loops'] += 1
+        with self._lock:
+            self.state['total_trading_loops'] += 1
         self._save()
 
     def update_runtime(self):
@@ -86,7 +95,8 @@ class RuntimeStateManager:
         current_time = datetime.now()
         runtime_minutes = int((current_time - start_time).total_seconds() / 60)
 
-        self.state['total_runtime_minutes'] = runtime_minutes
+        with self._lock:
+            self.state['total_runtime_minutes'] = runtime_minutes
         self._save()
 
     def get_state(self) -> Dict[str, Any]:
@@ -107,8 +117,9 @@ class RuntimeStateManager:
     def reset_session(self):
         """重置会话（保留历史总计，但重新开始计时）"""
         logger.info("[LOOP] 重置会话状态")
-        self.state['session_start_time'] = datetime.now().isoformat()
-        self.state['total_runtime_minutes'] = 0
+        with self._lock:
+            self.state['session_start_time'] = datetime.now().isoformat()
+            self.state['total_runtime_minutes'] = 0
         self._save()
 
 
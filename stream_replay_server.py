@@ -0,0 +1,277 @@
+"""
+本地 WebSocket 行情回放服务器
+按币安组合流格式回放录制的消息（JSONL，每行 {"stream": ..., "data": ...}），
+用于离线测试 BinanceStreamClient；/ws/<listenKey> 连接原样推送全部消息（用户数据流事件），
+只依赖标准库（RFC 6455 最小实现）
+
+用法:
+    python stream_replay_server.py recording.jsonl --port 9000 --interval 0.1
+"""
+
+import json
+import time
+import base64
+import socket
+import struct
+import hashlib
+import logging
+import argparse
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+
+def load_recording(path: str) -> List[Dict]:
+    """读取录制的组合流消息（JSONL）"""
+    messages = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                messages.append(json.loads(line))
+    return messages
+
+
+def _encode_frame(opcode: int, payload: bytes) -> bytes:
+    """编码服务端帧（服务端发送不加掩码）"""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 65536:
+        header += bytes([126]) + struct.pack('!H', length)
+    else:
+        header += bytes([127]) + struct.pack('!Q', length)
+    return header + payload
+
+
+def _recv_exact(conn: socket.socket, n: int) -> Optional[bytes]:
+    data = b''
+    while len(data) < n:
+        chunk = conn.recv(n - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _read_frame(conn: socket.socket):
+    """读取客户端帧（客户端帧必须带掩码），返回 (opcode, payload)"""
+    head = _recv_exact(conn, 2)
+    if head is None:
+        return None, None
+    opcode = head[0] & 0x0F
+    masked = head[1] & 0x80
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', _recv_exact(conn, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', _recv_exact(conn, 8))[0]
+    mask = _recv_exact(conn, 4) if masked else b'\x00\x00\x00\x00'
+    payload = _recv_exact(conn, length) if length else b''
+    if payload is None:
+        return None, None
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+class StreamReplayServer:
+    """按录制顺序回放组合流消息的本地 WebSocket 服务器"""
+
+    def __init__(self, messages: List[Dict], host: str = '127.0.0.1', port: int = 0,
+                 interval: float = 0.0, loop: bool = False):
+        """
+        Args:
+            messages: 组合流消息列表 [{"stream": ..., "data": ...}]
+            host: 监听地址
+            port: 监听端口（0 表示随机端口）
+            interval: 每条消息之间的间隔（秒）
+            loop: 回放结束后是否从头循环
+        """
+        self.messages = messages
+        self.interval = interval
+        self.loop = loop
+        self.logger = logging.getLogger(__name__)
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(8)
+        self.host, self.port = self._sock.getsockname()
+
+        self._running = False
+        self._connections: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self.connection_count = 0
+        self.received: List[Dict] = []   # 客户端发来的控制消息（如 SUBSCRIBE）
+        self.paths: List[str] = []       # 客户端连接的请求路径（如 /ws/<listenKey>）
+
+    @property
+    def url(self) -> str:
+        """流地址（传给 BinanceStreamClient 的 stream_url）"""
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self):
+        """后台启动服务器"""
+        self._running = True
+        threading.Thread(target=self._accept_loop, name='stream-replay', daemon=True).start()
+        return self
+
+    def stop(self):
+        """停止服务器并断开所有连接"""
+        self._running = False
+        self.disconnect_clients()
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+    def disconnect_clients(self):
+        """强制断开当前所有客户端（模拟网络中断）"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _handshake(self, conn: socket.socket) -> Optional[str]:
+        """完成 HTTP Upgrade 握手，返回请求路径"""
+        request = b''
+        while b'\r\n\r\n' not in request:
+            chunk = conn.recv(4096)
+            if not chunk:
+                return None
+            request += chunk
+
+        lines = request.decode('latin-1').split('\r\n')
+        path = lines[0].split(' ')[1]
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        key = headers.get('sec-websocket-key', '')
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        conn.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        return path
+
+    def _serve(self, conn: socket.socket):
+        try:
+            path = self._handshake(conn)
+        except OSError:
+            conn.close()
+            return
+        if path is None:
+            conn.close()
+            return
+
+        query = parse_qs(urlparse(path).query)
+        streams = set()
+        for value in query.get('streams', []):
+            streams.update(value.split('/'))
+
+        with self._lock:
+            self._connections.append(conn)
+            self.connection_count += 1
+            self.paths.append(path)
+
+        threading.Thread(target=self._read_loop, args=(conn, streams), daemon=True).start()
+
+        try:
+            while self._running:
+                for message in self.messages:
+                    if not self._running or conn not in self._connections:
+                        return
+                    # 只推送客户端订阅的流
+                    if streams and message.get('stream') not in streams:
+                        continue
+                    conn.sendall(_encode_frame(OPCODE_TEXT, json.dumps(message).encode()))
+                    if self.interval:
+                        time.sleep(self.interval)
+                if not self.loop:
+                    break
+            # 回放结束后保持连接，直到客户端关闭或服务器停止
+            while self._running and conn in self._connections:
+                time.sleep(0.05)
+        except OSError:
+            pass
+
+    def _read_loop(self, conn: socket.socket, streams: set):
+        """处理客户端帧：ping/close 及 SUBSCRIBE 请求"""
+        try:
+            while True:
+                opcode, payload = _read_frame(conn)
+                if opcode is None:
+                    break
+                if opcode == OPCODE_CLOSE:
+                    # 回应关闭帧，完成关闭握手
+                    conn.sendall(_encode_frame(OPCODE_CLOSE, payload))
+                    break
+                if opcode == OPCODE_PING:
+                    conn.sendall(_encode_frame(OPCODE_PONG, payload))
+                elif opcode == OPCODE_TEXT:
+                    request = json.loads(payload.decode())
+                    self.received.append(request)
+                    if request.get('method') == 'SUBSCRIBE':
+                        streams.update(request.get('params', []))
+                    conn.sendall(_encode_frame(OPCODE_TEXT, json.dumps(
+                        {'result': None, 'id': request.get('id')}).encode()))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地币安组合流回放服务器')
+    parser.add_argument('recording', help='录制文件（JSONL）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--interval', type=float, default=0.1, help='消息间隔（秒）')
+    parser.add_argument('--loop', action='store_true', help='循环回放')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = StreamReplayServer(load_recording(args.recording), args.host, args.port,
+                                args.interval, args.loop).start()
+    print(f"回放服务器已启动: {server.url}  (STREAM_URL={server.url})")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
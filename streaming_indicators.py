@@ -0,0 +1,521 @@
+"""
+流式技术指标
+每根K线收盘时 O(1) 更新 EMA / RSI / MACD / ATR / 布林带（滚动均值和标准差），
+计算量与回看长度无关；状态可以快照为 JSON 并恢复，重启后不需要重新预热
+
+与 indicators 模块的批量计算语义一致（SMA 均值的 RSI、真实波幅的简单均值 ATR、
+样本标准差的布林带）；未收盘K线通过 peek 预估当前值，不修改状态
+
+用法:
+    streams = IndicatorStreams(kline_store)
+    state, open_bar = streams.get('BTCUSDT', '3m')
+    state.series('rsi14', 10, open_bar)         # 最近10个值（含未收盘K线）
+"""
+
+import os
+import json
+import math
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from kline_store import INTERVAL_MS, CLOSE_GRACE_MS
+
+
+NAN = float('nan')
+
+# 默认维护的指标（键名与 indicators.compute_all 一致）
+DEFAULT_STREAM_SPEC = {
+    'ema': (20, 50),
+    'rsi': (7, 14),
+    'macd': (12, 26, 9),
+    'atr': (3, 14),
+    'bollinger': (20, 2),
+}
+
+
+class RollingWindow:
+    """定长滑动窗口的均值和样本标准差（滑动 Welford 更新，定期按窗口重算消除累积误差）"""
+
+    RESYNC_INTERVAL = 1000
+
+    def __init__(self, period: int):
+        if period <= 0:
+            raise ValueError(f"指标周期必须大于0: {period}")
+        self.period = period
+        self.values: deque = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._pushes = 0
+
+    def _next(self, x: float) -> Tuple[int, float, float]:
+        """加入 x 之后的 (数量, 均值, 平方差和)"""
+        n = len(self.values)
+        if n < self.period:
+            n += 1
+            mean = self._mean + (x - self._mean) / n
+            return n, mean, self._m2 + (x - self._mean) * (x - mean)
+        old = self.values[0]
+        mean = self._mean + (x - old) / n
+        return n, mean, self._m2 + (x - old) * (x - mean + old - self._mean)
+
+    def push(self, x: float):
+        _, self._mean, self._m2 = self._next(x)
+        if len(self.values) == self.period:
+            self.values.popleft()
+        self.values.append(x)
+
+        self._pushes += 1
+        if self._pushes % self.RESYNC_INTERVAL == 0:
+            self._resync()
+
+    def _resync(self):
+        n = len(self.values)
+        self._mean = sum(self.values) / n if n else 0.0
+        self._m2 = sum((v - self._mean) ** 2 for v in self.values)
+
+    def _stats(self, n: int, mean: float, m2: float) -> Tuple[float, float]:
+        """窗口未满时为NaN（与 pandas rolling 一致）"""
+        if n < self.period:
+            return NAN, NAN
+        std = math.sqrt(max(m2, 0.0) / (n - 1)) if n > 1 else NAN
+        return mean, std
+
+    def stats(self) -> Tuple[float, float]:
+        """(均值, 样本标准差)"""
+        return self._stats(len(self.values), self._mean, self._m2)
+
+    def peek(self, x: float) -> Tuple[float, float]:
+        """加入 x 之后的 (均值, 样本标准差)，不修改窗口"""
+        return self._stats(*self._next(x))
+
+    def snapshot(self) -> Dict:
+        return {'values': list(self.values), 'mean': self._mean, 'm2': self._m2, 'pushes': self._pushes}
+
+    def restore(self, state: Dict):
+        self.values = deque(state['values'][-self.period:])
+        self._mean, self._m2, self._pushes = state['mean'], state['m2'], state['pushes']
+
+
+class StreamingEMA:
+    """指数移动平均（与 ewm(span=period, adjust=False) 一致，第一根K线作为初值）"""
+
+    def __init__(self, period: int):
+        if period <= 0:
+            raise ValueError(f"指标周期必须大于0: {period}")
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.value: Optional[float] = None
+
+    def peek(self, x: float) -> float:
+        if self.value is None:
+            return x
+        return self.value + self.alpha * (x - self.value)
+
+    def update(self, x: float) -> float:
+        self.value = self.peek(x)
+        return self.value
+
+    def snapshot(self) -> Dict:
+        return {'value': self.value}
+
+    def restore(self, state: Dict):
+        self.value = state['value']
+
+
+def _rsi_value(gain: float, loss: float) -> float:
+    """平均涨跌幅 → RSI（跌幅为0时为100，没有涨跌时为NaN）"""
+    if math.isnan(gain) or math.isnan(loss):
+        return NAN
+    if loss == 0:
+        return 100.0 if gain > 0 else NAN
+    return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+class StreamingRSI:
+    """
+    RSI
+
+    wilder=False（默认）：涨跌幅的简单移动平均，与 indicators.rsi 一致（第一根K线涨跌幅记为0）
+    wilder=True：前 period 个涨跌幅取简单平均作为初值，之后按 Wilder 平滑 avg = (avg*(p-1) + x) / p
+    """
+
+    def __init__(self, period: int, wilder: bool = False):
+        self.period = period
+        self.wilder = wilder
+        self.prev_close: Optional[float] = None
+        self.gains = RollingWindow(period)
+        self.losses = RollingWindow(period)
+        self.avg_gain: Optional[float] = None
+        self.avg_loss: Optional[float] = None
+
+    def _delta(self, close: float) -> Tuple[float, float]:
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        return max(delta, 0.0), max(-delta, 0.0)
+
+    def _next(self, close: float) -> Tuple[float, float]:
+        """加入 close 之后的 (平均涨幅, 平均跌幅)"""
+        gain, loss = self._delta(close)
+        if not self.wilder:
+            return self.gains.peek(gain)[0], self.losses.peek(loss)[0]
+        if self.prev_close is None:
+            return NAN, NAN
+        if self.avg_gain is None:
+            # 初值阶段：第一根K线没有涨跌幅，不计入窗口
+            return self.gains.peek(gain)[0], self.losses.peek(loss)[0]
+        p = self.period
+        return (self.avg_gain * (p - 1) + gain) / p, (self.avg_loss * (p - 1) + loss) / p
+
+    def peek(self, close: float) -> float:
+        return _rsi_value(*self._next(close))
+
+    def update(self, close: float) -> float:
+        avg_gain, avg_loss = self._next(close)
+        if not self.wilder or (self.prev_close is not None and self.avg_gain is None):
+            gain, loss = self._delta(close)
+            self.gains.push(gain)
+            self.losses.push(loss)
+        if self.wilder and not math.isnan(avg_gain):
+            self.avg_gain, self.avg_loss = avg_gain, avg_loss
+        self.prev_close = close
+        return _rsi_value(avg_gain, avg_loss)
+
+    def snapshot(self) -> Dict:
+        return {
+            'prev_close': self.prev_close,
+            'gains': self.gains.snapshot(),
+            'losses': self.losses.snapshot(),
+            'avg_gain': self.avg_gain,
+            'avg_loss': self.avg_loss
+        }
+
+    def restore(self, state: Dict):
+        self.prev_close = state['prev_close']
+        self.gains.restore(state['gains'])
+        self.losses.restore(state['losses'])
+        self.avg_gain = state['avg_gain']
+        self.avg_loss = state['avg_loss']
+
+
+class StreamingMACD:
+    """MACD（快慢 EMA 之差及其信号线）"""
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast = StreamingEMA(fast_period)
+        self.slow = StreamingEMA(slow_period)
+        self.signal = StreamingEMA(signal_period)
+
+    def peek(self, close: float) -> Tuple[float, float, float]:
+        """(MACD线, 信号线, 柱状图)"""
+        macd_line = self.fast.peek(close) - self.slow.peek(close)
+        signal_line = self.signal.peek(macd_line)
+        return macd_line, signal_line, macd_line - signal_line
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        macd_line = self.fast.update(close) - self.slow.update(close)
+        signal_line = self.signal.update(macd_line)
+        return macd_line, signal_line, macd_line - signal_line
+
+    def snapshot(self) -> Dict:
+        return {'fast': self.fast.snapshot(), 'slow': self.slow.snapshot(), 'signal': self.signal.snapshot()}
+
+    def restore(self, state: Dict):
+        self.fast.restore(state['fast'])
+        self.slow.restore(state['slow'])
+        self.signal.restore(state['signal'])
+
+
+class StreamingATR:
+    """平均真实波幅（真实波幅的简单移动平均，第一根K线的真实波幅为 high-low）"""
+
+    def __init__(self, period: int = 14):
+        self.prev_close: Optional[float] = None
+        self.window = RollingWindow(period)
+
+    def _true_range(self, high: float, low: float) -> float:
+        if self.prev_close is None:
+            return high - low
+        return max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+    def peek(self, high: float, low: float, close: float) -> float:
+        return self.window.peek(self._true_range(high, low))[0]
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self.window.push(self._true_range(high, low))
+        self.prev_close = close
+        return self.window.stats()[0]
+
+    def snapshot(self) -> Dict:
+        return {'prev_close': self.prev_close, 'window': self.window.snapshot()}
+
+    def restore(self, state: Dict):
+        self.prev_close = state['prev_close']
+        self.window.restore(state['window'])
+
+
+class StreamingBollinger:
+    """布林带（滚动均值 ± std_dev 倍样本标准差）"""
+
+    def __init__(self, period: int = 20, std_dev: float = 2):
+        self.std_dev = std_dev
+        self.window = RollingWindow(period)
+
+    def _bands(self, mean: float, std: float) -> Tuple[float, float, float]:
+        return mean + std * self.std_dev, mean, mean - std * self.std_dev
+
+    def peek(self, close: float) -> Tuple[float, float, float]:
+        """(上轨, 中轨, 下轨)"""
+        return self._bands(*self.window.peek(close))
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        self.window.push(close)
+        return self._bands(*self.window.stats())
+
+    def snapshot(self) -> Dict:
+        return self.window.snapshot()
+
+    def restore(self, state: Dict):
+        self.window.restore(state)
+
+
+class IndicatorState:
+    """单个 (交易对, 周期) 的全部流式指标和最近的指标值历史"""
+
+    def __init__(self, spec: Optional[Dict] = None, history: int = 100):
+        self.spec = spec or DEFAULT_STREAM_SPEC
+        self.last_open_time: Optional[int] = None
+        self.bars = 0
+        self.history: deque = deque(maxlen=history)
+
+        self.emas = {period: StreamingEMA(period) for period in self.spec.get('ema', ())}
+        self.rsis = {period: StreamingRSI(period) for period in self.spec.get('rsi', ())}
+        self.atrs = {period: StreamingATR(period) for period in self.spec.get('atr', ())}
+        self.macd = StreamingMACD(*self.spec['macd']) if self.spec.get('macd') else None
+        self.bollinger = StreamingBollinger(*self.spec['bollinger']) if self.spec.get('bollinger') else None
+
+    def _values(self, bar: List, mutate: bool) -> Dict[str, float]:
+        high, low, close = float(bar[2]), float(bar[3]), float(bar[4])
+        values = {'open_time': int(bar[0]), 'close': close, 'volume': float(bar[5])}
+
+        for period, ema in self.emas.items():
+            values[f'ema{period}'] = ema.update(close) if mutate else ema.peek(close)
+        for period, rsi in self.rsis.items():
+            values[f'rsi{period}'] = rsi.update(close) if mutate else rsi.peek(close)
+        for period, atr in self.atrs.items():
+            values[f'atr{period}'] = atr.update(high, low, close) if mutate else atr.peek(high, low, close)
+        if self.macd is not None:
+            macd = self.macd.update(close) if mutate else self.macd.peek(close)
+            values['macd'], values['macd_signal'], values['macd_hist'] = macd
+        if self.bollinger is not None:
+            bands = self.bollinger.update(close) if mutate else self.bollinger.peek(close)
+            values['bb_upper'], values['bb_middle'], values['bb_lower'] = bands
+        return values
+
+    def update(self, bar: List) -> Dict[str, float]:
+        """新收盘K线（币安K线数组格式）→ 更新后的指标值"""
+        values = self._values(bar, mutate=True)
+        self.history.append(values)
+        self.last_open_time = values['open_time']
+        self.bars += 1
+        return values
+
+    def peek(self, bar: List) -> Dict[str, float]:
+        """未收盘K线的预估指标值（不修改状态）"""
+        return self._values(bar, mutate=False)
+
+    def current(self, open_bar: Optional[List] = None) -> Optional[Dict[str, float]]:
+        """当前指标值（传入未收盘K线时返回其预估值）"""
+        if open_bar is not None:
+            return self.peek(open_bar)
+        return self.history[-1] if self.history else None
+
+    def available(self, open_bar: Optional[List] = None) -> int:
+        """可提供的历史值数量"""
+        return len(self.history) + (1 if open_bar is not None else 0)
+
+    def series(self, name: str, limit: int, open_bar: Optional[List] = None) -> List[float]:
+        """最近 limit 个指标值（从旧到新，含未收盘K线的预估值）"""
+        rows = list(self.history)
+        if open_bar is not None:
+            rows.append(self.peek(open_bar))
+        return [row[name] for row in rows[-limit:]]
+
+    def snapshot(self) -> Dict:
+        return {
+            'last_open_time': self.last_open_time,
+            'bars': self.bars,
+            'history': list(self.history),
+            'emas': {str(p): ema.snapshot() for p, ema in self.emas.items()},
+            'rsis': {str(p): rsi.snapshot() for p, rsi in self.rsis.items()},
+            'atrs': {str(p): atr.snapshot() for p, atr in self.atrs.items()},
+            'macd': self.macd.snapshot() if self.macd is not None else None,
+            'bollinger': self.bollinger.snapshot() if self.bollinger is not None else None
+        }
+
+    def restore(self, state: Dict):
+        self.last_open_time = state['last_open_time']
+        self.bars = state['bars']
+        self.history.clear()
+        self.history.extend(state['history'])
+        for period, ema in self.emas.items():
+            ema.restore(state['emas'][str(period)])
+        for period, rsi in self.rsis.items():
+            rsi.restore(state['rsis'][str(period)])
+        for period, atr in self.atrs.items():
+            atr.restore(state['atrs'][str(period)])
+        if self.macd is not None:
+            self.macd.restore(state['macd'])
+        if self.bollinger is not None:
+            self.bollinger.restore(state['bollinger'])
+
+
+class IndicatorStreams:
+    """按 (交易对, 周期) 维护流式指标，从 KlineStore 读取并只消费新收盘的K线"""
+
+    def __init__(self, kline_store, warmup_bars: int = 200, sync_bars: int = 20,
+                 history: int = 100, spec: Optional[Dict] = None):
+        """
+        初始化流式指标
+
+        Args:
+            kline_store: KlineStore实例
+            warmup_bars: 首次建立状态或断档时用于预热的K线数量
+            sync_bars: 每次同步读取的尾部K线数量
+            history: 每个状态保留的指标值历史长度
+            spec: 指标周期配置，默认 DEFAULT_STREAM_SPEC
+        """
+        self.kline_store = kline_store
+        self.warmup_bars = warmup_bars
+        self.sync_bars = sync_bars
+        self.history = history
+        self.spec = spec or DEFAULT_STREAM_SPEC
+        self.logger = logging.getLogger(__name__)
+
+        self._states: Dict[Tuple[str, str], IndicatorState] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        # 统计信息
+        self.stats = {
+            'warmups': 0,
+            'bars_applied': 0,
+            'restored': 0
+        }
+
+    def _get_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    @staticmethod
+    def _split(klines: List[List], now_ms: int) -> Tuple[List[List], Optional[List]]:
+        """(已收盘K线, 未收盘K线)"""
+        if klines and int(klines[-1][6]) + CLOSE_GRACE_MS >= now_ms:
+            return klines[:-1], klines[-1]
+        return klines, None
+
+    def _apply(self, state: IndicatorState, closed: List[List], interval_ms: int) -> bool:
+        """按顺序应用新收盘K线，与状态之间有缺口时返回False"""
+        new = [bar for bar in closed if int(bar[0]) > state.last_open_time]
+        if new and int(new[0][0]) != state.last_open_time + interval_ms:
+            return False
+        for bar in new:
+            state.update(bar)
+        self.stats['bars_applied'] += len(new)
+        return True
+
+    def get(self, symbol: str, interval: str) -> Tuple[Optional[IndicatorState], Optional[List]]:
+        """
+        同步并返回指标状态
+
+        Returns:
+            (IndicatorState, 未收盘K线)；不支持的周期返回 (None, None)
+        """
+        if interval not in INTERVAL_MS:
+            return None, None
+
+        key = (symbol, interval)
+        interval_ms = INTERVAL_MS[interval]
+        with self._get_lock(key):
+            now_ms = int(time.time() * 1000)
+            state = self._states.get(key)
+
+            if state is not None and state.last_open_time is not None:
+                closed, open_bar = self._split(self.kline_store.get_klines(symbol, interval, self.sync_bars), now_ms)
+                if self._apply(state, closed, interval_ms):
+                    return state, open_bar
+                # 尾部K线与状态之间有缺口：读取更长的历史补齐，仍然接不上时重新预热
+                closed, open_bar = self._split(self.kline_store.get_klines(symbol, interval, self.warmup_bars), now_ms)
+                if self._apply(state, closed, interval_ms):
+                    return state, open_bar
+            else:
+                closed, open_bar = self._split(self.kline_store.get_klines(symbol, interval, self.warmup_bars), now_ms)
+
+            state = IndicatorState(self.spec, self.history)
+            for bar in closed:
+                state.update(bar)
+            self._states[key] = state
+            self.stats['warmups'] += 1
+            self.stats['bars_applied'] += len(closed)
+            return state, open_bar
+
+    # ========== 快照 ==========
+
+    def snapshot(self) -> Dict:
+        """全部状态（可 JSON 序列化）"""
+        states = {}
+        for (symbol, interval) in list(self._states):
+            with self._get_lock((symbol, interval)):
+                states[f'{symbol}|{interval}'] = self._states[(symbol, interval)].snapshot()
+        return {'spec': {name: list(value) for name, value in self.spec.items()}, 'states': states}
+
+    def restore(self, data: Dict) -> int:
+        """
+        恢复快照（指标配置不一致时忽略）
+
+        Returns:
+            恢复的状态数量
+        """
+        spec = {name: list(value) for name, value in self.spec.items()}
+        if data.get('spec') != spec:
+            self.logger.warning("[INDICATOR] 指标配置已变化，忽略快照")
+            return 0
+
+        for name, state_data in data.get('states', {}).items():
+            symbol, interval = name.split('|')
+            state = IndicatorState(self.spec, self.history)
+            state.restore(state_data)
+            with self._get_lock((symbol, interval)):
+                self._states[(symbol, interval)] = state
+        self.stats['restored'] += len(data.get('states', {}))
+        return len(data.get('states', {}))
+
+    def save(self, path: str):
+        """写入 JSON 文件（先写临时文件再替换）"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """
+        从 JSON 文件恢复（文件不存在或损坏时返回0）
+
+        Returns:
+            恢复的状态数量
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, encoding='utf-8') as f:
+                return self.restore(json.load(f))
+        except Exception as e:
+            self.logger.warning(f"[INDICATOR] 加载指标快照失败: {e}")
+            return 0
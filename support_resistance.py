@@ -0,0 +1,178 @@
+"""
+支撑/阻力位检测
+用单调队列求滑动窗口最高/最低价（每根K线最多入队、出队各一次，整体 O(n)），
+窗口中心等于窗口极值的K线记为枢轴点，再把价格相近的枢轴点聚合成价格区间并统计触及次数
+
+区间不区分来源：由高点形成的区间跌破后同样作为支撑（角色互换），
+按当前价格划分支撑（下方）和阻力（上方）
+"""
+
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# 默认参数：枢轴点左右各 5 根K线，价格相差 0.5% 以内的枢轴点合并为同一区间
+DEFAULT_ORDER = 5
+DEFAULT_TOLERANCE = 0.005
+
+
+# ========== 滑动窗口极值 ==========
+
+def sliding_max(values, window: int) -> np.ndarray:
+    """
+    滑动窗口最大值（单调递减队列）
+
+    Args:
+        values: 一维序列
+        window: 窗口大小
+
+    Returns:
+        长度为 len(values) - window + 1 的数组，第 i 个为 values[i:i + window] 的最大值
+    """
+    if window < 1:
+        raise ValueError(f"窗口必须大于0: {window}")
+    data = np.asarray(values, dtype=np.float64).tolist()
+    if len(data) < window:
+        return np.empty(0)
+
+    result = np.empty(len(data) - window + 1)
+    queue = deque()  # 下标，对应的值单调递减
+    for i, value in enumerate(data):
+        while queue and data[queue[-1]] <= value:
+            queue.pop()
+        queue.append(i)
+        if queue[0] <= i - window:
+            queue.popleft()
+        if i >= window - 1:
+            result[i - window + 1] = data[queue[0]]
+    return result
+
+
+def sliding_min(values, window: int) -> np.ndarray:
+    """滑动窗口最小值（对取负后的序列求最大值）"""
+    return -sliding_max(-np.asarray(values, dtype=np.float64), window)
+
+
+# ========== 枢轴点 ==========
+
+def _pivots(values: np.ndarray, centered: np.ndarray, order: int) -> np.ndarray:
+    """窗口中心等于窗口极值的位置；相邻 order 根内同价的平台只保留第一根"""
+    if len(centered) == 0:
+        return np.empty(0, dtype=np.int64)
+    index = np.flatnonzero(values[order:len(values) - order] == centered) + order
+    if len(index) > 1:
+        duplicate = (np.diff(index) <= order) & (values[index[1:]] == values[index[:-1]])
+        index = index[np.concatenate(([True], ~duplicate))]
+    return index
+
+
+def find_pivots(high, low, order: int = DEFAULT_ORDER) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    寻找枢轴高点和低点
+
+    Args:
+        high: 最高价序列
+        low: 最低价序列
+        order: 左右各比较的K线数量（窗口为 2 * order + 1）
+
+    Returns:
+        (枢轴高点下标, 枢轴低点下标)
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    window = 2 * order + 1
+    return (_pivots(high, sliding_max(high, window), order),
+            _pivots(low, sliding_min(low, window), order))
+
+
+# ========== 价格区间 ==========
+
+def cluster_levels(prices, bar_index, tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """
+    把相近的枢轴价格聚合成区间
+
+    按价格排序后顺序扫描，与当前区间最低价相差不超过 tolerance（比例）的并入该区间
+
+    Args:
+        prices: 枢轴点价格
+        bar_index: 枢轴点所在K线下标
+        tolerance: 合并阈值（相对价格的比例）
+
+    Returns:
+        按价格升序的区间列表，每个区间包含 price（均价）、low、high、touches、last_index
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    bar_index = np.asarray(bar_index, dtype=np.int64)
+    order = np.argsort(prices, kind='stable')
+
+    zones = []
+    members = []
+    for i in order:
+        price = float(prices[i])
+        if members and price > prices[members[0]] * (1 + tolerance):
+            zones.append(_make_zone(prices[members], bar_index[members]))
+            members = []
+        members.append(i)
+    if members:
+        zones.append(_make_zone(prices[members], bar_index[members]))
+    return zones
+
+
+def _make_zone(prices: np.ndarray, bar_index: np.ndarray) -> Dict:
+    return {
+        'price': float(prices.mean()),
+        'low': float(prices.min()),
+        'high': float(prices.max()),
+        'touches': int(len(prices)),
+        'last_index': int(bar_index.max())
+    }
+
+
+def find_zones(high, low, order: int = DEFAULT_ORDER, tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """
+    枢轴高点和低点合并聚类得到的支撑/阻力区间
+
+    Returns:
+        按价格升序的区间列表（见 cluster_levels）
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    highs, lows = find_pivots(high, low, order)
+    return cluster_levels(np.concatenate((high[highs], low[lows])),
+                          np.concatenate((highs, lows)), tolerance)
+
+
+def split_levels(zones: List[Dict], price: float, max_levels: int = 3) -> Dict[str, List[Dict]]:
+    """
+    按当前价格划分支撑和阻力，各自按距离由近到远取前 max_levels 个
+
+    Returns:
+        {'support': [...], 'resistance': [...]}
+    """
+    support = [zone for zone in reversed(zones) if zone['price'] < price]
+    resistance = [zone for zone in zones if zone['price'] >= price]
+    return {'support': support[:max_levels], 'resistance': resistance[:max_levels]}
+
+
+def detect_levels(high, low, price: Optional[float] = None, order: int = DEFAULT_ORDER,
+                  tolerance: float = DEFAULT_TOLERANCE, max_levels: int = 3) -> Dict[str, List[Dict]]:
+    """
+    一次完成枢轴点检测、聚类和划分
+
+    Args:
+        high: 最高价序列
+        low: 最低价序列
+        price: 当前价格，默认取最后一根K线最高价和最低价的中点
+        order: 枢轴点左右比较的K线数量
+        tolerance: 合并阈值（比例）
+        max_levels: 支撑/阻力各保留的数量
+
+    Returns:
+        {'support': [...], 'resistance': [...]}
+    """
+    zones = find_zones(high, low, order, tolerance)
+    if price is None:
+        price = (float(high[-1]) + float(low[-1])) / 2 if len(high) else 0.0
+    return split_levels(zones, price, max_levels)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+测试账户/持仓快照
+AccountSnapshot 包装只有账户和持仓两个接口的 Mock 客户端，按请求次数判断是否命中快照
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import logging
+import time
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from account_snapshot import AccountSnapshot
+from binance_client import BinanceClient
+from ai_trading_engine import AITradingEngine
+
+
+POSITIONS = [
+    {'symbol': 'BTCUSDT', 'positionAmt': '0.010', 'entryPrice': '60000', 'markPrice': '61000',
+     'unRealizedProfit': '10', 'leverage': '5'},
+    {'symbol': 'ETHUSDT', 'positionAmt': '0', 'entryPrice': '0', 'markPrice': '3000',
+     'unRealizedProfit': '0', 'leverage': '5'},
+]
+
+ACCOUNT = {'totalWalletBalance': '1000.5', 'availableBalance': '800.25'}
+
+
+def make_client():
+    client = Mock(spec=['get_futures_account_info', 'get_active_positions'])
+    client.get_futures_account_info.return_value = ACCOUNT
+    client.get_active_positions.return_value = [p for p in POSITIONS if float(p['positionAmt']) != 0]
+    return client
+
+
+class TestAccountSnapshot(unittest.TestCase):
+    """测试账户/持仓快照"""
+
+    def test_shared_within_ttl(self):
+        """TTL 内反复查询余额、可用余额和持仓只请求一次，汇总包含未实现盈亏"""
+        client = make_client()
+        snapshot = AccountSnapshot(client, ttl=10)
+
+        for _ in range(5):
+            self.assertEqual(snapshot.get_balance(), 1000.5)
+            self.assertEqual(snapshot.get_available_balance(), 800.25)
+            positions = snapshot.get_positions()
+            self.assertEqual([p['symbol'] for p in positions], ['BTCUSDT'])
+
+        self.assertIsNone(snapshot.get_position('ETHUSDT'))
+        summary = snapshot.get_summary()
+        self.assertEqual(summary['unrealized_pnl'], 10.0)
+        self.assertEqual(summary['total_value'], 1010.5)
+
+        self.assertEqual(client.get_futures_account_info.call_count, 1)
+        self.assertEqual(client.get_active_positions.call_count, 1)
+
+        # 调用方修改返回值不影响快照
+        positions[0]['positionAmt'] = '0'
+        self.assertEqual(snapshot.get_position('BTCUSDT')['positionAmt'], '0.010')
+
+    def test_invalidated_after_order(self):
+        """签名的下单请求成功后快照失效，查询请求不会"""
+        client = BinanceClient('key', 'secret')
+        client.get_futures_account_info = Mock(return_value=ACCOUNT)
+        client.get_futures_positions = Mock(return_value=POSITIONS)
+        snapshot = AccountSnapshot(client, ttl=10)
+
+        response = Mock(status_code=200, headers={})
+        response.json.return_value = {'orderId': 1}
+        client.session = Mock()
+        client.session.post.return_value = response
+        client.session.get.return_value = response
+
+        snapshot.get_balance()
+        client._request('GET', '/fapi/v1/openOrders', signed=True, futures=True)
+        snapshot.get_balance()
+        self.assertEqual(client.get_futures_account_info.call_count, 1)
+
+        client.create_futures_order('BTCUSDT', 'BUY', 'MARKET', quantity=0.001)
+        self.assertEqual(snapshot.stats['invalidations'], 1)
+        snapshot.get_balance()
+        self.assertEqual(client.get_futures_account_info.call_count, 2)
+
+    def test_expired_refetch(self):
+        """超过 TTL 后重新请求"""
+        client = make_client()
+        snapshot = AccountSnapshot(client, ttl=10)
+        clock = {'now': 1000.0}
+        with patch('account_snapshot.time.time', lambda: clock['now']):
+            snapshot.get_positions()
+            clock['now'] += 5
+            snapshot.get_positions()
+            self.assertEqual(client.get_active_positions.call_count, 1)
+            clock['now'] += 6
+            snapshot.get_positions()
+            self.assertEqual(client.get_active_positions.call_count, 2)
+
+    def test_engine_reads_snapshot(self):
+        """AI引擎的账户信息和是否持仓的判断读快照，不直接请求"""
+        client = make_client()
+        snapshot = AccountSnapshot(client, ttl=10)
+
+        engine = AITradingEngine.__new__(AITradingEngine)
+        engine.logger = logging.getLogger('test')
+        engine.binance = Mock()
+        engine.account_snapshot = snapshot
+        engine.trade_history = []
+        engine.reasoner_interval = 600
+        engine.last_reasoner_time = time.time()
+
+        account_info = engine._get_account_info()
+        self.assertEqual(account_info['balance'], 1000.5)
+        self.assertEqual(account_info['total_value'], 1010.5)
+
+        # 已有持仓且无其他触发条件：使用日常模型
+        self.assertFalse(engine._should_use_reasoner('BTCUSDT', {'price_change_24h': 1}, account_info))
+        # 无持仓：开仓决策使用推理模型
+        engine.last_reasoner_time = time.time()
+        self.assertTrue(engine._should_use_reasoner('SOLUSDT', {'price_change_24h': 1}, account_info))
+
+        engine.binance.get_futures_usdt_balance.assert_not_called()
+        engine.binance.get_active_positions.assert_not_called()
+        self.assertEqual(client.get_futures_account_info.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+测试异步Binance客户端
+假客户端每个请求耗时0.1秒，用总耗时判断请求是否并发
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from async_binance_client import AsyncBinanceClient
+from market_analyzer import MarketAnalyzer
+from testing_fakes import FakeMarketClient
+
+
+class TestAsyncBinanceClient(unittest.TestCase):
+    """测试异步Binance客户端"""
+
+    def setUp(self):
+        self.client = FakeMarketClient(delay=0.1)
+        self.async_client = AsyncBinanceClient(self.client)
+
+    def tearDown(self):
+        self.async_client.close()
+
+    def test_same_method_surface(self):
+        """BinanceClient 的方法映射为同名协程"""
+        result = asyncio.run(self.async_client.get_open_interest('BTCUSDT'))
+        self.assertEqual(result, {'openInterest': '5000'})
+
+    def test_gather_is_concurrent(self):
+        """9个请求并发发出，总耗时远小于顺序执行"""
+        start = time.time()
+        context = asyncio.run(self.async_client.gather_market_context('BTCUSDT'))
+        elapsed = time.time() - start
+
+        self.assertEqual(len(self.client.requests), 9)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(context['open_interest'], {'openInterest': '5000'})
+        self.assertEqual(sorted(context['klines']), ['1h', '1m', '3m', '4h'])
+        self.assertEqual(len(context['klines']['1h']), 500)
+        self.assertEqual(context['errors'], {})
+
+    def test_single_failure_is_isolated(self):
+        """订单簿请求失败时记入 errors，其余结果正常返回"""
+        def broken(symbol):
+            raise Exception("API请求失败: 503")
+        self.client.get_order_book = lambda symbol, limit=20: broken(symbol)
+
+        context = asyncio.run(self.async_client.gather_market_context('BTCUSDT'))
+        self.assertIsNone(context['order_book'])
+        self.assertIn('order_book', context['errors'])
+        self.assertIsNotNone(context['ticker_24h'])
+
+    def test_analyzer_reuses_prefetched_data(self):
+        """完整市场上下文只请求一次 ticker / 持仓量，不请求用不到的订单簿"""
+        analyzer = MarketAnalyzer(self.client, async_client=self.async_client)
+        context = analyzer.get_comprehensive_market_context('BTCUSDT').prefetch()
+        context.to_dict()
+
+        self.assertEqual(self.client.requests.count('ticker'), 1)
+        self.assertEqual(self.client.requests.count('order_book'), 0)
+        self.assertEqual(self.client.requests.count('open_interest'), 1)
+        self.assertEqual(self.client.requests.count('klines_1h'), 1)
+        self.assertEqual(context['price_change_24h'], 1.5)
+        self.assertEqual(context['futures_market']['open_interest']['average'], 5000.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
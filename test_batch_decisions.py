@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+测试批量决策
+一次 AI 调用为多个交易对返回决策：依次检查 DeepSeekClient 的解析、AITradingEngine 的批量接口
+和 AlphaArenaBot 的分发
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import logging
+import os
+import sys
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ai_trading_engine import AITradingEngine
+from deepseek_client import DeepSeekClient
+from testing_fakes import make_bot
+
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT']
+
+BATCH_RESPONSE = """分析如下：
+```json
+[
+  {"symbol": "BTCUSDT", "action": "OPEN_LONG", "confidence": 72, "reasoning": "趋势向上", "leverage": 5,
+   "position_size": 8, "stop_loss_pct": 2, "take_profit_pct": 6},
+  {"symbol": "ethusdt", "action": "HOLD", "confidence": 40, "reasoning": "震荡"},
+  {"symbol": "DOGEUSDT", "action": "OPEN_SHORT", "confidence": 90}
+]
+```"""
+
+
+def completion(content):
+    return {'choices': [{'message': {'content': content}}]}
+
+
+class TestBatchDecisions(unittest.TestCase):
+    """测试批量决策"""
+
+    def test_parse_batch_response(self):
+        """JSON 数组按交易对解析，交易对名大小写不敏感，忽略多余的、列出缺少的；无法解析或请求失败时不成功"""
+        client = DeepSeekClient('test_key')
+        with patch.object(client, 'chat_completion', return_value=completion(BATCH_RESPONSE)) as chat:
+            result = client.analyze_batch_and_decide('PROMPT', SYMBOLS)
+        self.assertTrue(result['success'])
+        self.assertEqual(set(result['decisions']), {'BTCUSDT', 'ETHUSDT'})
+        self.assertEqual(result['missing'], ['SOLUSDT'])
+        btc = result['decisions']['BTCUSDT']
+        self.assertEqual((btc['action'], btc['leverage'], btc['position_size']), ('OPEN_LONG', 5, 8))
+        self.assertEqual(result['decisions']['ETHUSDT']['stop_loss_pct'], 3)
+        self.assertEqual(chat.call_count, 1)
+        self.assertIn('SOLUSDT', chat.call_args.args[0][1]['content'])
+
+        for content in ('{"action": "HOLD"}', '[{"symbol": "BTCUSDT", "action": }]', '[]'):
+            with patch.object(client, 'chat_completion', return_value=completion(content)):
+                self.assertFalse(client.analyze_batch_and_decide('PROMPT', SYMBOLS)['success'])
+        with patch.object(client, 'chat_completion', side_effect=Exception('timeout')):
+            self.assertFalse(client.analyze_batch_and_decide('PROMPT', SYMBOLS)['success'])
+
+    def test_parse_batch_with_bracketed_prose(self):
+        """数组前后的说明文字含方括号时仍解析出决策数组"""
+        client = DeepSeekClient('test_key')
+        content = ("[注意] 以下为 [BTCUSDT, ETHUSDT] 的决策：\n"
+                   '[{"symbol": "BTCUSDT", "action": "OPEN_SHORT", "confidence": 65}, '
+                   '{"symbol": "ETHUSDT", "action": "HOLD", "confidence": 50}]\n'
+                   "风险提示见 [附录1] 和 [2]。")
+        with patch.object(client, 'chat_completion', return_value=completion(content)):
+            result = client.analyze_batch_and_decide('PROMPT', SYMBOLS)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['decisions']['BTCUSDT']['action'], 'OPEN_SHORT')
+        self.assertEqual(result['decisions']['ETHUSDT']['confidence'], 50)
+        self.assertEqual(result['missing'], ['SOLUSDT'])
+
+    def test_engine_batch_and_preset(self):
+        """AI引擎用完整提示词批量决策，失败或没有增强引擎时返回空字典；传入的决策直接执行"""
+        engine = AITradingEngine.__new__(AITradingEngine)
+        engine.logger = logging.getLogger('test')
+        engine.enhanced_features_enabled = True
+        engine.enhanced_engine = Mock()
+        engine.enhanced_engine.generate_comprehensive_prompt.return_value = 'PROMPT'
+        engine.runtime_manager = Mock()
+        engine.deepseek = Mock()
+        engine.deepseek.analyze_batch_and_decide.return_value = {
+            'success': True, 'decisions': {'BTCUSDT': {'action': 'HOLD'}}, 'missing': ['ETHUSDT']
+        }
+        self.assertEqual(engine.decide_batch(['BTCUSDT', 'ETHUSDT']), {'BTCUSDT': {'action': 'HOLD'}})
+        engine.enhanced_engine.generate_comprehensive_prompt.assert_called_once_with(['BTCUSDT', 'ETHUSDT'])
+        engine.runtime_manager.increment_ai_calls.assert_called_once()
+
+        engine.deepseek.analyze_batch_and_decide.return_value = {'success': False, 'error': 'bad json'}
+        self.assertEqual(engine.decide_batch(['BTCUSDT']), {})
+        engine.enhanced_engine = None
+        self.assertEqual(engine.decide_batch(['BTCUSDT']), {})
+
+        engine.trade_cooldown = {}
+        engine.trade_history = []
+        engine._decide_single = Mock()
+        engine._execute_trade = Mock(return_value={'success': True, 'action': 'OPEN_LONG'})
+        engine._record_trade = Mock()
+        decision = {'action': 'OPEN_LONG', 'confidence': 70, 'reasoning': 'x', 'leverage': 5}
+        result = engine.analyze_and_trade('BTCUSDT', 10.0, preset_decision=decision)
+        self.assertTrue(result['success'])
+        engine._decide_single.assert_not_called()
+        engine._execute_trade.assert_called_once_with('BTCUSDT', decision, 10.0)
+
+        closing = engine.analyze_position_for_closing('BTCUSDT', {}, preset_decision={'action': 'CLOSE'})
+        self.assertEqual(closing, {'success': True, 'decision': {'action': 'CLOSE'}})
+
+
+class TestBotBatchMode(unittest.TestCase):
+    """测试机器人批量决策模式"""
+
+    def make_bot(self, **env):
+        return make_bot(self, SYMBOLS, **{'BATCH_DECISIONS': 'true', **env})
+
+    def test_batch_dispatch(self):
+        """每轮一次批量决策，缺少决策或批量失败的交易对单独决策；关闭批量模式时不调用"""
+        bot = self.make_bot()
+        btc = {'action': 'OPEN_LONG'}
+        bot.ai_engine.decide_batch.return_value = {'BTCUSDT': btc}
+        bot._process_symbol = Mock()
+        bot._process_symbols(SYMBOLS)
+
+        bot.ai_engine.decide_batch.assert_called_once_with(SYMBOLS)
+        dispatched = {c.args[0]: c.args[2] for c in bot._process_symbol.call_args_list}
+        self.assertEqual(dispatched, {'BTCUSDT': btc, 'ETHUSDT': None, 'SOLUSDT': None})
+        self.assertEqual(bot.total_invocations, 1)
+
+        bot.ai_engine.decide_batch.side_effect = Exception('boom')
+        bot._process_symbols(SYMBOLS)
+        self.assertEqual(bot._process_symbol.call_count, 6)
+
+        single = self.make_bot(BATCH_DECISIONS='false', SYMBOL_CONCURRENCY='1')
+        single.ai_engine.reset_mock()
+        single._process_symbol = Mock()
+        single._process_symbols(SYMBOLS)
+        single.ai_engine.decide_batch.assert_not_called()
+        self.assertEqual([c.args[2] for c in single._process_symbol.call_args_list], [None] * 3)
+
+    def test_deadline_after_batch_call(self):
+        """截止时间从批量决策返回后计算，慢的批量调用不占用单独决策的时间"""
+        bot = self.make_bot(SYMBOL_DEADLINE_SECONDS='0.3')
+        btc = {'action': 'OPEN_LONG'}
+
+        def slow_batch(symbols):
+            time.sleep(0.4)
+            return {'BTCUSDT': btc}
+
+        budgets = {}
+
+        def process(symbol, deadline=None, decision=None):
+            budgets[symbol] = deadline - time.time()
+            if decision is None:
+                time.sleep(0.1)
+
+        bot.ai_engine.decide_batch.side_effect = slow_batch
+        bot._process_symbol = Mock(side_effect=process)
+        bot._process_symbols(SYMBOLS)
+        self.assertEqual(set(budgets), set(SYMBOLS))
+        self.assertGreater(min(budgets.values()), 0.2)
+
+    def test_position_uses_batch_decision(self):
+        """持仓交易对用批量决策评估平仓，不重复计数AI调用"""
+        bot = self.make_bot()
+        bot.account_snapshot = Mock()
+        bot.account_snapshot.get_positions.return_value = [
+            {'symbol': 'ETHUSDT', 'positionAmt': '-1', 'entryPrice': '3000', 'markPrice': '2990'}
+        ]
+        bot._check_and_execute_rolling = Mock()
+        bot._check_and_force_close_if_profit_target = Mock(return_value=False)
+        bot._save_ai_decision = Mock()
+        decision = {'action': 'CLOSE', 'confidence': 80, 'reasoning': 'x'}
+        bot.ai_engine.analyze_position_for_closing.return_value = {'success': True, 'decision': decision}
+
+        bot._process_symbol('ETHUSDT', decision=decision)
+        self.assertIs(bot.ai_engine.analyze_position_for_closing.call_args.kwargs['preset_decision'], decision)
+        bot.binance.close_position.assert_called_once_with('ETHUSDT')
+        self.assertEqual(bot.total_invocations, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
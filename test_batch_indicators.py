@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+测试多交易对批量指标计算
+indicators.compute_batch 把多个交易对的K线排成矩阵一次计算，逐行与 compute_all 对照
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import os
+import sys
+
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import indicators
+from bench_indicators import make_klines
+from market_analyzer import MarketAnalyzer
+from kline_store import KlineStore
+from enhanced_decision_engine import EnhancedDecisionEngine
+from testing_fakes import FakeKlineClient, assert_close
+
+
+class TestBatchIndicators(unittest.TestCase):
+    """测试多交易对批量指标计算"""
+
+    def test_aligned_matrix(self):
+        """三个交易对的矩阵一次计算，每行与单独计算一致"""
+        rows = [indicators.klines_to_arrays(make_klines(120, seed=i)) for i in range(5)]
+        close = np.vstack([r['close'] for r in rows])
+        high = np.vstack([r['high'] for r in rows])
+        low = np.vstack([r['low'] for r in rows])
+
+        result = indicators.compute_batch(close, high, low)
+        for i, r in enumerate(rows):
+            expected = indicators.compute_all(r['close'], r['high'], r['low'])
+            self.assertEqual(set(result), set(expected))
+            for name, values in expected.items():
+                assert_close(self, result[name][i], values)
+
+    def test_partially_aligned(self):
+        """较短的历史前部为 NaN，有效部分与单独计算一致；全 NaN 的行结果也是 NaN"""
+        klines = {f'S{i}': make_klines(150, seed=i)[i * 25:] for i in range(5)}
+        symbols, aligned = indicators.align_klines(klines, limit=120)
+        self.assertEqual(aligned['close'].shape, (5, 120))
+
+        result = indicators.compute_batch(aligned['close'], aligned['high'], aligned['low'])
+        for row, symbol in enumerate(symbols):
+            own = klines[symbol][-120:]
+            bars = indicators.klines_to_arrays(own)
+            expected = indicators.compute_all(bars['close'], bars['high'], bars['low'])
+            offset = 120 - len(own)
+            for name, values in expected.items():
+                self.assertTrue(np.isnan(result[name][row, :offset]).all())
+                assert_close(self, result[name][row, offset:], values)
+
+        # 没有数据的交易对全部为 NaN
+        empty = indicators.compute_batch(np.full((1, 30), np.nan))
+        self.assertTrue(np.isnan(empty['ema20']).all())
+
+    def test_align_fills_gaps(self):
+        """按开盘时间对齐，中间缺失的K线沿用前一根收盘价、成交量为0"""
+        base = make_klines(10)
+        gapped = base[:4] + base[6:]
+        symbols, aligned = indicators.align_klines({'A': base, 'B': gapped, 'C': base[5:]})
+
+        self.assertEqual(symbols, ['A', 'B', 'C'])
+        self.assertEqual(aligned['open_time'].tolist(), [k[0] for k in base])
+        self.assertEqual(aligned['close'][1, 4], float(base[3][4]))
+        self.assertEqual(aligned['high'][1, 5], float(base[3][4]))
+        self.assertEqual(aligned['volume'][1, 4], 0.0)
+        self.assertTrue(np.isnan(aligned['close'][2, :5]).all())
+        self.assertEqual(aligned['close'][2, 5], float(base[5][4]))
+
+        _, recent = indicators.align_klines({'A': base}, limit=3)
+        self.assertEqual(recent['open_time'].tolist(), [k[0] for k in base[-3:]])
+
+    def test_market_context_uses_batch(self):
+        """批量结果生成的上下文与单独计算一致，缺少K线的交易对不返回；决策引擎每轮只批量计算一次"""
+        data = {(s, i): make_klines(120, seed=n) for n, (s, i) in enumerate(
+            [(s, i) for s in ('BTCUSDT', 'ETHUSDT') for i in ('1m', '3m', '1h')])}
+        client = FakeKlineClient(bars=data)
+        analyzer = MarketAnalyzer(client, kline_store=KlineStore(client))
+
+        precomputed = analyzer.precompute_market_indicators(['BTCUSDT', 'ETHUSDT', 'MISSING'])
+        self.assertEqual(set(precomputed), {'BTCUSDT', 'ETHUSDT'})
+
+        with patch.multiple(MarketAnalyzer, prefetch_market_context=Mock(return_value=None),
+                            get_intraday_series=Mock(return_value={}), get_4h_context=Mock(return_value={}),
+                            get_futures_market_data=Mock(return_value={}), get_market_overview=Mock(return_value={})):
+            batched = analyzer.get_comprehensive_market_context('ETHUSDT', precomputed['ETHUSDT'])
+            single = analyzer.get_comprehensive_market_context('ETHUSDT')
+        for key in ('rsi', 'macd', 'macd_signal', 'bollinger_upper', 'sma_50'):
+            self.assertAlmostEqual(batched[key], single[key], places=9)
+        for key in ('ema20', 'macd', 'rsi7'):
+            self.assertAlmostEqual(batched['current_snapshot'][key], single['current_snapshot'][key], places=9)
+
+        market_analyzer = Mock()
+        market_analyzer.precompute_market_indicators.return_value = {'BTCUSDT': {'3m': 'rows'}}
+        market_analyzer.get_comprehensive_market_context.side_effect = Exception('skip')
+        runtime_state = Mock()
+        runtime_state.get_state.return_value = {'total_runtime_minutes': 1, 'total_ai_calls': 1}
+        account_snapshot = Mock()
+        account_snapshot.get_account_info.return_value = {}
+        account_snapshot.get_positions.return_value = []
+        engine = EnhancedDecisionEngine(Mock(), market_analyzer, runtime_state, account_snapshot=account_snapshot)
+        engine.generate_comprehensive_prompt(['BTCUSDT', 'ETHUSDT'])
+        market_analyzer.precompute_market_indicators.assert_called_once_with(['BTCUSDT', 'ETHUSDT'])
+        self.assertEqual([c.args for c in market_analyzer.get_comprehensive_market_context.call_args_list],
+                         [('BTCUSDT', {'3m': 'rows'}), ('ETHUSDT', None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
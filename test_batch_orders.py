@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+测试合约批量下单
+开仓单和保护单通过 batchOrders 一次提交，逐单结果映射回各自的订单
+"""
+
+import unittest
+from unittest.mock import Mock
+import logging
+import json
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from binance_client import BinanceClient
+from ai_trading_engine import AITradingEngine
+from advanced_position_manager import AdvancedPositionManager
+from exchange_filters import SymbolFilters
+from testing_fakes import symbol_info
+
+
+def ok(order_id):
+    return {'success': True, 'order': {'orderId': order_id}}
+
+
+def failed(msg, code=-2021):
+    return {'success': False, 'error': msg, 'code': code}
+
+
+class TestBatchOrders(unittest.TestCase):
+    """测试合约批量下单"""
+
+    def test_client_batch_request(self):
+        """参数值序列化为字符串、订单列表编码为 JSON 数组，逐单结果按顺序映射"""
+        client = BinanceClient('key', 'secret')
+        listener = Mock()
+        client.add_order_listener(listener)
+
+        response = Mock(status_code=200, headers={})
+        response.json.return_value = [
+            {'orderId': 1, 'status': 'FILLED'},
+            {'code': -2021, 'msg': 'Order would immediately trigger.'},
+        ]
+        client.session = Mock()
+        client.session.post.return_value = response
+
+        results = client.create_batch_futures_orders([
+            {'symbol': 'BTCUSDT', 'side': 'BUY', 'order_type': 'MARKET',
+             'quantity': 0.00001, 'position_side': 'LONG'},
+            {'symbol': 'BTCUSDT', 'side': 'SELL', 'order_type': 'STOP_MARKET',
+             'quantity': 0.00001, 'position_side': 'BOTH', 'reduce_only': True, 'stopPrice': 59000.0},
+        ])
+
+        url = client.session.post.call_args.args[0]
+        self.assertTrue(url.endswith('/fapi/v1/batchOrders'))
+        batch = json.loads(client.session.post.call_args.kwargs['params']['batchOrders'])
+        self.assertEqual(batch[0], {'symbol': 'BTCUSDT', 'side': 'BUY', 'type': 'MARKET',
+                                    'positionSide': 'LONG', 'quantity': '0.00001'})
+        self.assertEqual(batch[1]['reduceOnly'], 'true')
+        self.assertEqual(batch[1]['stopPrice'], '59000')
+
+        self.assertEqual(results[0], {'success': True, 'order': {'orderId': 1, 'status': 'FILLED'}})
+        self.assertEqual(results[1], failed('Order would immediately trigger.'))
+        listener.assert_called_once_with('POST', '/fapi/v1/batchOrders')
+
+        with self.assertRaises(ValueError):
+            client.create_batch_futures_orders([{'symbol': 'BTCUSDT', 'side': 'BUY',
+                                                 'order_type': 'MARKET', 'quantity': 1}] * 6)
+
+    def _make_engine(self):
+        engine = AITradingEngine.__new__(AITradingEngine)
+        engine.logger = logging.getLogger('test')
+        engine.binance = Mock()
+        return engine
+
+    def test_entry_with_protection_retries(self):
+        """开仓、止损、止盈一次提交，失败的止损单单独重试"""
+        engine = self._make_engine()
+        engine.binance.create_batch_futures_orders.return_value = [ok(1), ok(2), failed('timeout')]
+
+        order = engine._place_entry_with_protection('BTCUSDT', 'BUY', 'LONG', 0.01, 59000, 63000)
+        self.assertEqual(order, {'orderId': 1})
+
+        batch = engine.binance.create_batch_futures_orders.call_args.args[0]
+        self.assertEqual([o['order_type'] for o in batch], ['MARKET', 'STOP_MARKET', 'TAKE_PROFIT_MARKET'])
+        self.assertEqual([o['side'] for o in batch], ['BUY', 'SELL', 'SELL'])
+        self.assertTrue(all(o['position_side'] == 'LONG' for o in batch))
+
+        engine.binance.create_futures_order.assert_called_once_with(
+            symbol='BTCUSDT', side='SELL', order_type='TAKE_PROFIT_MARKET',
+            quantity=0.01, position_side='LONG', stopPrice=63000
+        )
+        engine.binance.cancel_futures_order.assert_not_called()
+
+    def test_entry_failure_cancels_protection(self):
+        """开仓单失败时撤销已挂上的保护单"""
+        engine = self._make_engine()
+        engine.binance.create_batch_futures_orders.return_value = [
+            failed('Margin is insufficient.', -2019), ok(2), ok(3)
+        ]
+
+        with self.assertRaises(Exception) as ctx:
+            engine._place_entry_with_protection('ETHUSDT', 'SELL', 'SHORT', 0.5, 3100, 2900)
+        self.assertIn('Margin is insufficient', str(ctx.exception))
+
+        cancelled = [c.kwargs['order_id'] for c in engine.binance.cancel_futures_order.call_args_list]
+        self.assertEqual(cancelled, [2, 3])
+        engine.binance.create_futures_order.assert_not_called()
+
+    def test_scale_out_take_profits_batched(self):
+        """分批止盈目标一次批量提交（reduceOnly），被拒绝的目标不计入结果，低于最小名义价值的目标并入最后一档"""
+        client = Mock()
+        client.BATCH_ORDER_LIMIT = 5
+        client.exchange_filters.get.return_value = SymbolFilters.from_exchange_info(
+            symbol_info('BTCUSDT', '0.001', '0.001', '0.10', '100')
+        )
+        client.get_close_position_side.return_value = 'BOTH'
+        client.create_batch_futures_orders.return_value = [ok(1), failed('rejected'), ok(3)]
+
+        manager = AdvancedPositionManager(client, Mock())
+        result = manager.setup_scale_out_take_profits('BTCUSDT', 60000, 0.1, 'LONG', [
+            {'profit_pct': 5.0, 'close_pct': 50},
+            {'profit_pct': 8.0, 'close_pct': 30},
+            {'profit_pct': 12.0, 'close_pct': 20},
+        ])
+
+        client.create_batch_futures_orders.assert_called_once()
+        batch = client.create_batch_futures_orders.call_args.args[0]
+        self.assertEqual([o['stopPrice'] for o in batch], [63000.0, 64800.0, 67200.0])
+        self.assertEqual([o['quantity'] for o in batch], [0.05, 0.03, 0.02])
+        self.assertTrue(all(o['reduce_only'] and o['side'] == 'SELL' for o in batch))
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['count'], 2)
+        self.assertEqual(result['targets'], [63000.0, 67200.0])
+
+        # 低于最小名义价值（100 USDT）的目标不提交：0.003 的 50% 取整为 0.001，约 63 USDT，
+        # 跳过的部分由最后一个目标一起平掉
+        client.create_batch_futures_orders.reset_mock()
+        client.create_batch_futures_orders.return_value = [ok(4)]
+        manager.setup_scale_out_take_profits('BTCUSDT', 60000, 0.003, 'LONG', [
+            {'profit_pct': 5.0, 'close_pct': 50},
+            {'profit_pct': 8.0, 'close_pct': 50},
+        ])
+        batch = client.create_batch_futures_orders.call_args.args[0]
+        self.assertEqual([(o['stopPrice'], o['quantity']) for o in batch], [(64800.0, 0.003)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+测试行情 WebSocket 客户端（使用本地回放服务器，无需联网）
+回放服务器推送 kline / markPrice / bookTicker 消息，检查缓存的行情和 REST 回退
+"""
+
+import unittest
+from unittest.mock import Mock
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from binance_stream_client import BinanceStreamClient, WEBSOCKET_AVAILABLE
+from stream_replay_server import StreamReplayServer
+from market_analyzer import MarketAnalyzer
+from testing_fakes import wait_for
+
+
+OPEN_TIME = 1_700_000_040_000
+
+
+def kline_message(symbol, open_time, close, closed=False):
+    return {
+        'stream': f'{symbol.lower()}@kline_1m',
+        'data': {
+            'e': 'kline', 'E': open_time + 1000, 's': symbol,
+            'k': {
+                't': open_time, 'T': open_time + 59_999, 's': symbol, 'i': '1m',
+                'o': '100.0', 'c': str(close), 'h': '101.0', 'l': '99.0', 'v': '10',
+                'n': 5, 'x': closed, 'q': '1000', 'V': '5', 'Q': '500', 'B': '0'
+            }
+        }
+    }
+
+
+def mark_price_message(symbol, price, funding_rate='0.0001'):
+    return {
+        'stream': f'{symbol.lower()}@markPrice@1s',
+        'data': {
+            'e': 'markPriceUpdate', 'E': 1, 's': symbol, 'p': str(price),
+            'i': str(price), 'P': str(price), 'r': funding_rate, 'T': 1_700_006_400_000
+        }
+    }
+
+
+def book_ticker_message(symbol, bid, ask):
+    return {
+        'stream': f'{symbol.lower()}@bookTicker',
+        'data': {
+            'e': 'bookTicker', 'u': 1, 'E': 1, 'T': 1, 's': symbol,
+            'b': str(bid), 'B': '2.5', 'a': str(ask), 'A': '1.5'
+        }
+    }
+
+
+@unittest.skipUnless(WEBSOCKET_AVAILABLE, "需要安装 websocket-client")
+class TestBinanceStreamClient(unittest.TestCase):
+    """测试行情 WebSocket 客户端"""
+
+    def setUp(self):
+        self.messages = [
+            kline_message('BTCUSDT', OPEN_TIME, 50010.5),
+            mark_price_message('BTCUSDT', 50012.3),
+            book_ticker_message('BTCUSDT', 50010.0, 50011.0),
+            kline_message('ETHUSDT', OPEN_TIME, 3000.0),
+        ]
+        self.server = StreamReplayServer(self.messages).start()
+        self.stream = BinanceStreamClient(['BTCUSDT'], stream_url=self.server.url)
+
+    def tearDown(self):
+        self.stream.stop()
+        self.server.stop()
+
+    def test_caches_latest_market_data(self):
+        """回放消息后缓存每个流的最新一条，未订阅的交易对不缓存"""
+        self.assertTrue(self.stream.start())
+        self.assertTrue(wait_for(lambda: self.stream.get_book_ticker('BTCUSDT') is not None))
+
+        self.assertEqual(self.stream.get_mark_price('BTCUSDT'), 50012.3)
+        self.assertEqual(self.stream.get_mark_price_info('BTCUSDT')['funding_rate'], 0.0001)
+        self.assertEqual(self.stream.get_last_price('BTCUSDT'), 50010.5)
+        book = self.stream.get_book_ticker('BTCUSDT')
+        self.assertEqual((book['bid_price'], book['ask_price']), (50010.0, 50011.0))
+        # 未订阅 ETHUSDT
+        self.assertIsNone(self.stream.get_last_price('ETHUSDT'))
+        self.assertTrue(self.stream.is_healthy())
+
+    def test_analyzer_falls_back_to_rest_after_disconnect(self):
+        """行情流正常时价格和资金费率读推送，断线后回退REST"""
+        client = Mock()
+        client.get_futures_24h_ticker.return_value = {'lastPrice': '49999.0'}
+        analyzer = MarketAnalyzer(client, stream_client=self.stream)
+
+        self.stream.start()
+        self.assertTrue(wait_for(lambda: self.stream.get_last_price('BTCUSDT') is not None))
+        self.assertEqual(analyzer.get_current_price('BTCUSDT'), 50010.5)
+        client.get_futures_24h_ticker.assert_not_called()
+
+        self.server.stop()
+        self.assertTrue(wait_for(lambda: not self.stream.connected))
+        self.assertEqual(analyzer.get_current_price('BTCUSDT'), 49999.0)
+        client.get_futures_24h_ticker.assert_called_once_with('BTCUSDT')
+
+    def test_stream_klines_update_store(self):
+        """推送的K线写入K线缓存，流正常期间读取命中缓存"""
+        client = Mock()
+        client.get_futures_klines.return_value = [
+            [OPEN_TIME - 60_000, '100', '100', '100', '100', '1', OPEN_TIME - 1, '100', 1, '0', '0', '0'],
+            [OPEN_TIME, '100', '100', '100', '100', '1', OPEN_TIME + 59_999, '100', 1, '0', '0', '0'],
+        ]
+        analyzer = MarketAnalyzer(client, stream_client=self.stream)
+        analyzer.kline_store.get_klines('BTCUSDT', '1m', 3)
+        # 模拟缓存已过期：没有行情流时下一次读取会请求REST
+        analyzer.kline_store._last_refresh[('BTCUSDT', '1m')] = 0
+
+        self.server.messages.append(kline_message('BTCUSDT', OPEN_TIME + 60_000, 50100.0))
+        self.stream.start()
+        self.assertTrue(wait_for(lambda: analyzer.kline_store.stats['stream_updates'] >= 2))
+
+        # 流已刷新缓存，不会再请求REST
+        bars = analyzer.kline_store.get_klines('BTCUSDT', '1m', 3)
+        self.assertEqual([b[0] for b in bars], [OPEN_TIME - 60_000, OPEN_TIME, OPEN_TIME + 60_000])
+        self.assertEqual(bars[1][4], '50010.5')
+        self.assertEqual(client.get_futures_klines.call_count, 1)
+
+    def test_add_symbols_sends_subscribe(self):
+        """连接后追加交易对发送 SUBSCRIBE，之后收到该交易对的推送"""
+        self.server.loop = True
+        self.server.interval = 0.01
+        self.stream.start()
+        self.assertTrue(self.stream.wait_until_connected())
+
+        self.stream.add_symbols(['ETHUSDT', 'BTCUSDT'])
+        self.assertTrue(wait_for(lambda: self.server.received))
+        self.assertEqual(self.server.received[0]['method'], 'SUBSCRIBE')
+        self.assertIn('ethusdt@kline_1m', self.server.received[0]['params'])
+        self.assertNotIn('btcusdt@bookTicker', self.server.received[0]['params'])
+        self.assertTrue(wait_for(lambda: self.stream.get_last_price('ETHUSDT') == 3000.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
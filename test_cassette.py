@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+测试 HTTP 录制/回放层
+每个用例先通过 FakeSession 录制一轮 BinanceClient / DeepSeekClient 请求，再离线回放
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import json
+import os
+import sys
+import time
+import tempfile
+
+import requests
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import cassette as cassette_module
+from cassette import Cassette, CassetteSession, CassetteMissError
+from binance_client import BinanceClient
+from deepseek_client import DeepSeekClient
+from testing_fakes import json_response
+
+
+KLINES = [[1700000000000, '100', '101', '99', '100.5', '10', 1700000059999, '1000', 5, '5', '500', '0']]
+ACCOUNT = {'totalWalletBalance': '1000', 'availableBalance': '900'}
+CHAT = {'choices': [{'message': {'content': '{"action": "HOLD", "confidence": 60}'}}]}
+
+
+class FakeSession:
+    """按接口返回固定响应的 session，记录调用次数"""
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    def request(self, method, url, params=None, json=None, **kwargs):
+        self.calls.append((method, url))
+        if self.delay:
+            time.sleep(self.delay)
+        if url.endswith('/fapi/v1/klines'):
+            return json_response(KLINES, headers={'X-MBX-USED-WEIGHT-1M': '42'})
+        if url.endswith('/fapi/v2/account'):
+            return json_response(ACCOUNT)
+        if url.endswith('/chat/completions'):
+            return json_response(CHAT)
+        if url.endswith('/fapi/v1/depth'):
+            raise requests.exceptions.ReadTimeout('read timed out')
+        raise AssertionError(url)
+
+
+class TestCassette(unittest.TestCase):
+    """测试 HTTP 录制/回放层"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'cycle.jsonl.gz')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _record(self, delay=0.0):
+        recording = Cassette(self.path, mode='record')
+        session = FakeSession(delay)
+        client = BinanceClient('key', 'secret')
+        client.session = CassetteSession(recording, session)
+        deepseek = DeepSeekClient('deepseek-key')
+        deepseek.session = CassetteSession(recording, session)
+
+        client.get_futures_klines('BTCUSDT', '1m', limit=1)
+        client.get_futures_account_info()
+        deepseek.chat_completion([{'role': 'user', 'content': 'BTC 价格 100.5, 时间 10:00'}])
+        with patch('binance_client.time.sleep'), self.assertRaises(Exception):
+            client.get_order_book('BTCUSDT', 20)
+        recording.close()
+        return session
+
+    def _replay_clients(self, latency_scale=0.0):
+        replay = Cassette(self.path, mode='replay', latency_scale=latency_scale)
+        # 关闭GET结果复用，每次请求都经过回放匹配
+        client = BinanceClient('key', 'secret', get_cache_ttl=0)
+        client.session = CassetteSession(replay, Mock())
+        deepseek = DeepSeekClient('deepseek-key')
+        deepseek.session = CassetteSession(replay, Mock())
+        return replay, client, deepseek
+
+    def test_binance_replay(self):
+        """离线回放 K线和账户请求，签名请求忽略 timestamp/signature 匹配；文件为 gzip 且不含签名"""
+        session = self._record()
+        self.assertGreater(len(session.calls), 4)   # 超时请求按重试次数录制
+
+        replay, client, _ = self._replay_clients()
+        self.assertEqual(client.get_futures_klines('BTCUSDT', '1m', limit=1), KLINES)
+        self.assertEqual(client.get_futures_account_info(), ACCOUNT)
+        # 限流响应头随响应回放，用于校准权重
+        self.assertEqual(replay.interactions[0]['headers'], {'X-MBX-USED-WEIGHT-1M': '42'})
+        self.assertEqual(replay.stats['loose_matches'], 0)
+
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(2), b'\x1f\x8b')   # gzip
+        self.assertNotIn('signature', json.dumps(replay.interactions))
+
+    def test_deepseek_loose_match(self):
+        """提示词不同时按同一接口的录制顺序回放"""
+        self._record()
+        replay, _, deepseek = self._replay_clients()
+        result = deepseek.chat_completion([{'role': 'user', 'content': 'BTC 价格 101.2, 时间 10:02'}])
+        self.assertEqual(result, CHAT)
+        self.assertEqual(replay.stats['loose_matches'], 1)
+
+    def test_errors_miss_and_repeat(self):
+        """录制的读超时在回放时重新抛出，没有录制的请求报错，录制用完后重复最后一条"""
+        self._record()
+        replay, client, _ = self._replay_clients()
+
+        with patch('binance_client.time.sleep'):
+            with self.assertRaises(Exception) as ctx:
+                client.get_order_book('BTCUSDT', 20)
+        self.assertIn('ReadTimeout', str(ctx.exception))
+
+        with self.assertRaises(CassetteMissError):
+            replay.replay('GET', 'https://fapi.binance.com/fapi/v1/ticker/24hr', {'symbol': 'BTCUSDT'}, None)
+
+        client.get_futures_klines('BTCUSDT', '1m', limit=1)
+        self.assertEqual(client.get_futures_klines('BTCUSDT', '1m', limit=1), KLINES)
+        self.assertEqual(replay.stats['repeats'], 1)
+
+    def test_latency_and_env(self):
+        """按录制耗时模拟延迟；设置 CASSETTE_MODE 后新建的客户端自动包装 session"""
+        self._record(delay=0.05)
+        _, client, _ = self._replay_clients(latency_scale=1.0)
+        started = time.perf_counter()
+        client.get_futures_account_info()
+        self.assertGreaterEqual(time.perf_counter() - started, 0.05)
+
+        with patch.dict(os.environ, {'CASSETTE_MODE': 'replay', 'CASSETTE_PATH': self.path}), \
+                patch.object(cassette_module, '_env_cassette', None):
+            env_client = BinanceClient('key', 'secret')
+            self.assertIsInstance(env_client.session, CassetteSession)
+            self.assertEqual(env_client.get_futures_account_info(), ACCOUNT)
+            self.assertIsInstance(DeepSeekClient('k').session, CassetteSession)
+
+        self.assertNotIsInstance(BinanceClient('key', 'secret').session, CassetteSession)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+测试交易所规则缓存
+规则来自 testing_fakes.EXCHANGE_INFO 中 BTCUSDT / DOGEUSDT / BNBUSDT 三个交易对
+"""
+
+import unittest
+from unittest.mock import Mock
+import logging
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from exchange_filters import ExchangeFilters
+from ai_trading_engine import AITradingEngine
+from testing_fakes import EXCHANGE_INFO
+
+
+class TestExchangeFilters(unittest.TestCase):
+    """测试交易所规则缓存"""
+
+    def setUp(self):
+        self.client = Mock()
+        self.client.get_futures_exchange_info.return_value = EXCHANGE_INFO
+        self.filters = ExchangeFilters(self.client)
+
+    def test_quantize(self):
+        """数量向下取整到步长且不超过市价单上限，价格取整到 tickSize"""
+        btc = self.filters.get('BTCUSDT')
+        self.assertEqual(btc.quantize_qty(0.0129), 0.012)
+        self.assertEqual(btc.quantize_qty(0.3), 0.3)          # 不受浮点误差影响
+        self.assertEqual(btc.quantize_qty(5000), 1000.0)      # 市价单最大数量
+        self.assertEqual(btc.quantize_price(65432.17), 65432.2)
+        self.assertEqual(btc.quantity_precision, 3)
+        self.assertEqual(btc.price_precision, 1)
+
+        doge = self.filters.get('DOGEUSDT')
+        self.assertEqual(doge.quantize_qty(123.9), 123.0)
+        self.assertEqual(doge.quantize_price(0.1234567), 0.12346)
+        self.assertEqual(doge.price_precision, 5)
+
+    def test_min_order_qty(self):
+        """BTC 的最小数量由最小名义价值向上取整得到，BNB 由 minQty 决定"""
+        btc = self.filters.get('BTCUSDT')
+        self.assertEqual(btc.min_order_qty(65000), 0.002)     # 100 / 65000 = 0.00154 -> 0.002
+        self.assertAlmostEqual(btc.min_order_notional(65000), 130.0)
+        self.assertTrue(btc.is_valid_order(0.002, 65000))
+        self.assertFalse(btc.is_valid_order(0.001, 65000))
+
+        bnb = self.filters.get('BNBUSDT')
+        self.assertEqual(bnb.min_order_qty(600), 0.01)        # minQty 优先
+
+    def test_loaded_once(self):
+        """规则只加载一次；刚加载过时未知交易对直接抛出 KeyError，不再请求"""
+        for _ in range(10):
+            self.filters.get('BTCUSDT')
+            self.filters.get('DOGEUSDT')
+        self.assertEqual(self.client.get_futures_exchange_info.call_count, 1)
+
+        self.assertIsNone(self.filters.find('NOPEUSDT'))
+        with self.assertRaises(KeyError):
+            self.filters.get('NOPEUSDT')
+        # 刚加载过，不会为未知交易对反复请求
+        self.assertEqual(self.client.get_futures_exchange_info.call_count, 1)
+
+    def test_open_long_uses_filters(self):
+        """DOGE 开多单的数量、止损价和止盈价按交易所规则取整"""
+        engine = AITradingEngine.__new__(AITradingEngine)
+        engine.logger = logging.getLogger('test')
+        engine.binance = Mock()
+        engine.binance.exchange_filters = self.filters
+        engine.market_analyzer = Mock()
+        engine.market_analyzer.get_current_price.return_value = 0.123456
+        engine.binance.create_batch_futures_orders.return_value = [
+            {'success': True, 'order': {'orderId': i}} for i in range(3)
+        ]
+
+        result = engine._open_long_position('DOGEUSDT', amount=10, leverage=3,
+                                            stop_loss_pct=0.015, take_profit_pct=0.05)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['quantity'], 243.0)           # 30 / 0.123456 = 243.0016 -> 步长1向下取整
+        self.assertEqual(result['stop_loss'], 0.12160)
+        self.assertEqual(result['take_profit'], 0.12963)
+        entry_order = engine.binance.create_batch_futures_orders.call_args.args[0][0]
+        self.assertEqual(entry_order['quantity'], 243.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+测试自适应超时和对冲请求
+先用 prime() 写入接口的延迟样本，再检查 BinanceClient 选择的超时和是否发送对冲请求
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import threading
+import time
+import sys
+import os
+
+import requests
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from binance_client import BinanceClient
+from rate_limiter import RateLimiter
+from testing_fakes import json_response
+
+
+KLINES = [[1700000000000, '100', '101', '99', '100.5', '10']]
+
+
+def prime(client, endpoint, seconds, count=20):
+    """写入观测样本"""
+    for _ in range(count):
+        client.telemetry.record_attempt('GET', endpoint, seconds, 200)
+
+
+class SequencedSession:
+    """第 n 次请求等待 delays[n] 秒后返回 payloads[n]"""
+
+    def __init__(self, delays, payloads):
+        self.delays = list(delays)
+        self.payloads = list(payloads)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        with self.lock:
+            index = len(self.calls)
+            self.calls.append(timeout)
+        time.sleep(self.delays[index])
+        return json_response(self.payloads[index])
+
+
+class TestHedgedRequests(unittest.TestCase):
+    """测试自适应超时和对冲请求"""
+
+    def _client(self, **kwargs):
+        client = BinanceClient('key', 'secret', get_cache_ttl=0, **kwargs)
+        # 独立的限流器，避免受其他测试的共享权重影响
+        client.futures_rate_limiter = RateLimiter()
+        return client
+
+    def test_adaptive_timeout(self):
+        """GET 超时按接口 p99 自适应；样本不足、非GET或关闭自适应时保持30秒"""
+        client = self._client()
+        endpoint = '/fapi/v1/klines'
+        self.assertEqual(client._timeout_for('GET', endpoint), 30)
+
+        prime(client, endpoint, 0.2)
+        self.assertEqual(client._timeout_for('GET', endpoint), client.MIN_TIMEOUT)
+        prime(client, endpoint, 2.0, count=200)
+        self.assertAlmostEqual(client._timeout_for('GET', endpoint), 8.0, delta=0.4)
+        self.assertEqual(client._timeout_for('POST', '/fapi/v1/order'), 30)
+
+        client.session = Mock()
+        client.session.get.return_value = json_response(KLINES)
+        client.get_futures_klines('BTCUSDT', '1m', limit=5)
+        self.assertAlmostEqual(client.session.get.call_args.kwargs['timeout'], 8.0, delta=0.4)
+
+        fixed = self._client(adaptive_timeout=False)
+        prime(fixed, endpoint, 0.2)
+        self.assertEqual(fixed._timeout_for('GET', endpoint), 30)
+
+    def test_retry_widens_timeout(self):
+        """连续读超时时超时逐次放宽，urllib3 不再叠加读超时重试"""
+        client = self._client()
+        prime(client, '/fapi/v1/depth', 0.5)
+        client.session = Mock()
+        client.session.get.side_effect = [
+            requests.exceptions.ReadTimeout('read timed out'),
+            requests.exceptions.ReadTimeout('read timed out'),
+            json_response({'bids': [], 'asks': []}),
+        ]
+        with patch('binance_client.time.sleep'):
+            client.get_order_book('BTCUSDT', 20)
+
+        timeouts = [c.kwargs['timeout'] for c in client.session.get.call_args_list]
+        self.assertEqual(timeouts, [3.0, 6.0, 9.0])
+
+        adapter = client._create_session().get_adapter('https://fapi.binance.com')
+        self.assertEqual(adapter.max_retries.read, 0)
+
+    def test_hedge_wins_over_slow_request(self):
+        """首个请求超过 p95 未返回时对冲请求先返回；遥测记录首个请求自身的耗时；p95 内返回时不对冲"""
+        client = self._client(hedge_requests=True)
+        prime(client, '/fapi/v1/klines', 0.02)
+        client.session = SequencedSession([0.6, 0.01], [['slow'], KLINES])
+
+        started = time.perf_counter()
+        result = client.get_futures_klines('BTCUSDT', '1m', limit=5)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(result, KLINES)
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(client.hedge_stats['hedged'], 1)
+        self.assertEqual(client.hedge_stats['hedge_wins'], 1)
+        self.assertEqual(client.stats()['hedge']['hedged'], 1)
+
+        # 遥测记录首个请求自身的耗时（结束后记录），而不是先返回的对冲请求
+        stats = client.telemetry._get('GET', '/fapi/v1/klines')
+        self.assertEqual(stats.http_latency.count, 20)
+        time.sleep(0.8)
+        self.assertEqual(stats.http_latency.count, 21)
+        self.assertGreater(client.telemetry.http_percentile('GET', '/fapi/v1/klines', 100), 0.5)
+
+        # 首个请求在 p95 内返回：不对冲
+        client.session = SequencedSession([0.0], [KLINES])
+        client.get_futures_klines('BTCUSDT', '1m', limit=5)
+        self.assertEqual(len(client.session.calls), 1)
+
+    def test_no_hedge_when_limited_or_signed(self):
+        """限流器余量不足或签名请求时不对冲"""
+        client = self._client(hedge_requests=True)
+        prime(client, '/fapi/v1/klines', 0.02)
+        limiter = client.futures_rate_limiter
+        limiter.acquire(limiter.soft_limit)
+
+        client.session = SequencedSession([0.2, 0.0], [KLINES, ['unused']])
+        self.assertEqual(client.get_futures_klines('BTCUSDT', '1m', limit=5), KLINES)
+        self.assertEqual(len(client.session.calls), 1)
+        self.assertEqual(client.hedge_stats['skipped_rate_limit'], 1)
+
+        prime(client, '/fapi/v2/account', 0.02)
+        client.session = SequencedSession([0.2, 0.0], [{'totalWalletBalance': '1'}, {}])
+        client.get_futures_account_info()
+        self.assertEqual(len(client.session.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+测试指标缓存
+MarketAnalyzer 按（交易对、周期、最后收盘K线）缓存指标，
+时钟停在第300根1小时K线开盘后30分钟
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import os
+import sys
+
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import indicators
+import market_analyzer
+from kline_store import KlineStore
+from market_analyzer import MarketAnalyzer
+from testing_fakes import FakeKlineClient, HOUR, grid_klines
+
+
+BARS = grid_klines(400, HOUR)
+
+
+class TestIndicatorCache(unittest.TestCase):
+    """测试指标缓存"""
+
+    def setUp(self):
+        # 第300根K线开盘后30分钟
+        self.clock = {'now': (BARS[300][0] + HOUR // 2) / 1000}
+        self.patcher = patch('kline_store.time.time', lambda: self.clock['now'])
+        self.patcher.start()
+        self.client = FakeKlineClient(self.clock, BARS, interval='1h')
+        self.analyzer = MarketAnalyzer(self.client, kline_store=KlineStore(self.client))
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_shared_within_bar(self):
+        """同一根K线内反复计算组合信号，RSI 只算一次"""
+        with patch.dict(market_analyzer.CACHED_INDICATORS,
+                        rsi=Mock(side_effect=market_analyzer.CACHED_INDICATORS['rsi'])) as funcs:
+            first = self.analyzer.get_combined_signal('BTCUSDT')
+            self.analyzer.get_rsi_signal('BTCUSDT')
+            self.analyzer.get_trend_signal('BTCUSDT')
+            second = self.analyzer.get_combined_signal('BTCUSDT')
+            self.assertEqual(funcs['rsi'].call_count, 1)
+
+        self.assertEqual(first['rsi'], second['rsi'])
+        stats = self.analyzer.indicator_cache_stats
+        # bars + sma20 + sma50 + rsi + macd
+        self.assertEqual(stats['misses'], 5)
+        self.assertGreaterEqual(stats['hits'], 10)
+
+    def test_new_bar_invalidates(self):
+        """前进一小时后 EMA 重新计算，结果等于新窗口的批量计算"""
+        before = self.analyzer.get_cached_indicator('BTCUSDT', '1h', 'ema', 20)
+        self.assertIs(self.analyzer.get_cached_indicator('BTCUSDT', '1h', 'ema', 20), before)
+
+        self.clock['now'] += HOUR / 1000
+        after = self.analyzer.get_cached_indicator('BTCUSDT', '1h', 'ema', 20)
+        self.assertIsNot(after, before)
+        closes = indicators.klines_to_arrays(BARS[202:301])['close']
+        self.assertAlmostEqual(after[-1], indicators.ema(closes, 20)[-1])
+        self.assertEqual(self.analyzer.indicator_cache_stats['misses'], 4)
+
+    def test_lru_eviction(self):
+        """容量为3时淘汰最久未用的 sma20，clear 后清空"""
+        analyzer = MarketAnalyzer(self.client, kline_store=KlineStore(self.client), indicator_cache_size=3)
+        analyzer.get_cached_indicator('BTCUSDT', '1h', 'sma', 10)     # 未命中 sma10、bars
+        analyzer.get_cached_indicator('BTCUSDT', '1h', 'sma', 20)     # 未命中 sma20，命中 bars
+        analyzer.get_cached_indicator('BTCUSDT', '1h', 'sma', 10)     # 命中 sma10
+        analyzer.get_cached_indicator('BTCUSDT', '1h', 'sma', 30)     # 命中 bars，淘汰最久未用的 sma20
+
+        keys = [key[4:] for key in analyzer._indicator_cache]
+        self.assertEqual(keys, [('sma', (10,)), ('bars', ()), ('sma', (30,))])
+        self.assertEqual(analyzer.indicator_cache_stats, {'hits': 3, 'misses': 4, 'evictions': 1})
+
+        analyzer.clear_indicator_cache()
+        self.assertEqual(len(analyzer._indicator_cache), 0)
+
+    def test_closed_bars_only(self):
+        """RSI 只用已收盘的99根，趋势信号的当前价取未收盘K线"""
+        store = self.analyzer.kline_store
+        self.assertEqual(store.get_last_closed_open_time('BTCUSDT', '1h'), BARS[299][0])
+        self.assertIsNone(store.get_last_closed_open_time('BTCUSDT', '1M'))
+
+        closes = indicators.klines_to_arrays(BARS[200:300])['close']
+        rsi = self.analyzer.get_cached_indicator('BTCUSDT', '1h', 'rsi', 14)
+        self.assertEqual(len(rsi), 99)
+        self.assertTrue(np.allclose(rsi, indicators.rsi(closes[1:], 14), equal_nan=True))
+
+        trend = self.analyzer.get_trend_signal('BTCUSDT')
+        self.assertEqual(trend['current_price'], float(BARS[300][4]))
+        self.assertAlmostEqual(trend['sma_20'], float(np.mean(closes[-20:])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+测试纯 NumPy 技术指标
+以 bench_indicators.pandas_path（原 pandas 实现）为基准对照 indicators 的结果
+"""
+
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import indicators
+from bench_indicators import make_klines, pandas_path
+from market_analyzer import MarketAnalyzer
+from kline_store import KlineStore
+from testing_fakes import FakeKlineClient, assert_close
+
+
+class TestIndicators(unittest.TestCase):
+    """测试纯 NumPy 技术指标"""
+
+    def setUp(self):
+        self.klines = make_klines(300)
+        self.bars = indicators.klines_to_arrays(self.klines)
+
+    def test_matches_pandas(self):
+        """SMA / EMA / RSI / MACD / 布林带 / ATR 与 pandas 实现一致"""
+        expected = pandas_path(self.klines)
+        close, high, low = self.bars['close'], self.bars['high'], self.bars['low']
+
+        assert_close(self, indicators.sma(close, 20), expected['sma20'])
+        assert_close(self, indicators.ema(close, 26), expected['ema26'])
+        assert_close(self, indicators.rsi(close, 14), expected['rsi14'])
+        macd_line, signal_line, histogram = indicators.macd(close)
+        assert_close(self, macd_line, expected['macd'])
+        assert_close(self, signal_line, expected['macd_signal'])
+        assert_close(self, histogram, expected['macd_hist'])
+        upper, middle, lower = indicators.bollinger_bands(close, 20, 2)
+        assert_close(self, upper, expected['bb_upper'])
+        assert_close(self, lower, expected['bb_lower'])
+        assert_close(self, indicators.atr(high, low, close, 14), expected['atr14'])
+
+    def test_compute_all(self):
+        """compute_all 按 spec 一次返回全部指标，与单独计算一致；不传最高/最低价时不算 ATR"""
+        close, high, low = self.bars['close'], self.bars['high'], self.bars['low']
+        result = indicators.compute_all(close, high, low)
+
+        self.assertEqual(set(result), set(pandas_path(self.klines)))
+        assert_close(self, result['ema50'], indicators.ema(close, 50))
+        assert_close(self, result['rsi7'], indicators.rsi(close, 7))
+        assert_close(self, result['atr3'], indicators.atr(high, low, close, 3))
+        self.assertEqual(result['sma20'].dtype, np.float64)
+        self.assertEqual(len(result['macd']), len(close))
+
+        # 不传最高/最低价时不计算ATR
+        self.assertNotIn('atr14', indicators.compute_all(close, spec={'atr': (14,)}))
+
+    def test_market_analyzer_delegation(self):
+        """DataFrame 接口的结果与 pandas 一致，4小时上下文、日内序列和趋势信号不构建 DataFrame"""
+        client = FakeKlineClient(bars={interval: self.klines for interval in ('3m', '1h', '4h')})
+        analyzer = MarketAnalyzer(client, kline_store=KlineStore(client))
+
+        df = analyzer.get_kline_data('BTCUSDT', '1h', 300)
+        expected = pandas_path(self.klines)
+        rsi = analyzer.calculate_rsi(df, 14)
+        self.assertIsInstance(rsi, pd.Series)
+        self.assertTrue(rsi.index.equals(df.index))
+        assert_close(self, rsi, expected['rsi14'])
+        assert_close(self, analyzer.calculate_atr(df, 14), expected['atr14'])
+        assert_close(self, analyzer.calculate_macd(df)[2], expected['macd_hist'])
+
+        with patch.object(MarketAnalyzer, 'get_kline_data', side_effect=AssertionError('不应构建DataFrame')):
+            context = analyzer.get_4h_context('BTCUSDT', 300)
+            series = analyzer.get_intraday_series('BTCUSDT', '3m', 300)
+            analyzer.get_trend_signal('BTCUSDT')
+
+        self.assertAlmostEqual(context['atr14'], float(expected['atr14'].iloc[-1]))
+        self.assertEqual(len(series['rsi14_values']), 300)
+        self.assertEqual(series['timestamps'][0], '2023-11-14 22:13:20')
+
+    def test_edge_cases(self):
+        """数据不足返回 NaN，两万根的 EMA 不溢出，周期非法时报错"""
+        short = np.array([1.0, 2.0, 3.0])
+        self.assertTrue(np.isnan(indicators.sma(short, 5)).all())
+        self.assertEqual(len(indicators.rsi(np.empty(0), 14)), 0)
+        self.assertIsNone(indicators.last(indicators.atr(short, short, short, 14)))
+        self.assertEqual(indicators.last(np.empty(0), 50), 50)
+
+        # 长序列分块计算 EMA 不溢出
+        long = 100 + np.sin(np.arange(20000) / 50.0)
+        expected = pd.Series(long).ewm(span=200, adjust=False).mean().to_numpy()
+        assert_close(self, indicators.ema(long, 200), expected)
+
+        with self.assertRaises(ValueError):
+            indicators.sma(short, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
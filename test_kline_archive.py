@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+测试历史K线归档
+KlineArchive 在临时目录里回补、追加和读取1分钟K线，时钟固定在某分钟开盘后30秒
+"""
+
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from kline_archive import KlineArchive, COLUMNS
+from testing_fakes import FakeKlineClient, MINUTE, synthetic_bar
+
+
+NOW_MS = 1_700_000_000_000 - 1_700_000_000_000 % MINUTE + 30_000   # 当前分钟已过30秒
+CLOCK = {'now': NOW_MS / 1000}
+
+
+class TestKlineArchive(unittest.TestCase):
+    """测试历史K线归档"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.clock = patch('kline_archive.time.time', lambda: NOW_MS / 1000)
+        self.clock.start()
+
+    def tearDown(self):
+        self.clock.stop()
+        self.tmpdir.cleanup()
+
+    def test_paginated_backfill(self):
+        """回补2500根分3页、最多2个并发，当前分钟的未收盘K线不保存"""
+        client = FakeKlineClient(CLOCK, delay=0.02)
+        archive = KlineArchive(client, root=self.tmpdir.name, max_workers=2)
+        start = NOW_MS - NOW_MS % MINUTE - 2499 * MINUTE
+
+        fetched = archive.backfill('BTCUSDT', '1m', start)
+
+        self.assertEqual(len(client.calls), 3)
+        self.assertLessEqual(client.max_active, 2)
+        # 最后一根（当前分钟）未收盘
+        self.assertEqual(fetched, 2499)
+        first, last, count = archive.coverage('BTCUSDT', '1m')
+        self.assertEqual((first, count), (start, 2499))
+        self.assertEqual(last, NOW_MS - NOW_MS % MINUTE - MINUTE)
+
+    def test_columnar_files_and_range_read(self):
+        """每列一个 .npy 文件，重新打开后按区间读到内存映射；没有归档的交易对返回空列"""
+        start = NOW_MS - NOW_MS % MINUTE - 1200 * MINUTE
+        KlineArchive(FakeKlineClient(CLOCK), root=self.tmpdir.name).backfill('ETHUSDT', '1m', start)
+
+        path = os.path.join(self.tmpdir.name, 'ETHUSDT', '1m')
+        self.assertEqual(sorted(os.listdir(path)), sorted(f'{name}.npy' for name, _ in COLUMNS))
+
+        archive = KlineArchive(root=self.tmpdir.name)
+        columns = archive.read('ETHUSDT', '1m', start + 100 * MINUTE, start + 199 * MINUTE)
+        self.assertIsInstance(columns['close'], np.memmap)
+        self.assertEqual(len(columns['open_time']), 100)
+        self.assertEqual(int(columns['open_time'][0]), start + 100 * MINUTE)
+        self.assertEqual(columns['trades'].dtype, np.int64)
+        expected = float(synthetic_bar(start + 150 * MINUTE)[4])
+        self.assertEqual(float(columns['close'][50]), expected)
+
+        empty = archive.read('SOLUSDT', '1m')
+        self.assertEqual(len(empty['close']), 0)
+        self.assertIsNone(archive.coverage('SOLUSDT', '1m'))
+
+    def test_incremental_backfill(self):
+        """先归档中间1000根，再回补3000根时只请求两端的分页，update 补到当前时间"""
+        client = FakeKlineClient(CLOCK)
+        archive = KlineArchive(client, root=self.tmpdir.name)
+        base = NOW_MS - NOW_MS % MINUTE - 3000 * MINUTE
+
+        archive.backfill('BTCUSDT', '1m', base + 1000 * MINUTE, base + 1999 * MINUTE)
+        self.assertEqual(len(client.calls), 1)
+
+        client.calls.clear()
+        archive.backfill('BTCUSDT', '1m', base, base + 2999 * MINUTE)
+        # 中间一页已归档
+        self.assertEqual([(c['startTime'], c['endTime']) for c in client.calls],
+                         [(base, base + 1000 * MINUTE - 1), (base + 2000 * MINUTE, base + 2999 * MINUTE)])
+        self.assertEqual(archive.coverage('BTCUSDT', '1m')[2], 3000)
+
+        # 增量更新到当前时间
+        client.calls.clear()
+        archive.update('BTCUSDT', '1m')
+        self.assertEqual(len(client.calls), 1)
+        open_time = archive.read('BTCUSDT', '1m')['open_time']
+        self.assertTrue(np.all(np.diff(open_time) == MINUTE))
+
+    def test_tail_append_writes_only_new_bars(self):
+        """范围之后的新K线只追加到各列末尾，重叠的数据才整体重写；只写了部分列的中断追加按最短列读取"""
+        archive = KlineArchive(root=self.tmpdir.name)
+        start = NOW_MS - NOW_MS % MINUTE - 100 * MINUTE
+        rows = [synthetic_bar(start + i * MINUTE) for i in range(100)]
+        archive.append('BTCUSDT', '1m', rows[:90])
+        self.assertEqual(archive.read('BTCUSDT', '1m')['close'][-1], float(rows[89][4]))
+
+        with patch.object(archive, '_write', wraps=archive._write) as write:
+            self.assertEqual(archive.append('BTCUSDT', '1m', rows[95:] + rows[90:95]), 100)
+            write.assert_not_called()
+            self.assertEqual(archive.append('BTCUSDT', '1m', rows[50:60]), 100)
+            write.assert_called_once()
+
+        reopened = KlineArchive(root=self.tmpdir.name)
+        columns = reopened.read('BTCUSDT', '1m')
+        self.assertEqual(columns['open_time'].tolist(), [r[0] for r in rows])
+        self.assertEqual(columns['trades'][-1], 42)
+
+        # 追加中断（只有部分列写入）时只读取各列都有的部分，下一次追加覆盖多写的数据
+        more = [synthetic_bar(start + i * MINUTE) for i in range(100, 103)]
+        path = os.path.join(self.tmpdir.name, 'BTCUSDT', '1m', 'close.npy')
+        np.save(path, np.concatenate([columns['close'], [1.0, 2.0]]))
+        reopened = KlineArchive(root=self.tmpdir.name)
+        self.assertEqual(reopened.coverage('BTCUSDT', '1m')[2], 100)
+        self.assertEqual(reopened.append('BTCUSDT', '1m', more), 103)
+        close = KlineArchive(root=self.tmpdir.name).read('BTCUSDT', '1m')['close']
+        self.assertEqual(close[-3:].tolist(), [float(r[4]) for r in more])
+
+    def test_read_klines_format(self):
+        """乱序追加后按开盘时间排序，读取为币安K线数组格式"""
+        archive = KlineArchive(root=self.tmpdir.name)
+        start = NOW_MS - NOW_MS % MINUTE - 10 * MINUTE
+        rows = [synthetic_bar(start + i * MINUTE) for i in range(5)]
+        self.assertEqual(archive.append('BNBUSDT', '1m', rows[2:] + rows[:3]), 5)
+
+        klines = archive.read_klines('BNBUSDT', '1m')
+        self.assertEqual([k[0] for k in klines], [r[0] for r in rows])
+        self.assertEqual(klines[1][4], float(rows[1][4]))
+        self.assertEqual(klines[1][8], 42)
+        self.assertEqual(len(klines[0]), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
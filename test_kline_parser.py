@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+测试K线解析
+以 bench_kline_parser.legacy_dataframe（原 pandas 转换）为基准对照 kline_parser 的结果
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import indicators
+import kline_parser
+from bench_kline_parser import exchange_klines, legacy_dataframe
+from binance_client import BinanceClient
+from kline_archive import COLUMNS, rows_to_columns
+from kline_store import KlineStore
+from market_analyzer import MarketAnalyzer
+from testing_fakes import FakeKlineClient
+
+
+KLINES = exchange_klines(200)
+
+
+class TestKlineParser(unittest.TestCase):
+    """测试K线解析"""
+
+    def test_parse_klines(self):
+        """结构化数组的字段类型和数值正确，可只解析部分字段，空列表返回空数组"""
+        parsed = kline_parser.parse_klines(KLINES)
+        self.assertEqual(parsed.dtype, kline_parser.KLINE_DTYPE)
+        self.assertEqual(len(parsed), len(KLINES))
+        self.assertEqual(parsed['open_time'].dtype, np.int64)
+        self.assertEqual(parsed['close'].dtype, np.float64)
+        self.assertEqual(int(parsed['open_time'][5]), KLINES[5][0])
+        self.assertEqual(float(parsed['close'][-1]), float(KLINES[-1][4]))
+        self.assertEqual(int(parsed['trades'][3]), int(KLINES[3][8]))
+        self.assertEqual(float(parsed['taker_buy_quote'][7]), float(KLINES[7][10]))
+
+        subset = kline_parser.parse_klines(KLINES, kline_parser.OHLCV_FIELDS)
+        self.assertEqual(subset.dtype.names, kline_parser.OHLCV_FIELDS)
+        np.testing.assert_array_equal(subset['high'], parsed['high'])
+
+        columns = kline_parser.to_columns(subset)
+        self.assertTrue(columns['low'].flags['C_CONTIGUOUS'])
+        np.testing.assert_array_equal(columns['low'], [float(k[3]) for k in KLINES])
+
+        empty = kline_parser.parse_klines([], kline_parser.OHLCV_FIELDS)
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(empty.dtype.names, kline_parser.OHLCV_FIELDS)
+
+    def test_get_kline_data_matches_pandas(self):
+        """get_kline_data 与原 pandas 转换完全一致，指标数组和归档列式数组来自同一解析器"""
+        client = FakeKlineClient(bars={'1h': KLINES})
+        analyzer = MarketAnalyzer(client, kline_store=KlineStore(client))
+
+        df = analyzer.get_kline_data('BTCUSDT', '1h', 100)
+        pd.testing.assert_frame_equal(df, legacy_dataframe(KLINES[-100:]))
+
+        # 指标用的数组、归档的列式数组与 DataFrame 来自同一个解析器
+        arrays = analyzer.get_kline_arrays('BTCUSDT', '1h', 100)
+        self.assertEqual(arrays['open_time'].dtype, np.int64)
+        np.testing.assert_array_equal(arrays['close'], df['close'].to_numpy())
+        for name, column in indicators.klines_to_arrays(KLINES[-100:]).items():
+            np.testing.assert_array_equal(column, arrays[name])
+        archived = rows_to_columns(KLINES)
+        self.assertEqual(list(archived), [name for name, _ in COLUMNS])
+        np.testing.assert_array_equal(archived['trades'], kline_parser.parse_klines(KLINES)['trades'])
+
+    def test_json_fallback(self):
+        """未安装 orjson 时回退到标准库 json，解析结果相同"""
+        body = json.dumps(KLINES).encode()
+        fast = kline_parser.parse_klines_json(body)
+        with patch.object(kline_parser, 'ORJSON_AVAILABLE', False):
+            self.assertEqual(kline_parser.loads(body), KLINES)
+            slow = kline_parser.parse_klines_json(body.decode())
+        np.testing.assert_array_equal(fast, slow)
+        self.assertEqual(kline_parser.loads(body), KLINES)
+
+    def test_client_decodes_raw_body(self):
+        """客户端直接解析响应原始字节，没有原始字节时回退到 json()"""
+        response = Mock()
+        response.content = json.dumps(KLINES[:3]).encode()
+        self.assertEqual(BinanceClient._decode_json(response), KLINES[:3])
+        response.json.assert_not_called()
+
+        legacy = Mock()
+        legacy.json.return_value = {'serverTime': 1}
+        self.assertEqual(BinanceClient._decode_json(legacy), {'serverTime': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
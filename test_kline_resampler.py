@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+测试多周期K线重采样
+模拟交易所的高周期K线由同一组1分钟K线聚合而来，ResampledKlineStore 的结果应与之逐根相同
+"""
+
+import unittest
+from unittest.mock import patch
+import os
+import sys
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from kline_resampler import ResampledKlineStore, aggregate_bars
+from testing_fakes import FakeKlineClient, HOUR, grid_klines
+
+
+# 开盘时间对齐到4小时整点
+BARS = grid_klines(3000, align=4 * HOUR)
+
+
+class TestKlineResampler(unittest.TestCase):
+    """测试多周期K线重采样"""
+
+    def setUp(self):
+        # 第2500根1分钟K线开盘后30秒
+        self.clock = {'now': (BARS[2500][0] + 30_000) / 1000}
+        self.patcher = patch('time.time', lambda: self.clock['now'])
+        self.patcher.start()
+        self.exchange = FakeKlineClient(self.clock, BARS)
+        self.store = ResampledKlineStore(self.exchange)
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_derived_from_base(self):
+        """1分钟缓冲区覆盖的 3m/15m/1h/4h 全部聚合得到，只请求一次1分钟K线"""
+        for interval, limit in (('3m', 30), ('15m', 50), ('1h', 10), ('4h', 3)):
+            self.assertEqual(self.store.get_klines('BTCUSDT', interval, limit),
+                             self.exchange.visible(interval, limit), interval)
+        self.assertEqual(self.exchange.intervals(), ['1m'])
+
+        bar = aggregate_bars(BARS[:3], BARS[0][0], 180_000)
+        self.assertEqual(bar[1:5], [BARS[0][1], max(b[2] for b in BARS[:3]), min(b[3] for b in BARS[:3]), BARS[2][4]])
+        self.assertAlmostEqual(float(bar[5]), sum(float(b[5]) for b in BARS[:3]))
+        self.assertEqual(bar[6], BARS[0][0] + 180_000 - 1)
+
+    def test_history_seeded_once(self):
+        """100根1小时K线超出1分钟缓冲区，历史只补一次，之后每小时增量聚合"""
+        first = self.store.get_klines('BTCUSDT', '1h', 100)
+        self.assertEqual(first, self.exchange.visible('1h', 100))
+        self.assertEqual(self.exchange.intervals(), ['1m', '1h'])
+        before = self.store.get_last_closed_open_time('BTCUSDT', '1h', 100)
+        self.assertEqual(before, first[-2][0])
+
+        for _ in range(5):
+            self.clock['now'] += 15 * 60
+            self.assertEqual(self.store.get_klines('BTCUSDT', '1h', 100), self.exchange.visible('1h', 100))
+        self.assertEqual(self.exchange.intervals().count('1h'), 1)
+        self.assertEqual(self.store.get_last_closed_open_time('BTCUSDT', '1h', 100), before + HOUR)
+        self.assertEqual(self.store.stats['history_seeds'], 1)
+
+    def test_stream_updates_partial(self):
+        """推送的1分钟K线同时更新各周期未收盘K线的收盘价和最高价，非1分钟推送被忽略"""
+        self.store.get_klines('BTCUSDT', '15m', 5)
+        live = list(BARS[2500])
+        live[4] = '12345.6'
+        live[2] = '99999.0'
+        self.store.apply_stream_kline('BTCUSDT', '1m', live)
+        self.store.apply_stream_kline('BTCUSDT', '3m', ['ignored'])
+
+        closes = {interval: self.store.get_klines('BTCUSDT', interval, 3)[-1]
+                  for interval in ('1m', '3m', '15m', '1h', '4h')}
+        self.assertEqual({bar[4] for bar in closes.values()}, {'12345.6'})
+        self.assertEqual(closes['4h'][2], '99999.0')
+        self.assertEqual(self.exchange.intervals(), ['1m'])
+
+    def test_gap_and_passthrough(self):
+        """8小时断档后重新补历史；1d 和超出容量的 1h 请求直接透传"""
+        store = ResampledKlineStore(self.exchange, base_bars=300)
+        store.get_klines('BTCUSDT', '1h', 3)
+        self.assertEqual(store.stats['history_seeds'], 0)
+
+        # 8小时后：1分钟缓冲区（300根）已不覆盖上次聚合之后的周期
+        self.clock['now'] += 8 * HOUR / 1000
+        self.assertEqual(store.get_klines('BTCUSDT', '1h', 3), self.exchange.visible('1h', 3))
+        self.assertEqual(store.stats['history_seeds'], 1)
+
+        self.exchange.calls.clear()
+        self.store.get_klines('BTCUSDT', '1d', 2)
+        self.store.get_klines('BTCUSDT', '1h', 1500)
+        self.assertEqual(self.exchange.intervals(), ['1d', '1h'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+测试K线增量缓存
+用模拟时钟推进时间，检查 KlineStore 何时全量加载、何时只增量拉取新收盘的K线
+"""
+
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from kline_store import KlineStore, INTERVAL_MS
+from testing_fakes import FakeKlineClient
+
+
+class TestKlineStore(unittest.TestCase):
+    """测试K线增量缓存"""
+
+    def setUp(self):
+        self.clock = {'now': 1_700_000_030.0}
+        self.client = FakeKlineClient(self.clock)
+        self.time_patcher = patch('kline_store.time.time', lambda: self.clock['now'])
+        self.time_patcher.start()
+        self.store = KlineStore(self.client, min_refresh_interval=2.0)
+
+    def tearDown(self):
+        self.time_patcher.stop()
+
+    def test_full_load_then_cache_hit(self):
+        """首次读取全量加载100根，0.5秒后再读30根不发请求"""
+        bars = self.store.get_klines('BTCUSDT', '1m', 100)
+        self.assertEqual(len(bars), 100)
+        self.assertEqual(len(self.client.calls), 1)
+
+        self.clock['now'] += 0.5
+        again = self.store.get_klines('BTCUSDT', '1m', 30)
+        self.assertEqual(len(again), 30)
+        self.assertEqual(again[-1][0], bars[-1][0])
+        self.assertEqual(len(self.client.calls), 1)
+        self.assertEqual(self.store.stats['cache_hits'], 1)
+
+    def test_incremental_fetch_uses_start_time(self):
+        """3分钟后的请求从上次未收盘K线的下一根开始，拼接后开盘时间连续"""
+        bars = self.store.get_klines('BTCUSDT', '1m', 100)
+        # 最后一根是未收盘K线，前进后它会收盘，成为缓冲区中最后一根已收盘K线
+        last_closed_open = bars[-1][0]
+
+        # 前进3分钟
+        self.clock['now'] += 180
+        updated = self.store.get_klines('BTCUSDT', '1m', 100)
+
+        call = self.client.calls[-1]
+        self.assertEqual(call['startTime'], last_closed_open + INTERVAL_MS['1m'])
+        self.assertLessEqual(call['limit'], 10)
+        self.assertEqual(len(updated), 100)
+
+        # 开盘时间严格递增且连续，没有重复或缺口
+        opens = [b[0] for b in updated]
+        self.assertEqual(opens, sorted(set(opens)))
+        self.assertTrue(all(b - a == INTERVAL_MS['1m'] for a, b in zip(opens, opens[1:])))
+        self.assertEqual(self.store.stats['incremental_loads'], 1)
+
+    def test_shared_buffer_across_limits(self):
+        """读过100根之后读10根，只发增量请求"""
+        self.store.get_klines('ETHUSDT', '1h', 100)
+        self.clock['now'] += 5
+        small = self.store.get_klines('ETHUSDT', '1h', 10)
+        self.assertEqual(len(small), 10)
+        # 第二次是增量请求，不是全量
+        self.assertIsNotNone(self.client.calls[-1]['startTime'])
+        self.assertEqual(self.store.stats['full_loads'], 1)
+
+    def test_deeper_request_triggers_full_load(self):
+        """limit 超过已缓存的根数时重新全量加载"""
+        self.store.get_klines('SOLUSDT', '3m', 10)
+        self.store.get_klines('SOLUSDT', '3m', 30)
+        self.assertEqual(self.store.stats['full_loads'], 2)
+        self.assertEqual(self.client.calls[-1]['limit'], 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+测试本地订单簿（增量深度使用本地回放服务器，无需联网）
+REST 快照固定为 lastUpdateId=100 的两档买卖盘，增量事件按币安 U/u/pu 字段构造
+"""
+
+import unittest
+from unittest.mock import Mock
+import os
+import sys
+import random
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from binance_stream_client import BinanceStreamClient, WEBSOCKET_AVAILABLE
+from local_order_book import BookSide, LocalOrderBook, OrderBookStore
+from market_analyzer import MarketAnalyzer
+from stream_replay_server import StreamReplayServer
+from testing_fakes import wait_for
+
+
+SNAPSHOT = {
+    'lastUpdateId': 100,
+    'bids': [['99.0', '1'], ['98.0', '2']],
+    'asks': [['101.0', '1'], ['102.0', '3']]
+}
+
+
+def depth_message(symbol, first, last, prev, bids=(), asks=()):
+    return {
+        'stream': f'{symbol.lower()}@depth@100ms',
+        'data': {
+            'e': 'depthUpdate', 'E': last, 'T': last, 's': symbol,
+            'U': first, 'u': last, 'pu': prev,
+            'b': [[str(p), str(q)] for p, q in bids],
+            'a': [[str(p), str(q)] for p, q in asks]
+        }
+    }
+
+
+# 第一条早于快照，第二条跨过快照 lastUpdateId，第三条衔接第二条
+EVENTS = [
+    depth_message('BTCUSDT', 90, 95, 89, bids=[(98.5, 7)]),
+    depth_message('BTCUSDT', 96, 105, 95, bids=[(99.0, 0)], asks=[(101.0, 2)]),
+    depth_message('BTCUSDT', 106, 110, 105, bids=[(99.5, 4)]),
+]
+
+
+class TestLocalOrderBook(unittest.TestCase):
+    """测试本地订单簿"""
+
+    def test_sync_sequencing(self):
+        """快照前的推送先缓存，同步时丢弃旧事件、按 U/u 衔接，数量为0的价位被删除"""
+        book = LocalOrderBook('BTCUSDT')
+        book.handle_event(EVENTS[0]['data'])
+        book.handle_event(EVENTS[1]['data'])
+        self.assertFalse(book.synced)
+
+        self.assertTrue(book.sync(SNAPSHOT))
+        book.handle_event(EVENTS[2]['data'])
+
+        self.assertEqual(book.stats['dropped'], 1)
+        self.assertEqual(book.last_update_id, 110)
+        self.assertEqual(book.bids.prices, [98.0, 99.5])
+        self.assertEqual(book.asks.quantities, [2.0, 3.0])
+        self.assertEqual(book.best_bid(), 99.5)
+
+        # 快照过旧：缓存的第一条事件 U 大于 lastUpdateId
+        stale = LocalOrderBook('BTCUSDT')
+        stale.handle_event(EVENTS[2]['data'])
+        self.assertFalse(stale.sync(SNAPSHOT))
+        self.assertFalse(stale.synced)
+
+    def test_gap_triggers_resync(self):
+        """pu 不连续时清空订单簿，下次读取重新同步；行情流断开时返回None"""
+        client = Mock()
+        client.get_order_book.return_value = SNAPSHOT
+        stream = Mock(connected=True)
+        store = OrderBookStore(client, stream_client=stream)
+        on_event = stream.add_listener.call_args[0][0]
+
+        self.assertIsNone(store.get_book('BTCUSDT'))
+        for message in EVENTS:
+            on_event(message['stream'], message['data'])
+        book = store.get_book('BTCUSDT')
+        self.assertEqual(book.best_bid(), 99.5)
+        client.get_order_book.assert_called_once_with('BTCUSDT', 1000)
+
+        # pu 与上一条 u 不一致
+        on_event('btcusdt@depth@100ms', depth_message('BTCUSDT', 115, 125, 114, asks=[(100.5, 1)])['data'])
+        self.assertFalse(book.synced)
+        self.assertEqual(book.stats['gaps'], 1)
+        self.assertEqual(len(book.bids), 0)
+
+        client.get_order_book.return_value = dict(SNAPSHOT, lastUpdateId=120)
+        self.assertIs(store.get_book('BTCUSDT'), book)
+        self.assertEqual((book.best_ask(), book.last_update_id), (100.5, 125))
+        self.assertEqual(client.get_order_book.call_count, 2)
+
+        stream.connected = False
+        self.assertIsNone(store.get_book('BTCUSDT'))
+
+    def test_queries(self):
+        """深度、基点范围内挂单量、买卖失衡度和吃单滑点"""
+        book = LocalOrderBook.from_snapshot('BTCUSDT', {
+            'lastUpdateId': 1,
+            'bids': [['100.0', '1'], ['99.9', '2'], ['99.0', '5']],
+            'asks': [['100.1', '1'], ['100.2', '3'], ['101.0', '10']]
+        })
+        self.assertEqual(book.depth(2), {'lastUpdateId': 1, 'bids': [[100.0, 1.0], [99.9, 2.0]],
+                                         'asks': [[100.1, 1.0], [100.2, 3.0]]})
+        self.assertAlmostEqual(book.mid_price(), 100.05)
+
+        near = book.depth_within(10)
+        self.assertEqual((near['bid_qty'], near['ask_qty']), (1.0, 1.0))
+        self.assertAlmostEqual(book.imbalance(10), (100.0 - 100.1) / 200.1)
+        self.assertEqual(book.depth_within(100)['ask_qty'], 14.0)
+
+        buy = book.estimate_slippage('BUY', 300)
+        self.assertTrue(buy['complete'])
+        self.assertEqual(buy['levels'], 2)
+        self.assertTrue(100.1 < buy['avg_price'] < 100.2)
+        self.assertAlmostEqual(buy['slippage_bps'], (buy['avg_price'] - 100.05) / 100.05 * 10000)
+        sell = book.estimate_slippage('SELL', 1e6)
+        self.assertFalse(sell['complete'])
+        self.assertAlmostEqual(sell['filled_notional'], 100.0 + 199.8 + 495.0)
+        self.assertGreater(sell['slippage_bps'], 0)
+
+        # 有序数组与字典参照实现一致
+        side, reference = BookSide(), {}
+        rng = random.Random(5)
+        for _ in range(2000):
+            price, quantity = rng.randint(1, 200) / 10, rng.choice([0, 0, 1, 2.5])
+            side.update(price, quantity)
+            if quantity:
+                reference[price] = quantity
+            else:
+                reference.pop(price, None)
+        self.assertEqual(side.prices, sorted(reference))
+        self.assertEqual(side.quantities, [reference[p] for p in sorted(reference)])
+
+    @unittest.skipUnless(WEBSOCKET_AVAILABLE, "需要安装 websocket-client")
+    def test_replay_feed(self):
+        """回放增量深度流，订单簿分析只请求一次同步快照，之后读取本地订单簿"""
+        server = StreamReplayServer(list(EVENTS)).start()
+        stream = BinanceStreamClient(['BTCUSDT'], stream_url=server.url, depth_updates=True)
+        client = Mock()
+        client.get_order_book.return_value = SNAPSHOT
+        store = OrderBookStore(client, stream_client=stream)
+        analyzer = MarketAnalyzer(client, order_books=store)
+        try:
+            stream.start()
+            self.assertTrue(wait_for(lambda: 'BTCUSDT' in store.symbols() and
+                                     store._get_book('BTCUSDT').stats['events'] == 3))
+            self.assertIn('btcusdt@depth@100ms', server.paths[0])
+
+            first = analyzer.analyze_order_book('BTCUSDT')
+            second = analyzer.analyze_order_book('BTCUSDT')
+        finally:
+            stream.stop()
+            server.stop()
+
+        client.get_order_book.assert_called_once_with('BTCUSDT', 1000)
+        self.assertEqual(first['best_bid'], 99.5)
+        self.assertEqual(second['total_ask_volume'], 5.0)
+        self.assertAlmostEqual(first['imbalance_10bps'], 0.0)
+
+        # 未配置本地订单簿时仍请求REST深度
+        rest = MarketAnalyzer(client).analyze_order_book('BTCUSDT', depth=20)
+        client.get_order_book.assert_called_with('BTCUSDT', 20)
+        self.assertEqual(rest['best_bid'], 99.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+测试惰性市场上下文
+MarketContext 按字段读取时才请求数据，这里通过假客户端的请求记录检查每一步发了哪些请求
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import logging
+import os
+import sys
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ai_trading_engine import AITradingEngine
+from async_binance_client import AsyncBinanceClient
+from bench_indicators import make_klines
+from kline_store import KlineStore
+from market_analyzer import MarketAnalyzer
+from market_context import CONTEXT_KEYS, MarketContext
+from testing_fakes import FakeMarketClient
+
+
+KLINES = {interval: make_klines(600, seed=n) for n, interval in enumerate(('1m', '3m', '1h', '4h'))}
+TICKER = {'lastPrice': '100.0', 'priceChangePercent': '2.5', 'highPrice': '110.0',
+          'lowPrice': '90.0', 'volume': '1234.5', 'quoteVolume': '123450.0'}
+
+
+class TestMarketContext(unittest.TestCase):
+    """测试惰性市场上下文"""
+
+    def setUp(self):
+        # 所有K线最后一根开盘后30秒
+        clock = {'now': (KLINES['1m'][-1][0] + 30_000) / 1000}
+        self.patcher = patch('kline_store.time.time', lambda: clock['now'])
+        self.patcher.start()
+        self.client = FakeMarketClient(clock, KLINES)
+        self.client.ticker = TICKER
+        self.client.open_interest = '500'
+        self.client.open_interest_history = ['400', '600']
+        self.analyzer = MarketAnalyzer(self.client, kline_store=KlineStore(self.client))
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_reads_only_requested_fields(self):
+        """创建时不发请求；读取价格和1小时指标只请求 1m/1h K线和 ticker，再次读取命中缓存"""
+        context = self.analyzer.get_comprehensive_market_context('BTCUSDT')
+        self.assertIsInstance(context, MarketContext)
+        self.assertEqual(self.client.requests, [])
+
+        for key in ('symbol', 'current_price', 'price_change_24h', 'rsi', 'macd', 'trend'):
+            context.get(key)
+        self.assertEqual(sorted(set(self.client.intervals())), ['1h', '1m'])
+        for name in ('open_interest', 'funding', 'order_book'):
+            self.assertNotIn(name, self.client.requests)
+
+        misses = self.analyzer.indicator_cache_stats['misses']
+        self.assertEqual(context['rsi'], context['rsi'])
+        self.assertEqual(self.analyzer.indicator_cache_stats['misses'], misses)
+        self.assertEqual(self.client.requests.count('ticker'), 1)
+
+    def test_mapping_compatible(self):
+        """键顺序、in、get、dict() 与原字典一致，数值与直接计算一致"""
+        context = self.analyzer.get_comprehensive_market_context('BTCUSDT')
+        self.assertEqual(list(context), list(CONTEXT_KEYS))
+        self.assertEqual(len(context), len(CONTEXT_KEYS))
+        self.assertIn('bollinger_upper', context)
+        self.assertNotIn('missing', context)
+        self.assertEqual(context.get('missing', 'N/A'), 'N/A')
+        with self.assertRaises(KeyError):
+            context['missing']
+
+        data = dict(context)
+        self.assertEqual(data, context.to_dict())
+        self.assertEqual(data['rsi'], float(self.analyzer.get_cached_indicator('BTCUSDT', '1h', 'rsi', 14)[-1]))
+        self.assertEqual(data['macd_histogram'],
+                         float(self.analyzer.get_cached_indicator('BTCUSDT', '1h', 'macd', 12, 26, 9)[2][-1]))
+        self.assertEqual(data['current_snapshot']['price'], float(KLINES['1m'][-1][4]))
+        self.assertEqual((data['price_change_24h'], data['volume_24h'], data['high_24h']), (2.5, 1234.5, 110.0))
+        self.assertEqual(data['futures_market']['open_interest'], {'current': 500.0, 'average': 500.0})
+        self.assertEqual(data['atr'], data['long_term_context_4h']['atr14'])
+
+    def test_prefetch_selected_fields(self):
+        """只预取合约数据时不请求K线；已有批量1小时指标时读取 RSI/MACD 不发请求"""
+        analyzer = MarketAnalyzer(self.client, kline_store=KlineStore(self.client),
+                                  async_client=AsyncBinanceClient(self.client))
+        context = analyzer.get_comprehensive_market_context('BTCUSDT').prefetch(('futures_market',))
+        self.assertEqual(self.client.calls, [])
+        self.assertNotIn('ticker', self.client.requests)
+        self.assertEqual(context['futures_market']['funding_rate'], 0.0001)
+        self.assertEqual(self.client.requests.count('open_interest'), 1)
+
+        precomputed = analyzer.precompute_market_indicators(['BTCUSDT'])['BTCUSDT']
+        self.client.reset()
+        context = analyzer.get_comprehensive_market_context('BTCUSDT', precomputed).prefetch(('rsi', 'macd'))
+        self.assertEqual(self.client.requests, [])
+        self.assertEqual(context['rsi'], float(precomputed['1h']['rsi14'][-1]))
+        self.assertEqual(self.client.requests, [])
+
+    def test_single_symbol_decision_prefetches(self):
+        """单交易对决策先预取提示词用到的 1m/1h K线和 ticker，构建提示词时不再发请求"""
+        analyzer = MarketAnalyzer(self.client, kline_store=KlineStore(self.client),
+                                  async_client=AsyncBinanceClient(self.client))
+        engine = AITradingEngine.__new__(AITradingEngine)
+        engine.logger = logging.getLogger('test')
+        engine.enhanced_features_enabled = True
+        engine.runtime_manager = None
+        engine.market_analyzer = analyzer
+        engine.trade_history = []
+        engine.deepseek = Mock()
+        engine._get_account_info = Mock(return_value={'positions': []})
+        engine._should_use_reasoner = Mock(return_value=False)
+
+        with patch.object(analyzer, 'prefetch_market_context', wraps=analyzer.prefetch_market_context) as prefetch:
+            engine._decide_single('BTCUSDT')
+        self.assertEqual(prefetch.call_args.kwargs['items'], {'1m', '1h', 'ticker_24h'})
+        market_data = engine.deepseek.analyze_market_and_decide.call_args.args[0]
+        self.client.reset()
+        for key in AITradingEngine.CONTEXT_FIELDS:
+            market_data[key]
+        self.assertEqual(self.client.requests, [])
+
+    def test_inner_key_error_not_swallowed(self):
+        """ticker 缺少字段时的 KeyError 不会被 get() 当成字段不存在"""
+        self.client.ticker = {'lastPrice': '100.0'}
+        context = self.analyzer.get_comprehensive_market_context('BTCUSDT')
+        with self.assertRaises(LookupError):
+            context.get('price_change_24h', 0)
+        self.assertIsInstance(context.get('current_price'), float)
+
+
+if __name__ == '__main__':
+    unittest.main()
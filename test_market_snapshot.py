@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+测试全市场行情快照
+Mock 客户端的全量 ticker 和 premiumIndex 覆盖 COIN0USDT~COIN19USDT，单交易对接口返回固定值
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from market_snapshot import MarketSnapshot
+from market_analyzer import MarketAnalyzer
+
+
+SYMBOLS = [f'COIN{i}USDT' for i in range(20)]
+
+
+def make_client():
+    client = Mock()
+    client.get_all_futures_24h_tickers.return_value = [
+        {'symbol': s, 'lastPrice': str(100 + i), 'priceChangePercent': '2.0', 'highPrice': '130',
+         'lowPrice': '90', 'volume': '1000', 'quoteVolume': '100000'}
+        for i, s in enumerate(SYMBOLS)
+    ]
+    client.get_premium_index.return_value = [
+        {'symbol': s, 'markPrice': str(100.5 + i), 'indexPrice': str(100 + i),
+         'lastFundingRate': '0.00025', 'nextFundingTime': 0}
+        for i, s in enumerate(SYMBOLS)
+    ]
+    client.get_futures_24h_ticker.return_value = {
+        'lastPrice': '7', 'priceChangePercent': '0', 'highPrice': '7', 'lowPrice': '7',
+        'volume': '1', 'quoteVolume': '7'
+    }
+    client.get_open_interest.return_value = {'openInterest': '10'}
+    client.get_open_interest_statistics.return_value = []
+    return client
+
+
+class TestMarketSnapshot(unittest.TestCase):
+    """测试全市场行情快照"""
+
+    def setUp(self):
+        self.client = make_client()
+        self.snapshot = MarketSnapshot(self.client, max_age=60)
+
+    def test_two_calls_cover_all_symbols(self):
+        """刷新一次（两次请求）后，20个交易对的价格、标记价格和资金费率都读内存"""
+        self.assertTrue(self.snapshot.refresh())
+        for i, symbol in enumerate(SYMBOLS):
+            self.assertEqual(float(self.snapshot.get_ticker(symbol)['lastPrice']), 100 + i)
+            self.assertEqual(self.snapshot.get_mark_price(symbol), 100.5 + i)
+            self.assertEqual(self.snapshot.get_funding_rate(symbol), 0.00025)
+
+        self.assertEqual(self.client.get_all_futures_24h_tickers.call_count, 1)
+        self.assertEqual(self.client.get_premium_index.call_count, 1)
+        self.client.get_futures_24h_ticker.assert_not_called()
+
+    def test_unknown_symbol_falls_back(self):
+        """快照中没有的交易对由分析器单独请求"""
+        analyzer = MarketAnalyzer(self.client, market_snapshot=self.snapshot)
+        self.snapshot.refresh()
+        self.assertEqual(analyzer.get_current_price('COIN3USDT'), 103.0)
+        self.client.get_futures_24h_ticker.assert_not_called()
+
+        self.assertIsNone(self.snapshot.get_ticker('NEWUSDT'))
+        self.assertEqual(analyzer.get_current_price('NEWUSDT'), 7.0)
+        self.client.get_futures_24h_ticker.assert_called_once_with('NEWUSDT')
+
+    def test_stale_refresh_and_failure_keeps_old_data(self):
+        """过期后自动刷新；刷新失败时继续使用旧快照，超过3倍有效期后回退单交易对接口"""
+        clock = {'now': 1000.0}
+        with patch('market_snapshot.time.time', lambda: clock['now']):
+            self.snapshot.refresh()
+            clock['now'] += 61
+            self.snapshot.get_ticker('COIN0USDT')
+            self.assertEqual(self.client.get_all_futures_24h_tickers.call_count, 2)
+
+            clock['now'] += 61
+            self.client.get_all_futures_24h_tickers.side_effect = Exception("API请求失败")
+            self.assertIsNotNone(self.snapshot.get_ticker('COIN0USDT'))
+            self.assertEqual(self.snapshot.stats['errors'], 1)
+
+            # 超过 3 * max_age 仍未刷新成功，不再使用旧快照，分析器回退单交易对接口
+            clock['now'] += 120
+            analyzer = MarketAnalyzer(self.client, market_snapshot=self.snapshot)
+            self.assertIsNone(self.snapshot.get_ticker('COIN0USDT'))
+            self.assertIsNone(self.snapshot.get_funding_rate('COIN0USDT'))
+            self.assertFalse(self.snapshot.available())
+            self.assertEqual(analyzer.get_current_price('COIN0USDT'), 7.0)
+            self.client.get_futures_24h_ticker.assert_called_once_with('COIN0USDT')
+
+    def test_analyzer_funding_rate_from_snapshot(self):
+        """合约数据的资金费率读快照，不再逐个请求"""
+        analyzer = MarketAnalyzer(self.client, market_snapshot=self.snapshot)
+        self.snapshot.refresh()
+        data = analyzer.get_futures_market_data('COIN1USDT')
+        self.assertEqual(data['funding_rate'], 0.00025)
+        self.client.get_current_funding_rate.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+测试请求权重限流器
+权重上限设为100（硬上限90、软上限50），time 换成 sleep 直接推进时间的模拟时钟
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rate_limiter import RateLimiter, endpoint_weight
+from binance_client import BinanceClient
+
+
+class FakeClock:
+    """模拟时钟：sleep 直接推进时间"""
+
+    def __init__(self, now):
+        self.now = now
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiter(unittest.TestCase):
+    """测试请求权重限流器"""
+
+    def setUp(self):
+        # 窗口开始后10秒
+        self.clock = FakeClock(1_700_000_040.0 + 10)
+        self.patcher = patch('rate_limiter.time', self.clock)
+        self.patcher.start()
+        self.limiter = RateLimiter(weight_limit=100, safety_ratio=0.9, soft_ratio=0.5)
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_endpoint_weights(self):
+        """K线、深度、持仓和 ticker 的权重随参数变化"""
+        self.assertEqual(endpoint_weight('GET', '/fapi/v1/klines', {'limit': 30}), 1)
+        self.assertEqual(endpoint_weight('GET', '/fapi/v1/klines', {'limit': 100}), 2)
+        self.assertEqual(endpoint_weight('GET', '/fapi/v1/klines', {'limit': 1000}), 5)
+        self.assertEqual(endpoint_weight('GET', '/fapi/v1/depth', {'limit': 20}), 2)
+        self.assertEqual(endpoint_weight('GET', '/fapi/v2/positionRisk', {}), 5)
+        self.assertEqual(endpoint_weight('GET', '/fapi/v1/ticker/24hr', {}), 40)
+        self.assertEqual(endpoint_weight('GET', '/fapi/v1/ticker/24hr', {'symbol': 'BTCUSDT'}), 1)
+        self.assertEqual(endpoint_weight('POST', '/fapi/v1/order', {}), 1)
+
+    def test_no_wait_far_from_limit(self):
+        """低于软上限时不等待"""
+        for _ in range(10):
+            self.limiter.acquire(5)
+        self.assertEqual(self.clock.slept, [])
+        self.assertEqual(self.limiter.get_status()['used_weight'], 50)
+        self.assertEqual(self.limiter.get_status()['headroom'], 40)
+
+    def test_paces_near_limit_and_waits_for_next_window(self):
+        """软上限之上匀速等待，超过硬上限等待到下一个窗口"""
+        self.limiter.acquire(50)
+        self.limiter.acquire(10)
+        self.assertEqual(len(self.clock.slept), 1)
+        self.assertLess(self.clock.slept[0], 50)
+
+        # 服务器报告已到硬上限
+        self.limiter.update_from_headers({'X-MBX-USED-WEIGHT-1M': '90'})
+        window_start = self.clock.now // 60 * 60
+        self.limiter.acquire(5)
+        self.assertGreaterEqual(self.clock.now, window_start + 60)
+        status = self.limiter.get_status()
+        self.assertEqual(status['used_weight'], 5)
+        self.assertGreater(status['throttled_seconds'], 0)
+
+    def test_headers_calibrate_used_weight(self):
+        """响应头中的已用权重（含其他进程消耗）覆盖本地计数"""
+        self.limiter.acquire(1)
+        self.limiter.update_from_headers({'X-MBX-USED-WEIGHT-1M': '80', 'X-MBX-ORDER-COUNT-1M': '3'})
+        status = self.limiter.get_status()
+        self.assertEqual(status['used_weight'], 80)
+        self.assertEqual(status['headroom'], 10)
+        self.assertEqual(status['order_count_1m'], 3)
+
+    def test_retry_after_on_429(self):
+        """429 时按 Retry-After 暂停后重试"""
+        client = BinanceClient('key', 'secret')
+        client.futures_rate_limiter = self.limiter
+
+        limited = Mock(status_code=429, headers={'Retry-After': '7', 'X-MBX-USED-WEIGHT-1M': '95'})
+        ok = Mock(status_code=200, headers={'X-MBX-USED-WEIGHT-1M': '3'})
+        ok.json.return_value = {'serverTime': 1}
+        client.session = Mock()
+        client.session.get.side_effect = [limited, ok]
+
+        before = self.clock.now
+        result = client._request('GET', '/fapi/v1/time', futures=True)
+
+        self.assertEqual(result, {'serverTime': 1})
+        self.assertEqual(client.session.get.call_count, 2)
+        self.assertGreaterEqual(self.clock.now - before, 7)
+        self.assertEqual(client.get_rate_limit_status()['rate_limit_hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+测试相同GET请求合并（single-flight）
+BinanceClient 的 session 换成每次请求固定耗时的 SlowSession，多个线程同时发出请求
+"""
+
+import unittest
+import threading
+import time
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from binance_client import BinanceClient
+from testing_fakes import json_response, wait_for
+
+
+POSITIONS = [{'symbol': 'BTCUSDT', 'positionAmt': '0.010'}]
+
+
+class SlowSession:
+    """每次请求等待一段时间，记录调用"""
+
+    def __init__(self, delay=0.1, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _respond(self, method, url, params):
+        with self.lock:
+            self.calls.append((method, url, dict(params or {})))
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return json_response([dict(p) for p in POSITIONS] if method == 'GET' else {'orderId': 1})
+
+    def get(self, url, params=None, **kwargs):
+        return self._respond('GET', url, params)
+
+    def post(self, url, params=None, **kwargs):
+        return self._respond('POST', url, params)
+
+
+def run_concurrently(func, count):
+    results, errors = [], []
+    barrier = threading.Barrier(count)
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(func())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+class TestRequestCoalescing(unittest.TestCase):
+    """测试相同GET请求合并"""
+
+    def test_concurrent_gets_share_one_call(self):
+        """8个线程同时查询持仓只发一次请求，各自拿到独立副本；ttl=0 时请求结束后不复用"""
+        client = BinanceClient('key', 'secret', get_cache_ttl=0)
+        client.session = SlowSession()
+
+        results, errors = run_concurrently(client.get_futures_positions, 8)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(client.session.calls), 1)
+        self.assertEqual(client.coalesce_stats['http_gets'], 1)
+        self.assertEqual(client.coalesce_stats['coalesced'], 7)
+        self.assertTrue(all(r == POSITIONS for r in results))
+
+        # 调用方修改结果互不影响
+        results[0][0]['positionAmt'] = '0'
+        self.assertTrue(all(r[0]['positionAmt'] == '0.010' for r in results[1:]))
+
+        # ttl=0：请求结束后不复用
+        client.get_futures_positions()
+        self.assertEqual(len(client.session.calls), 2)
+
+    def test_error_shared_with_followers(self):
+        """进行中的请求失败时所有等待者收到异常，失败结果不复用"""
+        client = BinanceClient('key', 'secret', get_cache_ttl=1.0)
+        client.session = SlowSession(error=ValueError('boom'))
+
+        results, errors = run_concurrently(lambda: client.get_futures_klines('BTCUSDT', '1m', limit=5), 4)
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 4)
+        self.assertEqual(len(client.session.calls), 1)
+        # 失败结果不复用
+        client.session.error = None
+        self.assertEqual(client.get_futures_klines('BTCUSDT', '1m', limit=5), POSITIONS)
+        self.assertEqual(len(client.session.calls), 2)
+
+    def test_base_exception_releases_followers(self):
+        """发起者被 BaseException 中断时等待者同样收到异常，之后的请求重新发送"""
+        class Abort(BaseException):
+            pass
+
+        client = BinanceClient('key', 'secret', get_cache_ttl=0)
+        release = threading.Event()
+
+        def interrupted_send(*args, **kwargs):
+            release.wait(5)
+            raise Abort()
+
+        client._send_request = interrupted_send
+        errors = []
+
+        def call():
+            try:
+                client.get_futures_positions()
+            except BaseException as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call, daemon=True)
+        leader.start()
+        self.assertTrue(wait_for(lambda: client._inflight))
+        follower = threading.Thread(target=call, daemon=True)
+        follower.start()
+        self.assertTrue(wait_for(lambda: client.coalesce_stats['coalesced'] == 1))
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertFalse(follower.is_alive())
+        self.assertEqual([type(e) for e in errors], [Abort, Abort])
+        self.assertEqual(client._inflight, {})
+
+    def test_cache_invalidated_by_order(self):
+        """复用时间内不重复请求，下单成功后立即失效"""
+        client = BinanceClient('key', 'secret', get_cache_ttl=10)
+        client.session = SlowSession(delay=0)
+
+        client.get_futures_positions()
+        client.get_futures_positions()
+        self.assertEqual(len(client.session.calls), 1)
+        self.assertEqual(client.coalesce_stats['cache_hits'], 1)
+
+        client.create_futures_order('BTCUSDT', 'BUY', 'MARKET', quantity=0.001)
+        client.get_futures_positions()
+        self.assertEqual([c[0] for c in client.session.calls], ['GET', 'POST', 'GET'])
+
+    def test_different_requests_not_merged(self):
+        """参数不同的GET和下单请求各自发送"""
+        client = BinanceClient('key', 'secret', get_cache_ttl=10)
+        client.session = SlowSession(delay=0.05)
+
+        run_concurrently(lambda: client.get_futures_klines('BTCUSDT', '1m', limit=5), 2)
+        run_concurrently(lambda: client.get_futures_klines('ETHUSDT', '1m', limit=5), 2)
+        self.assertEqual(len(client.session.calls), 2)
+
+        run_concurrently(lambda: client.create_futures_order('BTCUSDT', 'BUY', 'MARKET', quantity=0.001), 3)
+        self.assertEqual(sum(1 for c in client.session.calls if c[0] == 'POST'), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
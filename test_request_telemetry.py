@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+测试请求遥测
+LatencyHistogram / RequestTelemetry 单独测试，BinanceClient 的遥测用 Mock session 驱动
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import json
+import os
+import sys
+import tempfile
+
+import requests
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from request_telemetry import LatencyHistogram, RequestTelemetry, format_table
+from binance_client import BinanceClient
+from testing_fakes import json_response
+
+
+class TestRequestTelemetry(unittest.TestCase):
+    """测试请求遥测"""
+
+    def test_histogram_percentiles(self):
+        """1~1000ms 均匀分布的分位数误差在分桶精度内，空直方图返回0"""
+        histogram = LatencyHistogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.percentile(50), 0.5, delta=0.5 * 0.04)
+        self.assertAlmostEqual(histogram.percentile(99), 0.99, delta=0.99 * 0.04)
+        self.assertEqual(histogram.percentile(100), 1.0)
+        self.assertAlmostEqual(histogram.mean(), 0.5005)
+        self.assertLess(len(histogram.buckets), 200)
+        self.assertEqual(LatencyHistogram().percentile(99), 0.0)
+
+    def test_client_records_endpoint(self):
+        """读超时后重试成功：按接口记录请求数、重试次数、状态码和最后一次已用权重"""
+        client = BinanceClient('key', 'secret', get_cache_ttl=0)
+        client.session = Mock()
+        client.session.get.side_effect = [
+            requests.exceptions.ReadTimeout('read timed out'),
+            json_response([], headers={'X-MBX-USED-WEIGHT-1M': '37'}),
+            json_response([], headers={'X-MBX-USED-WEIGHT-1M': '38'}),
+        ]
+
+        with patch('binance_client.time.sleep'):
+            client.get_futures_klines('BTCUSDT', '1m', limit=5)
+        client.get_futures_klines('ETHUSDT', '1m', limit=5)
+
+        stats = client.telemetry.snapshot()['GET /fapi/v1/klines']
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['retries'], 1)
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(stats['status_codes'], {'network_error': 1, '200': 2})
+        self.assertEqual(stats['last_used_weight'], 38)
+        self.assertEqual(stats['latency']['count'], 2)
+        self.assertEqual(stats['http_latency']['count'], 3)
+
+    def test_errors_and_stats(self):
+        """下单返回400时计入错误数，stats() 同时汇总GET合并和限流状态"""
+        client = BinanceClient('key', 'secret')
+        client.session = Mock()
+        error_response = json_response({'code': -2019, 'msg': 'Margin is insufficient.'}, status=400)
+        error_response.raise_for_status.side_effect = requests.exceptions.HTTPError('400 Client Error')
+        client.session.post.return_value = error_response
+
+        with self.assertRaises(Exception):
+            client.create_futures_order('BTCUSDT', 'BUY', 'MARKET', quantity=0.001)
+
+        stats = client.stats()
+        order_stats = stats['endpoints']['POST /fapi/v1/order']
+        self.assertEqual(order_stats['errors'], 1)
+        self.assertEqual(order_stats['status_codes'], {'400': 1})
+        self.assertIn('coalesce', stats)
+        self.assertIn('used_weight', stats['rate_limit'])
+
+    def test_dump_jsonl(self):
+        """导出 JSONL 后 reset 清零，下一行为空统计；format_table 输出接口名"""
+        telemetry = RequestTelemetry()
+        telemetry.record_attempt('GET', '/fapi/v2/account', 0.120, 200, 55)
+        telemetry.record_request('GET', '/fapi/v2/account', 0.125, 1, True)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'telemetry', 'requests.jsonl')
+            telemetry.dump_jsonl(path, reset=True)
+            self.assertEqual(telemetry.snapshot(), {})
+            telemetry.dump_jsonl(path)
+
+            with open(path, encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f]
+
+        self.assertEqual(len(lines), 2)
+        account = lines[0]['endpoints']['GET /fapi/v2/account']
+        self.assertEqual(account['max_used_weight'], 55)
+        self.assertAlmostEqual(account['latency']['p50_ms'], 125, delta=5)
+        self.assertEqual(lines[1]['endpoints'], {})
+        self.assertIn('GET /fapi/v2/account', format_table(lines[0]['endpoints']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+测试流式技术指标
+逐根更新的指标状态与 indicators 的批量计算对照，
+IndicatorStreams 从假K线缓存读取最近收盘的K线
+"""
+
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import indicators
+from bench_indicators import make_klines
+from market_analyzer import MarketAnalyzer
+from streaming_indicators import IndicatorState, IndicatorStreams, StreamingRSI
+from testing_fakes import FakeKlineClient, MINUTE, assert_close
+
+
+KLINES = make_klines(400)
+START = KLINES[0][0]
+
+
+def make_store(last_open):
+    """当前时间在 last_open 这根1分钟K线开盘后30秒（这根未收盘）"""
+    return FakeKlineClient({'now': (last_open + 30_000) / 1000}, KLINES)
+
+
+class TestStreamingIndicators(unittest.TestCase):
+    """测试流式技术指标"""
+
+    def test_matches_batch(self):
+        """400根逐根更新后，各指标序列与批量计算一致"""
+        state = IndicatorState(history=len(KLINES))
+        for bar in KLINES:
+            state.update(bar)
+
+        bars = indicators.klines_to_arrays(KLINES)
+        expected = indicators.compute_all(bars['close'], bars['high'], bars['low'])
+        for name in ('ema20', 'ema50', 'rsi7', 'rsi14', 'macd', 'macd_signal', 'macd_hist',
+                     'atr3', 'atr14', 'bb_upper', 'bb_middle', 'bb_lower'):
+            assert_close(self, state.series(name, len(KLINES)), expected[name], tol=1e-8)
+
+    def test_wilder_rsi_and_peek(self):
+        """Wilder RSI 与递推定义一致；peek 的结果等于随后 update 的结果，且不改变状态"""
+        closes = [float(k[4]) for k in KLINES[:60]]
+        rsi = StreamingRSI(14, wilder=True)
+        values = [rsi.update(c) for c in closes]
+
+        deltas = np.diff(closes)
+        avg_gain = np.clip(deltas[:14], 0, None).mean()
+        avg_loss = np.clip(-deltas[:14], 0, None).mean()
+        for delta in deltas[14:]:
+            avg_gain = (avg_gain * 13 + max(delta, 0)) / 14
+            avg_loss = (avg_loss * 13 + max(-delta, 0)) / 14
+        self.assertTrue(np.isnan(values[13]))
+        self.assertAlmostEqual(values[-1], 100 - 100 / (1 + avg_gain / avg_loss), places=9)
+
+        # peek 等于更新后的值，但不改变状态
+        state = IndicatorState()
+        for bar in KLINES[:100]:
+            state.update(bar)
+        preview = state.peek(KLINES[100])
+        self.assertEqual(state.last_open_time, KLINES[99][0])
+        self.assertEqual(state.current(), state.history[-1])
+        self.assertAlmostEqual(preview['rsi14'], state.update(KLINES[100])['rsi14'])
+
+    def test_incremental_sync(self):
+        """预热后只应用新收盘的K线，20分钟断档读更长的历史补齐；日内序列直接读取流式状态"""
+        store = make_store(START + 299 * MINUTE)
+        streams = IndicatorStreams(store, warmup_bars=200, sync_bars=5)
+
+        with patch('streaming_indicators.time.time', lambda: store.clock['now']):
+            state, open_bar = streams.get('BTCUSDT', '1m')
+            self.assertEqual([c['limit'] for c in store.calls], [200])
+            self.assertEqual(open_bar[0], START + 299 * MINUTE)
+            self.assertEqual(state.last_open_time, START + 298 * MINUTE)
+
+            store.clock['now'] += 3 * 60
+            state, _ = streams.get('BTCUSDT', '1m')
+            self.assertEqual(state.last_open_time, START + 301 * MINUTE)
+            self.assertEqual(streams.stats['bars_applied'], 199 + 3)
+
+            # 断档超过 sync_bars：读取更长历史补齐，不重新预热
+            store.clock['now'] += 20 * 60
+            store.calls.clear()
+            state, _ = streams.get('BTCUSDT', '1m')
+            self.assertEqual([c['limit'] for c in store.calls], [5, 200])
+            self.assertEqual(state.last_open_time, START + 321 * MINUTE)
+            self.assertEqual(streams.stats['warmups'], 1)
+
+            # MarketAnalyzer 直接读取流式状态
+            analyzer = MarketAnalyzer(None, kline_store=store, indicator_streams=streams)
+            with patch.object(MarketAnalyzer, 'get_kline_arrays', side_effect=AssertionError('不应批量计算')):
+                series = analyzer.get_intraday_series('BTCUSDT', '1m', 10)
+        self.assertEqual(series['mid_prices'][-1], float(KLINES[322][4]))
+        self.assertEqual(series['rsi14_values'][:-1], state.series('rsi14', 9))
+        self.assertEqual(len(series['timestamps']), 10)
+
+    def test_snapshot_restore(self):
+        """保存后恢复的状态只读取断档的K线，继续更新的结果与未中断的一致；参数不同或文件不存在时不恢复"""
+        store = make_store(START + 250 * MINUTE)
+        clock = patch('streaming_indicators.time.time', lambda: store.clock['now'])
+        clock.start()
+        self.addCleanup(clock.stop)
+
+        original = IndicatorStreams(store)
+        original.get('ETHUSDT', '1m')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'state', 'indicators.json')
+            original.save(path)
+
+            restored = IndicatorStreams(store)
+            self.assertEqual(restored.load(path), 1)
+            self.assertEqual(IndicatorStreams(store, spec={'ema': (9,)}).load(path), 0)
+            self.assertEqual(restored.load(os.path.join(tmpdir, 'missing.json')), 0)
+
+        store.clock['now'] += 5 * 60
+        expected, _ = original.get('ETHUSDT', '1m')
+        store.calls.clear()
+        actual, _ = restored.get('ETHUSDT', '1m')
+        self.assertEqual([c['limit'] for c in store.calls], [20])
+        self.assertEqual(restored.stats['warmups'], 0)
+        self.assertEqual(actual.current(), expected.current())
+        self.assertEqual(actual.series('macd', 50), expected.series('macd', 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
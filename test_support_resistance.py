@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+测试支撑/阻力位检测
+support_resistance 的枢轴点和区间聚类与逐窗口的朴素实现对照
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import os
+import sys
+import time
+
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import indicators
+import support_resistance
+from bench_indicators import make_klines
+from kline_store import KlineStore
+from market_analyzer import MarketAnalyzer
+from testing_fakes import FakeKlineClient
+
+
+def naive_pivots(values, order, compare):
+    """逐个窗口切片比较的朴素实现（O(n·w)）"""
+    result = []
+    for i in range(order, len(values) - order):
+        if values[i] == compare(values[i - order:i + order + 1]):
+            if result and i - result[-1] <= order and values[result[-1]] == values[i]:
+                continue
+            result.append(i)
+    return result
+
+
+class TestSupportResistance(unittest.TestCase):
+    """测试支撑/阻力位检测"""
+
+    def test_sliding_extremes(self):
+        """单调队列的滑动窗口最大/最小值与逐窗口计算一致"""
+        values = np.random.default_rng(3).integers(0, 20, 300).astype(float)
+        for window in (1, 2, 5, 21):
+            expected_max = [values[i:i + window].max() for i in range(len(values) - window + 1)]
+            expected_min = [values[i:i + window].min() for i in range(len(values) - window + 1)]
+            self.assertEqual(support_resistance.sliding_max(values, window).tolist(), expected_max)
+            self.assertEqual(support_resistance.sliding_min(values, window).tolist(), expected_min)
+
+        self.assertEqual(len(support_resistance.sliding_max([1.0, 2.0], 5)), 0)
+        with self.assertRaises(ValueError):
+            support_resistance.sliding_min([1.0], 0)
+
+    def test_pivots_and_zones(self):
+        """平台只保留一个枢轴点，相近的枢轴点聚合成区间并统计触及次数"""
+        high = [10, 11, 15, 11, 10, 12, 15, 15, 12, 11, 15.05, 11, 10]
+        low = [9, 8, 9, 10, 5, 10, 10, 9, 8, 9, 10, 9, 8]
+        highs, lows = support_resistance.find_pivots(high, low, order=1)
+        # 6、7 两根同价平台只保留第一根
+        self.assertEqual(highs.tolist(), [2, 6, 10])
+        self.assertEqual(lows.tolist(), [1, 4, 8])
+
+        zones = support_resistance.find_zones(high, low, order=1, tolerance=0.01)
+        self.assertEqual([(z['low'], z['high'], z['touches']) for z in zones],
+                         [(5.0, 5.0, 1), (8.0, 8.0, 2), (15.0, 15.05, 3)])
+        self.assertEqual(zones[2]['last_index'], 10)
+        self.assertAlmostEqual(zones[2]['price'], (15 + 15 + 15.05) / 3)
+
+        self.assertEqual(support_resistance.find_zones([], []), [])
+
+    def test_split_and_scaling(self):
+        """按当前价格划分支撑和阻力，数千根K线的检测结果与朴素实现一致"""
+        bars = indicators.klines_to_arrays(make_klines(5000))
+        high, low = bars['high'], bars['low']
+        highs, lows = support_resistance.find_pivots(high, low, order=10)
+        self.assertEqual(highs.tolist(), naive_pivots(high, 10, np.max))
+        self.assertEqual(lows.tolist(), naive_pivots(low, 10, np.min))
+
+        price = float(bars['close'][-1])
+        levels = support_resistance.detect_levels(high, low, price, order=10, max_levels=4)
+        self.assertEqual(len(levels['support']), 4)
+        support = [z['price'] for z in levels['support']]
+        resistance = [z['price'] for z in levels['resistance']]
+        self.assertEqual(support, sorted(support, reverse=True))
+        self.assertEqual(resistance, sorted(resistance))
+        self.assertTrue(all(p < price for p in support) and all(p >= price for p in resistance))
+
+        # 线性时间：数据量扩大10倍，耗时增长远小于窗口加大带来的 O(n·w)
+        started = time.perf_counter()
+        support_resistance.find_zones(np.tile(high, 10), np.tile(low, 10), order=50)
+        self.assertLess(time.perf_counter() - started, 2.0)
+
+    def test_market_analyzer_levels(self):
+        """分析器只用已收盘K线检测并按K线缓存，完整上下文使用检测出的支撑阻力"""
+        klines = make_klines(600)
+        clock = {'now': (klines[-1][0] + 30_000) / 1000}
+        client = FakeKlineClient(clock, klines)
+        analyzer = MarketAnalyzer(client, kline_store=KlineStore(client))
+
+        with patch('kline_store.time.time', lambda: clock['now']):
+            result = analyzer.find_support_resistance('BTCUSDT', '1m', lookback=500)
+            again = analyzer.find_support_resistance('BTCUSDT', '1m', lookback=500, current_price=1e9)
+
+            bars = indicators.klines_to_arrays(klines[-500:-1])
+            expected = support_resistance.detect_levels(bars['high'], bars['low'], float(klines[-1][4]))
+            self.assertEqual(result['support_zones'], expected['support'])
+            self.assertEqual(result['resistance_levels'], [z['price'] for z in expected['resistance']])
+            self.assertEqual(again['resistance_levels'], [])
+            self.assertEqual(analyzer.indicator_cache_stats['misses'], 2)
+
+            with patch.multiple(MarketAnalyzer, prefetch_market_context=Mock(return_value=None),
+                                get_intraday_series=Mock(return_value={}), get_4h_context=Mock(return_value={}),
+                                get_futures_market_data=Mock(return_value={}), get_market_overview=Mock(return_value={}),
+                                find_support_resistance=Mock(return_value={'support_levels': [1.0],
+                                                                           'resistance_levels': [2.0]})):
+                context = analyzer.get_comprehensive_market_context('BTCUSDT')
+                self.assertEqual((context['support_levels'], context['resistance_levels']), ([1.0], [2.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
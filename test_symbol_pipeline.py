@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+测试多交易对并发处理
+AlphaArenaBot 的依赖全部为 Mock，_process_symbol 换成可控耗时的函数来观察调度
+"""
+
+import unittest
+from unittest.mock import Mock
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from performance_tracker import PerformanceTracker
+from testing_fakes import make_bot
+
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT']
+
+
+class TestSymbolPipeline(unittest.TestCase):
+    """测试多交易对并发处理"""
+
+    def make_bot(self, **env):
+        return make_bot(self, SYMBOLS, **{'SYMBOL_CONCURRENCY': '4', 'SYMBOL_DEADLINE_SECONDS': '5', **env})
+
+    def test_symbols_overlap(self):
+        """4个交易对并发处理，一轮耗时接近单个交易对；SYMBOL_CONCURRENCY=1 时按顺序处理"""
+        bot = self.make_bot()
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def slow(symbol, deadline=None, decision=None):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.2)
+            with lock:
+                active[0] -= 1
+
+        bot._process_symbol = Mock(side_effect=slow)
+        started = time.time()
+        bot._process_symbols(SYMBOLS)
+        self.assertLess(time.time() - started, 0.6)
+        self.assertEqual(peak[0], 4)
+        self.assertEqual(sorted(c.args[0] for c in bot._process_symbol.call_args_list), sorted(SYMBOLS))
+
+        sequential = self.make_bot(SYMBOL_CONCURRENCY='1')
+        sequential._process_symbol = Mock()
+        sequential._process_symbols(SYMBOLS)
+        self.assertEqual([c.args[0] for c in sequential._process_symbol.call_args_list], SYMBOLS)
+
+    def test_deadline_and_per_symbol_serial(self):
+        """超过截止时间的交易对本轮不再等待，下一轮仍在处理时跳过，同一交易对不会并发"""
+        bot = self.make_bot(SYMBOL_DEADLINE_SECONDS='0.2')
+        release = threading.Event()
+        calls = []
+
+        def process(symbol, deadline=None, decision=None):
+            calls.append(symbol)
+            if symbol == 'BTCUSDT':
+                release.wait(5)
+
+        bot._process_symbol = Mock(side_effect=process)
+        started = time.time()
+        bot._process_symbols(SYMBOLS)
+        self.assertLess(time.time() - started, 1.0)
+
+        bot._process_symbols(SYMBOLS)
+        self.assertEqual(calls.count('BTCUSDT'), 1)
+        self.assertEqual(calls.count('ETHUSDT'), 2)
+
+        release.set()
+        bot._symbol_executor.shutdown(wait=True)
+        self.assertFalse(bot._get_symbol_lock('BTCUSDT').locked())
+
+    def test_queued_symbols_deadline(self):
+        """排队的交易对截止时间从开始处理时计算，本轮未开始的被取消"""
+        bot = self.make_bot(SYMBOL_CONCURRENCY='2', SYMBOL_DEADLINE_SECONDS='0.3')
+        budgets = {}
+
+        def process(symbol, deadline=None, decision=None):
+            budgets[symbol] = deadline - time.time()
+            time.sleep(0.2)
+
+        bot._process_symbol = Mock(side_effect=process)
+        bot._process_symbols(SYMBOLS)
+        self.assertEqual(set(budgets), set(SYMBOLS))
+        self.assertGreater(min(budgets.values()), 0.25)
+
+        release = threading.Event()
+        calls = []
+
+        def blocked(symbol, deadline=None, decision=None):
+            calls.append(symbol)
+            release.wait(5)
+
+        bot._process_symbol = Mock(side_effect=blocked)
+        bot._process_symbols(SYMBOLS)
+        release.set()
+        bot._symbol_executor.shutdown(wait=True)
+        self.assertEqual(calls, SYMBOLS[:2])
+
+    def test_expired_decision_not_executed(self):
+        """平仓决策返回时已超过截止时间则不下单，截止时间传给开仓分析"""
+        bot = self.make_bot()
+        bot.account_snapshot = Mock()
+        bot.account_snapshot.get_positions.return_value = [
+            {'symbol': 'BTCUSDT', 'positionAmt': '0.01', 'entryPrice': '50000', 'markPrice': '50100'}
+        ]
+        bot._check_and_execute_rolling = Mock()
+        bot._check_and_force_close_if_profit_target = Mock(return_value=False)
+        bot._save_ai_decision = Mock()
+        bot.ai_engine.analyze_position_for_closing.return_value = {
+            'success': True, 'decision': {'action': 'CLOSE', 'confidence': 80, 'reasoning': 'x'}
+        }
+
+        bot._process_symbol('BTCUSDT', deadline=time.time() - 1)
+        bot.binance.close_position.assert_not_called()
+        bot._process_symbol('BTCUSDT', deadline=time.time() + 60)
+        bot.binance.close_position.assert_called_once_with('BTCUSDT')
+        self.assertEqual(bot.total_invocations, 2)
+
+        bot.account_snapshot.get_positions.return_value = []
+        bot._process_symbol('ETHUSDT', deadline=123.0)
+        self.assertEqual(bot.ai_engine.analyze_and_trade.call_args.kwargs['deadline'], 123.0)
+
+    def test_concurrent_performance_records(self):
+        """多个线程同时记录交易，性能数据文件完整"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'performance.json')
+            tracker = PerformanceTracker(initial_capital=100, data_file=path)
+
+            def record(symbol):
+                for i in range(20):
+                    tracker.record_trade({'symbol': symbol, 'action': 'OPEN_LONG', 'quantity': i, 'price': 1.0})
+
+            threads = [threading.Thread(target=record, args=(s,)) for s in SYMBOLS]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            with open(path) as f:
+                saved = json.load(f)
+            self.assertEqual(len(saved['trades']), 20 * len(SYMBOLS))
+
+
+if __name__ == '__main__':
+    unittest.main()
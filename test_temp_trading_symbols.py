@@ -33,7 +33,9 @@ class TestTempTradingSymbols(unittest.TestCase):
             'INITIAL_CAPITAL': '100',
             'MAX_POSITION_PCT': '10',
             'DEFAULT_LEVERAGE': '3',
-            'TRADING_INTERVAL_SECONDS': '120'
+            'TRADING_INTERVAL_SECONDS': '120',
+            'ENABLE_MARKET_STREAM': 'false',
+            'ENABLE_USER_STREAM': 'false'
         })
         self.env_patcher.start()
 
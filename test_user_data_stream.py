@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+测试用户数据流（使用本地回放服务器，无需联网）
+回放服务器推送 ACCOUNT_UPDATE / ORDER_TRADE_UPDATE，REST 对账数据来自 Mock 客户端
+"""
+
+import threading
+import unittest
+from unittest.mock import Mock, patch
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from user_data_stream import UserDataStream, WEBSOCKET_AVAILABLE
+from stream_replay_server import StreamReplayServer
+from binance_client import BinanceClient
+from alpha_arena_bot import AlphaArenaBot
+from testing_fakes import wait_for
+
+
+def account_update(symbol, amount, entry_price, unrealized_pnl, wallet_balance):
+    return {
+        'e': 'ACCOUNT_UPDATE', 'E': 1, 'T': 1,
+        'a': {
+            'm': 'ORDER',
+            'B': [{'a': 'USDT', 'wb': str(wallet_balance), 'cw': str(wallet_balance), 'bc': '0'}],
+            'P': [{'s': symbol, 'pa': str(amount), 'ep': str(entry_price), 'bep': str(entry_price),
+                   'cr': '0', 'up': str(unrealized_pnl), 'mt': 'cross', 'iw': '0', 'ps': 'BOTH'}]
+        }
+    }
+
+
+def order_update(symbol, order_id, status, order_type='STOP_MARKET', stop_price='59000'):
+    return {
+        'e': 'ORDER_TRADE_UPDATE', 'E': 1, 'T': 1,
+        'o': {
+            's': symbol, 'c': f'client-{order_id}', 'S': 'SELL', 'o': order_type, 'f': 'GTC',
+            'q': '0.010', 'p': '0', 'ap': '0', 'sp': stop_price, 'x': status, 'X': status,
+            'i': order_id, 'l': '0', 'z': '0', 'L': '0', 'T': 1, 'R': True, 'ps': 'BOTH',
+            'cp': False, 'ot': order_type, 'rp': '0'
+        }
+    }
+
+
+REST_ACCOUNT = {
+    'totalWalletBalance': '1000',
+    'assets': [{'asset': 'USDT', 'walletBalance': '1000', 'crossWalletBalance': '1000'}]
+}
+
+REST_TP_ORDER = {'orderId': 10, 'symbol': 'BTCUSDT', 'type': 'TAKE_PROFIT_MARKET',
+                 'origQty': '0.010', 'stopPrice': '63000', 'status': 'NEW'}
+
+
+def make_client():
+    client = Mock()
+    client.create_listen_key.return_value = 'test-listen-key'
+    client.get_futures_account_info.return_value = REST_ACCOUNT
+    client.get_futures_positions.return_value = []
+    client.get_futures_open_orders.return_value = [REST_TP_ORDER]
+    return client
+
+
+class TestUserDataStream(unittest.TestCase):
+    """测试用户数据流"""
+
+    @unittest.skipUnless(WEBSOCKET_AVAILABLE, "需要安装 websocket-client")
+    def test_stream_updates_mirror(self):
+        """用 listenKey 连接并对账，之后按推送更新余额、持仓和挂单镜像"""
+        messages = [
+            order_update('BTCUSDT', 11, 'NEW'),
+            account_update('BTCUSDT', 0.01, 60000, 5, 1010),
+            order_update('BTCUSDT', 10, 'FILLED', order_type='TAKE_PROFIT_MARKET'),
+        ]
+        server = StreamReplayServer(messages).start()
+        client = make_client()
+        stream = UserDataStream(client, stream_url=server.url)
+        try:
+            self.assertTrue(stream.start())
+            self.assertTrue(stream.wait_until_synced(5))
+            self.assertTrue(wait_for(lambda: stream.stats['events'] == 3))
+
+            self.assertEqual(server.paths, ['/ws/test-listen-key'])
+            client.get_futures_open_orders.assert_called_with(use_stream=False)
+
+            position = stream.get_position('BTCUSDT')
+            self.assertEqual(float(position['positionAmt']), 0.01)
+            self.assertEqual(float(position['entryPrice']), 60000)
+            self.assertEqual([o['orderId'] for o in stream.get_open_orders('BTCUSDT')], [11])
+            self.assertEqual(stream.get_balance('USDT')['wallet_balance'], 1010)
+
+            account = stream.get_account_info()
+            self.assertEqual(float(account['totalWalletBalance']), 1010)
+            self.assertEqual(float(account['totalMarginBalance']), 1015)
+        finally:
+            stream.stop()
+            server.stop()
+        client.close_listen_key.assert_called_once()
+        self.assertFalse(stream.is_synced())
+
+    def test_client_reads_mirror_when_synced(self):
+        """同步时 get_active_positions 和挂单读镜像，未同步时请求REST"""
+        client = BinanceClient('key', 'secret')
+        client.get_futures_positions = Mock(return_value=[])
+        stream = UserDataStream(client)
+        client.attach_user_data_stream(stream)
+
+        stream.handle_event(account_update('ETHUSDT', -0.5, 3000, -2, 1000))
+        stream.handle_event(order_update('ETHUSDT', 21, 'NEW'))
+
+        # 尚未连接：回退REST
+        self.assertEqual(client.get_active_positions(), [])
+        client.get_futures_positions.assert_called_once()
+
+        stream.connected = True
+        stream.synced = True
+        positions = client.get_active_positions()
+        self.assertEqual([p['symbol'] for p in positions], ['ETHUSDT'])
+        self.assertEqual(client.get_futures_positions.call_count, 1)
+        self.assertEqual([o['orderId'] for o in client.get_futures_open_orders('ETHUSDT')], [21])
+
+        # 标记价格来源可用时重算未实现盈亏
+        stream.mark_price_source = Mock()
+        stream.mark_price_source.get_mark_price.return_value = 2990.0
+        self.assertAlmostEqual(float(stream.get_position('ETHUSDT')['unRealizedProfit']), 5.0)
+
+    def test_push_during_reconcile_wins(self):
+        """对账请求期间收到的推送不会被更早的REST快照覆盖"""
+        client = make_client()
+        stream = UserDataStream(client)
+        stream.connected = True
+
+        stale_positions = [{'symbol': 'BTCUSDT', 'positionSide': 'BOTH', 'positionAmt': '0.01',
+                            'entryPrice': '60000', 'unRealizedProfit': '0', 'leverage': '5'}]
+
+        def positions_with_push():
+            # REST 请求进行中：止盈单成交、持仓归零
+            stream.handle_event(account_update('BTCUSDT', 0, 0, 0, 1030))
+            stream.handle_event(order_update('BTCUSDT', 10, 'FILLED', order_type='TAKE_PROFIT_MARKET'))
+            return stale_positions
+
+        client.get_futures_positions.side_effect = positions_with_push
+
+        self.assertTrue(stream.reconcile())
+        self.assertTrue(stream.is_synced())
+        self.assertEqual(stream.get_positions(), [])
+        self.assertEqual(stream.get_open_orders(), [])
+
+        # 之后的对账以REST为准
+        client.get_futures_positions.side_effect = None
+        client.get_futures_positions.return_value = stale_positions
+        stream.reconcile()
+        self.assertEqual(stream.get_position('BTCUSDT')['leverage'], '5')
+
+    def test_bot_handles_exit_fill(self):
+        """止损成交后失效账户快照，持仓归零时撤掉剩余的止盈单（推送先后顺序均可）"""
+        bot = AlphaArenaBot.__new__(AlphaArenaBot)
+        bot.logger = Mock()
+        bot.account_snapshot = Mock()
+        bot.binance = Mock()
+        bot.binance.cancel_stop_orders.return_value = {'success': True, 'cancelled_count': 1}
+        bot._pending_exit_symbols = set()
+        bot._exit_lock = threading.Lock()
+        bot._exit_order_executor = Mock()
+        bot.user_data_stream = UserDataStream(make_client())
+        bot.user_data_stream.connected = True
+        bot.user_data_stream.synced = True
+        bot.user_data_stream.add_listener(bot._on_user_data_event)
+        push = bot.user_data_stream.handle_event
+        submit = bot._exit_order_executor.submit
+
+        push(account_update('BTCUSDT', 0.01, 60000, 0, 1000))
+        push(order_update('BTCUSDT', 11, 'NEW'))
+        submit.assert_not_called()
+        self.assertEqual(bot.account_snapshot.invalidate.call_count, 2)
+
+        # 成交先于持仓变化：等 ACCOUNT_UPDATE 显示仓位为0后撤单
+        push(order_update('BTCUSDT', 11, 'FILLED'))
+        submit.assert_not_called()
+        push(account_update('BTCUSDT', 0, 0, 0, 990))
+        submit.assert_called_once_with(bot._cancel_remaining_exit_orders, 'BTCUSDT')
+
+        # 持仓变化先于成交：成交时镜像已无持仓，直接撤单
+        push(account_update('ETHUSDT', 0, 0, 0, 980))
+        push(order_update('ETHUSDT', 12, 'FILLED', order_type='TAKE_PROFIT_MARKET'))
+        self.assertEqual(submit.call_args.args, (bot._cancel_remaining_exit_orders, 'ETHUSDT'))
+
+        # 部分止盈后仍有持仓：保留其余保护单
+        submit.reset_mock()
+        push(account_update('BNBUSDT', 2, 600, 0, 980))
+        push(order_update('BNBUSDT', 13, 'FILLED', order_type='TAKE_PROFIT_MARKET'))
+        push(account_update('BNBUSDT', 1, 600, 0, 990))
+        submit.assert_not_called()
+        self.assertEqual(bot._pending_exit_symbols, set())
+
+        bot._cancel_remaining_exit_orders('BTCUSDT')
+        bot.binance.cancel_stop_orders.assert_called_once_with('BTCUSDT')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,258 @@
+"""
+单元测试共用的假对象
+各测试文件直接导入，不再各自实现
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from unittest.mock import Mock, patch
+
+import numpy as np
+
+from bench_indicators import make_klines
+from kline_resampler import aggregate_bars
+from kline_store import INTERVAL_MS
+
+
+MINUTE = INTERVAL_MS['1m']
+HOUR = INTERVAL_MS['1h']
+
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    """轮询等待条件成立，超时返回最后一次判断结果"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def assert_close(test, actual, expected, tol: float = 1e-9):
+    """数组逐元素近似相等（NaN 位置也要一致）"""
+    test.assertTrue(np.allclose(actual, expected, rtol=tol, atol=tol, equal_nan=True))
+
+
+def json_response(payload, status: int = 200, headers: Optional[Dict] = None) -> Mock:
+    """requests 响应的替身（json() 返回 payload）"""
+    response = Mock(status_code=status, headers=headers if headers is not None else {})
+    response.text = json.dumps(payload)
+    response.json.return_value = payload
+    return response
+
+
+# ==================== K线 ====================
+
+def synthetic_bar(open_time: int, step: int = MINUTE) -> List:
+    """按开盘时间确定的K线（价格在 100~149 之间循环）"""
+    price = 100 + (open_time // step) % 50
+    return [open_time, str(price), str(price + 1), str(price - 1), str(price + 0.5), '10.5',
+            open_time + step - 1, '1050.0', 42, '5.25', '525.0', '0']
+
+
+def grid_klines(count: int, step: int = MINUTE, align: Optional[int] = None, seed: int = 7) -> List[List]:
+    """随机游走K线，开盘时间按 step 排列并从 align 的整数倍开始"""
+    klines = make_klines(count, seed=seed)
+    first = klines[0][0] + (-klines[0][0] % (align or step))
+    for i, bar in enumerate(klines):
+        bar[0] = first + i * step
+        bar[6] = bar[0] + step - 1
+    return klines
+
+
+class FakeKlineClient:
+    """
+    按模拟时钟返回K线的客户端
+
+    行为与币安K线接口一致：开盘时间晚于当前时间的K线不可见，最后一根未收盘；
+    有 startTime 时返回从 startTime 开始的前 limit 根，否则返回最近 limit 根。
+    bars 为空时按请求周期生成 synthetic_bar；为字典时按 (交易对, 周期) 或周期取各自的K线；
+    否则 bars 是 interval 周期的K线，更高周期由它们聚合。
+    """
+
+    def __init__(self, clock: Optional[Dict] = None, bars=None,
+                 interval: str = '1m', delay: float = 0.0):
+        """
+        Args:
+            clock: {'now': 秒}，为空时使用真实时间
+            bars: 固定的K线序列（从旧到新），或 {周期 / (交易对, 周期): K线序列}
+            interval: bars 的周期
+            delay: 每次请求的耗时（秒）
+        """
+        self.clock = clock
+        self.bars = bars
+        self.interval = interval
+        self.delay = delay
+
+        self.calls: List[Dict] = []       # K线请求参数
+        self.requests: List[str] = []     # 所有请求的名称，按发出顺序
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def now_ms(self) -> int:
+        return int((self.clock['now'] if self.clock is not None else time.time()) * 1000)
+
+    def _record(self, name: str):
+        with self._lock:
+            self.requests.append(name)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+
+    def reset(self):
+        """清空请求记录"""
+        with self._lock:
+            self.calls.clear()
+            self.requests.clear()
+
+    def intervals(self) -> List[str]:
+        """K线请求的周期，按发出顺序"""
+        return [call['interval'] for call in self.calls]
+
+    def get_futures_klines(self, symbol, interval, limit=100, startTime=None, endTime=None):
+        with self._lock:
+            self.calls.append({'symbol': symbol, 'interval': interval, 'limit': limit,
+                               'startTime': startTime, 'endTime': endTime})
+        self._record(f'klines_{interval}')
+        return self.visible(interval, limit, startTime, endTime, symbol=symbol)
+
+    def get_klines(self, symbol, interval, limit=100):
+        """KlineStore 接口，作为K线缓存的替身"""
+        return self.get_futures_klines(symbol, interval, limit)
+
+    def visible(self, interval: str, limit: int, start_time: Optional[int] = None,
+                end_time: Optional[int] = None, symbol: Optional[str] = None) -> List[List]:
+        """当前时间交易所会返回的K线（不记录请求）"""
+        step = INTERVAL_MS[interval]
+        now = self.now_ms() if end_time is None else min(self.now_ms(), end_time)
+
+        if self.bars is None:
+            last = now - now % step
+            if start_time is None:
+                first = last - (limit - 1) * step
+            else:
+                first = start_time + (-start_time % step)
+            stop = min(last, first + (limit - 1) * step)
+            return [synthetic_bar(t, step) for t in range(first, stop + 1, step)]
+
+        if isinstance(self.bars, dict):
+            series = self.bars.get((symbol, interval)) or self.bars[interval]
+            bars = [list(k) for k in series if k[0] <= now]
+        elif interval == self.interval:
+            bars = [list(k) for k in self.bars if k[0] <= now]
+        else:
+            # 未收盘的高周期K线由其中已开盘的K线聚合
+            groups = {}
+            for bar in (k for k in self.bars if k[0] <= now):
+                groups.setdefault(bar[0] - bar[0] % step, []).append(bar)
+            bars = [aggregate_bars(group, open_time, step) for open_time, group in sorted(groups.items())]
+        if start_time is not None:
+            return [k for k in bars if k[0] >= start_time][:limit]
+        return bars[-limit:]
+
+
+class FakeMarketClient(FakeKlineClient):
+    """在 FakeKlineClient 的基础上提供 ticker、订单簿、资金费率和持仓量接口"""
+
+    def __init__(self, clock: Optional[Dict] = None, bars=None,
+                 interval: str = '1m', delay: float = 0.0):
+        super().__init__(clock, bars, interval, delay)
+        self.ticker = {'lastPrice': '100', 'priceChangePercent': '1.5', 'highPrice': '110',
+                       'lowPrice': '90', 'volume': '1000', 'quoteVolume': '100000'}
+        self.order_book = {'bids': [['99.9', '5']], 'asks': [['100.1', '4']]}
+        self.funding_rate = '0.0001'
+        self.open_interest = '5000'
+        self.open_interest_history = ['4000', '6000']
+
+    def get_futures_24h_ticker(self, symbol):
+        self._record('ticker')
+        return dict(self.ticker)
+
+    def get_order_book(self, symbol, limit=20):
+        self._record('order_book')
+        return self.order_book
+
+    def get_current_funding_rate(self, symbol):
+        self._record('funding')
+        return {'fundingRate': self.funding_rate}
+
+    def get_open_interest(self, symbol):
+        self._record('open_interest')
+        return {'openInterest': self.open_interest}
+
+    def get_open_interest_statistics(self, symbol, period='5m', limit=30):
+        self._record('oi_hist')
+        return [{'sumOpenInterest': value} for value in self.open_interest_history]
+
+
+# ==================== 交易所规则 ====================
+
+def symbol_info(symbol: str, step: str, min_qty: str, tick: str, notional: str,
+                market_step: Optional[str] = None) -> Dict:
+    """exchangeInfo 中单个交易对的规则"""
+    return {
+        'symbol': symbol,
+        'filters': [
+            {'filterType': 'PRICE_FILTER', 'tickSize': tick, 'minPrice': tick, 'maxPrice': '1000000'},
+            {'filterType': 'LOT_SIZE', 'stepSize': step, 'minQty': min_qty, 'maxQty': '100000'},
+            {'filterType': 'MARKET_LOT_SIZE', 'stepSize': market_step or step, 'minQty': min_qty,
+             'maxQty': '1000'},
+            {'filterType': 'MIN_NOTIONAL', 'notional': notional},
+        ]
+    }
+
+
+EXCHANGE_INFO = {
+    'symbols': [
+        symbol_info('BTCUSDT', '0.001', '0.001', '0.10', '100'),
+        symbol_info('DOGEUSDT', '1', '1', '0.000010', '5'),
+        symbol_info('BNBUSDT', '0.01', '0.01', '0.010', '5'),
+    ]
+}
+
+
+# ==================== 机器人 ====================
+
+# AlphaArenaBot 构造时创建的依赖，测试中全部替换为 Mock
+BOT_PATCHES = (
+    'BinanceClient', 'MarketAnalyzer', 'RiskManager', 'AITradingEngine',
+    'PerformanceTracker', 'RollTracker', 'AdvancedPositionManager', 'RollingPositionManager',
+)
+
+BOT_ENV = {
+    'BINANCE_API_KEY': 'test_key',
+    'BINANCE_API_SECRET': 'test_secret',
+    'DEEPSEEK_API_KEY': 'test_deepseek_key',
+    'BINANCE_TESTNET': 'true',
+    'ENABLE_MARKET_STREAM': 'false',
+    'ENABLE_USER_STREAM': 'false',
+}
+
+
+def make_bot(test, symbols: List[str], **env):
+    """
+    创建依赖全部为 Mock 的 AlphaArenaBot
+
+    Args:
+        test: 当前 TestCase，补丁和线程池在测试结束时清理
+        symbols: TRADING_SYMBOLS
+        **env: 额外的环境变量
+    """
+    from alpha_arena_bot import AlphaArenaBot
+
+    for name in BOT_PATCHES:
+        patcher = patch(f'alpha_arena_bot.{name}')
+        patcher.start()
+        test.addCleanup(patcher.stop)
+
+    with patch.dict(os.environ, {**BOT_ENV, 'TRADING_SYMBOLS': ','.join(symbols), **env}):
+        bot = AlphaArenaBot()
+    test.addCleanup(bot._symbol_executor.shutdown, wait=True)
+    return bot
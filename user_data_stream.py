@@ -0,0 +1,417 @@
+"""
+Binance 合约用户数据流
+通过 listenKey 订阅 ACCOUNT_UPDATE / ORDER_TRADE_UPDATE 推送，维护余额、持仓和挂单的本地镜像；
+连接建立时和之后定期用 REST 对账。断线或尚未对账时 is_synced() 为 False，调用方回退 REST
+"""
+
+import json
+import time
+import random
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+try:
+    import websocket  # websocket-client
+    WEBSOCKET_AVAILABLE = True
+except ImportError:
+    WEBSOCKET_AVAILABLE = False
+
+
+# 仍在挂单簿中的订单状态
+ACTIVE_ORDER_STATUSES = ('NEW', 'PARTIALLY_FILLED')
+
+
+class UserDataStream:
+    """币安合约用户数据流客户端（余额/持仓/挂单本地镜像）"""
+
+    STREAM_URL = "wss://fstream.binance.com"
+    TESTNET_STREAM_URL = "wss://stream.binancefuture.com"
+
+    def __init__(self, client, testnet: bool = False, stream_url: str = None,
+                 keepalive_interval: float = 1800.0, reconcile_interval: float = 60.0,
+                 mark_price_source=None):
+        """
+        初始化用户数据流
+
+        Args:
+            client: BinanceClient实例（listenKey 管理和 REST 对账）
+            testnet: 是否使用测试网
+            stream_url: 自定义流地址（本地回放服务器用）
+            keepalive_interval: listenKey 续期间隔（秒，币安要求60分钟内续期）
+            reconcile_interval: REST 对账间隔（秒）
+            mark_price_source: 标记价格来源（BinanceStreamClient，可选），读取持仓时用于重算未实现盈亏
+        """
+        self.client = client
+        self.stream_url = stream_url or (self.TESTNET_STREAM_URL if testnet else self.STREAM_URL)
+        self.keepalive_interval = keepalive_interval
+        self.reconcile_interval = reconcile_interval
+        self.mark_price_source = mark_price_source
+        self.logger = logging.getLogger(__name__)
+
+        # 本地镜像
+        self._lock = threading.RLock()
+        self._account: Dict = {}                    # 最近一次对账的 /fapi/v2/account（钱包余额随推送调整）
+        self._balances: Dict[str, Dict] = {}        # asset -> {'wallet_balance', 'cross_wallet_balance', ...}
+        self._positions: Dict[tuple, Dict] = {}     # (symbol, positionSide) -> positionRisk 格式
+        self._orders: Dict[int, Dict] = {}          # orderId -> openOrders 格式
+        self._updated_at: Dict[tuple, float] = {}   # 镜像条目最后一次由推送更新的时间（对账时推送优先）
+        self._listeners: List[Callable[[str, Dict], None]] = []
+
+        # 连接状态
+        self.listen_key: Optional[str] = None
+        self.connected = False
+        self.synced = False
+        self._running = False
+        self._stop_event = threading.Event()
+        self._ws = None
+        self._thread = None
+        self._maintenance_thread = None
+        self._last_keepalive = 0.0
+        self._last_reconcile = 0.0
+
+        self.stats = {
+            'events': 0,
+            'reconciles': 0,
+            'reconnects': 0,
+            'errors': 0
+        }
+
+    # ========== 生命周期 ==========
+
+    def start(self) -> bool:
+        """
+        启动连接线程和维护线程（续期 + 定期对账）
+
+        Returns:
+            是否成功启动（未安装 websocket-client 时返回False，调用方继续使用REST）
+        """
+        if not WEBSOCKET_AVAILABLE:
+            self.logger.warning("[USER_STREAM] 未安装 websocket-client，用户数据流不可用，继续使用REST轮询")
+            return False
+        if self._running:
+            return True
+
+        self._running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='user-data-stream', daemon=True)
+        self._thread.start()
+        self._maintenance_thread = threading.Thread(target=self._maintenance_loop,
+                                                    name='user-data-maintenance', daemon=True)
+        self._maintenance_thread.start()
+        return True
+
+    def stop(self):
+        """停止连接并关闭 listenKey"""
+        self._running = False
+        self._stop_event.set()
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        if self.listen_key is not None:
+            try:
+                self.client.close_listen_key()
+            except Exception as e:
+                self.logger.debug(f"[USER_STREAM] 关闭 listenKey 失败: {e}")
+            self.listen_key = None
+        self.connected = False
+        self.synced = False
+
+    def wait_until_synced(self, timeout: float = 10.0) -> bool:
+        """等待连接建立并完成首次对账"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.is_synced():
+                return True
+            time.sleep(0.05)
+        return self.is_synced()
+
+    def is_synced(self) -> bool:
+        """镜像是否可用（已连接且连接后已完成对账）"""
+        return self.connected and self.synced
+
+    def _run_loop(self):
+        """连接主循环（断线或 listenKey 过期后自动重连，指数退避）"""
+        backoff = 1.0
+        while self._running:
+            started = time.time()
+            try:
+                if self.listen_key is None:
+                    self.listen_key = self.client.create_listen_key()
+                    self._last_keepalive = time.time()
+
+                self._ws = websocket.WebSocketApp(
+                    f"{self.stream_url}/ws/{self.listen_key}",
+                    on_open=self._on_open,
+                    on_message=self._on_message,
+                    on_error=self._on_error,
+                    on_close=self._on_close
+                )
+                self._ws.run_forever(ping_interval=60, ping_timeout=10)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.warning(f"[USER_STREAM] 连接异常: {e}")
+
+            self.connected = False
+            self.synced = False
+            if not self._running:
+                break
+
+            if time.time() - started > 60:
+                backoff = 1.0
+            self.stats['reconnects'] += 1
+            self.logger.warning(f"[USER_STREAM] 用户数据流断开，{backoff:.0f}秒后重连（期间回退REST）")
+            self._stop_event.wait(backoff + random.uniform(0, 0.5))
+            backoff = min(backoff * 2, 30.0)
+
+    def _maintenance_loop(self):
+        """listenKey 续期和定期对账"""
+        while not self._stop_event.wait(1.0):
+            now = time.time()
+            if self.connected and self.listen_key and now - self._last_keepalive >= self.keepalive_interval:
+                try:
+                    self.client.keepalive_listen_key()
+                    self._last_keepalive = now
+                except Exception as e:
+                    # 续期失败：重新申请 listenKey 并重连
+                    self.logger.warning(f"[USER_STREAM] listenKey 续期失败，重新连接: {e}")
+                    self._reset_connection()
+            if self.connected and now - self._last_reconcile >= self.reconcile_interval:
+                self.reconcile()
+
+    def _reset_connection(self):
+        """丢弃当前 listenKey 并断开，由主循环重新申请后重连"""
+        self.listen_key = None
+        self.synced = False
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+
+    # ========== REST 对账 ==========
+
+    def reconcile(self) -> bool:
+        """
+        用 REST 快照校正本地镜像（对账开始后收到的推送更新优先于快照）
+
+        Returns:
+            是否对账成功（失败时镜像保持原状态，未同步时调用方继续回退REST）
+        """
+        started = time.time()
+        try:
+            account = self.client.get_futures_account_info()
+            positions = self.client.get_futures_positions()
+            orders = self.client.get_futures_open_orders(use_stream=False)
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.logger.warning(f"[USER_STREAM] REST 对账失败: {e}")
+            return False
+
+        with self._lock:
+            self._account = dict(account)
+            self._balances = {
+                a['asset']: {
+                    'wallet_balance': float(a.get('walletBalance', 0)),
+                    'cross_wallet_balance': float(a.get('crossWalletBalance', 0)),
+                    'balance_change': 0.0
+                }
+                for a in account.get('assets', [])
+            }
+
+            new_positions = {(p['symbol'], p.get('positionSide', 'BOTH')): dict(p) for p in positions}
+            new_orders = {o['orderId']: dict(o) for o in orders}
+
+            # 请求期间推送过的条目以推送为准（包括推送中已成交/撤销的订单）
+            for key, updated_at in self._updated_at.items():
+                if updated_at < started:
+                    continue
+                kind, item_key = key
+                if kind == 'position' and item_key in self._positions:
+                    new_positions[item_key] = self._positions[item_key]
+                elif kind == 'order':
+                    if item_key in self._orders:
+                        new_orders[item_key] = self._orders[item_key]
+                    else:
+                        new_orders.pop(item_key, None)
+
+            self._positions = new_positions
+            self._orders = new_orders
+            self._updated_at = {k: v for k, v in self._updated_at.items() if v >= started}
+            self._last_reconcile = time.time()
+            self.synced = self.connected
+
+        self.stats['reconciles'] += 1
+        return True
+
+    # ========== WebSocket 回调 ==========
+
+    def _on_open(self, ws):
+        self.connected = True
+        self.logger.info("[USER_STREAM] 用户数据流已连接")
+        # 连接建立后先对账：断线期间错过的推送由快照补齐，之后的推送在快照之上增量更新
+        self.reconcile()
+
+    def _on_close(self, ws, close_status_code=None, close_msg=None):
+        self.connected = False
+        self.synced = False
+
+    def _on_error(self, ws, error):
+        self.stats['errors'] += 1
+        self.logger.warning(f"[USER_STREAM] 用户数据流错误: {error}")
+
+    def _on_message(self, ws, message: str):
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return
+        if 'e' not in data:
+            return
+        self.stats['events'] += 1
+        self.handle_event(data)
+
+    def handle_event(self, data: Dict):
+        """处理单条用户数据事件并更新镜像"""
+        event_type = data.get('e')
+        received_at = time.time()
+
+        with self._lock:
+            if event_type == 'ACCOUNT_UPDATE':
+                self._apply_account_update(data['a'], received_at)
+            elif event_type == 'ORDER_TRADE_UPDATE':
+                self._apply_order_update(data['o'], received_at)
+            elif event_type == 'ACCOUNT_CONFIG_UPDATE' and 'ac' in data:
+                symbol, leverage = data['ac']['s'], data['ac']['l']
+                for (pos_symbol, _), position in self._positions.items():
+                    if pos_symbol == symbol:
+                        position['leverage'] = str(leverage)
+
+        if event_type == 'listenKeyExpired':
+            self.logger.warning("[USER_STREAM] listenKey 已过期，重新连接")
+            self._reset_connection()
+
+        for listener in list(self._listeners):
+            try:
+                listener(event_type, data)
+            except Exception as e:
+                self.logger.warning(f"[USER_STREAM] 监听器异常: {e}")
+
+    def _apply_account_update(self, update: Dict, received_at: float):
+        for balance in update.get('B', []):
+            asset = balance['a']
+            wallet_balance = float(balance['wb'])
+            previous = self._balances.get(asset)
+            # 总钱包余额按 USDT 变化量调整，其余资产等下一次对账
+            if asset == 'USDT' and previous is not None and 'totalWalletBalance' in self._account:
+                delta = wallet_balance - previous['wallet_balance']
+                self._account['totalWalletBalance'] = str(float(self._account['totalWalletBalance']) + delta)
+            self._balances[asset] = {
+                'wallet_balance': wallet_balance,
+                'cross_wallet_balance': float(balance.get('cw', 0)),
+                'balance_change': float(balance.get('bc', 0))
+            }
+
+        for p in update.get('P', []):
+            key = (p['s'], p.get('ps', 'BOTH'))
+            position = self._positions.get(key)
+            if position is None:
+                position = {'symbol': p['s'], 'positionSide': key[1], 'markPrice': '0',
+                            'liquidationPrice': '0', 'leverage': '1'}
+                self._positions[key] = position
+            position.update({
+                'positionAmt': p['pa'],
+                'entryPrice': p['ep'],
+                'breakEvenPrice': p.get('bep', position.get('breakEvenPrice', '0')),
+                'unRealizedProfit': p['up'],
+                'marginType': p.get('mt', position.get('marginType', 'cross')),
+                'isolatedWallet': p.get('iw', '0'),
+                'updateTime': update.get('T', int(received_at * 1000))
+            })
+            self._updated_at[('position', key)] = received_at
+
+    def _apply_order_update(self, o: Dict, received_at: float):
+        order_id = o['i']
+        if o['X'] in ACTIVE_ORDER_STATUSES:
+            self._orders[order_id] = {
+                'orderId': order_id,
+                'symbol': o['s'],
+                'clientOrderId': o.get('c'),
+                'side': o['S'],
+                'type': o['o'],
+                'origType': o.get('ot', o['o']),
+                'timeInForce': o.get('f'),
+                'origQty': o['q'],
+                'price': o.get('p', '0'),
+                'avgPrice': o.get('ap', '0'),
+                'stopPrice': o.get('sp', '0'),
+                'executedQty': o.get('z', '0'),
+                'status': o['X'],
+                'reduceOnly': o.get('R', False),
+                'closePosition': o.get('cp', False),
+                'positionSide': o.get('ps', 'BOTH'),
+                'workingType': o.get('wt'),
+                'updateTime': o.get('T')
+            }
+        else:
+            self._orders.pop(order_id, None)
+        self._updated_at[('order', order_id)] = received_at
+
+    def add_listener(self, callback: Callable[[str, Dict], None]):
+        """注册用户数据事件监听器 callback(event_type, data)，在推送线程中调用，不应阻塞"""
+        self._listeners.append(callback)
+
+    # ========== 镜像读取 ==========
+
+    def _with_mark_price(self, position: Dict) -> Dict:
+        """用最新标记价格重算未实现盈亏（推送只在成交/资金费时更新 up）"""
+        position = dict(position)
+        if self.mark_price_source is not None:
+            mark_price = self.mark_price_source.get_mark_price(position['symbol'])
+            if mark_price is not None:
+                position_amt = float(position.get('positionAmt', 0))
+                entry_price = float(position.get('entryPrice', 0))
+                position['markPrice'] = str(mark_price)
+                position['unRealizedProfit'] = str(position_amt * (mark_price - entry_price))
+        return position
+
+    def get_positions(self) -> List[Dict]:
+        """活跃持仓（positionRisk 格式，非零仓位，返回副本）"""
+        with self._lock:
+            positions = [p for p in self._positions.values() if float(p.get('positionAmt', 0)) != 0]
+            return [self._with_mark_price(p) for p in positions]
+
+    def get_position(self, symbol: str) -> Optional[Dict]:
+        """单个交易对的持仓，无持仓返回None"""
+        for position in self.get_positions():
+            if position['symbol'] == symbol:
+                return position
+        return None
+
+    def get_open_orders(self, symbol: str = None) -> List[Dict]:
+        """当前挂单（openOrders 格式，返回副本）"""
+        with self._lock:
+            return [dict(o) for o in self._orders.values() if symbol is None or o['symbol'] == symbol]
+
+    def get_balance(self, asset: str = 'USDT') -> Optional[Dict]:
+        """单个资产的钱包余额"""
+        with self._lock:
+            balance = self._balances.get(asset)
+            return dict(balance) if balance is not None else None
+
+    def get_account_info(self) -> Dict:
+        """
+        账户信息（/fapi/v2/account 格式）
+
+        钱包余额为对账值加推送的 USDT 变化量，未实现盈亏和保证金余额按当前持仓重算
+        """
+        with self._lock:
+            account = dict(self._account)
+        unrealized_pnl = sum(float(p.get('unRealizedProfit', 0)) for p in self.get_positions())
+        wallet_balance = float(account.get('totalWalletBalance', 0))
+        account['totalUnrealizedProfit'] = str(unrealized_pnl)
+        account['totalMarginBalance'] = str(wallet_balance + unrealized_pnl)
+        return account
@@ -15,6 +15,8 @@ import time
 
 # 导入 Binance 客户端
 from binance_client import BinanceClient
+from binance_stream_client import BinanceStreamClient
+from user_data_stream import UserDataStream
 from performance_tracker import PerformanceTracker
 from risk_manager import RiskManager
 
@@ -29,12 +31,17 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 
 # 初始化 Binance 客户端（全局单例）
 binance_client = None
+stream_client = None
+user_stream = None
 performance_tracker = None
 risk_manager = None
 
+# 行情流正常时，账户/持仓REST快照的刷新间隔（秒）；期间用推送的标记价格重算未实现盈亏
+STREAM_REST_REFRESH_INTERVAL = 5.0
+
 def init_clients():
     """初始化客户端（延迟加载）"""
-    global binance_client, performance_tracker, risk_manager
+    global binance_client, stream_client, user_stream, performance_tracker, risk_manager
 
     if binance_client is None:
         api_key = os.getenv('BINANCE_API_KEY')
@@ -44,8 +51,29 @@ def init_clients():
         binance_client = BinanceClient(
             api_key=api_key,
             api_secret=api_secret,
-            testnet=testnet
+            testnet=testnet,
+            get_cache_ttl=float(os.getenv('BINANCE_GET_CACHE_TTL', 0.25))
+        )
+
+    if stream_client is None and os.getenv('ENABLE_MARKET_STREAM', 'true').lower() == 'true':
+        client = BinanceStreamClient(
+            [],
+            testnet=os.getenv('BINANCE_TESTNET', 'false').lower() == 'true',
+            stream_url=os.getenv('STREAM_URL') or None
+        )
+        if client.start():
+            stream_client = client
+
+    if user_stream is None and os.getenv('ENABLE_USER_STREAM', 'true').lower() == 'true':
+        client = UserDataStream(
+            binance_client,
+            testnet=os.getenv('BINANCE_TESTNET', 'false').lower() == 'true',
+            stream_url=os.getenv('USER_STREAM_URL') or None,
+            mark_price_source=stream_client
         )
+        if client.start():
+            user_stream = client
+            binance_client.attach_user_data_stream(client)
 
     if performance_tracker is None:
         # [NEW] 从Binance API获取实际余额，替代配置文件
@@ -294,8 +322,8 @@ def get_positions():
         # 初始化客户端
         init_clients()
 
-        # 直接从 Binance 获取所有合约持仓数据（包括所有交易对，不仅仅是配置的交易对）
-        raw_positions = binance_client.get_futures_positions()
+        # 获取所有合约持仓数据（包括所有交易对，不仅仅是配置的交易对；用户数据流同步时读本地镜像）
+        raw_positions = binance_client.get_active_positions()
 
         positions_list = []
 
@@ -456,16 +484,74 @@ def handle_disconnect():
     print(f'[ERROR] 客户端已断开')
 
 
+def apply_stream_mark_prices(account_info: dict, raw_positions: list):
+    """
+    用行情流的最新标记价格重算持仓未实现盈亏和账户保证金余额
+
+    Returns:
+        (account_info, raw_positions) 的副本；行情流不可用的交易对保持REST数值
+    """
+    if stream_client is None:
+        return account_info, raw_positions
+
+    updated_positions = []
+    pnl_delta = 0.0
+    for pos in raw_positions:
+        position_amt = float(pos.get('positionAmt', 0))
+        mark_price = stream_client.get_mark_price(pos.get('symbol', '')) if position_amt != 0 else None
+        if mark_price is None:
+            updated_positions.append(pos)
+            continue
+
+        entry_price = float(pos.get('entryPrice', 0))
+        new_pnl = position_amt * (mark_price - entry_price)
+        pnl_delta += new_pnl - float(pos.get('unRealizedProfit', 0))
+
+        pos = dict(pos)
+        pos['markPrice'] = str(mark_price)
+        pos['unRealizedProfit'] = str(new_pnl)
+        updated_positions.append(pos)
+
+    account_info = dict(account_info)
+    account_info['totalUnrealizedProfit'] = str(float(account_info.get('totalUnrealizedProfit', 0)) + pnl_delta)
+    account_info['totalMarginBalance'] = str(float(account_info.get('totalMarginBalance', 0)) + pnl_delta)
+    return account_info, updated_positions
+
+
 # 后台推送线程：每500ms推送一次实时数据（延迟<100ms感知）
+# 行情流正常时价格来自推送，账户/持仓REST快照降频到 STREAM_REST_REFRESH_INTERVAL
 def background_push_thread():
     """后台线程：实时推送数据到所有连接的客户端"""
+    account_snapshot = None
+    positions_snapshot = None
+    last_rest_refresh = 0.0
+
     while True:
         try:
             # 初始化客户端
             init_clients()
 
-            # 直接从Binance获取合约账户信息
-            account_info = binance_client.get_futures_account_info()
+            stream_ok = stream_client is not None and stream_client.is_healthy()
+            rest_interval = STREAM_REST_REFRESH_INTERVAL if stream_ok else 0.0
+
+            if user_stream is not None and user_stream.is_synced():
+                # 用户数据流同步时账户和持仓直接读推送维护的镜像，不再轮询REST
+                account_snapshot = user_stream.get_account_info()
+                positions_snapshot = user_stream.get_positions()
+                if stream_client is not None:
+                    stream_client.add_symbols(p['symbol'] for p in positions_snapshot)
+            elif account_snapshot is None or time.time() - last_rest_refresh >= rest_interval:
+                # 直接从Binance获取合约账户信息和全部持仓（持仓只请求一次）
+                account_snapshot = binance_client.get_futures_account_info()
+                positions_snapshot = binance_client.get_futures_positions()
+                last_rest_refresh = time.time()
+
+                if stream_client is not None:
+                    stream_client.add_symbols(
+                        p['symbol'] for p in positions_snapshot if float(p.get('positionAmt', 0)) != 0
+                    )
+
+            account_info, raw_positions = apply_stream_mark_prices(account_snapshot, positions_snapshot)
 
             # 获取合约账户总资产
             total_wallet_balance = float(account_info.get('totalWalletBalance', 0))  # 钱包余额（实际资金）
@@ -475,8 +561,8 @@ def background_push_thread():
             # 账户价值 = 保证金余额（钱包余额 + 未实现盈亏）= 真实总价值
             account_value = total_margin_balance
 
-            # 实时获取持仓
-            positions = binance_client.get_active_positions()
+            # 活跃持仓
+            positions = [p for p in raw_positions if float(p.get('positionAmt', 0)) != 0]
 
             # 计算性能指标
             metrics = performance_tracker.calculate_metrics(total_wallet_balance, positions)
@@ -500,7 +586,6 @@ def background_push_thread():
             })
 
             # 推送持仓数据（包括所有合约，不仅仅是配置的交易对）
-            raw_positions = binance_client.get_futures_positions()
             positions_list = []
 
             for pos in raw_positions: